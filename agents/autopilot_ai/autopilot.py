@@ -2,8 +2,8 @@
 """
 AutopilotAI — единый модуль:
   • Ядро автопилота (PID) с режимами: MANUAL / HOLD_ALT / CRUISE / RTL / LAND
-  • Failsafe-профили: LOW_BATTERY→LAND, LINK_LOSS→RTL, BARO_FAULT→HOLD_ALT, NO_RTK→degrade
-  • Terrain-follow (AGL) + keep-in геозона + домашняя точка (RTL)
+  • Failsafe-профили: LOW_BATTERY→LAND, LINK_LOSS→RTL, BARO_FAULT→HOLD_ALT, OVERRUN→RTL, NO_RTK→degrade
+  • Terrain-follow (AGL) + keep-in геозона (круг / полигоны keep-in/keep-out) + домашняя точка (RTL)
   • Мини-симулятор динамики и демо
   • Advisor (AirframeSpec, справочник: libs, rules, capabilities, mission_presets, checklist)
 
@@ -12,37 +12,17 @@ AutopilotAI — единый модуль:
 
 from dataclasses import dataclass, field
 from typing import Dict, Any, Optional, Tuple, List
-from math import hypot
+from math import cos, hypot, radians
 from utils.pid import PID
+from agents.autopilot_ai.frames import AutopilotCommand, SensorFrame
+from agents.autopilot_ai.geofence import PolygonGeofence
+from agents.autopilot_ai.rtl_floor import rtl_floor_m
 
 # ╔══════════════════════════════════════════════════════════════════════════╗
 # ║  NEW: COMPLIANCE CHECK — ПРОВЕРКА СООТВЕТСТВИЯ UAS ZONES                 ║
 # ╚══════════════════════════════════════════════════════════════════════════╝
-from shapely.geometry import Polygon
-from agents.compliance.uas_zones_loader import load_zones
-from agents.compliance.uas_zones_check import check_polygon_against_zones
-
-def ensure_zone_compliance(poly_coords_latlon, zone_files):
-    """
-    Проверка миссии на пересечение с запретными/ограниченными зонами.
-    
-    Args:
-        poly_coords_latlon: список координат [(lat, lon), ...]
-        zone_files: список путей к файлам с геозонами (GeoJSON/GeoPackage)
-    
-    Raises:
-        RuntimeError: если маршрут пересекает запретные зоны
-    """
-    # poly_coords_latlon = [(lat, lon), ...]
-    mission_poly = Polygon([(lon, lat) for (lat, lon) in poly_coords_latlon])
-    zones = load_zones(zone_files)
-    hits = check_polygon_against_zones(mission_poly, zones)
-    if hits:
-        names = ", ".join(h["zone"] for h in hits)
-        raise RuntimeError(
-            f"Маршрут пересекает запретные/ограниченные зоны: {names}. "
-            f"Скорректируйте полигон или получите разрешение."
-        )
+# единая реализация (индекс зон, кэш файлов, высотные ограничения): agents/compliance/utils.py
+from agents.compliance.utils import ensure_zone_compliance  # noqa: F401
 # ╔══════════════════════════════════════════════════════════════════════════╗
 # ║  КОНЕЦ СЕКЦИИ COMPLIANCE CHECK                                           ║
 # ╚══════════════════════════════════════════════════════════════════════════╝
@@ -124,13 +104,17 @@ class SpeedController:
 # ========================== ВСПОМОГАТЕЛИ ==========================
 @dataclass
 class Geofence:
-    """Keep-in геозона: круг (lat0, lon0, radius_m). Упрощённая локальная проекция."""
+    """Keep-in геозона: круг (lat0, lon0, radius_m). Локальная проекция с cos(lat0), считается один раз."""
     lat0: float
     lon0: float
     radius_m: float
+    _kx: float = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._kx = 111320.0 * cos(radians(self.lat0))
 
     def inside(self, lat: float, lon: float) -> bool:
-        dx = (lon - self.lon0) * 111320.0 * 0.6  # грубо по долготе
+        dx = (lon - self.lon0) * self._kx
         dy = (lat - self.lat0) * 111320.0
         return hypot(dx, dy) <= self.radius_m
 
@@ -154,7 +138,8 @@ class Autopilot:
       RTL — возврат домой
       LAND — посадка
     """
-    MODES = {"MANUAL", "HOLD_ALT", "CRUISE", "RTL", "LAND"}
+    MODES = frozenset({"MANUAL", "HOLD_ALT", "CRUISE", "RTL", "LAND"})
+    _TERRAIN_MODES = frozenset({"HOLD_ALT", "CRUISE"})
 
     def __init__(self):
         self.mode: str = "MANUAL"
@@ -169,25 +154,48 @@ class Autopilot:
 
         # Геозона/рельеф
         self.keepin: Optional[Geofence] = None
+        self.fence: Optional[PolygonGeofence] = None
+        self.fence_margin_m: float = 0.0  # RTL, когда запас до границы меньше
         self.terrain = TerrainFollower(target_agl_m=60.0)
         self.use_terrain: bool = True
+        self.dem: Optional[Any] = None  # engine.utils.dem_srtm.DEM: рельеф по lat/lon вместо terrain_elev_m
+        self._rtl_floor_m: Optional[float] = None  # мин. высота RTL по профилю рельефа до дома
+        self.rtl_unknown_margin_m: float = 100.0  # рельеф до дома неизвестен — RTL на столько выше цели
 
         # Дом для RTL
         self.home: Optional[Tuple[float, float, float]] = None  # lat, lon, alt_asl_m
 
+        # Буферы dict-обёртки update() (переиспользуются между тиками)
+        self._frame = SensorFrame()
+        self._cmd = AutopilotCommand()
+        self._manual = AutopilotCommand()
+
     # ---- Публичный API ----
     def set_home(self, lat: float, lon: float, alt_asl_m: float) -> None:
         self.home = (float(lat), float(lon), float(alt_asl_m))
+        self._rtl_floor_m = None
 
     def set_geofence(self, lat: float, lon: float, radius_m: float) -> None:
         self.keepin = Geofence(lat, lon, radius_m)
 
+    def set_polygon_fence(self, fence: Optional[PolygonGeofence], margin_m: float = 0.0) -> None:
+        """Полигональная геозона (None — снять); RTL при запасе до границы < margin_m."""
+        if fence is not None:
+            fence.cover_margin(margin_m)
+        self.fence = fence
+        self.fence_margin_m = float(margin_m)
+
+    def set_dem(self, dem: Optional[Any]) -> None:
+        """Источник рельефа с elevation_at(lat, lon) (None — брать terrain_elev_m из сенсоров)."""
+        self.dem = dem
+
     def set_mode(self, mode: str,
                  target_alt_m: Optional[float] = None,
                  target_airspeed_ms: Optional[float] = None) -> None:
         if mode not in self.MODES:
             raise ValueError(f"Unknown mode: {mode}")
         self.mode = mode
+        self._rtl_floor_m = None  # пересчитать при следующем входе в RTL
         if target_alt_m is not None:
             self.alt_ctl.set_target(target_alt_m)
         if target_airspeed_ms is not None:
@@ -202,97 +210,114 @@ class Autopilot:
             self.spd_ctl.set_target(airspeed_ms)
 
     # ---- Failsafe ----
-    def _failsafe_check(self, sys: Dict[str, Any], sensors: Dict[str, Any]) -> Tuple[bool, str]:
-        batt_v = float(sys.get("battery_v", 0.0))
-        link_ok = bool(sys.get("link_ok", True))
-        dt = float(sys.get("dt", 0.1))
-        rtk_fix = bool(sensors.get("rtk_fix", True))  # True = RTK fixed/float
-        baro_alt_m = sensors.get("baro_alt_m", None)
-
-        self._link_timer = 0.0 if link_ok else (self._link_timer + dt)
+    def _failsafe_check(self, f: SensorFrame) -> str:
+        """Причина failsafe ("" — нет) по кадру сенсоров; обновляет таймер потери связи."""
+        self._link_timer = 0.0 if f.link_ok else (self._link_timer + f.dt)
 
-        if batt_v <= 0 or batt_v < self.min_batt_v:
-            return True, "LOW_BATTERY"
+        if f.battery_v <= 0 or f.battery_v < self.min_batt_v:
+            return "LOW_BATTERY"
         if self._link_timer > self.link_timeout_s:
-            return True, "LINK_LOSS"
-        if baro_alt_m is None or not isinstance(baro_alt_m, (int, float)):
-            return True, "BARO_FAULT"
-        if self.require_rtk and not rtk_fix:
-            return True, "NO_RTK"
-        return False, ""
+            return "LINK_LOSS"
+        if not f.baro_ok:
+            return "BARO_FAULT"
+        if f.overrun:
+            return "OVERRUN"
+        if self.require_rtk and not f.rtk_fix:
+            return "NO_RTK"
+        return ""
 
     # ---- Основной апдейт ----
     def update(self, sensors: Dict[str, Any], sys: Dict[str, Any],
                manual_cmd: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
-        dt = float(sys.get("dt", 0.1))
-        failsafe, reason = self._failsafe_check(sys, sensors)
+        """Dict-API (совместимость): обёртка над update_fast()."""
+        frame = self._frame.fill(sensors, sys)
+        manual = self._manual.fill_manual(manual_cmd) if self.mode == "MANUAL" else None
+        return self.update_fast(frame, self._cmd, manual).to_dict()
+
+    def update_fast(self, f: SensorFrame, cmd: AutopilotCommand,
+                    manual: Optional[AutopilotCommand] = None) -> AutopilotCommand:
+        """
+        Быстрый тик: читает SensorFrame и пишет в переиспользуемый cmd (без словарей).
+        manual — ручные команды (thrust/pitch/roll/yaw) для режима MANUAL.
+        """
+        dt = f.dt
+        reason = self._failsafe_check(f)
 
         # Terrain-follow (если включён и режим требует высоты)
-        terrain_elev_m = float(sensors.get("terrain_elev_m", 0.0))
-        if self.use_terrain and self.mode in {"HOLD_ALT", "CRUISE"}:
-            self.alt_ctl.set_target(self.terrain.target_asl(terrain_elev_m))
-
-        out = {
-            "thrust": 0.0, "pitch": 0.0, "roll": 0.0, "yaw": 0.0,
-            "failsafe": failsafe, "failsafe_reason": reason,
-            "mode": self.mode,
-            "targets": {"alt_m": self.alt_ctl.target_alt_m, "airspeed_ms": self.spd_ctl.target_ms},
-        }
+        if self.use_terrain and self.mode in self._TERRAIN_MODES:
+            elev = f.terrain_elev_m
+            if self.dem is not None:
+                e = self.dem.elevation_at(f.lat, f.lon)
+                if e == e:  # NaN (пустота DEM) — остаёмся на сенсорной высоте рельефа
+                    elev = e
+            self.alt_ctl.set_target(self.terrain.target_asl(elev))
+
+        cmd.thrust = cmd.pitch = cmd.roll = cmd.yaw = 0.0
+        cmd.failsafe = reason != ""
+        cmd.failsafe_reason = reason
+        cmd.mode = self.mode
+        cmd.target_alt_m = self.alt_ctl.target_alt_m
+        cmd.target_airspeed_ms = self.spd_ctl.target_ms
+        cmd.course_offset_deg = None
 
         # Профили поведения при авариях
-        if failsafe:
-            if reason == "LOW_BATTERY":
-                self.mode = "LAND"
-            elif reason == "LINK_LOSS":
-                self.mode = "RTL" if self.home else "HOLD_ALT"
-            elif reason == "BARO_FAULT":
-                self.mode = "HOLD_ALT"
-            elif reason == "NO_RTK":
-                # деградация: продолжаем без остановки миссии, но метим reason
-                pass
+        if reason == "LOW_BATTERY":
+            self.mode = "LAND"
+        elif reason == "LINK_LOSS" or reason == "OVERRUN":
+            # контур не успевает / нет связи — возврат домой, без дома — висим
+            self.mode = "RTL" if self.home else "HOLD_ALT"
+        elif reason == "BARO_FAULT":
+            self.mode = "HOLD_ALT"
+        # NO_RTK — деградация: продолжаем без остановки миссии, но метим reason
 
         # Геозона: выход => RTL (если не LAND)
-        lat, lon = float(sensors.get("lat", 0.0)), float(sensors.get("lon", 0.0))
-        if self.keepin and not self.keepin.inside(lat, lon) and self.mode != "LAND":
+        if self.keepin and not self.keepin.inside(f.lat, f.lon) and self.mode != "LAND":
+            self.mode = "RTL"
+        # Полигоны: RTL заранее, как только запас до границы меньше fence_margin_m
+        if self.fence is not None and self.mode != "LAND" and \
+                self.fence.margin_m(f.lat, f.lon) < self.fence_margin_m:
             self.mode = "RTL"
 
-        # Данные сенсоров
-        baro_alt_m = float(sensors.get("baro_alt_m", 0.0))
-        airspeed_ms = float(sensors.get("airspeed", 0.0))
+        mode = self.mode
+        if mode != "RTL":
+            self._rtl_floor_m = None  # вышли из RTL (в т.ч. по failsafe) — следующий вход пересчитает
+        elif self._rtl_floor_m is None and self.dem is not None and self.home:
+            # на входе в RTL: не ниже max(рельеф по прямой до дома) + AGL
+            target = self.alt_ctl.target_alt_m
+            self._rtl_floor_m = rtl_floor_m(self.dem, f.lat, f.lon, self.home[0], self.home[1],
+                                            self.terrain.target_agl_m, target + self.rtl_unknown_margin_m)
+            if self._rtl_floor_m > target:
+                self.alt_ctl.set_target(self._rtl_floor_m)
 
         # Режимы
-        if self.mode == "MANUAL":
-            cmd = manual_cmd or {}
-            out["thrust"] = float(cmd.get("thrust", 0.0))
-            out["pitch"]  = float(cmd.get("pitch",  0.0))
-            out["roll"]   = float(cmd.get("roll",   0.0))
-            out["yaw"]    = float(cmd.get("yaw",    0.0))
-            return out
-
-        if self.mode == "HOLD_ALT":
-            out["thrust"] = self.alt_ctl.update(baro_alt_m, dt)
-            out["pitch"] = 0.0
-            return out
-
-        if self.mode == "CRUISE":
-            out["thrust"] = self.alt_ctl.update(baro_alt_m, dt)
-            out["pitch"]  = self.spd_ctl.update(airspeed_ms, dt)
-            return out
-
-        if self.mode == "RTL":
+        if mode == "MANUAL":
+            if manual is not None:
+                cmd.thrust, cmd.pitch, cmd.roll, cmd.yaw = manual.thrust, manual.pitch, manual.roll, manual.yaw
+            return cmd
+
+        if mode == "HOLD_ALT":
+            cmd.thrust = self.alt_ctl.update(f.baro_alt_m, dt)
+            return cmd
+
+        if mode == "CRUISE":
+            cmd.thrust = self.alt_ctl.update(f.baro_alt_m, dt)
+            cmd.pitch = self.spd_ctl.update(f.airspeed, dt)
+            return cmd
+
+        if mode == "RTL":
             # Упрощённо: держим высоту, слегка «тянем» нос (возврат по курсу реализуется на внешнем слое)
-            out["thrust"] = self.alt_ctl.update(baro_alt_m, dt)
-            out["pitch"]  = 0.15
-            return out
+            cmd.thrust = self.alt_ctl.update(f.baro_alt_m, dt)
+            cmd.pitch = 0.15
+            return cmd
 
-        if self.mode == "LAND":
+        if mode == "LAND":
             # Примитивная посадка: ступенчатое снижение
             self.alt_ctl.set_target(max(0.0, self.alt_ctl.target_alt_m - 0.6))  # ≈0.6 м/шаг
-            out["thrust"] = max(0.2, self.alt_ctl.update(baro_alt_m, dt) - 0.1)
-            out["pitch"] = -0.05
-            return out
+            cmd.thrust = max(0.2, self.alt_ctl.update(f.baro_alt_m, dt) - 0.1)
+            cmd.pitch = -0.05
+            return cmd
 
-        return out
+        return cmd
 
 
 # ========================== МИНИ-СИМУЛЯТОР ==========================
@@ -17,10 +17,11 @@
 """
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from typing import Optional
 from math import pi, sin, cos
 
 from .autopilot_basic import Autopilot as BaseAutopilot
+from .frames import AutopilotCommand, SensorFrame
 
 
 # ───────────────────────── Параметры профилей ─────────────────────────
@@ -99,18 +100,21 @@ class AerobaticsAutopilot(BaseAutopilot):
                 setattr(target, k, float(v))
 
     # ――― Основной апдейт ―――
-    def update(self, sensors: Dict[str, Any], sys: Dict[str, Any],
-               manual_cmd: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    _PASSIVE_MODES = frozenset({"RTL", "LAND"})
+    _PROFILE_MODES = frozenset({"HOLD_ALT", "CRUISE"})
 
-        dt = float(sys.get("dt", 0.1))
-        out = super().update(sensors, sys, manual_cmd)
+    def update_fast(self, f: SensorFrame, cmd: AutopilotCommand,
+                    manual: Optional[AutopilotCommand] = None) -> AutopilotCommand:
+        # dict-API update() базового АП вызывает этот метод и отдаёт guidance в out["guidance"]
+        super().update_fast(f, cmd, manual)
 
         # если базовый АП в failsafe/RTL/LAND — пилотаж не вмешивается
-        if out.get("failsafe") or self.mode in {"RTL", "LAND"}:
-            return out
+        if cmd.failsafe or self.mode in self._PASSIVE_MODES:
+            return cmd
 
         # пилотаж активен только в удерживающих режимах
-        if self.profile and self.mode in {"HOLD_ALT", "CRUISE"}:
+        if self.profile and self.mode in self._PROFILE_MODES:
+            dt = f.dt
             # что отдаём внешнему слою: desired course offset (градусы)
             course_offset_deg = 0.0
             added_pitch = 0.0
@@ -128,14 +132,13 @@ class AerobaticsAutopilot(BaseAutopilot):
                 course_offset_deg, added_pitch = self._do_loiter(dt)
 
             # подмешиваем ограниченно
-            out["pitch"] = self._clamp(out.get("pitch", 0.0) + added_pitch,
-                                       -self.SAFE_PITCH_LIMIT, self.SAFE_PITCH_LIMIT)
+            cmd.pitch = self._clamp(cmd.pitch + added_pitch,
+                                    -self.SAFE_PITCH_LIMIT, self.SAFE_PITCH_LIMIT)
 
             # подсказка внешнему слою (планировщик курса/крен)
-            out.setdefault("guidance", {})
-            out["guidance"]["course_offset_deg"] = course_offset_deg
+            cmd.course_offset_deg = course_offset_deg
 
-        return out
+        return cmd
 
     # ――― Реализация профилей ―――
     def _do_orbit(self, dt: float) -> tuple[float, float]:
@@ -2,14 +2,18 @@
 """
 Базовый автопилот для миссий (легковесный).
 Режимы: MANUAL / HOLD_ALT / CRUISE / RTL / LAND
-Failsafe: LOW_BATTERY→LAND, LINK_LOSS→RTL, BARO_FAULT→HOLD_ALT, NO_RTK→degrade
-Функции: terrain-follow (AGL), keep-in геозона, RTL к дому.
+Failsafe: LOW_BATTERY→LAND, LINK_LOSS→RTL, BARO_FAULT→HOLD_ALT, OVERRUN→RTL, NO_RTK→degrade
+Функции: terrain-follow (AGL), keep-in геозона (круг / полигоны), RTL к дому.
 Проверка UAS-зон выполняется снаружи через check_mission_zones().
 """
 
 from dataclasses import dataclass, field
 from typing import Dict, Any, Optional, Tuple
-from math import hypot
+from math import cos, hypot, radians
+
+from .frames import AutopilotCommand, SensorFrame
+from .geofence import PolygonGeofence
+from .rtl_floor import rtl_floor_m
 
 # ───────────────────────── PID (встроенный, чтобы не тянуть utils.pid) ─────────────────────────
 @dataclass
@@ -88,10 +92,12 @@ class SpeedController:
 # ───────────────────────── Вспомогательные ─────────────────────────
 @dataclass
 class Geofence:
-    """Простая keep-in окружность (lat0, lon0, radius_m)."""
+    """Простая keep-in окружность (lat0, lon0, radius_m); cos(lat0) — один раз при создании."""
     lat0: float; lon0: float; radius_m: float
+    _kx: float = field(init=False, repr=False)
+    def __post_init__(self): self._kx = 111320.0 * cos(radians(self.lat0))
     def inside(self, lat: float, lon: float) -> bool:
-        dx = (lon - self.lon0) * 111320.0 * 0.6
+        dx = (lon - self.lon0) * self._kx
         dy = (lat - self.lat0) * 111320.0
         return hypot(dx, dy) <= self.radius_m
 
@@ -104,7 +110,8 @@ class TerrainFollower:
 
 # ───────────────────────── Базовый автопилот ─────────────────────────
 class Autopilot:
-    MODES = {"MANUAL","HOLD_ALT","CRUISE","RTL","LAND"}
+    MODES = frozenset({"MANUAL","HOLD_ALT","CRUISE","RTL","LAND"})
+    _TERRAIN_MODES = frozenset({"HOLD_ALT","CRUISE"})
 
     def __init__(self):
         self.mode: str = "MANUAL"
@@ -119,25 +126,41 @@ class Autopilot:
 
         # Геозона/рельеф
         self.keepin: Optional[Geofence] = None
+        self.fence: Optional[PolygonGeofence] = None; self.fence_margin_m: float = 0.0
         self.terrain = TerrainFollower(target_agl_m=60.0)
         self.use_terrain: bool = True
+        self.dem: Optional[Any] = None  # DEM с elevation_at(lat, lon) — вместо terrain_elev_m
+        self._rtl_floor_m: Optional[float] = None  # мин. высота RTL по рельефу до дома
+        self.rtl_unknown_margin_m: float = 100.0   # рельеф до дома неизвестен — RTL выше цели на столько
 
         # Дом (lat, lon, alt_asl_m)
         self.home: Optional[Tuple[float, float, float]] = None
 
+        # Буферы dict-обёртки update()
+        self._frame = SensorFrame(); self._cmd = AutopilotCommand(); self._manual = AutopilotCommand()
+
     # ---- API ----
     def set_home(self, lat: float, lon: float, alt_asl_m: float) -> None:
-        self.home = (float(lat), float(lon), float(alt_asl_m))
+        self.home = (float(lat), float(lon), float(alt_asl_m)); self._rtl_floor_m = None
 
     def set_geofence(self, lat: float, lon: float, radius_m: float) -> None:
         self.keepin = Geofence(lat, lon, radius_m)
 
+    def set_polygon_fence(self, fence: Optional[PolygonGeofence], margin_m: float = 0.0) -> None:
+        """Полигоны keep-in/keep-out (None — снять); RTL при запасе до границы < margin_m."""
+        if fence is not None: fence.cover_margin(margin_m)  # запас дальше горизонта — только оценка снизу
+        self.fence = fence; self.fence_margin_m = float(margin_m)
+
+    def set_dem(self, dem: Optional[Any]) -> None:
+        """Рельеф по lat/lon из DEM (None — из сенсоров)."""
+        self.dem = dem
+
     def set_mode(self, mode: str,
                  target_alt_m: Optional[float]=None,
                  target_airspeed_ms: Optional[float]=None) -> None:
         if mode not in self.MODES:
             raise ValueError(f"Unknown mode: {mode}")
-        self.mode = mode
+        self.mode = mode; self._rtl_floor_m = None  # пересчёт при следующем входе в RTL
         if target_alt_m is not None: self.alt_ctl.set_target(target_alt_m)
         if target_airspeed_ms is not None: self.spd_ctl.set_target(target_airspeed_ms)
         self.alt_ctl.reset(); self.spd_ctl.reset()
@@ -147,85 +170,92 @@ class Autopilot:
         if airspeed_ms is not None: self.spd_ctl.set_target(airspeed_ms)
 
     # ---- Failsafe ----
-    def _failsafe_check(self, sys: Dict[str, Any], sensors: Dict[str, Any]):
-        batt_v   = float(sys.get("battery_v", 0.0))
-        link_ok  = bool(sys.get("link_ok", True))
-        dt       = float(sys.get("dt", 0.1))
-        rtk_fix  = bool(sensors.get("rtk_fix", True))
-        baro_ok  = isinstance(sensors.get("baro_alt_m", None), (int, float))
+    def _failsafe_check(self, f: SensorFrame) -> str:
+        self._link_timer = 0.0 if f.link_ok else (self._link_timer + f.dt)
 
-        self._link_timer = 0.0 if link_ok else (self._link_timer + dt)
-
-        if batt_v <= 0 or batt_v < self.min_batt_v: return True, "LOW_BATTERY"
-        if self._link_timer > self.link_timeout_s:  return True, "LINK_LOSS"
-        if not baro_ok:                              return True, "BARO_FAULT"
-        if self.require_rtk and not rtk_fix:        return True, "NO_RTK"
-        return False, ""
+        if f.battery_v <= 0 or f.battery_v < self.min_batt_v: return "LOW_BATTERY"
+        if self._link_timer > self.link_timeout_s:          return "LINK_LOSS"
+        if not f.baro_ok:                                    return "BARO_FAULT"
+        if f.overrun:                                        return "OVERRUN"
+        if self.require_rtk and not f.rtk_fix:              return "NO_RTK"
+        return ""
 
     # ---- Основной апдейт ----
     def update(self, sensors: Dict[str, Any], sys: Dict[str, Any],
                manual_cmd: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
-        dt = float(sys.get("dt", 0.1))
-        failsafe, reason = self._failsafe_check(sys, sensors)
+        """Dict-API (совместимость): обёртка над update_fast()."""
+        frame = self._frame.fill(sensors, sys)
+        manual = self._manual.fill_manual(manual_cmd) if self.mode == "MANUAL" else None
+        return self.update_fast(frame, self._cmd, manual).to_dict()
 
-        # Terrain-follow при режимах, где держим высоту
-        terrain_elev_m = float(sensors.get("terrain_elev_m", 0.0))
-        if self.use_terrain and self.mode in {"HOLD_ALT","CRUISE"}:
-            self.alt_ctl.set_target(self.terrain.target_asl(terrain_elev_m))
+    def update_fast(self, f: SensorFrame, cmd: AutopilotCommand,
+                    manual: Optional[AutopilotCommand] = None) -> AutopilotCommand:
+        """Быстрый тик: SensorFrame → переиспользуемый AutopilotCommand (без словарей)."""
+        dt = f.dt
+        reason = self._failsafe_check(f)
 
-        out = {
-            "thrust": 0.0, "pitch": 0.0, "roll": 0.0, "yaw": 0.0,
-            "failsafe": failsafe, "failsafe_reason": reason, "mode": self.mode,
-            "targets": {"alt_m": self.alt_ctl.target_alt_m, "airspeed_ms": self.spd_ctl.target_ms},
-        }
+        # Terrain-follow при режимах, где держим высоту
+        if self.use_terrain and self.mode in self._TERRAIN_MODES:
+            elev = f.terrain_elev_m
+            if self.dem is not None:
+                e = self.dem.elevation_at(f.lat, f.lon)
+                if e == e: elev = e  # NaN — пустота DEM
+            self.alt_ctl.set_target(self.terrain.target_asl(elev))
+
+        cmd.thrust = cmd.pitch = cmd.roll = cmd.yaw = 0.0
+        cmd.failsafe = reason != ""; cmd.failsafe_reason = reason; cmd.mode = self.mode
+        cmd.target_alt_m = self.alt_ctl.target_alt_m; cmd.target_airspeed_ms = self.spd_ctl.target_ms
+        cmd.course_offset_deg = None
 
         # Поведение при авариях
-        if failsafe:
-            if   reason == "LOW_BATTERY": self.mode = "LAND"
-            elif reason == "LINK_LOSS":   self.mode = "RTL" if self.home else "HOLD_ALT"
-            elif reason == "BARO_FAULT":  self.mode = "HOLD_ALT"
+        if   reason == "LOW_BATTERY": self.mode = "LAND"
+        elif reason in ("LINK_LOSS", "OVERRUN"): self.mode = "RTL" if self.home else "HOLD_ALT"
+        elif reason == "BARO_FAULT":  self.mode = "HOLD_ALT"
 
         # Keep-in геозона → RTL
-        lat, lon = float(sensors.get("lat", 0.0)), float(sensors.get("lon", 0.0))
-        if self.keepin and not self.keepin.inside(lat, lon) and self.mode != "LAND":
+        if self.keepin and not self.keepin.inside(f.lat, f.lon) and self.mode != "LAND":
+            self.mode = "RTL"
+        if self.fence is not None and self.mode != "LAND" and self.fence.margin_m(f.lat, f.lon) < self.fence_margin_m:
             self.mode = "RTL"
 
-        # Сенсоры
-        baro_alt_m  = float(sensors.get("baro_alt_m", 0.0))
-        airspeed_ms = float(sensors.get("airspeed",   0.0))
+        mode = self.mode
+        if mode != "RTL":
+            self._rtl_floor_m = None  # вышли из RTL (и по failsafe) — пересчёт при входе
+        elif self._rtl_floor_m is None and self.dem is not None and self.home:
+            # вход в RTL: цель не ниже max(рельеф до дома) + AGL
+            target = self.alt_ctl.target_alt_m
+            self._rtl_floor_m = rtl_floor_m(self.dem, f.lat, f.lon, self.home[0], self.home[1],
+                                            self.terrain.target_agl_m, target + self.rtl_unknown_margin_m)
+            if self._rtl_floor_m > target: self.alt_ctl.set_target(self._rtl_floor_m)
 
         # Режимы
-        if self.mode == "MANUAL":
-            cmd = manual_cmd or {}
-            out["thrust"] = float(cmd.get("thrust", 0.0))
-            out["pitch"]  = float(cmd.get("pitch",  0.0))
-            out["roll"]   = float(cmd.get("roll",   0.0))
-            out["yaw"]    = float(cmd.get("yaw",    0.0))
-            return out
-
-        if self.mode == "HOLD_ALT":
-            out["thrust"] = self.alt_ctl.update(baro_alt_m, dt)
-            out["pitch"]  = 0.0
-            return out
-
-        if self.mode == "CRUISE":
-            out["thrust"] = self.alt_ctl.update(baro_alt_m, dt)
-            out["pitch"]  = self.spd_ctl.update(airspeed_ms, dt)
-            return out
-
-        if self.mode == "RTL":
-            out["thrust"] = self.alt_ctl.update(baro_alt_m, dt)
-            out["pitch"]  = 0.15
-            return out
-
-        if self.mode == "LAND":
+        if mode == "MANUAL":
+            if manual is not None:
+                cmd.thrust, cmd.pitch, cmd.roll, cmd.yaw = manual.thrust, manual.pitch, manual.roll, manual.yaw
+            return cmd
+
+        if mode == "HOLD_ALT":
+            cmd.thrust = self.alt_ctl.update(f.baro_alt_m, dt)
+            return cmd
+
+        if mode == "CRUISE":
+            cmd.thrust = self.alt_ctl.update(f.baro_alt_m, dt)
+            cmd.pitch  = self.spd_ctl.update(f.airspeed, dt)
+            return cmd
+
+        if mode == "RTL":
+            cmd.thrust = self.alt_ctl.update(f.baro_alt_m, dt)
+            cmd.pitch  = 0.15
+            return cmd
+
+        if mode == "LAND":
             # ступенчатое снижение
             self.alt_ctl.set_target(max(0.0, self.alt_ctl.target_alt_m - 0.6))
-            out["thrust"] = max(0.2, self.alt_ctl.update(baro_alt_m, dt) - 0.1)
-            out["pitch"]  = -0.05
-            return out
+            cmd.thrust = max(0.2, self.alt_ctl.update(f.baro_alt_m, dt) - 0.1)
+            cmd.pitch  = -0.05
+            return cmd
 
-        return out
+        return cmd
 
 # ───────────────────────── Проверка UAS-зон (вызов перед upload миссии) ─────────────────────────
 def check_mission_zones(poly_coords_latlon, zone_files):
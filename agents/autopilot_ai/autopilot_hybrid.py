@@ -27,10 +27,20 @@ class HybridAutopilot:
     def set_geofence(self, *args, **kwargs):
         self.basic.set_geofence(*args, **kwargs); self.aero.set_geofence(*args, **kwargs)
 
+    def set_polygon_fence(self, *args, **kwargs):
+        self.basic.set_polygon_fence(*args, **kwargs); self.aero.set_polygon_fence(*args, **kwargs)
+
+    def set_dem(self, dem):
+        self.basic.set_dem(dem); self.aero.set_dem(dem)
+
     def update(self, sensors: Dict[str,Any], sys: Dict[str,Any], manual_cmd: Optional[Dict[str,float]]=None):
         ap = self.aero if self.use_aero else self.basic
         return ap.update(sensors, sys, manual_cmd)
 
+    def update_fast(self, frame, cmd, manual=None):
+        ap = self.aero if self.use_aero else self.basic
+        return ap.update_fast(frame, cmd, manual)
+
     # проверка зон — на этапе планирования миссии (для basic)
     @staticmethod
     def ensure_mission_safe(poly_coords_latlon, zone_files):
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Микробенчмарк тика автопилота: dict-API update() против update_fast().
+
+Для каждого автопилота (autopilot.Autopilot, autopilot_basic.Autopilot,
+AerobaticsAutopilot) печатает:
+  • ticks/s          — пропускная способность тика
+  • peak B/tick      — пиковый объём временных аллокаций за тик (tracemalloc)
+  • blocks/tick      — среднее число живых блоков памяти, созданных тиком
+                       и ещё не освобождённых к его концу (утечки/кэши)
+
+Запуск:
+  python -m agents.autopilot_ai.benchmark_tick --ticks 200000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from agents.autopilot_ai.autopilot import Autopilot
+from agents.autopilot_ai.autopilot_aerobatics import AerobaticsAutopilot
+from agents.autopilot_ai.autopilot_basic import Autopilot as BasicAutopilot
+from agents.autopilot_ai.frames import AutopilotCommand, SensorFrame
+
+
+def _make(cls: type) -> object:
+    ap = cls()
+    ap.set_home(52.12, 13.45, 40.0)
+    ap.set_geofence(52.12, 13.45, 2000.0)
+    ap.set_mode("CRUISE", target_alt_m=120.0, target_airspeed_ms=18.0)
+    if isinstance(ap, AerobaticsAutopilot):
+        ap.set_profile("orbit")
+    return ap
+
+
+def _dict_tick(ap: object) -> Callable[[int], None]:
+    sensors = {"baro_alt_m": 100.0, "airspeed": 15.0, "terrain_elev_m": 60.0,
+               "lat": 52.12, "lon": 13.45, "rtk_fix": True}
+    sys_ = {"dt": 0.01, "battery_v": 23.5, "link_ok": True}
+
+    def tick(i: int) -> None:
+        sensors["baro_alt_m"] = 100.0 + (i & 15) * 0.1
+        ap.update(sensors, sys_)
+    return tick
+
+
+def _fast_tick(ap: object) -> Callable[[int], None]:
+    frame = SensorFrame(baro_alt_m=100.0, airspeed=15.0, terrain_elev_m=60.0,
+                        lat=52.12, lon=13.45, battery_v=23.5, dt=0.01)
+    cmd = AutopilotCommand()
+
+    def tick(i: int) -> None:
+        frame.baro_alt_m = 100.0 + (i & 15) * 0.1
+        ap.update_fast(frame, cmd)
+    return tick
+
+
+def _measure(tick: Callable[[int], None], n_ticks: int, n_alloc: int) -> Tuple[float, float, float]:
+    for i in range(1000):  # прогрев
+        tick(i)
+    t = time.perf_counter()
+    for i in range(n_ticks):
+        tick(i)
+    rate = n_ticks / (time.perf_counter() - t)
+
+    tracemalloc.start()
+    peak_sum = 0
+    start_blocks = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+    for i in range(n_alloc):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        tick(i)
+        peak_sum += tracemalloc.get_traced_memory()[1] - base
+    end_blocks = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    return rate, peak_sum / n_alloc, max(0, end_blocks - start_blocks) / n_alloc
+
+
+def run(n_ticks: int = 100000, n_alloc: int = 2000) -> List[Dict[str, float]]:
+    rows: List[Dict[str, float]] = []
+    print(f"{'autopilot':<12} {'api':<6} {'ticks/s':>10} {'peak B/tick':>12} {'blocks/tick':>12}")
+    for name, cls in (("autopilot", Autopilot), ("basic", BasicAutopilot), ("aerobatics", AerobaticsAutopilot)):
+        for api, factory in (("dict", _dict_tick), ("fast", _fast_tick)):
+            rate, peak, blocks = _measure(factory(_make(cls)), n_ticks, n_alloc)
+            rows.append({"autopilot": name, "api": api, "ticks_s": rate,
+                         "peak_bytes": peak, "blocks": blocks})
+            print(f"{name:<12} {api:<6} {rate:>10.0f} {peak:>12.1f} {blocks:>12.3f}")
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Микробенчмарк тика автопилота")
+    parser.add_argument("--ticks", type=int, default=100000, help="тиков для замера скорости")
+    parser.add_argument("--alloc-ticks", type=int, default=2000, help="тиков для замера аллокаций")
+    args = parser.parse_args(argv)
+    run(args.ticks, args.alloc_ticks)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
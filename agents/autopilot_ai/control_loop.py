@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+ControlLoop — исполнитель тика автопилота с фиксированной частотой.
+
+  • частота — general.tick_rate_hz из config/autopilot.yaml (или rate_hz)
+  • монотонные часы, сон до абсолютного дедлайна (без накопления дрейфа):
+    дедлайны идут сеткой t0 + k·period, а не «период после окончания тика»
+  • в автопилот передаётся реально измеренный dt между тиками
+  • overrun — тик закончился позже следующего дедлайна; пропущенные слоты
+    не догоняются пачкой, сетка сдвигается вперёд
+  • overrun_limit подряд идущих overrun → SensorFrame.overrun=True →
+    failsafe OVERRUN (RTL при заданном доме, иначе HOLD_ALT)
+  • статистика джиттера (опоздание старта тика): p50/p99/max + гистограмма
+
+Источник сенсоров — callable(frame), заполняющий SensorFrame на месте;
+исполнители — callable(cmd), например MavlinkRadio.apply_autopilot_command.
+
+Пример:
+    radio = MavlinkRadio(dry_run=True)
+    loop = ControlLoop(ap, read_sensors, [radio.apply_autopilot_command])
+    stats = loop.run(duration_s=60)
+    print(stats.summary())
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import yaml
+
+from agents.autopilot_ai.frames import AutopilotCommand, SensorFrame
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]  # WebKurierDrone/
+DEFAULT_CONFIG = PROJECT_ROOT / "config" / "autopilot.yaml"
+
+SensorSource = Callable[[SensorFrame], Any]
+Actuator = Callable[[AutopilotCommand], Any]
+
+# границы корзин гистограммы джиттера, мкс (последняя — «всё, что дольше»)
+JITTER_BINS_US = (0.0, 50.0, 100.0, 200.0, 500.0, 1000.0, 2000.0, 5000.0, 10000.0, float("inf"))
+
+
+def load_tick_rate_hz(config_path: Union[str, Path] = DEFAULT_CONFIG, default: float = 100.0) -> float:
+    """general.tick_rate_hz из config/autopilot.yaml (default, если файла/ключа нет)."""
+    try:
+        with Path(config_path).open("r", encoding="utf-8") as f:
+            cfg = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return float(default)
+    return float((cfg.get("general") or {}).get("tick_rate_hz", default))
+
+
+def dict_source(read: Callable[[], Tuple[Dict[str, Any], Dict[str, Any]]]) -> SensorSource:
+    """Адаптер источника в формате dict-API: read() → (sensors, sys)."""
+    def source(frame: SensorFrame) -> None:
+        sensors, sys = read()
+        frame.fill(sensors, sys)
+    return source
+
+
+@dataclass
+class JitterStats:
+    """Сводка по тикам: опоздание старта тика относительно дедлайна и реальный dt."""
+    ticks: int = 0
+    overruns: int = 0
+    p50_us: float = 0.0
+    p99_us: float = 0.0
+    max_us: float = 0.0
+    dt_mean_s: float = 0.0
+    dt_max_s: float = 0.0
+    hist_edges_us: List[float] = field(default_factory=lambda: list(JITTER_BINS_US))
+    hist_counts: List[int] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return (f"{self.ticks} tick(s), {self.overruns} overrun(s), jitter p50={self.p50_us:.0f}us "
+                f"p99={self.p99_us:.0f}us max={self.max_us:.0f}us, dt mean={self.dt_mean_s * 1e3:.3f}ms "
+                f"max={self.dt_max_s * 1e3:.3f}ms")
+
+    def histogram(self) -> str:
+        """Текстовая гистограмма джиттера (по строке на корзину)."""
+        lines = []
+        total = max(1, sum(self.hist_counts))
+        for lo, hi, n in zip(self.hist_edges_us, self.hist_edges_us[1:], self.hist_counts):
+            label = f"{lo:>6.0f}–{hi:<6.0f}us" if hi != float("inf") else f"{lo:>6.0f}+      us"
+            lines.append(f"{label} {n:>8} {'#' * int(40 * n / total)}")
+        return "\n".join(lines)
+
+
+class ControlLoop:
+    """
+    Args:
+        autopilot: объект с update_fast(frame, cmd) (Autopilot, autopilot_basic, Aerobatics, Hybrid)
+        sensors: источник, заполняющий SensorFrame перед тиком
+        actuators: исполнители команды после тика
+        rate_hz: частота; None — general.tick_rate_hz из config_path
+        overrun_limit: сколько overrun подряд включают failsafe OVERRUN (0 — никогда)
+        spin_s: последние spin_s секунд до дедлайна ждать активным опросом часов
+        history: размер кольцевого буфера статистики (тиков)
+        clock, sleep: монотонные часы и сон (подменяются в тестах/симуляции)
+    """
+
+    def __init__(
+        self,
+        autopilot: Any,
+        sensors: SensorSource,
+        actuators: Sequence[Actuator] = (),
+        *,
+        rate_hz: Optional[float] = None,
+        config_path: Union[str, Path] = DEFAULT_CONFIG,
+        overrun_limit: int = 3,
+        spin_s: float = 0.0002,
+        history: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Any] = time.sleep,
+    ):
+        rate = float(rate_hz) if rate_hz is not None else load_tick_rate_hz(config_path)
+        if rate <= 0:
+            raise ValueError("rate_hz must be > 0")
+        self.autopilot = autopilot
+        self.sensors = sensors
+        self.actuators = list(actuators)
+        self.rate_hz = rate
+        self.period_s = 1.0 / rate
+        self.overrun_limit = int(overrun_limit)
+        self.spin_s = float(spin_s)
+        self.clock = clock
+        self.sleep = sleep
+
+        self.frame = SensorFrame(dt=self.period_s)
+        self.cmd = AutopilotCommand()
+
+        self.ticks = 0
+        self.overruns = 0
+        self._consecutive = 0
+        self._running = False
+        self._lateness = np.zeros(max(1, int(history)))
+        self._dts = np.zeros(max(1, int(history)))
+
+    # ---- управление ----
+    def stop(self) -> None:
+        """Остановить run() после текущего тика (можно из другого потока/исполнителя)."""
+        self._running = False
+
+    def _wait_until(self, deadline: float) -> None:
+        remaining = deadline - self.clock()
+        if remaining > self.spin_s:
+            self.sleep(remaining - self.spin_s)
+        if self.spin_s > 0:
+            while self.clock() < deadline:  # дожим до дедлайна без погрешности планировщика ОС
+                pass
+
+    def _tick(self, dt: float) -> None:
+        frame = self.frame
+        self.sensors(frame)
+        frame.dt = dt
+        frame.overrun = 0 < self.overrun_limit <= self._consecutive
+        self.autopilot.update_fast(frame, self.cmd)
+        for act in self.actuators:
+            act(self.cmd)
+
+    def run(self, duration_s: Optional[float] = None, max_ticks: Optional[int] = None) -> JitterStats:
+        """
+        Крутить тики до stop(), duration_s или max_ticks (что наступит раньше).
+        Возвращает статистику за все тики этого экземпляра.
+        """
+        clock, period = self.clock, self.period_s
+        hist_n = len(self._lateness)
+        t0 = clock()
+        t_end = None if duration_s is None else t0 + float(duration_s)
+        deadline = t0
+        last_start: Optional[float] = None
+        n = 0
+        self._running = True
+        while self._running:
+            if max_ticks is not None and n >= max_ticks:
+                break
+            if t_end is not None and deadline >= t_end:
+                break
+            self._wait_until(deadline)
+
+            start = clock()
+            dt = period if last_start is None else start - last_start
+            last_start = start
+            self._tick(dt)
+            end = clock()
+
+            k = self.ticks % hist_n
+            self._lateness[k] = max(0.0, start - deadline)
+            self._dts[k] = dt
+            self.ticks += 1
+            n += 1
+
+            deadline += period
+            if end > deadline:
+                # overrun: сдвигаем сетку на целое число пропущенных слотов (без «догоняющей» пачки)
+                self.overruns += 1
+                self._consecutive += 1
+                deadline += period * (int((end - deadline) / period) + 1)
+            else:
+                self._consecutive = 0
+        self._running = False
+        return self.stats()
+
+    # ---- статистика ----
+    def stats(self) -> JitterStats:
+        n = min(self.ticks, len(self._lateness))
+        st = JitterStats(ticks=self.ticks, overruns=self.overruns)
+        if n == 0:
+            st.hist_counts = [0] * (len(JITTER_BINS_US) - 1)
+            return st
+        late_us = self._lateness[:n] * 1e6
+        dts = self._dts[:n]
+        st.p50_us, st.p99_us = (float(v) for v in np.percentile(late_us, [50, 99]))
+        st.max_us = float(late_us.max())
+        st.dt_mean_s = float(dts.mean())
+        st.dt_max_s = float(dts.max())
+        st.hist_counts = [int(c) for c in np.histogram(late_us, bins=JITTER_BINS_US)[0]]
+        return st
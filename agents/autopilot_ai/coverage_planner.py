@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Планировщик покрытия произвольного полигона (с дырами) для аэросъёмки.
+
+  • полигон → UTM (utm.py, зона по центроиду), поворот на курс линий
+  • шаг линий и дистанция срабатывания камеры — из CameraSpec и GSD:
+      footprint = GSD · пиксели; шаг = ширина·(1 − side_overlap);
+      триггер = длина кадра·(1 − front_overlap)
+  • обрезка линий по полигону — векторно (все линии × все рёбра за раз),
+    пары пересечений по каждой линии → отрезки съёмки
+  • выбор курса: перебор heading с шагом + уточнение; критерий — время
+    полёта = длина маршрута / скорость + разворотов · turn_time_s
+  • с DEM — высоты по рельефу (mission_grid.terrain_follow): AGL = altitude,
+    лишние точки только там, где рельеф отходит от прямой больше допуска
+
+Пример:
+    plan = plan_coverage(field_latlon, holes=[pond_latlon], params=GridParams(gsd_cm=2.0),
+                         camera=CameraSpec(), altitude_from_gsd=True)
+    print(plan.summary())
+    upload_and_start(plan.waypoints)
+Замер (поле ~1000 га, 1500 вершин, с прудом): python -m agents.autopilot_ai.coverage_planner
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agents.autopilot_ai.mission_grid import GridParams, WaypointArray, terrain_follow
+from agents.autopilot_ai.utm import from_utm, to_utm, utm_zone
+
+LatLon = Tuple[float, float]
+
+
+@dataclass
+class CameraSpec:
+    """Внутренние параметры камеры; ширина кадра — поперёк линии облёта."""
+    name: str = "Sony RX1R II"
+    sensor_width_mm: float = 35.9
+    sensor_height_mm: float = 24.0
+    image_width_px: int = 7952
+    image_height_px: int = 5304
+    focal_length_mm: float = 35.0
+
+    def gsd_m(self, altitude_m: float) -> float:
+        """Размер пикселя на земле, м/пкс (надир, по ширине сенсора)."""
+        return altitude_m * self.sensor_width_mm / (self.focal_length_mm * self.image_width_px)
+
+    def altitude_for_gsd(self, gsd_m: float) -> float:
+        return gsd_m * self.focal_length_mm * self.image_width_px / self.sensor_width_mm
+
+    def footprint_m(self, altitude_m: float) -> Tuple[float, float]:
+        """(поперёк, вдоль) линии облёта, м."""
+        k = altitude_m / self.focal_length_mm
+        return self.sensor_width_mm * k, self.sensor_height_mm * k
+
+
+@dataclass
+class CoveragePlan:
+    waypoints: WaypointArray = field(repr=False)
+    heading_deg: float
+    altitude_m: float
+    gsd_cm: float
+    line_spacing_m: float
+    trigger_distance_m: float
+    lines: int
+    segments: int
+    turns: int
+    length_m: float          # весь маршрут (съёмка + переходы)
+    survey_length_m: float   # только отрезки съёмки
+    flight_time_s: float
+    photos: int
+    area_ha: float
+    utm_zone: int
+    utm_north: bool
+
+    def summary(self) -> str:
+        return (f"{self.area_ha:.1f} ha @ {self.altitude_m:.0f} m (GSD {self.gsd_cm:.2f} cm): "
+                f"heading {self.heading_deg:.0f}°, {self.lines} line(s)/{self.segments} segment(s), "
+                f"spacing {self.line_spacing_m:.1f} m, trigger {self.trigger_distance_m:.1f} m, "
+                f"{self.length_m / 1000:.2f} km, {self.turns} turn(s), ~{self.flight_time_s / 60:.1f} min, "
+                f"{self.photos} photo(s)")
+
+
+def _edges(rings: Sequence[np.ndarray]) -> np.ndarray:
+    """(E, 4): x1, y1, x2, y2 всех контуров (замкнутых)."""
+    return np.vstack([np.hstack([r, np.roll(r, -1, axis=0)]) for r in rings])
+
+
+def _ring_area(r: np.ndarray) -> float:
+    x, y = r[:, 0], r[:, 1]
+    return 0.5 * abs(float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)))
+
+
+def _sweep(edges: np.ndarray, heading_deg: float, spacing: float,
+           min_gap_m: float = 0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Отрезки съёмки для курса heading_deg (азимут линий, от севера по часовой).
+    Возвращает (u линии, v начала, v конца) по отрезкам в порядке облёта «змейкой»;
+    u — поперёк линий, v — вдоль. Отрезки одной линии с зазором < min_gap_m сливаются.
+    """
+    h = math.radians(heading_deg)
+    s, c = math.sin(h), math.cos(h)
+    u1 = edges[:, 0] * c - edges[:, 1] * s
+    v1 = edges[:, 0] * s + edges[:, 1] * c
+    u2 = edges[:, 2] * c - edges[:, 3] * s
+    v2 = edges[:, 2] * s + edges[:, 3] * c
+
+    u_min, u_max = min(u1.min(), u2.min()), max(u1.max(), u2.max())
+    n_lines = max(1, int(math.ceil((u_max - u_min) / spacing)))
+    lines = u_min + (u_max - u_min - (n_lines - 1) * spacing) / 2 + spacing * np.arange(n_lines)
+
+    # пересечения всех линий со всеми рёбрами (полуоткрытое правило, как в ray casting)
+    cross = (u1[None, :] <= lines[:, None]) != (u2[None, :] <= lines[:, None])
+    li, ei = np.nonzero(cross)
+    du = u2[ei] - u1[ei]
+    v = v1[ei] + (lines[li] - u1[ei]) * (v2[ei] - v1[ei]) / du
+    order = np.lexsort((v, li))
+    li, v = li[order], v[order]
+    # на каждой линии чётное число пересечений: пары (вход, выход)
+    seg_line, v_a, v_b = li[0::2], v[0::2], v[1::2]
+    keep = v_b > v_a
+    seg_line, v_a, v_b = seg_line[keep], v_a[keep], v_b[keep]
+    if min_gap_m > 0 and len(seg_line) > 1:
+        # узкие выемки/зазоры вдоль линии пролетаем со съёмкой, без лишнего разворота
+        new = np.ones(len(seg_line), dtype=bool)
+        new[1:] = (seg_line[1:] != seg_line[:-1]) | (v_a[1:] - v_b[:-1] >= min_gap_m)
+        first = np.flatnonzero(new)
+        last = np.append(first[1:], len(seg_line)) - 1
+        seg_line, v_a, v_b = seg_line[first], v_a[first], v_b[last]
+
+    # «змейка»: нечётные по счёту линии — в обратную сторону (и отрезки на них — в обратном порядке)
+    _, rank = np.unique(seg_line, return_inverse=True)
+    rev = (rank % 2) == 1
+    order = np.lexsort((np.where(rev, -v_a, v_a), seg_line))
+    seg_line, v_a, v_b, rev = seg_line[order], v_a[order], v_b[order], rev[order]
+    start = np.where(rev, v_b, v_a)
+    end = np.where(rev, v_a, v_b)
+    return lines[seg_line], start, end
+
+
+def _route_cost(u: np.ndarray, start: np.ndarray, end: np.ndarray, speed: float,
+                turn_time_s: float) -> Tuple[float, float, int]:
+    """(время, длина маршрута, число переходов между отрезками)."""
+    survey = float(np.sum(np.abs(end - start)))
+    hop = float(np.sum(np.hypot(u[1:] - u[:-1], start[1:] - end[:-1]))) if len(u) > 1 else 0.0
+    turns = max(0, len(u) - 1)
+    length = survey + hop
+    return length / speed + turns * turn_time_s, length, turns
+
+
+def plan_coverage(
+    polygon: Sequence[LatLon],
+    holes: Sequence[Sequence[LatLon]] = (),
+    params: Optional[GridParams] = None,
+    camera: Optional[CameraSpec] = None,
+    *,
+    heading_deg: Optional[float] = None,
+    altitude_from_gsd: bool = False,
+    heading_step_deg: float = 5.0,
+    turn_time_s: float = 12.0,
+    min_gap_m: Optional[float] = None,
+    dem: Any = None,
+    home_elev_m: Optional[float] = None,
+) -> CoveragePlan:
+    """
+    Покрытие полигона (lat, lon) с дырами.
+
+    Args:
+        params: перекрытия, высота, GSD, скорость (GridParams)
+        camera: интринсики камеры (по умолчанию CameraSpec())
+        heading_deg: курс линий; None — подобрать по минимуму времени полёта
+        altitude_from_gsd: высота из params.gsd_cm (иначе params.altitude_m, GSD — расчётный)
+        heading_step_deg: шаг грубого перебора курса (затем уточнение ±шаг по 1°)
+        turn_time_s: штраф за разворот/переход между отрезками
+        min_gap_m: зазоры вдоль линии короче — пролетаются (по умолчанию шаг линий);
+                   дыры шире — облетаются отдельными отрезками
+        dem: источник высот с elevation(lats, lons); None — плоская высота AGL
+        home_elev_m: высота рельефа в точке взлёта (по умолчанию — в первой точке)
+    """
+    p = params or GridParams()
+    cam = camera or CameraSpec()
+    altitude = cam.altitude_for_gsd(p.gsd_cm / 100.0) if altitude_from_gsd else p.altitude_m
+    if altitude <= 0:
+        raise ValueError("altitude must be > 0")
+    across, along = cam.footprint_m(altitude)
+    spacing = across * (1.0 - p.side_overlap)
+    trigger = along * (1.0 - p.front_overlap)
+    if spacing <= 0 or trigger <= 0:
+        raise ValueError("overlaps must be < 1")
+    gap = spacing if min_gap_m is None else float(min_gap_m)
+
+    # ---- проекция ----
+    outer = np.asarray(polygon, dtype=float)
+    if len(outer) > 1 and np.array_equal(outer[0], outer[-1]):
+        outer = outer[:-1]
+    if len(outer) < 3:
+        raise ValueError("polygon needs at least 3 vertices")
+    zone, north = utm_zone(float(outer[:, 0].mean()), float(outer[:, 1].mean()))
+    rings = []
+    for ring in [outer, *[np.asarray(h, dtype=float) for h in holes]]:
+        e, n, _, _ = to_utm(ring[:, 0], ring[:, 1], zone, north)
+        rings.append(np.column_stack([e, n]))
+    origin = rings[0].mean(axis=0)
+    rings = [r - origin for r in rings]  # локальные метры (точность float64 при повороте)
+    edges = _edges(rings)
+    area_ha = (_ring_area(rings[0]) - sum(_ring_area(r) for r in rings[1:])) / 1e4
+    # схождение меридианов: курс задаётся от истинного севера, сетка UTM повёрнута относительно него
+    lat0, lon0 = from_utm(origin[0], origin[1], zone, north)
+    e1, n1, _, _ = to_utm(lat0 + 0.01, lon0, zone, north)
+    grid_rot = math.degrees(math.atan2(float(e1) - origin[0], float(n1) - origin[1]))
+
+    # ---- курс ----
+    def cost(h: float) -> float:
+        return _route_cost(*_sweep(edges, h + grid_rot, spacing, gap), p.speed_ms, turn_time_s)[0]
+
+    if heading_deg is None:
+        coarse = np.arange(0.0, 180.0, heading_step_deg)
+        best = float(coarse[int(np.argmin([cost(h) for h in coarse]))])
+        fine = (best + np.arange(-heading_step_deg, heading_step_deg + 1e-9, 1.0)) % 180.0
+        heading = float(fine[int(np.argmin([cost(h) for h in fine]))])
+    else:
+        heading = float(heading_deg) % 360.0
+
+    u, start, end = _sweep(edges, heading + grid_rot, spacing, gap)
+    t, length, turns = _route_cost(u, start, end, p.speed_ms, turn_time_s)
+
+    # ---- обратно в WGS84 ----
+    h = math.radians(heading + grid_rot)
+    s, c = math.sin(h), math.cos(h)
+    uu = np.repeat(u, 2)
+    vv = np.column_stack([start, end]).ravel()
+    x = uu * c + vv * s + origin[0]
+    y = -uu * s + vv * c + origin[1]
+    lat, lon = from_utm(x, y, zone, north)
+    waypoints = WaypointArray.from_columns(lat, lon, altitude)
+    waypoints.photo_distance_m[0::2] = trigger  # старт съёмки на отрезке, на конце — стоп (0)
+    if dem is not None:
+        waypoints = terrain_follow(waypoints, dem, altitude, home_elev_m=home_elev_m,
+                                   tolerance_m=p.terrain_tolerance_m, sample_m=p.terrain_sample_m)
+
+    survey = float(np.sum(np.abs(end - start)))
+    photos = int(np.sum(np.floor(np.abs(end - start) / trigger) + 1))
+    return CoveragePlan(
+        waypoints=waypoints, heading_deg=heading, altitude_m=altitude, gsd_cm=cam.gsd_m(altitude) * 100.0,
+        line_spacing_m=spacing, trigger_distance_m=trigger, lines=int(len(np.unique(u))), segments=len(u),
+        turns=turns, length_m=length, survey_length_m=survey, flight_time_s=t, photos=photos,
+        area_ha=area_ha, utm_zone=zone, utm_north=north,
+    )
+
+
+def _bench(n_vertices: int = 1500) -> None:
+    import time
+
+    lat0, lon0 = 52.3, 13.1
+    a = np.linspace(0.0, 2 * np.pi, n_vertices, endpoint=False)
+    r = 0.018 * (1 + 0.15 * np.sin(5 * a))
+    field_ll = list(zip(lat0 + r * np.sin(a), lon0 + 1.6 * r * np.cos(a)))
+    t_ring = np.linspace(0, 2 * np.pi, 60, endpoint=False)
+    pond = list(zip(lat0 + 0.004 * np.sin(t_ring), lon0 + 0.0065 * np.cos(t_ring)))
+    t = time.perf_counter()
+    plan = plan_coverage(field_ll, holes=[pond])
+    print(f"{n_vertices} vertices, {plan.area_ha:.0f} ha: {(time.perf_counter() - t) * 1e3:.0f} ms, "
+          f"{plan.segments} segments, heading {plan.heading_deg:.0f}°")
+
+
+if __name__ == "__main__":
+    _bench()
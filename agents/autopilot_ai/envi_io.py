@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+ENVI-сцены и потоковая запись растров — только NumPy + stdlib (без spectral/GDAL/PIL).
+
+  • read_envi_header / EnviImage — разбор .hdr, numpy.memmap данных (BSQ/BIL/BIP),
+    чтение блока строк одного канала в готовый буфер (band_rows)
+  • PngStripWriter  — 8-бит grayscale PNG, строки пишутся по мере готовности (zlib-поток)
+  • TiffStripWriter — float32 (Geo)TIFF полосами: полосы — сразу в файл, IFD — в конце;
+    геопривязка из «map info» ENVI (UTM WGS-84 / Geographic Lat/Lon)
+  • read_tiff — такой TIFF обратно: memmap полос + геопривязка
+
+Память писателей не зависит от размера сцены: держатся только смещения полос.
+"""
+from __future__ import annotations
+
+import os
+import re
+import struct
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ENVI "data type" -> dtype (без порядка байт)
+ENVI_DTYPES = {1: "u1", 2: "i2", 3: "i4", 4: "f4", 5: "f8", 12: "u2", 13: "u4", 14: "i8", 15: "u8"}
+DATA_EXTS = ("", ".img", ".dat", ".raw", ".bsq", ".bil", ".bip")
+
+
+def read_envi_header(path: str) -> Dict[str, str]:
+    """Ключи .hdr в нижнем регистре -> строковые значения (списки {…} — без скобок)."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    if not text.lstrip().upper().startswith("ENVI"):
+        raise ValueError(f"{path}: not an ENVI header")
+    out: Dict[str, str] = {}
+    for m in re.finditer(r"^\s*([^=\n]+?)\s*=\s*(\{[^}]*\}|[^\n]*)", text, flags=re.M):
+        val = m.group(2).strip()
+        if val.startswith("{"):
+            val = " ".join(val[1:-1].split())
+        out[m.group(1).strip().lower()] = val
+    return out
+
+
+def _floats(s: str) -> List[float]:
+    return [float(x) for x in s.replace(",", " ").split()] if s else []
+
+
+@dataclass
+class EnviImage:
+    """Сцена ENVI: геометрия, тип, каналы; данные — memmap по запросу."""
+    data_path: str
+    lines: int
+    samples: int
+    bands: int
+    interleave: str                    # bsq | bil | bip
+    dtype: np.dtype
+    header_offset: int = 0
+    wavelengths_nm: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    map_info: List[str] = field(default_factory=list)
+    _mm: Optional[np.memmap] = field(default=None, repr=False)
+
+    @classmethod
+    def open(cls, hdr_path: str) -> "EnviImage":
+        h = read_envi_header(hdr_path)
+        base = hdr_path[:-4] if hdr_path.lower().endswith(".hdr") else hdr_path
+        cands = [base + e for e in DATA_EXTS] + [base + e.upper() for e in DATA_EXTS[1:]]
+        data_path = next((p for p in cands if os.path.isfile(p) and p != hdr_path), None)
+        if data_path is None:
+            raise FileNotFoundError(f"no ENVI data file next to {hdr_path}")
+        code = int(h.get("data type", "0"))
+        if code not in ENVI_DTYPES:
+            raise ValueError(f"unsupported ENVI data type {code}")
+        dtype = np.dtype((">" if h.get("byte order", "0").strip() == "1" else "<") + ENVI_DTYPES[code])
+        wl = np.array(_floats(h.get("wavelength", "")))
+        units = h.get("wavelength units", "").lower()
+        if units.startswith("micro") or units == "um" or (len(wl) and units == "" and wl.max() < 100):
+            wl = wl * 1000.0
+        return cls(
+            data_path=data_path, lines=int(h["lines"]), samples=int(h["samples"]), bands=int(h["bands"]),
+            interleave=h.get("interleave", "bsq").lower(), dtype=dtype,
+            header_offset=int(h.get("header offset", "0")), wavelengths_nm=wl,
+            map_info=[s.strip() for s in h.get("map info", "").split(",")] if h.get("map info") else [],
+        )
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return {"bsq": (self.bands, self.lines, self.samples),
+                "bil": (self.lines, self.bands, self.samples),
+                "bip": (self.lines, self.samples, self.bands)}[self.interleave]
+
+    def memmap(self) -> np.memmap:
+        if self._mm is None:
+            if self.interleave not in ("bsq", "bil", "bip"):
+                raise ValueError(f"unsupported interleave {self.interleave!r}")
+            self._mm = np.memmap(self.data_path, dtype=self.dtype, mode="r",
+                                 offset=self.header_offset, shape=self.shape)
+        return self._mm
+
+    def nearest_band(self, nm: float) -> int:
+        if not len(self.wavelengths_nm):
+            raise ValueError("header has no wavelengths")
+        return int(np.argmin(np.abs(self.wavelengths_nm - nm)))
+
+    def band_rows(self, band: int, r0: int, r1: int, out: np.ndarray) -> np.ndarray:
+        """Строки [r0, r1) канала band -> out[:r1-r0] (с приведением типа), без промежуточной копии."""
+        mm = self.memmap()
+        src = {"bsq": lambda: mm[band, r0:r1, :],
+               "bil": lambda: mm[r0:r1, band, :],
+               "bip": lambda: mm[r0:r1, :, band]}[self.interleave]()
+        dst = out[:r1 - r0]
+        np.copyto(dst, src, casting="unsafe")
+        return dst
+
+    def geo_transform(self) -> Optional[Tuple[float, float, float, float]]:
+        """(x левого верхнего угла, y, размер пикселя x, y) из map info или None."""
+        mi = self.map_info
+        if len(mi) < 7:
+            return None
+        ref_x, ref_y, e, n, dx, dy = (float(v) for v in mi[1:7])
+        return e - (ref_x - 1.0) * dx, n + (ref_y - 1.0) * dy, dx, dy
+
+    def epsg(self) -> Optional[int]:
+        mi = self.map_info
+        if not mi:
+            return None
+        name = mi[0].lower()
+        if name.startswith("geographic"):
+            return 4326
+        if name == "utm" and len(mi) >= 9 and "wgs" in ",".join(mi[9:]).lower().replace("-", ""):
+            return (32600 if mi[8].lower().startswith("n") else 32700) + int(mi[7])
+        return None
+
+
+# ───────────────────────── Потоковые писатели ─────────────────────────
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+class PngStripWriter:
+    """8-бит grayscale PNG: write(rows uint8 (h, width)) по порядку строк, close() — IEND."""
+
+    def __init__(self, path: str, width: int, height: int, level: int = 6):
+        self.width, self.height, self.rows = width, height, 0
+        self._f = open(path, "wb")
+        self._z = zlib.compressobj(level)
+        self._row = np.zeros((0, width + 1), dtype=np.uint8)
+        self._f.write(b"\x89PNG\r\n\x1a\n")
+        self._f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)))
+
+    def write(self, rows: np.ndarray) -> None:
+        h = rows.shape[0]
+        if self._row.shape[0] < h:
+            self._row = np.zeros((h, self.width + 1), dtype=np.uint8)   # столбец 0 — фильтр None
+        buf = self._row[:h]
+        buf[:, 1:] = rows
+        data = self._z.compress(buf.tobytes())
+        if data:
+            self._f.write(_png_chunk(b"IDAT", data))
+        self.rows += h
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        if self.rows != self.height:
+            self._f.close()
+            raise ValueError(f"PNG: wrote {self.rows} of {self.height} rows")
+        self._f.write(_png_chunk(b"IDAT", self._z.flush()))
+        self._f.write(_png_chunk(b"IEND", b""))
+        self._f.close()
+
+    def __enter__(self) -> "PngStripWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class TiffStripWriter:
+    """
+    Однобандовый float32 TIFF (little-endian, без сжатия), полоса = один write().
+    geo=(x0, y0, dx, dy), epsg — GeoTIFF-теги (ModelPixelScale/Tiepoint/GeoKeyDirectory).
+    """
+
+    def __init__(self, path: str, width: int, height: int, *,
+                 geo: Optional[Tuple[float, float, float, float]] = None, epsg: Optional[int] = None):
+        self.width, self.height, self.rows = width, height, 0
+        self.geo, self.epsg = geo, epsg
+        self._offsets: List[int] = []
+        self._counts: List[int] = []
+        self._rows_per_strip = 0
+        self._f = open(path, "wb")
+        self._f.write(b"II*\x00\x00\x00\x00\x00")   # смещение IFD — в close()
+
+    def write(self, rows: np.ndarray) -> None:
+        data = np.ascontiguousarray(rows, dtype="<f4")
+        h = data.shape[0]
+        if self._rows_per_strip == 0:
+            self._rows_per_strip = h
+        elif h > self._rows_per_strip or (h < self._rows_per_strip and self.rows + h != self.height):
+            raise ValueError("TIFF strips must have equal height (last may be shorter)")
+        self._offsets.append(self._f.tell())
+        self._counts.append(data.nbytes)
+        self._f.write(data.tobytes())
+        self.rows += h
+
+    def _entries(self) -> List[Tuple[int, int, Sequence]]:
+        """(тег, тип TIFF, значения); 3=SHORT, 4=LONG, 12=DOUBLE."""
+        e: List[Tuple[int, int, Sequence]] = [
+            (256, 4, [self.width]), (257, 4, [self.height]), (258, 3, [32]), (259, 3, [1]),
+            (262, 3, [1]), (273, 4, self._offsets), (277, 3, [1]), (278, 4, [self._rows_per_strip]),
+            (279, 4, self._counts), (284, 3, [1]), (339, 3, [3]),
+        ]
+        if self.geo is not None:
+            x0, y0, dx, dy = self.geo
+            e.append((33550, 12, [dx, dy, 0.0]))
+            e.append((33922, 12, [0.0, 0.0, 0.0, x0, y0, 0.0]))
+            if self.epsg:
+                geographic = self.epsg == 4326
+                keys = [1, 1, 0, 3,
+                        1024, 0, 1, 2 if geographic else 1,     # GTModelType
+                        1025, 0, 1, 1,                          # GTRasterType = PixelIsArea
+                        2048 if geographic else 3072, 0, 1, self.epsg]
+                e.append((34735, 3, keys))
+        return sorted(e)
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        f = self._f
+        if self.rows != self.height:
+            f.close()
+            raise ValueError(f"TIFF: wrote {self.rows} of {self.height} rows")
+        fmt = {3: "H", 4: "I", 12: "d"}
+        entries = self._entries()
+        if f.tell() % 2:
+            f.write(b"\x00")
+        ifd = f.tell()
+        extra = ifd + 2 + 12 * len(entries) + 4        # данные тегов, не влезающие в 4 байта
+        head, tail = [struct.pack("<H", len(entries))], []
+        for tag, typ, vals in entries:
+            payload = struct.pack("<%d%s" % (len(vals), fmt[typ]), *vals)
+            if len(payload) <= 4:
+                head.append(struct.pack("<HHI", tag, typ, len(vals)) + payload.ljust(4, b"\x00"))
+            else:
+                head.append(struct.pack("<HHII", tag, typ, len(vals), extra))
+                tail.append(payload)
+                extra += len(payload)
+        head.append(struct.pack("<I", 0))
+        f.write(b"".join(head) + b"".join(tail))
+        f.seek(4)
+        f.write(struct.pack("<I", ifd))
+        f.close()
+
+    def __enter__(self) -> "TiffStripWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def read_tiff(path: str) -> Tuple[np.ndarray, Optional[Tuple[float, float, float, float]], Optional[int]]:
+    """
+    Однобандовый несжатый TIFF (как пишет TiffStripWriter) -> (массив (H, W), geo, epsg).
+    Полосы подряд — memmap без чтения в память; иначе полосы собираются в массив.
+    """
+    with open(path, "rb") as f:
+        head = f.read(8)
+        bo = {b"II": "<", b"MM": ">"}.get(head[:2])
+        if bo is None or struct.unpack(bo + "H", head[2:4])[0] != 42:
+            raise ValueError(f"{path}: not a classic TIFF")
+        f.seek(struct.unpack(bo + "I", head[4:8])[0])
+        n = struct.unpack(bo + "H", f.read(2))[0]
+        raw = f.read(12 * n)
+        size = {1: 1, 2: 1, 3: 2, 4: 4, 11: 4, 12: 8, 16: 8}
+        code = {1: "B", 2: "c", 3: "H", 4: "I", 11: "f", 12: "d", 16: "Q"}
+        tags: Dict[int, tuple] = {}
+        for k in range(n):
+            tag, typ, cnt = struct.unpack(bo + "HHI", raw[12 * k:12 * k + 8])
+            if typ not in code:
+                continue
+            nbytes = size[typ] * cnt
+            if nbytes <= 4:
+                data = raw[12 * k + 8:12 * k + 8 + nbytes]
+            else:
+                pos = f.tell()
+                f.seek(struct.unpack(bo + "I", raw[12 * k + 8:12 * k + 12])[0])
+                data = f.read(nbytes)
+                f.seek(pos)
+            tags[tag] = struct.unpack(bo + code[typ] * cnt, data)
+    width, height = tags[256][0], tags[257][0]
+    if tags.get(259, (1,))[0] != 1 or tags.get(277, (1,))[0] != 1:
+        raise ValueError(f"{path}: only uncompressed single-band TIFF is supported")
+    bits, fmt = tags.get(258, (8,))[0], tags.get(339, (1,))[0]
+    dtype = np.dtype(bo + {1: "u", 2: "i", 3: "f"}[fmt] + str(bits // 8))
+    offsets, counts = tags[273], tags[279]
+    contiguous = all(offsets[i] + counts[i] == offsets[i + 1] for i in range(len(offsets) - 1))
+    if contiguous and sum(counts) == width * height * dtype.itemsize:
+        arr = np.memmap(path, dtype=dtype, mode="r", offset=offsets[0], shape=(height, width))
+    else:
+        with open(path, "rb") as f:
+            chunks = []
+            for o, c in zip(offsets, counts):
+                f.seek(o)
+                chunks.append(f.read(c))
+        arr = np.frombuffer(b"".join(chunks), dtype=dtype).reshape(height, width)
+    geo = None
+    if 33550 in tags and 33922 in tags:
+        dx, dy = tags[33550][:2]
+        i, j, _, x, y, _ = tags[33922][:6]
+        geo = (x - i * dx, y + j * dy, dx, dy)
+    epsg = None
+    keys = tags.get(34735)
+    if keys:
+        for k in range(keys[3]):
+            kid, loc, _, val = keys[4 + 4 * k:8 + 4 * k]
+            if kid in (2048, 3072) and loc == 0:
+                epsg = val
+    return arr, geo, epsg
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+FleetAutopilot — векторизованный автопилот для роя (N аппаратов за один шаг).
+
+Состояние всех аппаратов (режимы, PID-интеграторы, таймеры связи, цели,
+дом, геозоны) хранится в структуре массивов NumPy. Один вызов step()
+считает failsafe, переходы режимов и выходы контроллеров для всего роя.
+Семантика один-в-один повторяет agents/autopilot_ai/autopilot.Autopilot.update
+для каждого аппарата (сверяется тестом tests/test_fleet_autopilot.py), включая
+полигональную геозону с RTL до пересечения и пол RTL по рельефу до дома
+(agents/autopilot_ai/rtl_floor.py). Оба — чистый Python поверх геозоны/DEM,
+поэтому считаются циклом только по аппаратам, которым они нужны: с заданной
+геозоной и входящим в RTL на этом тике.
+
+Соглашения о входах step():
+  • массивы формы (N,) или скаляры (транслируются на весь рой)
+  • baro_alt_m = NaN ⇔ баро нет (в скалярном API — отсутствующий ключ) → BARO_FAULT
+  • режимы и причины failsafe — коды (MODE_*/REASON_*); имена — в MODE_NAMES/REASON_NAMES
+
+Пример:
+    fleet = FleetAutopilot(300)
+    fleet.set_home(52.12, 13.45, 40.0)
+    fleet.set_mode("CRUISE", target_alt_m=120.0, target_airspeed_ms=18.0)
+    out = fleet.step(baro_alt_m=alts, airspeed=v, battery_v=batt, dt=0.01)
+    out["thrust"], out["pitch"]  # (N,)
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from agents.autopilot_ai.autopilot import AltitudeController, SpeedController
+from agents.autopilot_ai.geofence import PolygonGeofence
+from agents.autopilot_ai.rtl_floor import rtl_floor_m
+from utils.pid import PIDBank
+
+# ---- коды режимов / причин failsafe ----
+MODE_NAMES = ("MANUAL", "HOLD_ALT", "CRUISE", "RTL", "LAND")
+MODE_MANUAL, MODE_HOLD_ALT, MODE_CRUISE, MODE_RTL, MODE_LAND = range(len(MODE_NAMES))
+MODE_CODES = {name: code for code, name in enumerate(MODE_NAMES)}
+
+# приоритет проверок: LOW_BATTERY > LINK_LOSS > BARO_FAULT > OVERRUN > NO_RTK
+REASON_NAMES = ("", "LOW_BATTERY", "LINK_LOSS", "BARO_FAULT", "NO_RTK", "OVERRUN")
+(REASON_NONE, REASON_LOW_BATTERY, REASON_LINK_LOSS, REASON_BARO_FAULT,
+ REASON_NO_RTK, REASON_OVERRUN) = range(len(REASON_NAMES))
+
+M_PER_DEG = 111320.0
+
+Index = Union[None, int, slice, np.ndarray]
+
+
+def _pid_bank(ctl: Any, n: int) -> PIDBank:
+    """PIDBank на N аппаратов с усилениями/лимитами скалярного контроллера."""
+    return PIDBank(n, ctl.kp, ctl.ki, ctl.kd,
+                   output_limits=(ctl.out_min, ctl.out_max),
+                   integral_limits=(ctl.int_min, ctl.int_max))
+
+
+class FleetAutopilot:
+    """
+    N экземпляров Autopilot в структуре массивов.
+
+    Параметры безопасности/рельефа доступны как массивы (N,) и меняются на месте:
+    min_batt_v, link_timeout_s, require_rtk, use_terrain, target_agl_m, hover_ff,
+    rtl_unknown_margin_m.
+    """
+
+    def __init__(self, n: int, alt_ctl: Optional[AltitudeController] = None,
+                 spd_ctl: Optional[SpeedController] = None):
+        if n <= 0:
+            raise ValueError("n must be > 0")
+        alt_ctl = alt_ctl or AltitudeController()
+        spd_ctl = spd_ctl or SpeedController()
+        self.n = int(n)
+
+        self.mode = np.full(n, MODE_MANUAL, dtype=np.int8)
+        self.alt_pid = _pid_bank(alt_ctl, n)
+        self.spd_pid = _pid_bank(spd_ctl, n)
+        # цели — это setpoint банков (как set_target → pid.set_setpoint в скалярном API)
+        self.target_alt_m = self.alt_pid.setpoint
+        self.target_alt_m[:] = alt_ctl.target_alt_m
+        self.target_airspeed_ms = self.spd_pid.setpoint
+        self.target_airspeed_ms[:] = spd_ctl.target_ms
+        self.hover_ff = np.full(n, float(alt_ctl.hover_ff))
+
+        # Безопасность
+        self.min_batt_v = np.full(n, 19.2)
+        self.link_timeout_s = np.full(n, 2.0)
+        self.link_timer = np.zeros(n)
+        self.require_rtk = np.zeros(n, dtype=bool)
+
+        # Геозона/рельеф
+        self.fence_enabled = np.zeros(n, dtype=bool)
+        self.fence_lat0 = np.zeros(n)
+        self.fence_lon0 = np.zeros(n)
+        self.fence_kx = np.zeros(n)  # м/град долготы на широте центра (cos(lat0), при настройке)
+        self.fence_radius_m = np.zeros(n)
+        self.polygon_fence: List[Optional[PolygonGeofence]] = [None] * n
+        self.polygon_fence_enabled = np.zeros(n, dtype=bool)
+        self.polygon_fence_margin_m = np.zeros(n)  # RTL, когда запас до границы меньше
+        self.use_terrain = np.ones(n, dtype=bool)
+        self.target_agl_m = np.full(n, 60.0)
+        self.dem: Optional[Any] = None  # DEM с elevation(lats, lons): рельеф по координатам роя
+        self.rtl_floor_m = np.full(n, np.nan)  # мин. высота RTL по рельефу до дома (NaN — не считалась)
+        self.rtl_unknown_margin_m = np.full(n, 100.0)  # рельеф до дома неизвестен — RTL выше цели на столько
+
+        # Дом для RTL
+        self.home_set = np.zeros(n, dtype=bool)
+        self.home = np.zeros((n, 3))  # lat, lon, alt_asl_m
+
+        # Выходные буферы (переиспользуются между тиками)
+        self._out: Dict[str, np.ndarray] = {
+            "thrust": np.zeros(n), "pitch": np.zeros(n), "roll": np.zeros(n), "yaw": np.zeros(n),
+            "failsafe": np.zeros(n, dtype=bool),
+            "failsafe_reason": np.zeros(n, dtype=np.int8),
+            "mode": np.zeros(n, dtype=np.int8),
+            "target_alt_m": np.zeros(n), "target_airspeed_ms": np.zeros(n),
+        }
+
+    def __len__(self) -> int:
+        return self.n
+
+    # ---- Публичный API (idx=None — весь рой) ----
+    @staticmethod
+    def _idx(idx: Index) -> Any:
+        return slice(None) if idx is None else idx
+
+    def set_home(self, lat: Any, lon: Any, alt_asl_m: Any, idx: Index = None) -> None:
+        i = self._idx(idx)
+        self.home[i, 0] = lat
+        self.home[i, 1] = lon
+        self.home[i, 2] = alt_asl_m
+        self.home_set[i] = True
+        self.rtl_floor_m[i] = np.nan
+
+    def set_geofence(self, lat: Any, lon: Any, radius_m: Any, idx: Index = None) -> None:
+        i = self._idx(idx)
+        self.fence_lat0[i] = lat
+        self.fence_lon0[i] = lon
+        self.fence_kx[i] = M_PER_DEG * np.cos(np.radians(lat))
+        self.fence_radius_m[i] = radius_m
+        self.fence_enabled[i] = True
+
+    def set_polygon_fence(self, fence: Optional[PolygonGeofence], margin_m: Any = 0.0,
+                          idx: Index = None) -> None:
+        """Полигональная геозона (None — снять); RTL при запасе до границы < margin_m."""
+        i = self._idx(idx)
+        if fence is not None:
+            fence.cover_margin(float(np.max(margin_m)))
+        for k in np.arange(self.n)[i].ravel():
+            self.polygon_fence[k] = fence
+        self.polygon_fence_enabled[i] = fence is not None
+        self.polygon_fence_margin_m[i] = margin_m
+
+    def set_mode(self, mode: str, target_alt_m: Any = None,
+                 target_airspeed_ms: Any = None, idx: Index = None) -> None:
+        if mode not in MODE_CODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        i = self._idx(idx)
+        self.mode[i] = MODE_CODES[mode]
+        self.rtl_floor_m[i] = np.nan  # пересчитать при следующем входе в RTL
+        self.set_targets(target_alt_m, target_airspeed_ms, idx)
+        self.alt_pid.reset(i)
+        self.spd_pid.reset(i)
+
+    def set_targets(self, alt_m: Any = None, airspeed_ms: Any = None, idx: Index = None) -> None:
+        i = self._idx(idx)
+        if alt_m is not None:
+            self.target_alt_m[i] = alt_m
+        if airspeed_ms is not None:
+            self.target_airspeed_ms[i] = airspeed_ms
+
+    def mode_names(self) -> list:
+        return [MODE_NAMES[m] for m in self.mode]
+
+    # ---- Failsafe ----
+    def _failsafe_check(self, baro_alt_m: np.ndarray, battery_v: np.ndarray, link_ok: np.ndarray,
+                        rtk_fix: np.ndarray, overrun: np.ndarray, dt: np.ndarray) -> np.ndarray:
+        self.link_timer = np.where(link_ok, 0.0, self.link_timer + dt)
+        reason = self._out["failsafe_reason"]
+        # в обратном порядке приоритета: старшая причина перезаписывает младшую
+        reason[:] = np.where(self.require_rtk & ~rtk_fix, REASON_NO_RTK, REASON_NONE)
+        reason[overrun] = REASON_OVERRUN
+        reason[np.isnan(baro_alt_m)] = REASON_BARO_FAULT
+        reason[self.link_timer > self.link_timeout_s] = REASON_LINK_LOSS
+        reason[(battery_v <= 0) | (battery_v < self.min_batt_v)] = REASON_LOW_BATTERY
+        return reason
+
+    # ---- Основной шаг ----
+    def step(
+        self,
+        baro_alt_m: Any,
+        battery_v: Any,
+        dt: Any = 0.1,
+        *,
+        airspeed: Any = 0.0,
+        link_ok: Any = True,
+        rtk_fix: Any = True,
+        overrun: Any = False,
+        terrain_elev_m: Any = 0.0,
+        lat: Any = 0.0,
+        lon: Any = 0.0,
+        manual_cmd: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Один тик для всех аппаратов.
+
+        Returns:
+            dict массивов (N,): thrust, pitch, roll, yaw, failsafe, failsafe_reason (код),
+            mode (код режима ДО переходов — как out["mode"] скалярного API),
+            target_alt_m, target_airspeed_ms. Буферы переиспользуются следующим тиком.
+        """
+        n = self.n
+        shape = (n,)
+        baro = np.broadcast_to(np.asarray(baro_alt_m, dtype=float), shape)
+        batt = np.broadcast_to(np.asarray(battery_v, dtype=float), shape)
+        dt = np.broadcast_to(np.asarray(dt, dtype=float), shape)
+        link_ok = np.broadcast_to(np.asarray(link_ok, dtype=bool), shape)
+        rtk_fix = np.broadcast_to(np.asarray(rtk_fix, dtype=bool), shape)
+        overrun = np.broadcast_to(np.asarray(overrun, dtype=bool), shape)
+        out = self._out
+
+        reason = self._failsafe_check(baro, batt, link_ok, rtk_fix, overrun, dt)
+        np.not_equal(reason, REASON_NONE, out=out["failsafe"])
+
+        # Terrain-follow (если включён и режим требует высоты)
+        mode = self.mode
+        follow = self.use_terrain & ((mode == MODE_HOLD_ALT) | (mode == MODE_CRUISE))
+        if follow.any():
+            terrain = np.broadcast_to(np.asarray(terrain_elev_m, dtype=float), shape)
+            if self.dem is not None:
+                elev = self.dem.elevation(np.broadcast_to(lat, shape), np.broadcast_to(lon, shape))
+                terrain = np.where(np.isnan(elev), terrain, elev)  # пустоты DEM — из сенсоров
+            np.copyto(self.target_alt_m, terrain + self.target_agl_m, where=follow)
+
+        out["mode"][:] = mode
+        out["target_alt_m"][:] = self.target_alt_m
+        out["target_airspeed_ms"][:] = self.target_airspeed_ms
+
+        # Профили поведения при авариях (NO_RTK — только деградация)
+        mode[reason == REASON_LOW_BATTERY] = MODE_LAND
+        go_home = (reason == REASON_LINK_LOSS) | (reason == REASON_OVERRUN)
+        mode[go_home & self.home_set] = MODE_RTL
+        mode[go_home & ~self.home_set] = MODE_HOLD_ALT
+        mode[reason == REASON_BARO_FAULT] = MODE_HOLD_ALT
+
+        # Геозона: выход => RTL (если не LAND)
+        if self.fence_enabled.any():
+            dx = (np.asarray(lon, dtype=float) - self.fence_lon0) * self.fence_kx
+            dy = (np.asarray(lat, dtype=float) - self.fence_lat0) * M_PER_DEG
+            breach = self.fence_enabled & (np.hypot(dx, dy) > self.fence_radius_m) & (mode != MODE_LAND)
+            mode[breach] = MODE_RTL
+        # Полигоны: RTL заранее, как только запас до границы меньше polygon_fence_margin_m
+        fenced = self.polygon_fence_enabled & (mode != MODE_LAND)
+        if fenced.any():
+            lat_b = np.broadcast_to(np.asarray(lat, dtype=float), shape)
+            lon_b = np.broadcast_to(np.asarray(lon, dtype=float), shape)
+            for k in np.flatnonzero(fenced):
+                if self.polygon_fence[k].margin_m(lat_b[k], lon_b[k]) < self.polygon_fence_margin_m[k]:
+                    mode[k] = MODE_RTL
+
+        # RTL по рельефу: на входе в режим цель не ниже max(рельеф до дома) + AGL
+        rtl = mode == MODE_RTL
+        self.rtl_floor_m[~rtl] = np.nan
+        if self.dem is not None:
+            enter = rtl & self.home_set & np.isnan(self.rtl_floor_m)
+            if enter.any():
+                lat_b = np.broadcast_to(np.asarray(lat, dtype=float), shape)
+                lon_b = np.broadcast_to(np.asarray(lon, dtype=float), shape)
+                for k in np.flatnonzero(enter):
+                    target = self.target_alt_m[k]
+                    floor = rtl_floor_m(self.dem, lat_b[k], lon_b[k], self.home[k, 0], self.home[k, 1],
+                                        self.target_agl_m[k], target + self.rtl_unknown_margin_m[k])
+                    self.rtl_floor_m[k] = floor
+                    if floor > target:
+                        self.target_alt_m[k] = floor
+
+        # Данные сенсоров (нет баро → 0.0, как sensors.get("baro_alt_m", 0.0))
+        meas_alt = np.where(np.isnan(baro), 0.0, baro)
+        meas_spd = np.broadcast_to(np.asarray(airspeed, dtype=float), shape)
+
+        manual = mode == MODE_MANUAL
+        land = mode == MODE_LAND
+        cruise = mode == MODE_CRUISE
+        auto = ~manual
+
+        # LAND: ступенчатое снижение цели до апдейта PID
+        np.copyto(self.target_alt_m, np.maximum(0.0, self.target_alt_m - 0.6), where=land)
+
+        # Высота: все режимы, кроме MANUAL
+        u = self.alt_pid.update(meas_alt, dt, mask=auto)
+        u[np.isnan(u)] = 0.0  # NaN guard
+        thrust = np.clip(self.hover_ff + 0.8 * (u - 0.5), self.alt_pid.min_out, self.alt_pid.max_out)
+        np.copyto(thrust, np.maximum(0.2, thrust - 0.1), where=land)
+
+        # Скорость: только CRUISE
+        pitch = np.zeros(n)
+        if cruise.any():
+            p = self.spd_pid.update(meas_spd, dt, mask=cruise)
+            p[np.isnan(p)] = 0.0
+            np.copyto(pitch, np.clip(p, self.spd_pid.min_out, self.spd_pid.max_out), where=cruise)
+        pitch[rtl] = 0.15
+        pitch[land] = -0.05
+
+        np.copyto(out["thrust"], np.where(auto, thrust, 0.0))
+        out["pitch"][:] = pitch
+        out["roll"].fill(0.0)
+        out["yaw"].fill(0.0)
+
+        # MANUAL: прямой проброс ручных команд (отсутствующий ключ → 0.0)
+        if manual_cmd and manual.any():
+            for key in ("thrust", "pitch", "roll", "yaw"):
+                if key in manual_cmd:
+                    np.copyto(out[key], np.asarray(manual_cmd[key], dtype=float), where=manual)
+        return out
+
+    def vehicle_output(self, i: int) -> Dict[str, Any]:
+        """Выход аппарата i последнего тика в формате скалярного Autopilot.update."""
+        out = self._out
+        return {
+            "thrust": float(out["thrust"][i]), "pitch": float(out["pitch"][i]),
+            "roll": float(out["roll"][i]), "yaw": float(out["yaw"][i]),
+            "failsafe": bool(out["failsafe"][i]),
+            "failsafe_reason": REASON_NAMES[out["failsafe_reason"][i]],
+            "mode": MODE_NAMES[out["mode"][i]],
+            "targets": {"alt_m": float(out["target_alt_m"][i]),
+                        "airspeed_ms": float(out["target_airspeed_ms"][i])},
+        }
@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+"""
+FlightDynamics — векторная модель динамики VTOL-аппаратов (замена игрушечного
+_simulate_step для CI/планирования).
+
+Состояние каждого аппарата: позиция ENU (x, y, z), скорость (vx, vy, vz),
+углы (roll, pitch, yaw), заряд батареи SOC; ветер — отдельный OU-процесс.
+Интегрирование по массивам аппаратов: полунеявный Эйлер (по умолчанию;
+запаздывание углов — точная экспонента, устойчиво при любом dt) или RK4
+(method="rk4", в ~4 раза дороже). Один аппарат (N=1) на полунеявном
+Эйлере считается скалярно (step_one/fill_frame: math вместо массивов) —
+тот же результат, без накладных расходов NumPy на шаг (сверяется тестом
+по всем компонентам состояния).
+
+Семантика команд та же, что у Autopilot.update:
+  • thrust [0..1] — подъёмные роторы (thrust = hover_thrust ⇔ висение)
+  • pitch [-1..1] — тяга маршевого винта (через угол тангажа с запаздыванием)
+  • roll/yaw [-1..1] — координированный разворот / скорость рыскания
+Крыло разгружает роторы пропорционально v² (wing_lift_frac веса на крейсере).
+
+Параметры берутся из AirframeSpec (масса, крейсерская/макс. скорость,
+батарея) и fixar_specs.SPECS (длительность полёта): по полезной энергии
+батареи (до резерва reserve_soc) и длительности калибруется мощность
+крейсера и лобовое сопротивление, а ЭДС пустой батареи — так, чтобы порог
+min_batt_v автопилота (LOW_BATTERY → LAND) наступал на крейсере при SOC = reserve_soc:
+резерв остаётся на посадку.
+
+Пример:
+    dyn = FlightDynamics(64, AirframeParams.from_spec())
+    dyn.step(thrust, pitch, dt=0.1)
+    dyn.altitude, dyn.airspeed, dyn.battery_v()
+"""
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from agents.autopilot_ai.autopilot import AirframeSpec
+from agents.autopilot_ai.fixar_specs import SPECS
+
+G = 9.80665
+M_PER_DEG = 111320.0
+
+# строки вектора состояния (10, N)
+X, Y, Z, VX, VY, VZ, ROLL, PITCH, YAW, SOC = range(10)
+
+
+def _battery_from_text(text: str) -> tuple:
+    """"Li-Ion 25V 27Ah" → (25.0, 27.0); (0, 0), если разобрать не удалось."""
+    v = re.search(r"([\d.]+)\s*V", text)
+    ah = re.search(r"([\d.]+)\s*Ah", text)
+    return (float(v.group(1)) if v else 0.0, float(ah.group(1)) if ah else 0.0)
+
+
+@dataclass
+class AirframeParams:
+    """Физические параметры модели (см. from_spec для калибровки)."""
+    model: str = "FIXAR 007 NG"
+    mass_kg: float = 7.0
+    cruise_ms: float = 18.0
+    max_ms: float = 24.0
+    battery_v: float = 25.0
+    battery_ah: float = 27.0
+    endurance_min: float = 60.0
+    hover_thrust: float = 0.45        # команда thrust для висения (= hover_ff автопилота)
+    hover_power_w: float = 1400.0     # мощность висения на роторах
+    wing_lift_frac: float = 0.7       # доля веса, которую несёт крыло на крейсере
+    eta_prop: float = 0.7
+    rho: float = 1.225
+    cda_m2: float = 0.05              # калибруется from_spec
+    theta_max_rad: float = 0.35
+    phi_max_rad: float = 0.6
+    yaw_rate_max: float = 0.8         # рад/с при yaw=1
+    tau_att_s: float = 0.3            # запаздывание углов
+    min_batt_v: float = 19.2          # порог LOW_BATTERY автопилота (Autopilot.min_batt_v)
+    reserve_soc: float = 0.2          # посадочный резерв: на нём срабатывает LOW_BATTERY (см. calibrated_v_empty)
+    v_empty: float = 18.2             # ЭДС при SOC=0 (калибруется from_spec)
+    r_internal_ohm: float = 0.015
+
+    @classmethod
+    def from_spec(cls, spec: Optional[AirframeSpec] = None, **overrides: Any) -> "AirframeParams":
+        """
+        Параметры из AirframeSpec + SPECS[spec.model]; лобовое сопротивление подбирается так,
+        чтобы полезной энергии (до reserve_soc) хватало на endurance_min крейсерского полёта,
+        v_empty — см. calibrated_v_empty() (если не задан в overrides).
+        """
+        spec = spec or AirframeSpec()
+        v, ah = _battery_from_text(spec.battery)
+        ref = SPECS.get(spec.model, {})
+        p = cls(model=spec.model, mass_kg=spec.mtow_kg, cruise_ms=spec.cruise_ms, max_ms=spec.max_ms,
+                battery_v=v or cls.battery_v, battery_ah=ah or cls.battery_ah,
+                endurance_min=float(ref.get("endurance_min", cls.endurance_min)))
+        p = replace(p, **overrides)
+        if "cda_m2" not in overrides:
+            p.cda_m2 = p.calibrated_cda()
+        if "v_empty" not in overrides:
+            p.v_empty = p.calibrated_v_empty()
+        return p
+
+    @property
+    def battery_wh(self) -> float:
+        return self.battery_v * self.battery_ah
+
+    @property
+    def cells(self) -> int:
+        return max(1, round(self.battery_v / 4.2))
+
+    @property
+    def cruise_power_w(self) -> float:
+        """Мощность крейсера: полезная энергия (до reserve_soc) за endurance_min."""
+        return self.battery_wh * (1.0 - self.reserve_soc) / (self.endurance_min / 60.0)
+
+    @property
+    def t_max_n(self) -> float:
+        """Тяга роторов при thrust=1."""
+        return self.mass_kg * G / self.hover_thrust
+
+    @property
+    def f_fwd_max_n(self) -> float:
+        """Маршевая тяга при pitch=1: установившаяся скорость = max_ms."""
+        return 0.5 * self.rho * self.cda_m2 * self.max_ms ** 2
+
+    @property
+    def k_wing(self) -> float:
+        """Подъёмная сила крыла L = k_wing·v² (Н)."""
+        return self.wing_lift_frac * self.mass_kg * G / self.cruise_ms ** 2
+
+    def open_circuit_v(self, soc: Any) -> Any:
+        """ЭДС батареи по SOC: линейно от v_empty (SOC=0) до 4.2 В/яч. (SOC=1)."""
+        return self.v_empty + (4.2 * self.cells - self.v_empty) * soc
+
+    def lift_power_w(self, thrust: Any) -> Any:
+        return self.hover_power_w * (np.maximum(thrust, 0.0) / self.hover_thrust) ** 1.5
+
+    def calibrated_cda(self) -> float:
+        p_cruise = self.cruise_power_w
+        p_lift = float(self.lift_power_w((1.0 - self.wing_lift_frac) * self.hover_thrust))
+        p_prop = max(0.1 * p_cruise, p_cruise - p_lift)
+        drag = self.eta_prop * p_prop / self.cruise_ms
+        return 2.0 * drag / (self.rho * self.cruise_ms ** 2)
+
+    def calibrated_v_empty(self) -> float:
+        """
+        ЭДС пустой батареи: под крейсерским током (с просадкой на r_internal_ohm) напряжение
+        доходит до min_batt_v при SOC = reserve_soc — LOW_BATTERY → LAND срабатывает,
+        когда на посадку ещё остаётся резерв.
+        """
+        m, r, s = self.min_batt_v, self.r_internal_ohm, self.reserve_soc
+        v_res = 0.5 * (m + math.sqrt(m * m + 4.0 * r * self.cruise_power_w))   # v - r·P/v = m
+        return (v_res - 4.2 * self.cells * s) / (1.0 - s)                       # open_circuit_v(s) = v_res
+
+
+def _vec(v: Any, n: int) -> np.ndarray:
+    """Вход (N,) без копии; скаляр — транслируется (broadcast_to дорог на каждом шаге)."""
+    a = np.asarray(v, dtype=float)
+    return a if a.shape == (n,) else np.broadcast_to(a, (n,))
+
+
+class FlightDynamics:
+    """
+    N аппаратов; состояние — массив self.y формы (10, N) (строки X..SOC).
+
+    Args:
+        n: число аппаратов
+        params: AirframeParams (по умолчанию — from_spec() для FIXAR 007 NG)
+        method: "semi-implicit" | "rk4"
+        wind_mean: средний ветер ENU, м/с
+        gust_sigma_ms, gust_tau_s: порывы (OU-процесс по каждой оси)
+        lat0, lon0: начало локальной системы ENU (для lat/lon сенсоров)
+        seed: сид генератора порывов
+    """
+
+    def __init__(self, n: int, params: Optional[AirframeParams] = None, *, method: str = "semi-implicit",
+                 wind_mean: Any = (0.0, 0.0, 0.0), gust_sigma_ms: float = 0.0, gust_tau_s: float = 5.0,
+                 lat0: float = 0.0, lon0: float = 0.0, seed: Optional[int] = None):
+        if method not in ("rk4", "semi-implicit"):
+            raise ValueError(f"Unknown integration method: {method}")
+        self.n = int(n)
+        self.p = params or AirframeParams.from_spec()
+        self.method = method
+        self.y = np.zeros((10, n))
+        self.y[SOC] = 1.0
+        self.wind_mean = np.broadcast_to(np.asarray(wind_mean, dtype=float).reshape(3, -1), (3, n)).copy()
+        self.wind = self.wind_mean.copy()
+        self.gust_sigma_ms = float(gust_sigma_ms)
+        self.gust_tau_s = float(gust_tau_s)
+        self.lat0, self.lon0 = float(lat0), float(lon0)
+        self._lon_scale = M_PER_DEG * np.cos(np.radians(self.lat0))
+        self._rng = np.random.default_rng(seed)
+        self._dead = False
+        self.t = 0.0
+
+    # ---- производные ----
+    def _power_w(self, y: np.ndarray, thrust: np.ndarray, vh: np.ndarray) -> np.ndarray:
+        """Электрическая мощность: подъёмные роторы + маршевый винт."""
+        p = self.p
+        return p.lift_power_w(thrust) + np.abs(p.f_fwd_max_n / p.theta_max_rad * y[PITCH]) * vh / p.eta_prop
+
+    def _deriv(self, y: np.ndarray, thrust: np.ndarray, pitch: np.ndarray,
+               roll: np.ndarray, yaw: np.ndarray) -> np.ndarray:
+        p = self.p
+        vax, vay, vaz = y[VX] - self.wind[0], y[VY] - self.wind[1], y[VZ] - self.wind[2]
+        vh2 = vax * vax + vay * vay
+        vh = np.sqrt(vh2)
+        k_drag = (0.5 * p.rho * p.cda_m2 / p.mass_kg) * np.sqrt(vh2 + vaz * vaz)
+
+        f_prop = (p.f_fwd_max_n / p.theta_max_rad) * y[PITCH]
+        if self._dead:  # разряженные аппараты: без тяги
+            alive = y[SOC] > 0.0
+            thrust = np.where(alive, thrust, 0.0)
+            f_prop = np.where(alive, f_prop, 0.0)
+        c, s = np.cos(y[YAW]), np.sin(y[YAW])
+        lift = thrust * p.t_max_n + np.minimum(p.k_wing * vh2, 1.5 * p.mass_kg * G)
+
+        d = np.empty_like(y)
+        d[X], d[Y], d[Z] = y[VX], y[VY], y[VZ]
+        d[VX] = f_prop * c / p.mass_kg - k_drag * vax
+        d[VY] = f_prop * s / p.mass_kg - k_drag * vay
+        d[VZ] = lift / p.mass_kg - G - k_drag * vaz
+        d[ROLL] = (roll * p.phi_max_rad - y[ROLL]) / p.tau_att_s
+        d[PITCH] = (pitch * p.theta_max_rad - y[PITCH]) / p.tau_att_s
+        d[YAW] = G * np.tan(y[ROLL]) / np.maximum(vh, 5.0) + yaw * p.yaw_rate_max
+        power = p.lift_power_w(thrust) + np.abs(f_prop) * vh / p.eta_prop
+        d[SOC] = power * (-1.0 / (p.battery_wh * 3600.0))
+        return d
+
+    # ---- шаг ----
+    def step(self, thrust: Any, pitch: Any, roll: Any = 0.0, yaw: Any = 0.0, *,
+             dt: float = 0.1, ground_m: Any = 0.0) -> "FlightDynamics":
+        """Продвинуть все аппараты на dt; команды — скаляры или массивы (N,)."""
+        n = self.n
+        if n == 1 and self.method == "semi-implicit" and np.size(ground_m) == 1:
+            return self.step_one(float(np.asarray(thrust).item()), float(np.asarray(pitch).item()),
+                                  float(np.asarray(roll).item()), float(np.asarray(yaw).item()),
+                                  dt, float(np.asarray(ground_m).item()))
+        u = [_vec(v, n) for v in (thrust, pitch, roll, yaw)]
+        y = self.y
+        self._dead = bool(y[SOC].min() <= 0.0)
+        if self.method == "rk4":
+            k1 = self._deriv(y, *u)
+            k2 = self._deriv(y + (0.5 * dt) * k1, *u)
+            k3 = self._deriv(y + (0.5 * dt) * k2, *u)
+            k4 = self._deriv(y + dt * k3, *u)
+            y += (dt / 6.0) * (k1 + 2.0 * (k2 + k3) + k4)
+        else:
+            # полунеявный Эйлер: сначала скорости/рыскание/SOC, углы — точным решением
+            # звена первого порядка, затем позиция по новой скорости
+            d = self._deriv(y, *u)
+            y[VX:ROLL] += dt * d[VX:ROLL]
+            y[YAW:] += dt * d[YAW:]
+            a = math.exp(-dt / self.p.tau_att_s)
+            for row, cmd, lim in ((ROLL, u[2], self.p.phi_max_rad), (PITCH, u[1], self.p.theta_max_rad)):
+                target = cmd * lim
+                y[row] = target + (y[row] - target) * a
+            y[X:VX] += dt * y[VX:ROLL]
+
+        # земля: не проваливаемся ниже рельефа
+        ground = ground_m if np.ndim(ground_m) == 0 else _vec(ground_m, n)
+        below = y[Z] < ground
+        if below.any():
+            y[Z] = np.where(below, ground, y[Z])
+            y[VZ] = np.where(below, np.maximum(y[VZ], 0.0), y[VZ])
+            on_ground = below & (u[0] <= self.p.hover_thrust)
+            y[VX] = np.where(on_ground, 0.0, y[VX])
+            y[VY] = np.where(on_ground, 0.0, y[VY])
+        np.maximum(y[SOC], 0.0, out=y[SOC])
+        self._gust(dt)
+        self.t += dt
+        return self
+
+    def _gust(self, dt: float) -> None:
+        """Порывы: OU-процесс вокруг среднего ветра (Эйлер–Маруяма, постоянен внутри шага)."""
+        if self.gust_sigma_ms > 0.0:
+            a = math.exp(-dt / self.gust_tau_s)
+            self.wind = self.wind_mean + a * (self.wind - self.wind_mean) + \
+                self.gust_sigma_ms * math.sqrt(1.0 - a * a) * self._rng.standard_normal((3, self.n))
+
+    def step_one(self, thrust: float, pitch: float, roll: float, yaw: float,
+                 dt: float, ground: float = 0.0) -> "FlightDynamics":
+        """
+        step() для N=1 на float (полунеявный Эйлер): та же модель, что _deriv + векторная
+        ветка step(), без NumPy на шаг. Изменения модели вносятся в обе ветки —
+        tests/test_flight_dynamics.py сверяет их по всем компонентам состояния.
+        """
+        if self.n != 1:
+            raise ValueError("step_one() needs a single vehicle (n=1)")
+        p = self.p
+        x, y, z, vx, vy, vz, phi, theta, psi, soc = self.y[:, 0].tolist()
+        wx, wy, wz = self.wind[:, 0].tolist()
+        vax, vay, vaz = vx - wx, vy - wy, vz - wz
+        vh2 = vax * vax + vay * vay
+        vh = math.sqrt(vh2)
+        k_drag = (0.5 * p.rho * p.cda_m2 / p.mass_kg) * math.sqrt(vh2 + vaz * vaz)
+        f_prop = (p.f_fwd_max_n / p.theta_max_rad) * theta
+        lift_cmd = thrust
+        if soc <= 0.0:
+            lift_cmd = f_prop = 0.0
+        lift = lift_cmd * p.t_max_n + min(p.k_wing * vh2, 1.5 * p.mass_kg * G)
+        power = p.hover_power_w * (max(lift_cmd, 0.0) / p.hover_thrust) ** 1.5 + abs(f_prop) * vh / p.eta_prop
+
+        vx += dt * (f_prop * math.cos(psi) / p.mass_kg - k_drag * vax)
+        vy += dt * (f_prop * math.sin(psi) / p.mass_kg - k_drag * vay)
+        vz += dt * (lift / p.mass_kg - G - k_drag * vaz)
+        psi += dt * (G * math.tan(phi) / max(vh, 5.0) + yaw * p.yaw_rate_max)
+        soc += dt * power * (-1.0 / (p.battery_wh * 3600.0))
+        a = math.exp(-dt / p.tau_att_s)
+        phi = roll * p.phi_max_rad + (phi - roll * p.phi_max_rad) * a
+        theta = pitch * p.theta_max_rad + (theta - pitch * p.theta_max_rad) * a
+        x, y, z = x + dt * vx, y + dt * vy, z + dt * vz
+
+        if z < ground:
+            z, vz = ground, max(vz, 0.0)
+            if thrust <= p.hover_thrust:
+                vx = vy = 0.0
+        self.y[:, 0] = (x, y, z, vx, vy, vz, phi, theta, psi, max(soc, 0.0))
+        self._gust(dt)
+        self.t += dt
+        return self
+
+    # ---- наблюдения ----
+    @property
+    def altitude(self) -> np.ndarray:
+        return self.y[Z]
+
+    @property
+    def groundspeed(self) -> np.ndarray:
+        return np.hypot(self.y[VX], self.y[VY])
+
+    @property
+    def airspeed(self) -> np.ndarray:
+        return np.sqrt((self.y[VX] - self.wind[0]) ** 2 + (self.y[VY] - self.wind[1]) ** 2
+                       + (self.y[VZ] - self.wind[2]) ** 2)
+
+    @property
+    def soc(self) -> np.ndarray:
+        return self.y[SOC]
+
+    def latlon(self) -> tuple:
+        return self.lat0 + self.y[Y] / M_PER_DEG, self.lon0 + self.y[X] / self._lon_scale
+
+    def battery_v(self, thrust: Any = None) -> np.ndarray:
+        """Напряжение: ЭДС по SOC (v_empty … 4.2 В/яч.) минус просадка под током."""
+        p = self.p
+        v_oc = p.open_circuit_v(self.y[SOC])
+        if thrust is None:
+            return v_oc
+        vh = np.hypot(self.y[VX] - self.wind[0], self.y[VY] - self.wind[1])
+        thrust = np.asarray(thrust, dtype=float)
+        current = self._power_w(self.y, thrust, vh) / np.maximum(v_oc, 1.0)
+        return v_oc - p.r_internal_ohm * current
+
+    def sensors(self, thrust: Any = None) -> Dict[str, np.ndarray]:
+        """Входы для FleetAutopilot.step: baro_alt_m, airspeed, battery_v, lat, lon."""
+        lat, lon = self.latlon()
+        return {"baro_alt_m": self.altitude.copy(), "airspeed": self.airspeed,
+                "battery_v": self.battery_v(thrust), "lat": lat, "lon": lon}
+
+    def fill_frame(self, frame: Any, thrust: float) -> Any:
+        """Сенсоры аппарата 0 (N=1) в SensorFrame скалярного Autopilot — как sensors(), на float."""
+        p = self.p
+        x, y, z, vx, vy, vz, _, theta, _, soc = self.y[:, 0].tolist()
+        wx, wy, wz = self.wind[:, 0].tolist()
+        vh = math.hypot(vx - wx, vy - wy)
+        v_oc = p.open_circuit_v(soc)
+        power = p.hover_power_w * (max(thrust, 0.0) / p.hover_thrust) ** 1.5 + \
+            abs(p.f_fwd_max_n / p.theta_max_rad * theta) * vh / p.eta_prop
+        frame.baro_alt_m = z
+        frame.airspeed = math.sqrt(vh * vh + (vz - wz) ** 2)
+        frame.battery_v = v_oc - p.r_internal_ohm * power / max(v_oc, 1.0)
+        frame.lat = self.lat0 + y / M_PER_DEG
+        frame.lon = self.lon0 + x / self._lon_scale
+        return frame
+
+
+def simulate_mission(n: int = 1, duration_s: float = 3600.0, dt: float = 0.25, *,
+                     target_alt_m: float = 120.0, params: Optional[AirframeParams] = None,
+                     method: str = "semi-implicit", gust_sigma_ms: float = 1.0,
+                     seed: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Полёт N аппаратов под FleetAutopilot (CRUISE на target_alt_m, крейсерская скорость).
+    N=1 на полунеявном Эйлере — скалярный Autopilot.update_fast + скалярный шаг модели
+    (те же законы, см. tests/test_fleet_autopilot.py). dt=0.25 — шаг, на котором контуры
+    автопилота ещё ведут себя как на 0.1 с.
+    Возвращает итоговые высоту, скорость, SOC, режим, время полёта и t_land — время
+    перехода в LAND (NaN — не было; LOW_BATTERY наступает около SOC = reserve_soc).
+    """
+    from agents.autopilot_ai.autopilot import Autopilot
+    from agents.autopilot_ai.fleet_autopilot import MODE_LAND, FleetAutopilot
+    from agents.autopilot_ai.frames import AutopilotCommand, SensorFrame
+
+    params = params or AirframeParams.from_spec()
+    dyn = FlightDynamics(n, params, method=method, gust_sigma_ms=gust_sigma_ms, seed=seed,
+                         lat0=52.12, lon0=13.45)
+    steps = int(round(duration_s / dt))
+    if n == 1 and method == "semi-implicit":
+        ap = Autopilot()
+        ap.use_terrain = False
+        ap.alt_ctl.hover_ff = params.hover_thrust
+        ap.min_batt_v = params.min_batt_v
+        ap.set_mode("CRUISE", target_alt_m=target_alt_m, target_airspeed_ms=params.cruise_ms)
+        frame, cmd = SensorFrame(dt=dt), AutopilotCommand()
+        thrust, t_land = 0.0, math.nan
+        for _ in range(steps):
+            ap.update_fast(dyn.fill_frame(frame, thrust), cmd)
+            if ap.mode == "LAND" and t_land != t_land:
+                t_land = dyn.t
+            thrust = cmd.thrust
+            dyn.step_one(thrust, cmd.pitch, cmd.roll, cmd.yaw, dt)
+        modes = np.array([ap.mode])
+        t_land = np.array([t_land])
+    else:
+        fleet = FleetAutopilot(n)
+        fleet.use_terrain[:] = False
+        fleet.hover_ff[:] = params.hover_thrust
+        fleet.min_batt_v[:] = params.min_batt_v
+        fleet.set_mode("CRUISE", target_alt_m=target_alt_m, target_airspeed_ms=params.cruise_ms)
+        thrust, t_land = np.zeros(n), np.full(n, np.nan)
+        for _ in range(steps):
+            s = dyn.sensors(thrust)
+            out = fleet.step(s["baro_alt_m"], s["battery_v"], dt, airspeed=s["airspeed"],
+                             lat=s["lat"], lon=s["lon"])
+            t_land[(fleet.mode == MODE_LAND) & np.isnan(t_land)] = dyn.t
+            thrust = out["thrust"].copy()
+            dyn.step(thrust, out["pitch"], out["roll"], out["yaw"], dt=dt)
+        modes = np.array(fleet.mode_names())
+    return {"altitude": dyn.altitude.copy(), "airspeed": dyn.airspeed, "soc": dyn.soc.copy(),
+            "mode": modes, "t": np.full(n, dyn.t), "t_land": t_land}
+
+
+if __name__ == "__main__":
+    import time
+
+    # N=1 — скалярная ветка; дальше векторно по аппаратам: время на аппарат падает с ростом N
+    for n in (1, 16, 256):
+        t0 = time.perf_counter()
+        res = simulate_mission(n, duration_s=3600.0)
+        dt_s = time.perf_counter() - t0
+        print(f"[DYN] {n} vehicle(s), 60 min: {dt_s:.2f}s total, {dt_s / n * 1e3:.1f} ms/vehicle; "
+              f"soc={res['soc'].mean():.2f}, modes={sorted(set(res['mode'].tolist()))}")
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Типизированные кадры быстрого тика автопилота (без словарей на каждом шаге).
+
+  • SensorFrame      — входы одного тика (сенсоры + системные данные)
+  • AutopilotCommand — выход тика; один объект переиспользуется между тиками
+
+Оба класса на __slots__: нет __dict__, атрибуты фиксированы, заполнение
+на месте. Dict-API Autopilot.update(sensors, sys, manual_cmd) остаётся
+обёрткой: from_dicts() → update_fast() → to_dict().
+
+Пример (100 Гц, без аллокаций контейнеров):
+    frame, cmd = SensorFrame(), AutopilotCommand()
+    while True:
+        frame.baro_alt_m = baro.read(); frame.airspeed = pitot.read(); ...
+        ap.update_fast(frame, cmd)
+        radio.send(cmd.thrust, cmd.pitch, cmd.roll, cmd.yaw)
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+
+class SensorFrame:
+    """
+    Входы одного тика. baro_ok=False ⇔ баро нет/невалидно (BARO_FAULT),
+    тогда baro_alt_m используется как есть (по умолчанию 0.0).
+    overrun=True — контур управления не успевает в период тика (OVERRUN).
+    """
+    __slots__ = ("baro_alt_m", "baro_ok", "airspeed", "terrain_elev_m", "lat", "lon",
+                 "rtk_fix", "battery_v", "link_ok", "dt", "overrun")
+
+    def __init__(self, baro_alt_m: float = 0.0, baro_ok: bool = True, airspeed: float = 0.0,
+                 terrain_elev_m: float = 0.0, lat: float = 0.0, lon: float = 0.0,
+                 rtk_fix: bool = True, battery_v: float = 0.0, link_ok: bool = True,
+                 dt: float = 0.1, overrun: bool = False):
+        self.baro_alt_m = baro_alt_m
+        self.baro_ok = baro_ok
+        self.airspeed = airspeed
+        self.terrain_elev_m = terrain_elev_m
+        self.lat = lat
+        self.lon = lon
+        self.rtk_fix = rtk_fix
+        self.battery_v = battery_v
+        self.link_ok = link_ok
+        self.dt = dt
+        self.overrun = overrun
+
+    def fill(self, sensors: Dict[str, Any], sys: Dict[str, Any]) -> "SensorFrame":
+        """Заполнить кадр из dict-входов прежнего API (те же ключи и значения по умолчанию)."""
+        baro = sensors.get("baro_alt_m", None)
+        self.baro_ok = isinstance(baro, (int, float))
+        self.baro_alt_m = float(baro) if self.baro_ok else float(sensors.get("baro_alt_m", 0.0))
+        self.airspeed = float(sensors.get("airspeed", 0.0))
+        self.terrain_elev_m = float(sensors.get("terrain_elev_m", 0.0))
+        self.lat = float(sensors.get("lat", 0.0))
+        self.lon = float(sensors.get("lon", 0.0))
+        self.rtk_fix = bool(sensors.get("rtk_fix", True))  # True = RTK fixed/float
+        self.battery_v = float(sys.get("battery_v", 0.0))
+        self.link_ok = bool(sys.get("link_ok", True))
+        self.dt = float(sys.get("dt", 0.1))
+        self.overrun = bool(sys.get("overrun", False))
+        return self
+
+    @classmethod
+    def from_dicts(cls, sensors: Dict[str, Any], sys: Dict[str, Any]) -> "SensorFrame":
+        return cls().fill(sensors, sys)
+
+
+class AutopilotCommand:
+    """
+    Выход тика. course_offset_deg=None — нет подсказки курса (guidance)
+    для внешнего слоя; иначе её выставляет пилотажный профиль.
+    """
+    __slots__ = ("thrust", "pitch", "roll", "yaw", "failsafe", "failsafe_reason", "mode",
+                 "target_alt_m", "target_airspeed_ms", "course_offset_deg")
+
+    def __init__(self):
+        self.thrust = 0.0
+        self.pitch = 0.0
+        self.roll = 0.0
+        self.yaw = 0.0
+        self.failsafe = False
+        self.failsafe_reason = ""
+        self.mode = "MANUAL"
+        self.target_alt_m = 0.0
+        self.target_airspeed_ms = 0.0
+        self.course_offset_deg: Optional[float] = None
+
+    def fill_manual(self, manual_cmd: Optional[Dict[str, float]]) -> "AutopilotCommand":
+        """Ручные команды из dict прежнего API (отсутствующий ключ → 0.0)."""
+        cmd = manual_cmd or {}
+        self.thrust = float(cmd.get("thrust", 0.0))
+        self.pitch = float(cmd.get("pitch", 0.0))
+        self.roll = float(cmd.get("roll", 0.0))
+        self.yaw = float(cmd.get("yaw", 0.0))
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Выход в формате прежнего Autopilot.update (для совместимости)."""
+        out = {
+            "thrust": self.thrust, "pitch": self.pitch, "roll": self.roll, "yaw": self.yaw,
+            "failsafe": self.failsafe, "failsafe_reason": self.failsafe_reason,
+            "mode": self.mode,
+            "targets": {"alt_m": self.target_alt_m, "airspeed_ms": self.target_airspeed_ms},
+        }
+        if self.course_offset_deg is not None:
+            out["guidance"] = {"course_offset_deg": self.course_offset_deg}
+        return out
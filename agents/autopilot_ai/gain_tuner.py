@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+"""
+Автоподбор усилений PID (высота + скорость) на симуляторе FlightDynamics.
+
+Кандидат — вектор из 6 усилений (alt_kp, alt_ki, alt_kd, spd_kp, spd_ki, spd_kd).
+Оценка пачкой: K кандидатов × S сценариев = K·S аппаратов в одном
+FleetAutopilot (усиления PIDBank задаются по аппаратам) + одной FlightDynamics.
+Пачки кандидатов раздаются по процессам (ProcessPoolExecutor).
+
+Сценарии (одни и те же для всех кандидатов — общие случайные числа):
+  • ступенька высоты ±(alt_step_m) и скорости ±(spd_step_ms) на старте
+  • средний ветер до wind_ms + порывы (OU-процесс)
+
+Стоимость сценария (меньше — лучше):
+  ISE/(ступенька²·T) + w_overshoot·перелёт/ступенька + w_settle·t_settle/T
+  по обоим контурам; падение на землю/failsafe — штраф fail_penalty.
+Стоимость кандидата — среднее по сценариям.
+
+Поиск: grid_search (сетка по границам) или cmaes (CMA-ES в нормированном
+пространстве [0, 1]^6). Лучшие усиления пишутся в config/pid_gains.yaml
+по модели планера (создаётся оператором через --write; в репозитории его нет —
+автопилот по умолчанию летает на ручных усилениях AltitudeController/SpeedController);
+make_controllers() читает их обратно, для планера без записи — исходные усиления.
+
+Пример:
+    with GainTuner(AirframeParams.from_spec(), workers=4) as tuner:
+        res = tuner.cmaes(generations=30)
+    print(res.summary())
+    save_gains(res)
+    alt_ctl, spd_ctl = make_controllers("FIXAR 007 NG")
+    fleet = FleetAutopilot(64, alt_ctl=alt_ctl, spd_ctl=spd_ctl)
+CLI:
+    python -m agents.autopilot_ai.gain_tuner --airframe "FIXAR 007 NG" --method cmaes --workers 4 --write
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import itertools
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import yaml
+
+from agents.autopilot_ai.autopilot import AirframeSpec, AltitudeController, SpeedController
+from agents.autopilot_ai.fixar_specs import SPECS
+from agents.autopilot_ai.fleet_autopilot import FleetAutopilot
+from agents.autopilot_ai.flight_dynamics import PITCH, VX, Z, AirframeParams, FlightDynamics
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]  # WebKurierDrone/
+DEFAULT_GAINS_PATH = PROJECT_ROOT / "config" / "pid_gains.yaml"
+
+GAIN_NAMES = ("alt_kp", "alt_ki", "alt_kd", "spd_kp", "spd_ki", "spd_kd")
+DEFAULT_BOUNDS: Dict[str, Tuple[float, float]] = {
+    "alt_kp": (0.05, 3.0), "alt_ki": (0.0, 1.0), "alt_kd": (0.0, 0.5),
+    "spd_kp": (0.02, 1.5), "spd_ki": (0.0, 0.5), "spd_kd": (0.0, 0.2),
+}
+
+
+def default_gains() -> np.ndarray:
+    """Текущие ручные усиления AltitudeController/SpeedController (порядок GAIN_NAMES)."""
+    a, s = AltitudeController(), SpeedController()
+    return np.array([a.kp, a.ki, a.kd, s.kp, s.ki, s.kd], dtype=float)
+
+
+def airframe_params(model: str = "FIXAR 007 NG") -> AirframeParams:
+    """AirframeParams для модели из fixar_specs.SPECS (скорости — из таблицы, км/ч → м/с)."""
+    base = AirframeSpec()
+    if model == base.model:
+        return AirframeParams.from_spec(base)
+    ref = SPECS.get(model)
+    if ref is None:
+        raise ValueError(f"Unknown airframe: {model}")
+    cruise = float(ref.get("cruise_speed_kmh", base.cruise_ms * 3.6)) / 3.6
+    top = max(cruise, float(ref.get("max_speed_kmh", base.max_ms * 3.6)) / 3.6)
+    return AirframeParams.from_spec(AirframeSpec(model=model, cruise_ms=cruise, max_ms=top))
+
+
+@dataclass
+class TuningConfig:
+    """Сценарии и веса стоимости."""
+    duration_s: float = 60.0
+    dt: float = 0.1
+    scenarios: int = 8
+    target_alt_m: float = 120.0
+    alt_step_m: tuple = (10.0, 30.0)       # |ступенька высоты| (знак случайный)
+    spd_step_ms: tuple = (2.0, 5.0)        # |ступенька скорости|
+    wind_ms: float = 5.0                   # средний горизонтальный ветер ≤
+    gust_sigma_ms: float = 1.0
+    gust_tau_s: float = 5.0
+    settle_alt_m: float = 2.0
+    settle_spd_ms: float = 2.5            # шире σ порывов, иначе «не устаканилось» никогда
+    w_overshoot: float = 1.0
+    w_settle: float = 1.0
+    fail_penalty: float = 10.0
+    method: str = "rk4"
+    seed: int = 0                          # сид сценариев (одинаков для всех кандидатов)
+
+
+def evaluate_gains(gains: Any, params: Optional[AirframeParams] = None,
+                   cfg: Optional[TuningConfig] = None) -> Dict[str, np.ndarray]:
+    """
+    Оценить K кандидатов (массив (K, 6) в порядке GAIN_NAMES) на cfg.scenarios сценариях.
+    Возвращает метрики (K,) — средние по сценариям; "cost" — итоговая стоимость.
+    """
+    cfg = cfg or TuningConfig()
+    params = params or AirframeParams.from_spec()
+    gains = np.atleast_2d(np.asarray(gains, dtype=float))
+    k_cand, n_scen = gains.shape[0], cfg.scenarios
+    n = k_cand * n_scen
+    scen = np.tile(np.arange(n_scen), k_cand)   # аппарат i = кандидат i // S, сценарий i % S
+    dt = cfg.dt
+    steps = int(round(cfg.duration_s / dt))
+    t_total = steps * dt
+
+    # ---- сценарии: зависят только от cfg.seed ----
+    rng = np.random.default_rng(cfg.seed)
+    sign = lambda: np.where(rng.random(n_scen) < 0.5, -1.0, 1.0)  # noqa: E731
+    d_alt = sign() * rng.uniform(*cfg.alt_step_m, n_scen)
+    d_spd = sign() * rng.uniform(*cfg.spd_step_ms, n_scen)
+    wind_dir = rng.uniform(0.0, 2 * np.pi, n_scen)
+    wind_spd = rng.uniform(0.0, cfg.wind_ms, n_scen)
+    wind_mean = np.zeros((3, n_scen))
+    wind_mean[0], wind_mean[1] = wind_spd * np.cos(wind_dir), wind_spd * np.sin(wind_dir)
+    gust_a = np.exp(-dt / cfg.gust_tau_s)
+    gust_b = cfg.gust_sigma_ms * np.sqrt(1.0 - gust_a ** 2)
+    gust = np.zeros((3, n_scen))
+
+    # ---- аппараты ----
+    dyn = FlightDynamics(n, params, method=cfg.method)
+    v0 = np.maximum(0.0, params.cruise_ms - d_spd)
+    dyn.y[Z] = (cfg.target_alt_m - d_alt)[scen]
+    dyn.y[VX] = (v0 + wind_mean[0])[scen]
+    dyn.y[PITCH] = 0.0
+
+    fleet = FleetAutopilot(n)
+    fleet.use_terrain[:] = False
+    fleet.hover_ff[:] = params.hover_thrust
+    fleet.set_mode("CRUISE", target_alt_m=cfg.target_alt_m, target_airspeed_ms=params.cruise_ms)
+    g = np.repeat(gains, n_scen, axis=0)
+    fleet.alt_pid.tune(g[:, 0], g[:, 1], g[:, 2])
+    fleet.spd_pid.tune(g[:, 3], g[:, 4], g[:, 5])
+
+    # ---- метрики (потоково, без истории) ----
+    s_alt, s_spd = np.sign(d_alt)[scen], np.sign(d_spd)[scen]
+    ise_alt, ise_spd = np.zeros(n), np.zeros(n)
+    os_alt, os_spd = np.zeros(n), np.zeros(n)
+    last_alt, last_spd = np.full(n, -1), np.full(n, -1)
+    failed = np.zeros(n, dtype=bool)
+    thrust = np.full(n, params.hover_thrust)
+
+    for k in range(steps):
+        s = dyn.sensors(thrust)
+        out = fleet.step(s["baro_alt_m"], s["battery_v"], dt, airspeed=s["airspeed"],
+                         lat=s["lat"], lon=s["lon"])
+        e_alt = s["baro_alt_m"] - cfg.target_alt_m
+        e_spd = s["airspeed"] - params.cruise_ms
+        ise_alt += e_alt * e_alt * dt
+        ise_spd += e_spd * e_spd * dt
+        np.maximum(os_alt, s_alt * e_alt, out=os_alt)
+        np.maximum(os_spd, s_spd * e_spd, out=os_spd)
+        last_alt[np.abs(e_alt) > cfg.settle_alt_m] = k
+        last_spd[np.abs(e_spd) > cfg.settle_spd_ms] = k
+        failed |= out["failsafe"] | (s["baro_alt_m"] < 5.0)
+
+        thrust = out["thrust"].copy()
+        gust = gust_a * gust + gust_b * rng.standard_normal((3, n_scen))
+        dyn.wind = (wind_mean + gust)[:, scen]
+        dyn.step(thrust, out["pitch"], out["roll"], out["yaw"], dt=dt)
+
+    # ---- стоимость ----
+    a_alt, a_spd = np.abs(d_alt)[scen], np.abs(d_spd)[scen]
+    settle_alt = (last_alt + 1) * dt
+    settle_spd = (last_spd + 1) * dt
+    cost = (ise_alt / (a_alt ** 2 * t_total) + ise_spd / (a_spd ** 2 * t_total)
+            + cfg.w_overshoot * (os_alt / a_alt + os_spd / a_spd)
+            + cfg.w_settle * (settle_alt + settle_spd) / t_total)
+    cost = np.where(np.isfinite(cost), cost, cfg.fail_penalty) + cfg.fail_penalty * failed
+
+    per_vehicle = {"cost": cost, "ise_alt": ise_alt, "ise_spd": ise_spd,
+                   "overshoot_alt_m": os_alt, "overshoot_spd_ms": os_spd,
+                   "settle_alt_s": settle_alt, "settle_spd_s": settle_spd, "failures": failed.astype(float)}
+    return {key: v.reshape(k_cand, n_scen).mean(axis=1) for key, v in per_vehicle.items()}
+
+
+def _chunk_job(args: tuple) -> Dict[str, np.ndarray]:
+    return evaluate_gains(*args)
+
+
+@dataclass
+class TuningResult:
+    """Лучшие усиления + сравнение с исходными."""
+    airframe: str
+    method: str
+    gains: Dict[str, float]
+    cost: float
+    baseline_gains: Dict[str, float]
+    baseline_cost: float
+    evaluations: int
+    elapsed_s: float
+    metrics: Dict[str, float] = field(default_factory=dict)
+    baseline_metrics: Dict[str, float] = field(default_factory=dict)
+    history: List[float] = field(default_factory=list, repr=False)  # лучшая стоимость по итерациям
+
+    @property
+    def improvement(self) -> float:
+        """Доля снижения стоимости относительно исходных усилений."""
+        return 1.0 - self.cost / self.baseline_cost if self.baseline_cost > 0 else 0.0
+
+    def summary(self) -> str:
+        g = ", ".join(f"{k}={v:.3f}" for k, v in self.gains.items())
+        m, b = self.metrics, self.baseline_metrics
+        return (f"[{self.airframe}] {self.method}: cost {self.baseline_cost:.3f} → {self.cost:.3f} "
+                f"({self.improvement:.0%} better), {self.evaluations} candidate(s) in {self.elapsed_s:.1f}s\n"
+                f"  {g}\n"
+                f"  settle alt {b.get('settle_alt_s', 0):.1f}s → {m.get('settle_alt_s', 0):.1f}s, "
+                f"spd {b.get('settle_spd_s', 0):.1f}s → {m.get('settle_spd_s', 0):.1f}s; "
+                f"overshoot alt {b.get('overshoot_alt_m', 0):.2f}m → {m.get('overshoot_alt_m', 0):.2f}m")
+
+
+class GainTuner:
+    """
+    Args:
+        params: планер (AirframeParams; см. airframe_params(model))
+        cfg: сценарии/веса стоимости
+        bounds: границы поиска {имя: (min, max)} (по умолчанию DEFAULT_BOUNDS)
+        workers: число процессов; None/0/1 — в текущем процессе
+        chunk: максимум кандидатов в одной пачке симуляции
+        seed: сид поиска (CMA-ES); сценарии задаются cfg.seed
+
+    Результат не зависит от workers/chunk: все пачки видят одни и те же сценарии.
+    """
+
+    def __init__(self, params: Optional[AirframeParams] = None, cfg: Optional[TuningConfig] = None, *,
+                 bounds: Optional[Dict[str, Tuple[float, float]]] = None,
+                 workers: Optional[int] = None, chunk: int = 32, seed: int = 0):
+        self.params = params or AirframeParams.from_spec()
+        self.cfg = cfg or TuningConfig()
+        b = dict(DEFAULT_BOUNDS, **(bounds or {}))
+        self.lo = np.array([b[k][0] for k in GAIN_NAMES], dtype=float)
+        self.hi = np.array([b[k][1] for k in GAIN_NAMES], dtype=float)
+        if np.any(self.hi <= self.lo):
+            raise ValueError("gain bounds must satisfy min < max")
+        self.workers = workers
+        self.chunk = max(1, int(chunk))
+        self.seed = seed
+        self.evaluations = 0
+        self._pool: Optional[Executor] = None
+
+    # ---- пул процессов ----
+    def __enter__(self) -> "GainTuner":
+        if self.workers and self.workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    # ---- оценка ----
+    def evaluate(self, gains: Any) -> Dict[str, np.ndarray]:
+        """Метрики (K,) для массива кандидатов (K, 6); пачки по chunk — параллельно."""
+        gains = np.atleast_2d(np.asarray(gains, dtype=float))
+        size = self.chunk
+        if self._pool is not None:  # поколение меньше chunk·workers — делим поровну между воркерами
+            size = max(1, min(size, -(-len(gains) // self.workers)))
+        jobs = [(gains[i:i + size], self.params, self.cfg) for i in range(0, len(gains), size)]
+        if self._pool is not None and len(jobs) > 1:
+            parts = list(self._pool.map(_chunk_job, jobs))
+        else:
+            parts = [_chunk_job(j) for j in jobs]
+        self.evaluations += len(gains)
+        return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+    def _to_gains(self, u: np.ndarray) -> np.ndarray:
+        return self.lo + np.clip(u, 0.0, 1.0) * (self.hi - self.lo)
+
+    def _to_unit(self, gains: np.ndarray) -> np.ndarray:
+        return np.clip((gains - self.lo) / (self.hi - self.lo), 0.0, 1.0)
+
+    def _result(self, method: str, best: np.ndarray, best_m: Dict[str, float], base: np.ndarray,
+                base_m: Dict[str, float], history: List[float], t0: float) -> TuningResult:
+        as_dict = lambda v: {k: float(x) for k, x in zip(GAIN_NAMES, v)}  # noqa: E731
+        return TuningResult(airframe=self.params.model, method=method, gains=as_dict(best),
+                            cost=best_m["cost"], baseline_gains=as_dict(base),
+                            baseline_cost=base_m["cost"], evaluations=self.evaluations,
+                            elapsed_s=time.perf_counter() - t0, metrics=best_m,
+                            baseline_metrics=base_m, history=history)
+
+    @staticmethod
+    def _row(metrics: Dict[str, np.ndarray], i: int) -> Dict[str, float]:
+        return {k: float(v[i]) for k, v in metrics.items()}
+
+    # ---- поиск ----
+    def grid_search(self, levels: Union[int, Dict[str, Sequence[float]]] = 3) -> TuningResult:
+        """
+        Полный перебор: levels точек на усиление по границам (или явные значения
+        {имя: [...]}; неуказанные усиления — исходные). 6 усилений × 3 уровня = 729 кандидатов.
+        """
+        t0 = time.perf_counter()
+        self.evaluations = 0
+        base = default_gains()
+        axes = []
+        for j, name in enumerate(GAIN_NAMES):
+            if isinstance(levels, dict):
+                axes.append(np.asarray(levels.get(name, [base[j]]), dtype=float))
+            else:
+                axes.append(np.linspace(self.lo[j], self.hi[j], int(levels)))
+        cand = np.vstack([base, np.array(list(itertools.product(*axes)), dtype=float)])
+        m = self.evaluate(cand)
+        i = int(np.argmin(m["cost"]))
+        return self._result("grid", cand[i], self._row(m, i), base, self._row(m, 0),
+                            [float(m["cost"][i])], t0)
+
+    def cmaes(self, generations: int = 30, popsize: Optional[int] = None,
+              sigma0: float = 0.2, x0: Optional[Sequence[float]] = None,
+              callback: Optional[Callable[[int, float], Any]] = None) -> TuningResult:
+        """
+        CMA-ES (μ/μ_w, λ) в нормированном пространстве [0, 1]^6; старт — исходные
+        усиления (или x0). Вне границ кандидат оценивается на границе плюс
+        квадратичный штраф. Поколение целиком считается одной пачкой симуляций.
+        """
+        t0 = time.perf_counter()
+        self.evaluations = 0
+        rng = np.random.default_rng(self.seed)
+        base = default_gains()
+        d = len(GAIN_NAMES)
+        lam = int(popsize or 4 + int(3 * np.log(d)))
+        mu = lam // 2
+        w = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+        w /= w.sum()
+        mueff = 1.0 / np.sum(w ** 2)
+        cc = (4 + mueff / d) / (d + 4 + 2 * mueff / d)
+        cs = (mueff + 2) / (d + mueff + 5)
+        c1 = 2 / ((d + 1.3) ** 2 + mueff)
+        cmu = min(1 - c1, 2 * (mueff - 2 + 1 / mueff) / ((d + 2) ** 2 + mueff))
+        damps = 1 + 2 * max(0.0, np.sqrt((mueff - 1) / (d + 1)) - 1) + cs
+        chi_n = np.sqrt(d) * (1 - 1 / (4 * d) + 1 / (21 * d * d))
+
+        start = np.asarray(x0, dtype=float) if x0 is not None else base
+        base_m = self.evaluate(np.vstack([base, start]))
+        best, best_m = start, self._row(base_m, 1)
+        base_m = self._row(base_m, 0)
+        if base_m["cost"] < best_m["cost"]:
+            best, best_m = base, dict(base_m)
+        history = [best_m["cost"]]
+
+        mean = self._to_unit(start)
+        sigma = float(sigma0)
+        cov = np.eye(d)
+        pc, ps = np.zeros(d), np.zeros(d)
+        for gen in range(int(generations)):
+            eig, basis = np.linalg.eigh(cov)
+            sd = np.sqrt(np.maximum(eig, 1e-20))
+            y = (rng.standard_normal((lam, d)) * sd) @ basis.T
+            u = mean + sigma * y
+            cand = self._to_gains(u)
+            m = self.evaluate(cand)
+            cost = m["cost"] + 1e3 * np.sum((u - np.clip(u, 0.0, 1.0)) ** 2, axis=1)
+            order = np.argsort(cost, kind="stable")
+            i = int(np.argmin(m["cost"]))
+            if m["cost"][i] < best_m["cost"]:
+                best, best_m = cand[i], self._row(m, i)
+            history.append(best_m["cost"])
+            if callback is not None:
+                callback(gen, best_m["cost"])
+
+            # обновление распределения
+            y_sel = y[order[:mu]]
+            y_w = w @ y_sel
+            mean = mean + sigma * y_w
+            inv_sqrt = basis @ np.diag(1.0 / sd) @ basis.T
+            ps = (1 - cs) * ps + np.sqrt(cs * (2 - cs) * mueff) * (inv_sqrt @ y_w)
+            hsig = np.linalg.norm(ps) / np.sqrt(1 - (1 - cs) ** (2 * (gen + 1))) / chi_n < 1.4 + 2 / (d + 1)
+            pc = (1 - cc) * pc + hsig * np.sqrt(cc * (2 - cc) * mueff) * y_w
+            cov = ((1 - c1 - cmu) * cov
+                   + c1 * (np.outer(pc, pc) + (1 - hsig) * cc * (2 - cc) * cov)
+                   + cmu * (y_sel.T * w) @ y_sel)
+            cov = 0.5 * (cov + cov.T)
+            sigma *= np.exp((cs / damps) * (np.linalg.norm(ps) / chi_n - 1))
+            sigma = min(sigma, 1.0)
+        return self._result("cmaes", best, best_m, base, base_m, history, t0)
+
+
+# ========================== CONFIG: config/pid_gains.yaml ==========================
+def load_gains(airframe: Optional[str] = None,
+               path: Union[str, Path] = DEFAULT_GAINS_PATH) -> Dict[str, Any]:
+    """
+    Секция airframes из pid_gains.yaml: всё (airframe=None) или запись одного планера
+    ({} если файла/записи нет).
+    """
+    try:
+        with Path(path).open("r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+    frames = data.get("airframes") or {}
+    return frames if airframe is None else (frames.get(airframe) or {})
+
+
+def save_gains(result: TuningResult, path: Union[str, Path] = DEFAULT_GAINS_PATH) -> Path:
+    """Записать/обновить усиления планера result.airframe (остальные записи сохраняются)."""
+    path = Path(path)
+    frames = load_gains(None, path)
+    g = result.gains
+    frames[result.airframe] = {
+        "altitude": {"kp": round(g["alt_kp"], 4), "ki": round(g["alt_ki"], 4), "kd": round(g["alt_kd"], 4)},
+        "speed": {"kp": round(g["spd_kp"], 4), "ki": round(g["spd_ki"], 4), "kd": round(g["spd_kd"], 4)},
+        "tuning": {
+            "method": result.method,
+            "cost": round(result.cost, 4),
+            "baseline_cost": round(result.baseline_cost, 4),
+            "evaluations": result.evaluations,
+            "date": _dt.date.today().isoformat(),
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        f.write("# Усиления PID по планерам — генерируется agents/autopilot_ai/gain_tuner.py\n")
+        yaml.safe_dump({"airframes": frames}, f, allow_unicode=True, sort_keys=True)
+    return path
+
+
+def make_controllers(airframe: str = "FIXAR 007 NG",
+                     path: Union[str, Path] = DEFAULT_GAINS_PATH) -> Tuple[AltitudeController, SpeedController]:
+    """AltitudeController/SpeedController с усилениями планера из pid_gains.yaml (иначе — исходные)."""
+    entry = load_gains(airframe, path)
+    alt = {k: float(v) for k, v in (entry.get("altitude") or {}).items() if k in ("kp", "ki", "kd")}
+    spd = {k: float(v) for k, v in (entry.get("speed") or {}).items() if k in ("kp", "ki", "kd")}
+    return AltitudeController(**alt), SpeedController(**spd)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Автоподбор усилений PID на симуляторе")
+    parser.add_argument("--airframe", default="FIXAR 007 NG", help=f"одна из: {', '.join(SPECS)}")
+    parser.add_argument("--method", choices=("cmaes", "grid"), default="cmaes")
+    parser.add_argument("--generations", type=int, default=30, help="поколений CMA-ES")
+    parser.add_argument("--popsize", type=int, default=None, help="размер популяции CMA-ES")
+    parser.add_argument("--levels", type=int, default=3, help="точек на усиление для grid")
+    parser.add_argument("--scenarios", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=60.0, help="длительность сценария, с")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--write", action="store_true", help=f"записать в {DEFAULT_GAINS_PATH.name}")
+    args = parser.parse_args(argv)
+
+    cfg = TuningConfig(duration_s=args.duration, scenarios=args.scenarios, seed=args.seed)
+    with GainTuner(airframe_params(args.airframe), cfg, workers=args.workers, seed=args.seed) as tuner:
+        if args.method == "grid":
+            res = tuner.grid_search(args.levels)
+        else:
+            res = tuner.cmaes(args.generations, args.popsize,
+                              callback=lambda g, c: print(f"gen {g:>3}: best cost {c:.4f}"))
+    print(res.summary())
+    if args.write:
+        print(f"✅ Saved: {save_gains(res)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+Полигональная геозона для тика автопилота (keep-in / keep-out).
+
+  • LocalProjection  — локальная ENU-проекция (равнопромежуточная вокруг
+                       lat0/lon0); cos(lat0) считается один раз при настройке
+  • PreparedPolygon  — полигон (внешний контур + дыры) в метрах с индексами:
+      – point-in-polygon: горизонтальные «слэбы» между соседними y вершин,
+        в каждом — рёбра, отсортированные по x; запрос = bisect по y +
+        бинарный поиск числа рёбер левее точки → O(log n)
+      – расстояние до границы: равномерная сетка ячеек с рёбрами, поиск
+        расширяющимися кольцами ячеек (обычно 1–2 кольца)
+  • PolygonGeofence  — набор зон; margin_m(lat, lon) — запас до нарушения:
+        > 0 — внутри разрешённого на столько метров, < 0 — нарушение
+    Несколько keep-in зон — объединение; keep-out — запрет в каждой.
+
+Автопилот включает RTL, как только запас меньше fence_margin_m — до пересечения.
+
+Пример:
+    fence = PolygonGeofence.from_navigator_config()          # config/navigator.yaml
+    ap.set_polygon_fence(fence, margin_m=50.0)              # horizon_m поднимается до margin_m
+    fence.margin_m(51.2335, 8.0128)                          # → -43.2 (внутри NFZ)
+
+Чистый Python (math/bisect): годится и для лёгкого autopilot_basic.
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from math import cos, hypot, inf, pi, radians, sin, sqrt
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+M_PER_DEG = 111320.0
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]  # WebKurierDrone/
+NAVIGATOR_CONFIG = PROJECT_ROOT / "config" / "navigator.yaml"
+
+LatLon = Tuple[float, float]
+Ring = Sequence[LatLon]
+
+
+class LocalProjection:
+    """Локальная ENU (x — восток, y — север, метры) вокруг (lat0, lon0)."""
+    __slots__ = ("lat0", "lon0", "kx", "ky")
+
+    def __init__(self, lat0: float, lon0: float):
+        self.lat0 = float(lat0)
+        self.lon0 = float(lon0)
+        self.kx = M_PER_DEG * cos(radians(self.lat0))
+        self.ky = M_PER_DEG
+
+    def to_xy(self, lat: float, lon: float) -> Tuple[float, float]:
+        return (lon - self.lon0) * self.kx, (lat - self.lat0) * self.ky
+
+    def to_latlon(self, x: float, y: float) -> LatLon:
+        return self.lat0 + y / self.ky, self.lon0 + x / self.kx
+
+
+def _seg_dist(px: float, py: float, x1: float, y1: float, x2: float, y2: float) -> float:
+    dx, dy = x2 - x1, y2 - y1
+    l2 = dx * dx + dy * dy
+    t = 0.0 if l2 == 0.0 else max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / l2))
+    return hypot(px - x1 - t * dx, py - y1 - t * dy)
+
+
+class PreparedPolygon:
+    """
+    Полигон в локальных метрах: rings[0] — внешний контур, остальные — дыры
+    (ориентация не важна, контуры замыкаются автоматически). Контуры не должны
+    пересекаться — как у валидного GeoJSON-полигона.
+    """
+
+    def __init__(self, rings: Sequence[Sequence[Tuple[float, float]]]):
+        edges: List[Tuple[float, float, float, float]] = []
+        for ring in rings:
+            pts = [(float(x), float(y)) for x, y in ring]
+            if len(pts) > 1 and pts[0] == pts[-1]:
+                pts.pop()
+            if len(pts) < 3:
+                raise ValueError("polygon ring needs at least 3 vertices")
+            edges.extend((*pts[i - 1], *pts[i]) for i in range(len(pts)))
+        self.edges = edges
+        xs = [e[0] for e in edges]
+        ys = [e[1] for e in edges]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+        self._build_slabs()
+        self._build_grid()
+
+    # ---- индекс point-in-polygon ----
+    def _build_slabs(self) -> None:
+        ys = sorted({e[1] for e in self.edges})
+        slabs: List[List[Tuple[float, float, float, float]]] = [[] for _ in range(len(ys) - 1)]
+        for x1, y1, x2, y2 in self.edges:
+            if y1 == y2:
+                continue  # горизонтальные рёбра луч не пересекают
+            if y1 > y2:
+                x1, y1, x2, y2 = x2, y2, x1, y1
+            k = (x2 - x1) / (y2 - y1)
+            for j in range(bisect_right(ys, y1) - 1, bisect_right(ys, y2) - 1):
+                ym = 0.5 * (ys[j] + ys[j + 1])
+                slabs[j].append((x1 + (ym - y1) * k, x1, y1, k))
+        # рёбра внутри слэба не пересекаются → порядок по x в середине верен по всей высоте слэба
+        self._slab_y = ys
+        self._slabs = [[e[1:] for e in sorted(s)] for s in slabs]
+
+    def contains(self, x: float, y: float) -> bool:
+        """Точка внутри (с учётом дыр); O(log n)."""
+        i = bisect_right(self._slab_y, y) - 1
+        if i < 0 or i >= len(self._slabs):
+            return False
+        edges = self._slabs[i]
+        lo, hi = 0, len(edges)
+        while lo < hi:  # число рёбер левее точки
+            mid = (lo + hi) >> 1
+            x1, y1, k = edges[mid]
+            if x1 + (y - y1) * k < x:
+                lo = mid + 1
+            else:
+                hi = mid
+        return bool(lo & 1)
+
+    # ---- индекс расстояния до границы ----
+    def _build_grid(self) -> None:
+        x0, y0, x1, y1 = self.bbox
+        span = max(x1 - x0, y1 - y0, 1e-6)
+        self._cell = span / max(1, int(sqrt(len(self.edges))))
+        self._nx = int((x1 - x0) / self._cell) + 1
+        self._ny = int((y1 - y0) / self._cell) + 1
+        grid: Dict[Tuple[int, int], List[int]] = {}
+        x0 = self.bbox[0]
+        for idx, (ax, ay, bx, by) in enumerate(self.edges):
+            if ax > bx:
+                ax, ay, bx, by = bx, by, ax, ay
+            k = (by - ay) / (bx - ax) if bx > ax else 0.0
+            # по столбцам: в каждом — только ячейки, через которые проходит отрезок
+            for ix in range(self._cx(ax), self._cx(bx) + 1):
+                if bx > ax:
+                    xa = max(ax, x0 + ix * self._cell)
+                    xb = min(bx, x0 + (ix + 1) * self._cell)
+                    ya, yb = ay + (xa - ax) * k, ay + (xb - ax) * k
+                else:
+                    ya, yb = ay, by
+                for iy in range(self._cy(min(ya, yb)), self._cy(max(ya, yb)) + 1):
+                    grid.setdefault((ix, iy), []).append(idx)
+        self._grid = grid
+
+        # чебышёвское расстояние (в ячейках) до ближайшей непустой ячейки:
+        # запрос расстояния начинает поиск сразу с этого кольца (два прохода)
+        nx, ny, big = self._nx, self._ny, self._nx + self._ny
+        clear = [[0 if (i, j) in grid else big for j in range(ny)] for i in range(nx)]
+        for i in range(nx):
+            for j in range(ny):
+                v = clear[i][j]
+                for di, dj in ((-1, -1), (-1, 0), (-1, 1), (0, -1)):
+                    if 0 <= i + di < nx and 0 <= j + dj < ny:
+                        v = min(v, clear[i + di][j + dj] + 1)
+                clear[i][j] = v
+        for i in range(nx - 1, -1, -1):
+            for j in range(ny - 1, -1, -1):
+                v = clear[i][j]
+                for di, dj in ((1, 1), (1, 0), (1, -1), (0, 1)):
+                    if 0 <= i + di < nx and 0 <= j + dj < ny:
+                        v = min(v, clear[i + di][j + dj] + 1)
+                clear[i][j] = v
+        self._clear = clear
+
+    def _cx(self, x: float) -> int:
+        return min(self._nx - 1, max(0, int((x - self.bbox[0]) / self._cell)))
+
+    def _cy(self, y: float) -> int:
+        return min(self._ny - 1, max(0, int((y - self.bbox[1]) / self._cell)))
+
+    def bbox_distance(self, x: float, y: float) -> float:
+        """Нижняя граница расстояния до полигона (0 внутри bbox)."""
+        x0, y0, x1, y1 = self.bbox
+        return hypot(max(x0 - x, 0.0, x - x1), max(y0 - y, 0.0, y - y1))
+
+    def _ring(self, ix: int, iy: int, r: int) -> Iterable[Tuple[int, int]]:
+        """Ячейки на чебышёвском расстоянии r от (ix, iy), только внутри сетки."""
+        if r == 0:
+            yield ix, iy
+            return
+        x_lo, x_hi = max(0, ix - r), min(self._nx - 1, ix + r)
+        y_lo, y_hi = max(0, iy - r + 1), min(self._ny - 1, iy + r - 1)
+        for cy in (iy - r, iy + r):
+            if 0 <= cy < self._ny:
+                for cx in range(x_lo, x_hi + 1):
+                    yield cx, cy
+        for cx in (ix - r, ix + r):
+            if 0 <= cx < self._nx:
+                for cy in range(y_lo, y_hi + 1):
+                    yield cx, cy
+
+    def _bound(self, x: float, y: float, ix: int, iy: int, r: int) -> float:
+        """Нижняя граница расстояния до рёбер вне квадрата колец 0..r (inf — вне сетки)."""
+        c, gx0, gy0 = self._cell, self.bbox[0], self.bbox[1]
+        bound = inf
+        if ix - r > 0:
+            bound = min(bound, x - (gx0 + (ix - r) * c))
+        if ix + r < self._nx - 1:
+            bound = min(bound, gx0 + (ix + r + 1) * c - x)
+        if iy - r > 0:
+            bound = min(bound, y - (gy0 + (iy - r) * c))
+        if iy + r < self._ny - 1:
+            bound = min(bound, gy0 + (iy + r + 1) * c - y)
+        return bound
+
+    def distance(self, x: float, y: float, horizon: float = inf) -> float:
+        """
+        Расстояние до ближайшего ребра (границы), метры. Дальше horizon точное
+        значение не ищется: возвращается нижняя граница ≥ horizon.
+        """
+        ix, iy = self._cx(x), self._cy(y)
+        grid, edges = self._grid, self.edges
+        best, seen = inf, set()
+        r = self._clear[ix][iy]  # кольца ближе — пустые
+        if r > 0:
+            bound = self._bound(x, y, ix, iy, r - 1)
+            if horizon <= bound < inf:
+                return bound
+        while True:
+            for cell in self._ring(ix, iy, r):
+                for e in grid.get(cell, ()):
+                    if e not in seen:
+                        seen.add(e)
+                        d = _seg_dist(x, y, *edges[e])
+                        if d < best:
+                            best = d
+            # всё, что дальше кольца r, не ближе стороны квадрата ячеек 0..r
+            bound = self._bound(x, y, ix, iy, r)
+            if best <= bound or bound == inf:
+                return best
+            if bound >= horizon:
+                return bound
+            r += 1
+
+    def signed_distance(self, x: float, y: float, horizon: float = inf) -> float:
+        """> 0 внутри, < 0 снаружи."""
+        d = self.distance(x, y, horizon)
+        return d if self.contains(x, y) else -d
+
+
+@dataclass
+class FenceZone:
+    name: str
+    keep_in: bool
+    polygon: PreparedPolygon = field(repr=False)
+
+
+class PolygonGeofence:
+    """
+    Набор keep-in/keep-out полигонов в общей локальной проекции.
+    Интерфейс inside(lat, lon) совместим с круговой Geofence автопилота.
+
+    horizon_m — дальность точного поиска границы: |запас| больше horizon_m
+    возвращается как нижняя граница (≥ horizon_m) — для решения о RTL этого
+    достаточно, а время запроса остаётся ограниченным.
+    """
+
+    def __init__(self, projection: LocalProjection, horizon_m: float = 200.0):
+        self.proj = projection
+        self.horizon_m = float(horizon_m)
+        self.keep_in: List[FenceZone] = []
+        self.keep_out: List[FenceZone] = []
+
+    # ---- построение ----
+    def add_zone(self, name: str, rings_latlon: Sequence[Ring], keep_in: bool = False) -> FenceZone:
+        """rings_latlon: [внешний контур, дыра, ...], точки (lat, lon)."""
+        to_xy = self.proj.to_xy
+        poly = PreparedPolygon([[to_xy(lat, lon) for lat, lon in ring] for ring in rings_latlon])
+        zone = FenceZone(name=name, keep_in=keep_in, polygon=poly)
+        (self.keep_in if keep_in else self.keep_out).append(zone)
+        return zone
+
+    def add_circle(self, name: str, lat: float, lon: float, radius_m: float,
+                   keep_in: bool = False, segments: int = 72) -> FenceZone:
+        """Круг как вписанный многоугольник (для зон вида center/radius_m)."""
+        x0, y0 = self.proj.to_xy(lat, lon)
+        to_ll = self.proj.to_latlon
+        ring = [to_ll(x0 + radius_m * cos(2 * pi * i / segments), y0 + radius_m * sin(2 * pi * i / segments))
+                for i in range(segments)]
+        return self.add_zone(name, [ring], keep_in)
+
+    @classmethod
+    def from_zones(cls, keep_in: Iterable[Sequence[Ring]] = (), keep_out: Iterable[Sequence[Ring]] = (),
+                   origin: Optional[LatLon] = None, horizon_m: float = 200.0) -> "PolygonGeofence":
+        """Из списков полигонов (каждый — [контур, дыры...] в (lat, lon)); origin — центр проекции."""
+        keep_in, keep_out = list(keep_in), list(keep_out)
+        if origin is None:
+            pts = [p for poly in keep_in + keep_out for p in poly[0]]
+            if not pts:
+                raise ValueError("geofence needs at least one zone or an explicit origin")
+            origin = (sum(p[0] for p in pts) / len(pts), sum(p[1] for p in pts) / len(pts))
+        fence = cls(LocalProjection(*origin), horizon_m)
+        for i, poly in enumerate(keep_in):
+            fence.add_zone(f"keep_in_{i}", poly, keep_in=True)
+        for i, poly in enumerate(keep_out):
+            fence.add_zone(f"keep_out_{i}", poly, keep_in=False)
+        return fence
+
+    @classmethod
+    def from_navigator_config(cls, path: Union[str, Path] = NAVIGATOR_CONFIG,
+                              origin: Optional[LatLon] = None,
+                              horizon_m: float = 200.0) -> Optional["PolygonGeofence"]:
+        """
+        Зоны navigator.geofence.zones из config/navigator.yaml; None, если геозона
+        выключена или зон нет. Поля зоны: name, type (polygon | circle),
+        coordinates [[lat, lon], ...] (+ holes) или center [lat, lon] + radius_m,
+        kind: keep_out (по умолчанию, NFZ) | keep_in.
+        """
+        import yaml
+
+        with Path(path).open("r", encoding="utf-8") as f:
+            cfg = yaml.safe_load(f) or {}
+        geo = (cfg.get("navigator") or {}).get("geofence") or {}
+        zones = geo.get("zones") or []
+        if not geo.get("enabled", True) or not zones:
+            return None
+
+        anchors = [tuple(z["center"]) if z.get("type") == "circle" else tuple(z["coordinates"][0])
+                   for z in zones]
+        if origin is None:
+            origin = (sum(a[0] for a in anchors) / len(anchors), sum(a[1] for a in anchors) / len(anchors))
+        fence = cls(LocalProjection(*origin), horizon_m)
+        for i, z in enumerate(zones):
+            name = z.get("name", f"zone_{i}")
+            keep_in = str(z.get("kind", "keep_out")).lower() in ("keep_in", "keepin")
+            if z.get("type", "polygon") == "circle":
+                lat, lon = z["center"]
+                fence.add_circle(name, lat, lon, float(z["radius_m"]), keep_in)
+            else:
+                fence.add_zone(name, [z["coordinates"], *(z.get("holes") or [])], keep_in)
+        return fence
+
+    # ---- запросы (тик) ----
+    def check(self, lat: float, lon: float) -> Tuple[float, str]:
+        """(запас до нарушения в метрах, имя определяющей зоны)."""
+        x, y = self.proj.to_xy(lat, lon)
+        margin, name = inf, ""
+        if self.keep_in:
+            margin = -inf
+            for z in self.keep_in:  # объединение: берём лучшую keep-in зону
+                m = z.polygon.signed_distance(x, y, self.horizon_m)
+                if m > margin:
+                    margin, name = m, z.name
+        for z in self.keep_out:
+            if z.polygon.bbox_distance(x, y) >= margin:
+                continue  # вне bbox зона не ближе текущего запаса
+            m = -z.polygon.signed_distance(x, y, self.horizon_m)
+            if m < margin:
+                margin, name = m, z.name
+        return margin, name
+
+    def margin_m(self, lat: float, lon: float) -> float:
+        return self.check(lat, lon)[0]
+
+    def cover_margin(self, margin_m: float) -> None:
+        """
+        Поднять horizon_m до margin_m: за горизонтом запас — лишь нижняя граница,
+        и сравнение «запас < margin_m» при margin_m > horizon_m дало бы ранний RTL.
+        """
+        if margin_m > self.horizon_m:
+            self.horizon_m = float(margin_m)
+
+    def inside(self, lat: float, lon: float) -> bool:
+        """Разрешённая точка (совместимо с круговой Geofence.inside)."""
+        return self.check(lat, lon)[0] >= 0.0
+
+    def zones(self) -> List[FenceZone]:
+        return self.keep_in + self.keep_out
+
+
+def _bench(n_vertices: int = 20000, n_queries: int = 100000) -> None:
+    import random
+    import time
+
+    rnd = random.Random(0)
+    lat0, lon0 = 52.12, 13.45
+    coast, r = [], 0.015
+    for i in range(n_vertices):  # «береговая линия»: случайное блуждание радиуса
+        a = 2 * pi * i / n_vertices
+        r = min(0.02, max(0.01, r + rnd.gauss(0.0, 0.0002)))
+        coast.append((lat0 + r * sin(a), lon0 + r * cos(a) * 1.6))
+    holes = [[(lat0 + 0.003 * sin(2 * pi * k / 8), lon0 + 0.005 * cos(2 * pi * k / 8)) for k in range(8)]]
+    t = time.perf_counter()
+    fence = PolygonGeofence.from_zones(keep_in=[[coast] + holes])
+    build = time.perf_counter() - t
+    pts = [(lat0 + rnd.uniform(-0.025, 0.025), lon0 + rnd.uniform(-0.04, 0.04)) for _ in range(n_queries)]
+    t = time.perf_counter()
+    for lat, lon in pts:
+        fence.margin_m(lat, lon)
+    per = (time.perf_counter() - t) / n_queries
+    print(f"{n_vertices} vertices: build {build * 1e3:.0f} ms, margin_m {per * 1e6:.1f} us/query")
+
+
+if __name__ == "__main__":
+    _bench()
@@ -1,24 +1,219 @@
-# NDVI из ENVI (гиперспектр) через spectral
-# pip install spectral numpy pillow
+# -*- coding: utf-8 -*-
+"""
+NDVI (и любые поканальные индексы) для больших ENVI-сцен — блоками строк, вне памяти.
+
+  • сцена читается через numpy.memmap (envi_io.EnviImage, BSQ/BIL/BIP) блоками
+    по block_rows строк; каналы блока копируются в заранее выделенные float32-буферы
+  • блоки считаются параллельно (потоки: memmap общий, NumPy отпускает GIL),
+    результат пишется по порядку строк — GeoTIFF/PNG полосами (envi_io.*StripWriter)
+  • пик памяти = слоты × (каналы + выходы) × block_rows × samples × 4 байта,
+    не зависит от размера сцены; слотов — 2 на воркер (чтение следующего блока
+    идёт, пока пишется предыдущий)
+
+Пример:
+    stats = compute_index_tiled("data/scene.hdr", [red, nir], ndvi_kernel,
+                                save_tif="ndvi.tif", save_png="ndvi.png", workers=4)
+    print(stats.summary())
+"""
+from __future__ import annotations
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
 import numpy as np
-import spectral as sp
-from PIL import Image
-
-def compute_ndvi(envi_hdr_path: str, red_nm: int = 650, nir_nm: int = 800, save_png: str = "ndvi.png"):
-    img = sp.open_image(envi_hdr_path)   # .hdr (ENVI) -> lazy loader
-    # Поиск ближайших индексов к заданным длинам волн
-    wl = np.array(img.bands.centers)  # список длин волн
-    red_idx = (np.abs(wl - red_nm)).argmin()
-    nir_idx = (np.abs(wl - nir_nm)).argmin()
-
-    red = img[:, :, red_idx].astype(np.float32)
-    nir = img[:, :, nir_idx].astype(np.float32)
-    ndvi = (nir - red) / (nir + red + 1e-6)
-    # нормируем 0..255 для предпросмотра
-    ndvi_img = ((ndvi + 1.0) * 127.5).clip(0, 255).astype(np.uint8)
-    Image.fromarray(ndvi_img).save(save_png)
+
+from agents.autopilot_ai.envi_io import EnviImage, PngStripWriter, TiffStripWriter
+
+Kernel = Callable[[List[np.ndarray], np.ndarray], None]
+
+
+def ndvi_kernel(bands: List[np.ndarray], out: np.ndarray) -> None:
+    """(NIR − RED) / (NIR + RED + 1e-6); bands = [red, nir], red используется как рабочий буфер."""
+    red, nir = bands
+    np.subtract(nir, red, out=out)
+    np.add(nir, red, out=red)
+    red += 1e-6
+    np.divide(out, red, out=out)
+
+
+@dataclass
+class TileStats:
+    lines: int
+    samples: int
+    blocks: int
+    valid: int                 # конечных значений
+    min: float
+    max: float
+    mean: float
+    seconds: float
+    buffer_bytes: int          # все предвыделенные буферы блоков
+
+    def summary(self) -> str:
+        mpx = self.lines * self.samples / 1e6
+        return (f"{self.lines}×{self.samples} ({mpx:.1f} Mpx) in {self.blocks} block(s): "
+                f"min {self.min:.3f}, max {self.max:.3f}, mean {self.mean:.3f}; "
+                f"{self.seconds:.2f} s ({mpx / max(self.seconds, 1e-9):.1f} Mpx/s), "
+                f"buffers {self.buffer_bytes / 2**20:.1f} MiB")
+
+
+def _to_u8(block: np.ndarray, lo: float, hi: float, out: np.ndarray) -> np.ndarray:
+    """[lo, hi] -> 0..255 (NaN -> lo) для предпросмотра."""
+    tmp = np.clip((np.nan_to_num(block, nan=lo) - lo) * (255.0 / (hi - lo)), 0, 255)
+    np.copyto(out, tmp, casting="unsafe")
+    return out
+
+
+class IndexSink:
+    """Выход одного индекса: потоковые GeoTIFF/PNG (опц.) + статистика по конечным значениям."""
+
+    def __init__(self, img: EnviImage, save_tif: Optional[str] = None, save_png: Optional[str] = None,
+                 png_range: Tuple[float, float] = (-1.0, 1.0)):
+        self.tif = TiffStripWriter(save_tif, img.samples, img.lines,
+                                   geo=img.geo_transform(), epsg=img.epsg()) if save_tif else None
+        self.png = PngStripWriter(save_png, img.samples, img.lines) if save_png else None
+        self.png_range = png_range
+        self._u8 = np.empty((0, img.samples), dtype=np.uint8)
+        self.valid, self.total, self.lo, self.hi = 0, 0.0, np.inf, -np.inf
+
+    def write(self, out: np.ndarray) -> None:
+        if self.tif is not None:
+            self.tif.write(out)
+        if self.png is not None:
+            if self._u8.shape[0] < out.shape[0]:
+                self._u8 = np.empty(out.shape, dtype=np.uint8)
+            self.png.write(_to_u8(out, self.png_range[0], self.png_range[1], self._u8[:out.shape[0]]))
+        fin = out[np.isfinite(out)]
+        if fin.size:
+            self.valid += fin.size
+            self.total += float(fin.sum(dtype=np.float64))
+            self.lo, self.hi = min(self.lo, float(fin.min())), max(self.hi, float(fin.max()))
+
+    def close(self) -> None:
+        for w in (self.tif, self.png):
+            if w is not None:
+                w.close()
+
+    def stats(self, img: EnviImage, blocks: int, seconds: float, buffer_bytes: int) -> TileStats:
+        ok = self.valid > 0
+        return TileStats(
+            lines=img.lines, samples=img.samples, blocks=blocks, valid=self.valid,
+            min=self.lo if ok else float("nan"), max=self.hi if ok else float("nan"),
+            mean=self.total / self.valid if ok else float("nan"), seconds=seconds,
+            buffer_bytes=buffer_bytes + self._u8.nbytes,
+        )
+
+
+def process_tiles(
+    img: EnviImage,
+    bands: Sequence[int],
+    kernel: Callable[[List[np.ndarray], List[np.ndarray]], None],
+    consume: Callable[[List[np.ndarray]], None],
+    *,
+    outputs: int = 1,
+    block_rows: int = 256,
+    workers: Optional[int] = None,
+) -> Tuple[int, int]:
+    """
+    Ядро конвейера: каждый канал каждого блока читается один раз в буфер слота,
+    kernel(входы, выходы) считает outputs растров, consume(выходы) получает их по порядку строк.
+    Returns: (число блоков, байт в буферах слотов).
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    rows, cols = img.lines, img.samples
+    block_rows = max(1, min(block_rows, rows))
+    n_blocks = -(-rows // block_rows)
+    n_slots = 1 if workers == 1 else 2 * workers
+    slots = [[np.empty((block_rows, cols), dtype=np.float32) for _ in range(len(bands) + outputs)]
+             for _ in range(n_slots)]
+
+    def job(i: int) -> List[np.ndarray]:
+        r0 = i * block_rows
+        r1 = min(rows, r0 + block_rows)
+        slot = slots[i % n_slots]
+        ins = [img.band_rows(b, r0, r1, slot[k]) for k, b in enumerate(bands)]
+        outs = [buf[:r1 - r0] for buf in slot[len(bands):]]
+        kernel(ins, outs)
+        return outs
+
+    if workers == 1:
+        for i in range(n_blocks):
+            consume(job(i))
+    else:
+        # окно из n_slots блоков: блок i берёт слот i % n_slots только после записи блока i − n_slots
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            pending: deque = deque()
+            for i in range(n_blocks):
+                if len(pending) == n_slots:
+                    consume(pending.popleft().result())
+                pending.append(ex.submit(job, i))
+            while pending:
+                consume(pending.popleft().result())
+    return n_blocks, sum(b.nbytes for s in slots for b in s)
+
+
+def compute_index_tiled(
+    image: Union[str, EnviImage],
+    bands: Sequence[int],
+    kernel: Kernel,
+    *,
+    save_tif: Optional[str] = None,
+    save_png: Optional[str] = None,
+    png_range: Tuple[float, float] = (-1.0, 1.0),
+    block_rows: int = 256,
+    workers: Optional[int] = None,
+) -> TileStats:
+    """
+    Поканальный индекс по сцене блоками строк.
+
+    Args:
+        image: путь к .hdr или открытый EnviImage
+        bands: индексы каналов, в этом порядке попадают в kernel
+        kernel: kernel(входы float32 (h, samples), out float32 (h, samples)) — пишет индекс в out;
+                входные буферы можно портить (они перечитываются для каждого блока)
+        save_tif/save_png: потоковый вывод (float32 GeoTIFF / 8-бит PNG в диапазоне png_range)
+        block_rows: строк в блоке
+        workers: потоков (None — os.cpu_count(); 1 — без пула)
+    Несколько индексов за один проход — spectral_indices.SpectralIndexEngine.
+    """
+    img = EnviImage.open(image) if isinstance(image, str) else image
+    sink = IndexSink(img, save_tif, save_png, png_range)
+    t0 = time.perf_counter()
+    try:
+        blocks, nbytes = process_tiles(img, bands, lambda ins, outs: kernel(ins, outs[0]),
+                                       lambda outs: sink.write(outs[0]),
+                                       block_rows=block_rows, workers=workers)
+    finally:
+        sink.close()
+    return sink.stats(img, blocks, time.perf_counter() - t0, nbytes)
+
+
+def compute_ndvi(envi_hdr_path: str, red_nm: int = 650, nir_nm: int = 800, save_png: str = "ndvi.png",
+                 *, save_tif: Optional[str] = None, block_rows: int = 256,
+                 workers: Optional[int] = None) -> str:
+    """NDVI по ближайшим к red_nm/nir_nm каналам; PNG (и опц. GeoTIFF) пишутся полосами. Возвращает save_png."""
+    img = EnviImage.open(envi_hdr_path)
+    compute_index_tiled(img, [img.nearest_band(red_nm), img.nearest_band(nir_nm)], ndvi_kernel,
+                        save_tif=save_tif, save_png=save_png, block_rows=block_rows, workers=workers)
     return save_png
 
+
 if __name__ == "__main__":
-    # пример: compute_ndvi("data/hyperspec_scene.hdr")
-    pass
\ No newline at end of file
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Tiled NDVI for ENVI scenes")
+    ap.add_argument("hdr")
+    ap.add_argument("--red-nm", type=float, default=650.0)
+    ap.add_argument("--nir-nm", type=float, default=800.0)
+    ap.add_argument("--png", default="ndvi.png")
+    ap.add_argument("--tif", default=None)
+    ap.add_argument("--block-rows", type=int, default=256)
+    ap.add_argument("--workers", type=int, default=None)
+    a = ap.parse_args()
+    scene = EnviImage.open(a.hdr)
+    st = compute_index_tiled(scene, [scene.nearest_band(a.red_nm), scene.nearest_band(a.nir_nm)], ndvi_kernel,
+                             save_tif=a.tif, save_png=a.png, block_rows=a.block_rows, workers=a.workers)
+    print(st.summary())
@@ -3,10 +3,22 @@
 import asyncio
 from mavsdk import System
 from mavsdk.mission import MissionItem, MissionPlan
-from typing import List
-from .mission_grid import Waypoint
+from typing import Any, Iterable, Optional, Union
+from .mission_grid import Waypoint, WaypointArray, as_waypoint_array, camera_actions
+
+async def upload_and_start(waypoints: Union[WaypointArray, Iterable[Waypoint]], speed_ms: float = 6.0,
+                           *, dem: Any = None, min_clearance_m: float = 30.0,
+                           home_elev_m: Optional[float] = None, allow_unknown_terrain: bool = False):
+    """
+    dem (engine.utils.dem_srtm.DEM) — до подключения к борту проверить запас над рельефом
+    по всему маршруту; меньше min_clearance_m или рельеф неизвестен (нет тайла, пустота) —
+    TerrainClearanceError, миссия не загружается (allow_unknown_terrain=True — только известные участки).
+    """
+    wps = as_waypoint_array(waypoints)
+    if dem is not None:
+        dem.check_clearance(wps, min_clearance_m, spacing_m=10.0, home_elev_m=home_elev_m,
+                            allow_unknown=allow_unknown_terrain)
 
-async def upload_and_start(waypoints: List[Waypoint], speed_ms: float = 6.0):
     drone = System()
     await drone.connect(system_address="udp://:14540")
 
@@ -14,22 +26,32 @@ async def upload_and_start(waypoints: List[Waypoint], speed_ms: float = 6.0):
         if state.is_connected:
             break
 
-    mission_items = []
-    for wp in waypoints:
-        mission_items.append(
-            MissionItem(
-                latitude_deg=wp.lat,
-                longitude_deg=wp.lon,
-                relative_altitude_m=wp.rel_alt,
-                speed_m_s=speed_ms,
-                is_fly_through=False,
-                gimbal_pitch_deg=wp.gimbal_pitch,
-                gimbal_yaw_deg=None,
-                camera_action=MissionItem.CameraAction.TAKE_PHOTO if wp.take_photo else MissionItem.CameraAction.NONE,
-                loiter_time_s=0,
-                camera_photo_interval_s=0
-            )
+    # колонки -> MissionItem за один проход (списки Python, без Waypoint на точку)
+    # съёмка по дистанции (coverage_planner): START_PHOTO_DISTANCE с шагом на начале отрезка,
+    # STOP_PHOTO_DISTANCE на конце — см. mission_grid.camera_actions
+    nan = float("nan")  # NaN — значение по умолчанию автопилота
+    extra = {"vehicle_action": MissionItem.VehicleAction.NONE} if hasattr(MissionItem, "VehicleAction") else {}
+    mission_items = [
+        MissionItem(
+            latitude_deg=lat,
+            longitude_deg=lon,
+            relative_altitude_m=alt,
+            speed_m_s=speed_ms,
+            is_fly_through=False,
+            gimbal_pitch_deg=pitch,
+            gimbal_yaw_deg=nan,
+            camera_action=getattr(MissionItem.CameraAction, action),
+            loiter_time_s=0,
+            camera_photo_interval_s=0,
+            acceptance_radius_m=nan,
+            yaw_deg=nan,
+            camera_photo_distance_m=dist if action == "START_PHOTO_DISTANCE" else 0.0,
+            **extra
         )
+        for lat, lon, alt, pitch, action, dist in zip(wps.lat.tolist(), wps.lon.tolist(), wps.rel_alt.tolist(),
+                                                      wps.gimbal_pitch.tolist(), camera_actions(wps),
+                                                      wps.photo_distance_m.tolist())
+    ]
 
     await drone.action.set_maximum_speed(speed_ms)
     await drone.mission.upload_mission(MissionPlan(mission_items))
@@ -38,7 +60,7 @@ async def upload_and_start(waypoints: List[Waypoint], speed_ms: float = 6.0):
 
 if __name__ == "__main__":
     # демо: маленький прямоугольник над Берлином (НЕ ЛЕТАТЬ БЕЗ РАЗРЕШЕНИЯ)
-    from .mission_grid import generate_grid, GridParams
+    from .mission_grid import generate_grid_array, GridParams
     bbox = (52.5205, 13.4040, 52.5210, 13.4060)
-    wps = generate_grid(bbox, GridParams())
+    wps = generate_grid_array(bbox, GridParams())
     asyncio.run(upload_and_start(wps, speed_ms=5.0))
\ No newline at end of file
@@ -1,7 +1,14 @@
 # Планировщик грид-миссии: bbox -> линии облёта с учётом перекрытий и DEM (опционально)
-from dataclasses import dataclass
-from typing import List, Tuple, Optional
+# Геометрия (UTM, полигоны, курс, камера) — в coverage_planner.py
+# Точки миссии хранятся колонками в WaypointArray; List[Waypoint] — только на краях API
 import math
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, List, Tuple, Optional, Union, overload
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .coverage_planner import CameraSpec
 
 @dataclass
 class GridParams:
@@ -10,7 +17,9 @@ class GridParams:
     gsd_cm: float = 2.5          # целевой GSD (см/пкс) - опционально
     altitude_m: float = 100.0    # высота полёта AGL
     speed_ms: float = 6.0
-    heading_deg: float = 0.0     # азимут сетки
+    heading_deg: float = 0.0     # азимут линий облёта (от севера по часовой)
+    terrain_tolerance_m: float = 2.0  # допуск по AGL при следовании рельефу (DEM)
+    terrain_sample_m: float = 10.0    # шаг выборки рельефа вдоль плеча
 
 @dataclass
 class Waypoint:
@@ -19,46 +28,258 @@ class Waypoint:
     rel_alt: float
     gimbal_pitch: float = -90.0
     take_photo: bool = True
+    photo_distance_m: float = 0.0  # >0 — с этой точки съёмка по дистанции (0 на конце отрезка — стоп)
+
+# ───────────────────────── Колоночное хранение ─────────────────────────
+WAYPOINT_DTYPE = np.dtype([
+    ("lat", "f8"), ("lon", "f8"), ("rel_alt", "f8"),
+    ("gimbal_pitch", "f4"), ("take_photo", "?"), ("photo_distance_m", "f4"),
+])
+_M_PER_DEG = 111320.0
+
+class WaypointArray:
+    """
+    Точки миссии как структурированный массив NumPy (WAYPOINT_DTYPE).
+
+    • срезы wps[a:b], wps[::2] — представления без копирования (view);
+      маски/индексы — копия (семантика NumPy)
+    • колонки lat/lon/rel_alt/... — представления, их можно менять на месте
+    • offset/rotate/agl_adjust — векторно, возвращают новый массив
+    • wps[i] и итерация дают Waypoint — для кода на прежнем API
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, data: np.ndarray):
+        if data.dtype != WAYPOINT_DTYPE:
+            raise TypeError(f"WaypointArray expects dtype {WAYPOINT_DTYPE}, got {data.dtype}")
+        self.data = data
+
+    # ---- создание / края API ----
+    @classmethod
+    def empty(cls, n: int) -> "WaypointArray":
+        data = np.zeros(n, dtype=WAYPOINT_DTYPE)
+        data["gimbal_pitch"] = -90.0
+        data["take_photo"] = True
+        return cls(data)
+
+    @classmethod
+    def from_columns(cls, lat: Any, lon: Any, rel_alt: Any, gimbal_pitch: Any = -90.0,
+                     take_photo: Any = True, photo_distance_m: Any = 0.0) -> "WaypointArray":
+        lat = np.asarray(lat, dtype=float)
+        wps = cls(np.empty(lat.shape[0] if lat.ndim else 1, dtype=WAYPOINT_DTYPE))
+        d = wps.data
+        d["lat"], d["lon"], d["rel_alt"] = lat, lon, rel_alt
+        d["gimbal_pitch"], d["take_photo"], d["photo_distance_m"] = gimbal_pitch, take_photo, photo_distance_m
+        return wps
+
+    @classmethod
+    def from_waypoints(cls, waypoints: Iterable[Waypoint]) -> "WaypointArray":
+        rows = [(w.lat, w.lon, w.rel_alt, w.gimbal_pitch, w.take_photo, w.photo_distance_m) for w in waypoints]
+        return cls(np.array(rows, dtype=WAYPOINT_DTYPE))
+
+    @classmethod
+    def concat(cls, parts: Iterable["WaypointArray"]) -> "WaypointArray":
+        return cls(np.concatenate([p.data for p in parts]))
+
+    def to_waypoints(self) -> List[Waypoint]:
+        d = self.data
+        return [Waypoint(lat=a, lon=b, rel_alt=c, gimbal_pitch=g, take_photo=t, photo_distance_m=pd)
+                for a, b, c, g, t, pd in zip(d["lat"].tolist(), d["lon"].tolist(), d["rel_alt"].tolist(),
+                                             d["gimbal_pitch"].tolist(), d["take_photo"].tolist(),
+                                             d["photo_distance_m"].tolist())]
+
+    def copy(self) -> "WaypointArray":
+        return WaypointArray(self.data.copy())
+
+    # ---- контейнер ----
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @overload
+    def __getitem__(self, idx: int) -> Waypoint: ...
+    @overload
+    def __getitem__(self, idx: Union[slice, np.ndarray, List[int]]) -> "WaypointArray": ...
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            r = self.data[idx]
+            return Waypoint(lat=float(r["lat"]), lon=float(r["lon"]), rel_alt=float(r["rel_alt"]),
+                            gimbal_pitch=float(r["gimbal_pitch"]), take_photo=bool(r["take_photo"]),
+                            photo_distance_m=float(r["photo_distance_m"]))
+        return WaypointArray(self.data[idx])
+
+    def __iter__(self) -> Iterator[Waypoint]:
+        return iter(self.to_waypoints())
+
+    def __repr__(self) -> str:
+        return f"WaypointArray({len(self)} waypoint(s))"
+
+    # ---- колонки (представления) ----
+    @property
+    def lat(self) -> np.ndarray: return self.data["lat"]
+    @property
+    def lon(self) -> np.ndarray: return self.data["lon"]
+    @property
+    def rel_alt(self) -> np.ndarray: return self.data["rel_alt"]
+    @property
+    def gimbal_pitch(self) -> np.ndarray: return self.data["gimbal_pitch"]
+    @property
+    def take_photo(self) -> np.ndarray: return self.data["take_photo"]
+    @property
+    def photo_distance_m(self) -> np.ndarray: return self.data["photo_distance_m"]
 
-def _rotate(x: float, y: float, deg: float) -> Tuple[float,float]:
-    r = math.radians(deg)
-    return (x*math.cos(r)-y*math.sin(r), x*math.sin(r)+y*math.cos(r))
+    # ---- векторные преобразования (локальная ENU вокруг центра, cos(lat) по центру) ----
+    def _center(self) -> Tuple[float, float]:
+        return float(self.lat.mean()), float(self.lon.mean())
 
-def generate_grid(bbox: Tuple[float,float,float,float], p: GridParams) -> List[Waypoint]:
+    def offset(self, north_m: Any = 0.0, east_m: Any = 0.0, up_m: Any = 0.0) -> "WaypointArray":
+        """Сдвиг на (north, east, up) метров (скаляры или массивы по точкам)."""
+        out = self.copy()
+        if len(out):
+            kx = _M_PER_DEG * math.cos(math.radians(self._center()[0]))
+            out.lat[:] += np.asarray(north_m, dtype=float) / _M_PER_DEG
+            out.lon[:] += np.asarray(east_m, dtype=float) / kx
+            out.rel_alt[:] += up_m
+        return out
+
+    def rotate(self, deg: float, origin: Optional[Tuple[float, float]] = None) -> "WaypointArray":
+        """Поворот по часовой на deg вокруг origin (lat, lon; по умолчанию — центр точек)."""
+        out = self.copy()
+        if len(out):
+            lat0, lon0 = origin if origin is not None else self._center()
+            kx = _M_PER_DEG * math.cos(math.radians(lat0))
+            x = (self.lon - lon0) * kx
+            y = (self.lat - lat0) * _M_PER_DEG
+            r = math.radians(deg)
+            c, s = math.cos(r), math.sin(r)
+            out.lon[:] = lon0 + (x * c + y * s) / kx
+            out.lat[:] = lat0 + (-x * s + y * c) / _M_PER_DEG
+        return out
+
+    def agl_adjust(self, terrain: Union[Any, Callable[[np.ndarray, np.ndarray], np.ndarray]],
+                   agl_m: Optional[Any] = None, home_elev_m: float = 0.0) -> "WaypointArray":
+        """
+        Высота над рельефом: rel_alt = terrain − home_elev_m + agl_m.
+        terrain — высоты рельефа по точкам (массив) или функция (lats, lons) → высоты;
+        agl_m=None — сохранить текущие rel_alt как AGL.
+        """
+        out = self.copy()
+        elev = terrain(self.lat, self.lon) if callable(terrain) else terrain
+        agl = self.rel_alt if agl_m is None else agl_m
+        out.rel_alt[:] = np.asarray(elev, dtype=float) - home_elev_m + agl
+        return out
+
+
+def as_waypoint_array(waypoints: Union[WaypointArray, Iterable[Waypoint]]) -> WaypointArray:
+    """WaypointArray как есть; список Waypoint — в колонки (край API)."""
+    return waypoints if isinstance(waypoints, WaypointArray) else WaypointArray.from_waypoints(waypoints)
+
+
+def camera_actions(wps: WaypointArray) -> List[str]:
+    """
+    Действие камеры на каждую точку — имена MissionItem.CameraAction (MAVSDK).
+    План с триггером по дистанции (photo_distance_m > 0 хоть у одной точки):
+    START_PHOTO_DISTANCE, где съёмка начинается или меняется шаг, STOP_PHOTO_DISTANCE,
+    где шаг падает до 0, иначе NONE (точки, вставленные terrain_follow, наследуют
+    триггер плеча и ничего не переключают). Без дистанций — TAKE_PHOTO по take_photo.
+    """
+    dist = wps.photo_distance_m
+    if not (dist > 0).any():
+        return ["TAKE_PHOTO" if p else "NONE" for p in wps.take_photo.tolist()]
+    prev = np.concatenate([[0.0], dist[:-1]])
+    start = (dist > 0) & (dist != prev)
+    stop = (dist <= 0) & (prev > 0)
+    return np.where(start, "START_PHOTO_DISTANCE", np.where(stop, "STOP_PHOTO_DISTANCE", "NONE")).tolist()
+
+
+# ───────────────────────── Следование рельефу ─────────────────────────
+def _dp_keep(d: np.ndarray, z: np.ndarray, fixed: np.ndarray, tol: float) -> np.ndarray:
+    """
+    Дуглас–Пекер по профилю (d, z) с вертикальным допуском tol:
+    между соседними fixed-точками оставляет минимум точек, при которых
+    линейная интерполяция высоты отклоняется от профиля не более чем на tol.
     """
-    bbox: (lat_min, lon_min, lat_max, lon_max) — малая область (поля/участки).
-    Упростим шаг как ~ расстояние между полосами по side_overlap.
-    Примечание: для реала лучше проецировать в UTM. Здесь — упрощённая геометрия (градусы).
+    keep = np.zeros(len(d), dtype=bool)
+    keep[fixed] = True
+    stack = [(int(a), int(b)) for a, b in zip(fixed[:-1], fixed[1:]) if b - a > 1]
+    while stack:
+        a, b = stack.pop()
+        span = d[b] - d[a]
+        seg_z = z[a + 1:b]
+        line = z[a] + (d[a + 1:b] - d[a]) * ((z[b] - z[a]) / span if span > 0 else 0.0)
+        dev = np.abs(seg_z - line)
+        k = int(np.argmax(dev))
+        if dev[k] > tol:
+            m = a + 1 + k
+            keep[m] = True
+            if m - a > 1:
+                stack.append((a, m))
+            if b - m > 1:
+                stack.append((m, b))
+    return keep
+
+def terrain_follow(wps: WaypointArray, dem: Any, agl_m: float, *,
+                   home_elev_m: Optional[float] = None, tolerance_m: float = 2.0,
+                   sample_m: float = 10.0) -> WaypointArray:
+    """
+    Высоты по рельефу: rel_alt = рельеф − высота дома + agl_m (GSD держится постоянным).
+
+    Все плечи сэмплируются с шагом sample_m одним запросом dem.elevation(lats, lons);
+    на профиле каждого плеча Дуглас–Пекер добавляет промежуточные точки только там,
+    где рельеф отходит от прямой между соседними точками больше чем на tolerance_m.
+    home_elev_m=None — высота рельефа в первой точке (взлёт с начала маршрута).
+    Вставленные точки наследуют камеру/подвес/триггер начала своего плеча.
+    Нет высоты хотя бы в одном сэмпле (нет тайла/пустота DEM) — ValueError: над неизвестным
+    рельефом высоты не планируются.
     """
+    n = len(wps)
+    if n == 0:
+        return wps.copy()
+    lat, lon = wps.lat, wps.lon
+    kx = _M_PER_DEG * math.cos(math.radians(float(lat.mean())))
+    leg = np.hypot(np.diff(lat) * _M_PER_DEG, np.diff(lon) * kx)
+    counts = np.maximum(1, np.ceil(leg / sample_m).astype(np.int64))   # сэмплов на плечо (без конца)
+    starts = np.concatenate([[0], np.cumsum(counts)])                  # индексы исходных точек в сэмплах
+    total = int(starts[-1]) + 1
+
+    idx = np.repeat(np.arange(n - 1), counts)
+    t = (np.arange(total - 1) - starts[:-1][idx]) / counts[idx]
+    s_lat = np.append(lat[idx] + t * (lat[idx + 1] - lat[idx]), lat[-1])
+    s_lon = np.append(lon[idx] + t * (lon[idx + 1] - lon[idx]), lon[-1])
+    dist = np.append(np.concatenate([[0.0], np.cumsum(leg)])[idx] + t * leg[idx], leg.sum())
+    src = np.append(idx, n - 1)                                        # исходная точка-начало плеча
+
+    elev = np.asarray(dem.elevation(s_lat, s_lon), dtype=float)
+    unknown = ~np.isfinite(elev)
+    if unknown.any():
+        i = int(np.argmax(unknown))
+        raise ValueError(f"terrain_follow: no DEM elevation at {s_lat[i]:.5f}, {s_lon[i]:.5f} "
+                         f"({int(unknown.sum())} of {total} samples: missing tile or void)")
+    keep = _dp_keep(dist, elev, starts, tolerance_m)
+
+    out = WaypointArray(wps.data[src[keep]].copy())
+    out.lat[:], out.lon[:] = s_lat[keep], s_lon[keep]
+    home = float(elev[0]) if home_elev_m is None else float(home_elev_m)
+    out.rel_alt[:] = elev[keep] - home + agl_m
+    return out
+
+
+def generate_grid_array(bbox: Tuple[float,float,float,float], p: GridParams,
+                        camera: Optional["CameraSpec"] = None, dem: Any = None) -> WaypointArray:
+    """
+    bbox: (lat_min, lon_min, lat_max, lon_max) — прямоугольник как полигон для
+    coverage_planner.plan_coverage: проекция в UTM, поворот на p.heading_deg,
+    шаг линий и триггер камеры — из интринсик камеры (CameraSpec) и перекрытий.
+    dem (engine.utils.dem_srtm.DEM или любой объект с elevation(lats, lons)) —
+    высоты по рельефу, см. terrain_follow().
+    Для произвольных полигонов/дыр и подбора курса — plan_coverage напрямую.
+    """
+    from .coverage_planner import plan_coverage
     lat_min, lon_min, lat_max, lon_max = bbox
-    # Прибл. конверсии: 1 deg lat ≈ 111_000 м; 1 deg lon ≈ 111_000 * cos(lat)
-    lat0 = (lat_min+lat_max)/2
-    m_per_deg_lat = 111_000.0
-    m_per_deg_lon = 111_000.0*math.cos(math.radians(lat0))
-
-    width_m  = (lon_max - lon_min)*m_per_deg_lon
-    height_m = (lat_max - lat_min)*m_per_deg_lat
-
-    # Шаг полосы по side_overlap (камерный FOV/px тут не считаем — берём эмпирику по alt)
-    # Для простоты: шаг между линиями ~ 30 м при 100 м высоте и side_overlap=0.65
-    base_swath = max(5.0, p.altitude_m * 0.6)  # очень грубая аппроксимация ширины полосы
-    line_spacing = base_swath*(1.0 - p.side_overlap)
-
-    n_lines = max(1, int(width_m/line_spacing)+1)
-    step_lon = (line_spacing / m_per_deg_lon)
-
-    waypoints: List[Waypoint] = []
-    for i in range(n_lines):
-        x_lon = lon_min + i*step_lon
-        # Чередуем направление (змейка)
-        strip = [
-            Waypoint(lat=lat_min, lon=x_lon, rel_alt=p.altitude_m),
-            Waypoint(lat=lat_max, lon=x_lon, rel_alt=p.altitude_m),
-        ]
-        if i % 2 == 1:
-            strip.reverse()
-        waypoints.extend(strip)
-
-    # Поворот сетки по heading_deg — для простоты не вращаем географически,
-    # а оставляем как есть (реально нужно едать в UTM, вращать, возвращать в WGS84).
-    return waypoints
\ No newline at end of file
+    polygon = [(lat_min, lon_min), (lat_min, lon_max), (lat_max, lon_max), (lat_max, lon_min)]
+    return plan_coverage(polygon, params=p, camera=camera, heading_deg=p.heading_deg, dem=dem).waypoints
+
+def generate_grid(bbox: Tuple[float,float,float,float], p: GridParams,
+                  camera: Optional["CameraSpec"] = None, dem: Any = None) -> List[Waypoint]:
+    """Прежний API: то же, что generate_grid_array(), списком Waypoint."""
+    return generate_grid_array(bbox, p, camera, dem).to_waypoints()
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo-прогон автопилота: тысячи рандомизированных эпизодов параллельно.
+
+Эпизоды режутся на пачки; каждая пачка — один FleetAutopilot (вектор по
+эпизодам) + векторная версия игрушечной динамики autopilot._simulate_step.
+Пачки раздаются по процессам (ProcessPoolExecutor); сиды пачек фиксированы,
+поэтому результат не зависит от числа воркеров.
+
+Рандомизируются: просадка батареи (разряд + провал под нагрузкой),
+пропадания связи, отказ баро, ступенька рельефа, вертикальные порывы,
+курс/радиус геозоны/наличие дома.
+
+Метрики:
+  • time_to_converge_s — когда высота вошла в ±converge_tol_m от цели и держалась hold_s
+  • overshoot_m        — перелёт по высоте над целью до первой ступеньки/аварии
+  • failsafe_correct   — первая авария дала ожидаемые причину и режим
+                         (ожидание считается независимо, по тем же входам)
+  • breach_m           — максимальный выход за радиус keep-in геозоны
+
+Пример (регрессия усилений за секунды):
+    rep = run_montecarlo(4000, workers=4, alt_ctl=AltitudeController(kp=1.1))
+    print(rep.summary())
+CLI:
+    python -m agents.autopilot_ai.montecarlo --episodes 4000 --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from agents.autopilot_ai.autopilot import AltitudeController, SpeedController
+from agents.autopilot_ai.fleet_autopilot import (
+    M_PER_DEG,
+    MODE_CRUISE,
+    MODE_HOLD_ALT,
+    MODE_LAND,
+    MODE_RTL,
+    REASON_BARO_FAULT,
+    REASON_LINK_LOSS,
+    REASON_LOW_BATTERY,
+    REASON_NAMES,
+    REASON_NONE,
+    FleetAutopilot,
+)
+
+LAT0, LON0 = 52.12, 13.45  # центр полигона эпизодов (дом/геозона)
+LON_M_PER_DEG = M_PER_DEG * np.cos(np.radians(LAT0))
+
+
+@dataclass
+class ScenarioConfig:
+    """Диапазоны рандомизации эпизодов."""
+    duration_s: float = 120.0
+    dt: float = 0.05
+    target_agl_m: float = 60.0
+    cruise_ms: float = 18.0
+    terrain_m: tuple = (0.0, 400.0)          # высота рельефа в точке старта
+    terrain_step_m: float = 40.0             # |ступенька рельефа| ≤
+    battery_v0: tuple = (21.0, 25.2)
+    battery_sag_v_s: tuple = (0.0, 0.03)     # разряд, В/с
+    battery_load_v: float = 1.5              # провал под тягой: load·thrust
+    p_link_drop: float = 0.3
+    link_drop_s: tuple = (0.5, 6.0)
+    p_baro_fault: float = 0.1
+    gust_sigma_ms: float = 0.8               # вертикальные порывы (OU-процесс)
+    gust_tau_s: float = 2.0
+    p_home: float = 0.8
+    fence_radius_m: tuple = (600.0, 3000.0)
+    converge_tol_m: float = 2.0
+    hold_s: float = 1.0
+    breach_tol_m: float = 50.0
+
+
+def simulate_batch(n: int, seed: Any, cfg: Optional[ScenarioConfig] = None,
+                   alt_ctl: Optional[AltitudeController] = None,
+                   spd_ctl: Optional[SpeedController] = None) -> Dict[str, np.ndarray]:
+    """Прогнать n эпизодов одной пачкой; возвращает метрики (n,) по эпизодам."""
+    cfg = cfg or ScenarioConfig()
+    rng = np.random.default_rng(seed)
+    dt = cfg.dt
+    steps = int(round(cfg.duration_s / dt))
+    t_axis = np.arange(steps) * dt
+
+    # ---- сценарии ----
+    terrain0 = rng.uniform(*cfg.terrain_m, n)
+    t_terrain = rng.uniform(0.4, 0.9, n) * cfg.duration_s
+    d_terrain = rng.uniform(-cfg.terrain_step_m, cfg.terrain_step_m, n)
+    batt0 = rng.uniform(*cfg.battery_v0, n)
+    sag = rng.uniform(*cfg.battery_sag_v_s, n)
+    link_from = np.where(rng.random(n) < cfg.p_link_drop, rng.uniform(0.2, 0.9, n) * cfg.duration_s, np.inf)
+    link_to = link_from + rng.uniform(*cfg.link_drop_s, n)
+    baro_from = np.where(rng.random(n) < cfg.p_baro_fault, rng.uniform(0.2, 0.9, n) * cfg.duration_s, np.inf)
+    baro_to = baro_from + rng.uniform(0.2, 3.0, n)
+    heading = rng.uniform(0.0, 2 * np.pi, n)
+    radius = rng.uniform(*cfg.fence_radius_m, n)
+    home = rng.random(n) < cfg.p_home
+
+    fleet = FleetAutopilot(n, alt_ctl=alt_ctl, spd_ctl=spd_ctl)
+    fleet.target_agl_m[:] = cfg.target_agl_m
+    fleet.set_geofence(LAT0, LON0, radius)
+    fleet.set_home(LAT0, LON0, terrain0[home], idx=home)
+    fleet.set_mode("CRUISE", target_alt_m=terrain0 + cfg.target_agl_m, target_airspeed_ms=cfg.cruise_ms)
+
+    # ---- состояние динамики (как _simulate_step) ----
+    kT, hover, kP, kV, drag = 6.0, 0.45, 2.0, 10.0, 0.12
+    alt = terrain0.copy()
+    v = np.zeros(n)
+    x = np.zeros(n)
+    y = np.zeros(n)
+    gust = np.zeros(n)
+    thrust = np.full(n, hover)
+    gust_a = np.exp(-dt / cfg.gust_tau_s)
+    gust_b = cfg.gust_sigma_ms * np.sqrt(1.0 - gust_a ** 2)
+
+    # ---- метрики ----
+    conv_t = np.full(n, np.nan)
+    in_band = np.zeros(n)
+    overshoot = np.zeros(n)
+    crossed = np.zeros(n, dtype=bool)
+    quiet = np.ones(n, dtype=bool)            # до первой ступеньки/аварии
+    breach = np.zeros(n)
+    exp_timer = np.zeros(n)
+    fs_seen = np.zeros(n, dtype=bool)
+    fs_step = np.full(n, -1)
+    fs_reason = np.zeros(n, dtype=np.int8)
+    fs_mode = np.zeros(n, dtype=np.int8)
+    exp_reason = np.zeros(n, dtype=np.int8)
+    exp_mode = np.zeros(n, dtype=np.int8)
+
+    for k in range(steps):
+        t = t_axis[k]
+        terrain = terrain0 + np.where(t >= t_terrain, d_terrain, 0.0)
+        battery = batt0 - sag * t - cfg.battery_load_v * (thrust - hover)
+        link_ok = ~((t >= link_from) & (t < link_to))
+        baro_bad = (t >= baro_from) & (t < baro_to)
+        baro = np.where(baro_bad, np.nan, alt)
+        lat = LAT0 + y / M_PER_DEG
+        lon = LON0 + x / LON_M_PER_DEG
+        dist = np.hypot(x, y)
+        outside = dist > radius
+
+        prev_mode = fleet.mode.copy()
+        out = fleet.step(baro, battery, dt, airspeed=v, link_ok=link_ok,
+                         terrain_elev_m=terrain, lat=lat, lon=lon)
+        thrust = out["thrust"].copy()
+        pitch = out["pitch"]
+
+        # ---- ожидаемая реакция на первую аварию (независимо от FleetAutopilot) ----
+        exp_timer = np.where(link_ok, 0.0, exp_timer + dt)
+        reason = np.select(
+            [(battery <= 0) | (battery < fleet.min_batt_v), exp_timer > fleet.link_timeout_s, baro_bad],
+            [REASON_LOW_BATTERY, REASON_LINK_LOSS, REASON_BARO_FAULT], REASON_NONE)
+        first = (reason != REASON_NONE) & ~fs_seen
+        if first.any():
+            mode = np.select([reason == REASON_LOW_BATTERY, reason == REASON_BARO_FAULT, home],
+                             [MODE_LAND, MODE_HOLD_ALT, MODE_RTL], MODE_HOLD_ALT)
+            mode = np.where(outside & (mode != MODE_LAND), MODE_RTL, mode)
+            exp_reason[first] = reason[first]
+            exp_mode[first] = mode[first]
+        got = (out["failsafe_reason"] != REASON_NONE) & (fs_step < 0)
+        fs_step[got] = k
+        fs_reason[got] = out["failsafe_reason"][got]
+        fs_mode[got] = fleet.mode[got]
+        fs_seen |= first
+
+        # ---- метрики высоты: до ступеньки рельефа/аварии/смены режима ----
+        quiet &= (t < t_terrain) & ~fs_seen & (prev_mode == MODE_CRUISE) & (fleet.mode == MODE_CRUISE)
+        err = alt - out["target_alt_m"]
+        crossed |= quiet & (err >= 0)
+        overshoot = np.where(quiet & crossed, np.maximum(overshoot, err), overshoot)
+        in_band = np.where(quiet & (np.abs(err) <= cfg.converge_tol_m), in_band + dt, 0.0)
+        newly = quiet & np.isnan(conv_t) & (in_band >= cfg.hold_s)
+        conv_t[newly] = t - cfg.hold_s + dt
+
+        # ---- динамика ----
+        gust = gust_a * gust + gust_b * rng.standard_normal(n)
+        alt_dot = kT * (thrust - hover) + kP * pitch + gust
+        v_dot = kV * pitch - drag * v
+        alt = np.maximum(0.0, alt + alt_dot * dt)
+        v = np.maximum(0.0, v + v_dot * dt)
+        # внешний слой курса: в RTL — на дом, иначе по своему курсу
+        rtl = fleet.mode == MODE_RTL
+        hdg = np.where(rtl & (dist > 1.0), np.arctan2(-y, -x), heading)
+        x += v * np.cos(hdg) * dt
+        y += v * np.sin(hdg) * dt
+        breach = np.maximum(breach, np.hypot(x, y) - radius)
+
+    correct = np.where(fs_seen | (fs_step >= 0), (fs_reason == exp_reason) & (fs_mode == exp_mode), True)
+    return {
+        "time_to_converge_s": conv_t,
+        "overshoot_m": overshoot,
+        "failsafe_step": fs_step,
+        "failsafe_reason": fs_reason,
+        "expected_reason": exp_reason,
+        "failsafe_correct": correct,
+        "breach_m": breach,
+        "final_mode": fleet.mode.copy(),
+    }
+
+
+def _batch_job(args: tuple) -> Dict[str, np.ndarray]:
+    return simulate_batch(*args)
+
+
+@dataclass
+class MonteCarloReport:
+    """Метрики по эпизодам + агрегаты."""
+    episodes: int
+    metrics: Dict[str, np.ndarray] = field(repr=False)
+    breach_tol_m: float = 50.0
+
+    @property
+    def converge_rate(self) -> float:
+        return float(np.mean(~np.isnan(self.metrics["time_to_converge_s"])))
+
+    @property
+    def failsafe_accuracy(self) -> float:
+        return float(np.mean(self.metrics["failsafe_correct"]))
+
+    @property
+    def breaches(self) -> int:
+        return int(np.sum(self.metrics["breach_m"] > self.breach_tol_m))
+
+    def stats(self) -> Dict[str, float]:
+        ttc = self.metrics["time_to_converge_s"]
+        ttc = ttc[~np.isnan(ttc)]
+        ov = self.metrics["overshoot_m"]
+        reasons = self.metrics["failsafe_reason"]
+        out = {
+            "episodes": float(self.episodes),
+            "converge_rate": self.converge_rate,
+            "ttc_p50_s": float(np.percentile(ttc, 50)) if ttc.size else float("nan"),
+            "ttc_p95_s": float(np.percentile(ttc, 95)) if ttc.size else float("nan"),
+            "overshoot_p50_m": float(np.percentile(ov, 50)),
+            "overshoot_p95_m": float(np.percentile(ov, 95)),
+            "overshoot_max_m": float(ov.max()),
+            "failsafe_accuracy": self.failsafe_accuracy,
+            "breaches": float(self.breaches),
+        }
+        for code, name in enumerate(REASON_NAMES):
+            if name:
+                out[f"failsafe_{name.lower()}"] = float(np.sum(reasons == code))
+        return out
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (f"{self.episodes} episode(s): converge {s['converge_rate']:.1%} "
+                f"(p50 {s['ttc_p50_s']:.1f}s, p95 {s['ttc_p95_s']:.1f}s), overshoot p50 "
+                f"{s['overshoot_p50_m']:.2f}m p95 {s['overshoot_p95_m']:.2f}m max {s['overshoot_max_m']:.2f}m, "
+                f"failsafe accuracy {s['failsafe_accuracy']:.1%}, geofence breaches {self.breaches}")
+
+
+def run_montecarlo(
+    episodes: int = 2000,
+    *,
+    batch_size: int = 256,
+    workers: Optional[int] = None,
+    seed: int = 0,
+    cfg: Optional[ScenarioConfig] = None,
+    alt_ctl: Optional[AltitudeController] = None,
+    spd_ctl: Optional[SpeedController] = None,
+) -> MonteCarloReport:
+    """
+    Прогнать episodes эпизодов пачками по batch_size.
+
+    Args:
+        workers: число процессов; None/0/1 — в текущем процессе
+        seed: базовый сид; пачка i получает сид (seed, i) — результат не зависит от workers
+        alt_ctl, spd_ctl: проверяемые усиления (по умолчанию — как в Autopilot)
+    """
+    cfg = cfg or ScenarioConfig()
+    sizes = [min(batch_size, episodes - s) for s in range(0, episodes, batch_size)]
+    jobs = [(size, np.random.SeedSequence([seed, i]), cfg, alt_ctl, spd_ctl) for i, size in enumerate(sizes)]
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(_batch_job, jobs))
+    else:
+        parts = [_batch_job(j) for j in jobs]
+    metrics = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]} if parts else {}
+    return MonteCarloReport(episodes=episodes, metrics=metrics, breach_tol_m=cfg.breach_tol_m)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Monte Carlo-прогон автопилота")
+    parser.add_argument("--episodes", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=256, help="эпизодов в пачке (векторно в одном воркере)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duration", type=float, default=120.0, help="длительность эпизода, с")
+    args = parser.parse_args(argv)
+    rep = run_montecarlo(args.episodes, batch_size=args.batch, workers=args.workers, seed=args.seed,
+                         cfg=ScenarioConfig(duration_s=args.duration))
+    print(rep.summary())
+    return 0 if rep.failsafe_accuracy == 1.0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Минимальная высота RTL по рельефу до дома — общая для Autopilot (autopilot.py),
+лёгкого autopilot_basic и FleetAutopilot.
+
+  floor = max(рельеф по прямой «текущая точка → дом») + AGL
+
+Рельеф на пути неизвестен (нет GPS-фикса, нет тайла, пустота DEM) — высота
+не снимается, а берётся не ниже fallback_m (обычно текущая цель + запас):
+неизвестный участок может оказаться хребтом.
+
+Пример:
+    floor = rtl_floor_m(dem, lat, lon, home_lat, home_lon, agl_m=60.0,
+                        fallback_m=target_alt_m + 100.0)
+
+Чистый Python поверх dem.profile(): годится и для лёгкого autopilot_basic.
+"""
+
+from math import isfinite
+from typing import Any
+
+RTL_SPACING_M = 30.0  # шаг сэмплов профиля до дома
+
+
+def rtl_floor_m(dem: Any, lat: float, lon: float, home_lat: float, home_lon: float,
+                agl_m: float, fallback_m: float) -> float:
+    """Мин. высота RTL (м ASL); при неизвестном рельефе на пути — не ниже fallback_m."""
+    if not (isfinite(lat) and isfinite(lon)):
+        return fallback_m
+    prof = dem.profile([lat, home_lat], [lon, home_lon], spacing_m=RTL_SPACING_M)
+    floor = prof.max_elevation_m + agl_m
+    if floor != floor:                       # весь путь неизвестен
+        return fallback_m
+    return max(floor, fallback_m) if prof.unknown_samples else floor
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Несколько спектральных индексов за один проход по сцене (NDVI, NDRE, GNDVI, SAVI, EVI, свои).
+
+  • каналы всех выражений разрешаются один раз (ближайшая длина волны к BAND_NM);
+    каждый канал каждого блока читается ровно один раз (hyperspectral_ndvi.process_tiles),
+    поэтому ввод-вывод для пяти индексов — как для одного
+  • выражения — строки над именами каналов (blue, green, red, rededge, nir, …);
+    numexpr, если установлен (без временных массивов), иначе NumPy
+  • деление на ноль и т.п. — NaN; статистика — по конечным значениям
+
+Пример:
+    eng = SpectralIndexEngine("data/scene.hdr", ["ndvi", "ndre", "gndvi", "savi", "evi"],
+                              reflectance_scale=1e-4)
+    stats = eng.run("out/", png=True, workers=4)   # out/ndvi.tif, out/ndvi.png, ...
+    for name, st in stats.items():
+        print(name, st.summary())
+"""
+from __future__ import annotations
+
+import ast
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from agents.autopilot_ai.envi_io import EnviImage
+from agents.autopilot_ai.hyperspectral_ndvi import IndexSink, TileStats, process_tiles
+
+try:  # опционально: pip install numexpr
+    import numexpr as ne
+except ImportError:  # pragma: no cover - зависит от окружения
+    ne = None
+
+# Номинальные центры каналов (нм) — типичные для мультиспектральных камер агро-съёмки
+BAND_NM: Dict[str, float] = {"blue": 475.0, "green": 560.0, "red": 668.0, "rededge": 717.0, "nir": 842.0}
+
+_FUNCS = {"sqrt": np.sqrt, "abs": np.abs, "log": np.log, "exp": np.exp}
+
+
+@dataclass(frozen=True)
+class IndexDef:
+    name: str
+    expr: str
+    png_range: Tuple[float, float] = (-1.0, 1.0)
+
+
+INDICES: Dict[str, IndexDef] = {d.name: d for d in (
+    IndexDef("ndvi", "(nir - red) / (nir + red)"),
+    IndexDef("ndre", "(nir - rededge) / (nir + rededge)"),
+    IndexDef("gndvi", "(nir - green) / (nir + green)"),
+    IndexDef("savi", "1.5 * (nir - red) / (nir + red + 0.5)"),                     # L = 0.5, отражение 0..1
+    IndexDef("evi", "2.5 * (nir - red) / (nir + 6.0 * red - 7.5 * blue + 1.0)"),  # отражение 0..1
+)}
+
+
+def expr_bands(expr: str) -> List[str]:
+    """Имена каналов в выражении (по порядку появления); допускаются только арифметика и _FUNCS."""
+    tree = ast.parse(expr, mode="eval")
+    found: List[ast.Name] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if not (isinstance(node.func, ast.Name) and node.func.id in _FUNCS) or node.keywords:
+                raise ValueError(f"unsupported call in {expr!r}")
+        elif isinstance(node, ast.Name):
+            if node.id not in _FUNCS:
+                found.append(node)
+        elif not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Load,
+                                   ast.operator, ast.unaryop)):
+            raise ValueError(f"unsupported syntax {type(node).__name__} in {expr!r}")
+    return list(dict.fromkeys(n.id for n in sorted(found, key=lambda n: n.col_offset)))
+
+
+class SpectralIndexEngine:
+    """
+    Набор индексов над одной сценой.
+
+    Args:
+        image: путь к .hdr или EnviImage
+        indices: имена из INDICES, IndexDef или {имя: выражение}
+        band_nm: длины волн каналов (по умолчанию BAND_NM) — переопределить под сенсор
+        band_index: явные номера каналов {имя: индекс} (приоритетнее band_nm)
+        reflectance_scale: множитель DN -> отражение (например 1e-4); важно для SAVI/EVI
+        use_numexpr: None — если установлен
+    """
+
+    def __init__(self, image: Union[str, EnviImage],
+                 indices: Union[Sequence[Union[str, IndexDef]], Mapping[str, str]] = ("ndvi",), *,
+                 band_nm: Optional[Mapping[str, float]] = None,
+                 band_index: Optional[Mapping[str, int]] = None,
+                 reflectance_scale: float = 1.0, use_numexpr: Optional[bool] = None):
+        self.img = EnviImage.open(image) if isinstance(image, str) else image
+        if isinstance(indices, Mapping):
+            defs = [IndexDef(k, v) for k, v in indices.items()]
+        else:
+            defs = [d if isinstance(d, IndexDef) else INDICES[d.lower()] for d in indices]
+        if not defs:
+            raise ValueError("no indices requested")
+        self.indices: List[IndexDef] = defs
+        self.reflectance_scale = float(reflectance_scale)
+        self.use_numexpr = (ne is not None) if use_numexpr is None else bool(use_numexpr and ne is not None)
+
+        # каналы — один раз на весь набор
+        nm = {**BAND_NM, **(band_nm or {})}
+        explicit = dict(band_index or {})
+        self.band_names: List[str] = []
+        for d in defs:
+            for b in expr_bands(d.expr):
+                if b not in self.band_names:
+                    self.band_names.append(b)
+        self.bands: Dict[str, int] = {}
+        for b in self.band_names:
+            if b in explicit:
+                self.bands[b] = int(explicit[b])
+            elif b in nm:
+                self.bands[b] = self.img.nearest_band(nm[b])
+            else:
+                raise ValueError(f"unknown band {b!r}: pass band_nm or band_index")
+        self._code = [compile(d.expr, f"<{d.name}>", "eval") for d in defs]
+
+    def _kernel(self, ins: List[np.ndarray], outs: List[np.ndarray]) -> None:
+        if self.reflectance_scale != 1.0:
+            for b in ins:
+                b *= self.reflectance_scale
+        env = dict(zip(self.band_names, ins))
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            for d, code, out in zip(self.indices, self._code, outs):
+                if self.use_numexpr:
+                    ne.evaluate(d.expr, local_dict=env, out=out, casting="unsafe")
+                else:
+                    np.copyto(out, eval(code, {"__builtins__": {}, **_FUNCS}, env), casting="unsafe")
+                out[~np.isfinite(out)] = np.nan
+
+    def run(self, out_dir: Optional[str] = None, *, tif: bool = True, png: bool = False,
+            block_rows: int = 256, workers: Optional[int] = None) -> Dict[str, TileStats]:
+        """Все индексы за один проход; out_dir/<имя>.tif|.png (out_dir=None — только статистика)."""
+        if out_dir is not None:
+            os.makedirs(out_dir, exist_ok=True)
+        path = (lambda d, ext: os.path.join(out_dir, f"{d.name}.{ext}")) if out_dir is not None else None
+        sinks = [IndexSink(self.img,
+                           path(d, "tif") if path and tif else None,
+                           path(d, "png") if path and png else None, d.png_range)
+                 for d in self.indices]
+
+        def consume(outs: List[np.ndarray]) -> None:
+            for sink, out in zip(sinks, outs):
+                sink.write(out)
+
+        t0 = time.perf_counter()
+        try:
+            blocks, nbytes = process_tiles(self.img, [self.bands[b] for b in self.band_names], self._kernel,
+                                           consume, outputs=len(self.indices),
+                                           block_rows=block_rows, workers=workers)
+        finally:
+            for sink in sinks:
+                sink.close()
+        dt = time.perf_counter() - t0
+        return {d.name: sink.stats(self.img, blocks, dt, nbytes) for d, sink in zip(self.indices, sinks)}
+
+
+def compute_indices(envi_hdr_path: str, names: Sequence[str] = ("ndvi", "ndre", "gndvi", "savi", "evi"),
+                    out_dir: str = "indices", **kw) -> Dict[str, TileStats]:
+    """Короткий вызов: SpectralIndexEngine(path, names).run(out_dir); kw — в конструктор и run()."""
+    ctor = {k: kw.pop(k) for k in ("band_nm", "band_index", "reflectance_scale", "use_numexpr") if k in kw}
+    return SpectralIndexEngine(envi_hdr_path, names, **ctor).run(out_dir, **kw)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Spectral indices for ENVI scenes in one pass")
+    ap.add_argument("hdr")
+    ap.add_argument("--indices", default="ndvi,ndre,gndvi,savi,evi")
+    ap.add_argument("--out", default="indices")
+    ap.add_argument("--png", action="store_true")
+    ap.add_argument("--scale", type=float, default=1.0, help="DN -> reflectance")
+    ap.add_argument("--block-rows", type=int, default=256)
+    ap.add_argument("--workers", type=int, default=None)
+    a = ap.parse_args()
+    eng = SpectralIndexEngine(a.hdr, a.indices.split(","), reflectance_scale=a.scale)
+    print("bands:", {b: int(i) for b, i in eng.bands.items()}, "| numexpr:", eng.use_numexpr)
+    for name, st in eng.run(a.out, png=a.png, block_rows=a.block_rows, workers=a.workers).items():
+        print(f"{name:6s} {st.summary()}")
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+UTM (WGS84) прямое/обратное преобразование на NumPy, без pyproj.
+
+Ряды Крюгера 3-го порядка по n (точность ~1 мм в пределах зоны);
+все функции векторные: lat/lon/easting/northing — скаляры или массивы.
+
+Пример:
+    e, n, zone, north = to_utm(lats, lons)          # зона — по первой точке (или задать)
+    lats2, lons2 = from_utm(e, n, zone, north)
+"""
+from __future__ import annotations
+
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+WGS84_A = 6378137.0
+WGS84_F = 1.0 / 298.257223563
+K0 = 0.9996
+E0 = 500000.0
+N0_SOUTH = 10000000.0
+
+_n = WGS84_F / (2.0 - WGS84_F)
+_A = WGS84_A / (1.0 + _n) * (1.0 + _n ** 2 / 4.0 + _n ** 4 / 64.0)
+_ALPHA = (_n / 2 - 2 * _n ** 2 / 3 + 5 * _n ** 3 / 16,
+          13 * _n ** 2 / 48 - 3 * _n ** 3 / 5,
+          61 * _n ** 3 / 240)
+_BETA = (_n / 2 - 2 * _n ** 2 / 3 + 37 * _n ** 3 / 96,
+         _n ** 2 / 48 + _n ** 3 / 15,
+         17 * _n ** 3 / 480)
+_DELTA = (2 * _n - 2 * _n ** 2 / 3 - 2 * _n ** 3,
+          7 * _n ** 2 / 3 - 8 * _n ** 3 / 5,
+          56 * _n ** 3 / 15)
+_C = 2.0 * np.sqrt(_n) / (1.0 + _n)
+
+
+def utm_zone(lat: float, lon: float) -> Tuple[int, bool]:
+    """(номер зоны 1..60, северное полушарие) с исключениями Норвегии/Шпицбергена."""
+    zone = int((lon + 180.0) // 6.0) % 60 + 1
+    if 56.0 <= lat < 64.0 and 3.0 <= lon < 12.0:
+        zone = 32
+    elif 72.0 <= lat < 84.0 and 0.0 <= lon < 42.0:
+        zone = 31 if lon < 9.0 else 33 if lon < 21.0 else 35 if lon < 33.0 else 37
+    return zone, lat >= 0.0
+
+
+def central_meridian(zone: int) -> float:
+    return 6.0 * zone - 183.0
+
+
+def to_utm(lat: Any, lon: Any, zone: Optional[int] = None,
+           north: Optional[bool] = None) -> Tuple[np.ndarray, np.ndarray, int, bool]:
+    """(easting, northing, zone, north); зона/полушарие по первой точке, если не заданы."""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if zone is None or north is None:
+        z, h = utm_zone(float(lat.flat[0]), float(lon.flat[0]))
+        zone = z if zone is None else zone
+        north = h if north is None else north
+    phi = np.radians(lat)
+    dlam = np.radians(lon - central_meridian(zone))
+    sphi = np.sin(phi)
+    t = np.sinh(np.arctanh(sphi) - _C * np.arctanh(_C * sphi))
+    xi = np.arctan2(t, np.cos(dlam))
+    eta = np.arctanh(np.sin(dlam) / np.sqrt(1.0 + t * t))
+    e = eta.copy()
+    n = xi.copy()
+    for j, a in enumerate(_ALPHA, start=1):
+        e += a * np.cos(2 * j * xi) * np.sinh(2 * j * eta)
+        n += a * np.sin(2 * j * xi) * np.cosh(2 * j * eta)
+    easting = E0 + K0 * _A * e
+    northing = K0 * _A * n + (0.0 if north else N0_SOUTH)
+    return easting, northing, int(zone), bool(north)
+
+
+def from_utm(easting: Any, northing: Any, zone: int, north: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """(lat, lon) в градусах."""
+    xi = (np.asarray(northing, dtype=float) - (0.0 if north else N0_SOUTH)) / (K0 * _A)
+    eta = (np.asarray(easting, dtype=float) - E0) / (K0 * _A)
+    xi_p = xi.copy()
+    eta_p = eta.copy()
+    for j, b in enumerate(_BETA, start=1):
+        xi_p -= b * np.sin(2 * j * xi) * np.cosh(2 * j * eta)
+        eta_p -= b * np.cos(2 * j * xi) * np.sinh(2 * j * eta)
+    chi = np.arcsin(np.sin(xi_p) / np.cosh(eta_p))
+    phi = chi.copy()
+    for j, d in enumerate(_DELTA, start=1):
+        phi += d * np.sin(2 * j * chi)
+    lam = np.arctan2(np.sinh(eta_p), np.cos(xi_p))
+    return np.degrees(phi), central_meridian(zone) + np.degrees(lam)
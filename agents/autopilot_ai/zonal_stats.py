@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Зональная статистика индекса (NDVI и др.) по полям: mean/std/min/max, перцентили, гистограммы.
+
+  • поля — GeoJSON-фичи (как из compliance.uas_zones_loader.load_zones) или путь к файлу;
+    Polygon/MultiPolygon с дырами, lon/lat -> CRS растра (UTM WGS-84 / EPSG:4326) через utm.py
+  • растеризация — векторно по всем полям сразу: пересечения всех рёбер с центрами строк,
+    пары (вход, выход) -> пролёты (строка, c0, c1, поле); маски по полям не строятся
+  • растр читается блоками строк (memmap TIFF из spectral_indices / любой массив);
+    пиксели пролётов блока -> np.bincount по номеру поля (count, Σ, Σ²) и поля×бина (гистограмма),
+    min/max — np.minimum.at / np.maximum.at
+  • перцентили — по гистограмме с линейной интерполяцией внутри бина
+    (точность (hi − lo) / bins; mean/std/min/max — точные)
+  • пиксель, попавший в несколько полей, учитывается в каждом
+
+Пример:
+    res = zonal_stats("out/ndvi.tif", "fields.geojson")
+    for row in res.to_rows():
+        print(row["name"], row["mean"], row["p50"])
+"""
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from agents.autopilot_ai.envi_io import read_tiff
+from agents.autopilot_ai.utm import to_utm
+
+Geo = Tuple[float, float, float, float]   # x0, y0 (левый верхний угол), dx, dy
+
+
+def load_fields(source: Union[str, Sequence[Dict[str, Any]]]) -> Tuple[List[str], List[List[List[np.ndarray]]]]:
+    """
+    GeoJSON -> (имена, полигоны); полигон — список колец (N, 2) в lon/lat, первое — внешнее.
+    Имя — properties.name/id/field_id, иначе порядковый номер.
+    """
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            gj = json.load(f)
+        feats = gj.get("features", []) if isinstance(gj, dict) else gj
+    else:
+        feats = source
+    names: List[str] = []
+    polys: List[List[List[np.ndarray]]] = []
+    for k, feat in enumerate(feats):
+        geom = (feat or {}).get("geometry") or {}
+        if geom.get("type") == "Polygon":
+            parts = [geom["coordinates"]]
+        elif geom.get("type") == "MultiPolygon":
+            parts = geom["coordinates"]
+        else:
+            continue
+        rings = [np.asarray(r, dtype=float)[:, :2] for part in parts for r in part if len(r) >= 3]
+        if not rings:
+            continue
+        props = feat.get("properties") or {}
+        names.append(str(props.get("name", props.get("id", props.get("field_id", k)))))
+        polys.append(rings)
+    return names, polys
+
+
+def _project(lon: np.ndarray, lat: np.ndarray, epsg: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    if epsg is None:                       # координаты уже в CRS растра
+        return lon, lat
+    if epsg == 4326:
+        return lon, lat
+    if 32601 <= epsg <= 32660 or 32701 <= epsg <= 32760:
+        e, n, _, _ = to_utm(lat, lon, epsg % 100, epsg < 32700)
+        return e, n
+    raise ValueError(f"unsupported raster CRS EPSG:{epsg}")
+
+
+def rasterize_spans(polys: Sequence[Sequence[np.ndarray]], shape: Tuple[int, int], geo: Geo,
+                    epsg: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Пролёты полей по строкам растра: (row, c0, c1, label), отсортированы по row;
+    пиксель (r, c) в поле, если его центр внутри (правило чёт-нечет, дыры — вычитаются).
+    """
+    height, width = shape
+    x0, y0, dx, dy = geo
+    xs, ys, lab = [], [], []
+    for i, rings in enumerate(polys):
+        for r in rings:
+            xs.append(r[:, 0])
+            ys.append(r[:, 1])
+            lab.append(np.full(len(r), i, dtype=np.int64))
+    empty = np.zeros(0, dtype=np.int64)
+    if not xs:
+        return empty, empty, empty, empty
+    # вершины -> пиксельные координаты (col, row), рёбра — к следующей вершине своего кольца
+    px, py = _project(np.concatenate(xs), np.concatenate(ys), epsg)
+    col = (px - x0) / dx
+    row = (y0 - py) / dy
+    lens = np.array([len(x) for x in xs])
+    nxt = np.arange(len(col)) + 1
+    ends = np.cumsum(lens) - 1
+    nxt[ends] = ends - lens + 1
+    cx1, cy1, cx2, cy2, elab = col, row, col[nxt], row[nxt], np.concatenate(lab)
+
+    ylo, yhi = np.minimum(cy1, cy2), np.maximum(cy1, cy2)
+    r_first = np.clip(np.ceil(ylo - 0.5), 0, height).astype(np.int64)      # центры строк r + 0.5 в [ylo, yhi)
+    r_last = np.clip(np.ceil(yhi - 0.5), 0, height).astype(np.int64)
+    cnt = r_last - r_first
+    e = np.repeat(np.arange(len(cnt)), cnt)
+    rr = r_first[e] + (np.arange(int(cnt.sum())) - np.repeat(np.cumsum(cnt) - cnt, cnt))
+    yc = rr + 0.5
+    x = cx1[e] + (yc - cy1[e]) * (cx2[e] - cx1[e]) / (cy2[e] - cy1[e])
+    lb = elab[e]
+    order = np.lexsort((x, rr, lb))
+    rr, x, lb = rr[order], x[order], lb[order]
+    # на каждой (поле, строка) чётное число пересечений: (вход, выход)
+    r_s, xa, xb, l_s = rr[0::2], x[0::2], x[1::2], lb[0::2]
+    c0 = np.clip(np.ceil(xa - 0.5), 0, width).astype(np.int64)
+    c1 = np.clip(np.ceil(xb - 0.5), 0, width).astype(np.int64)
+    keep = c1 > c0
+    r_s, c0, c1, l_s = r_s[keep], c0[keep], c1[keep], l_s[keep]
+    order = np.argsort(r_s, kind="stable")
+    return r_s[order], c0[order], c1[order], l_s[order]
+
+
+@dataclass
+class ZonalResult:
+    names: List[str]
+    count: np.ndarray                 # (F,) конечных пикселей
+    mean: np.ndarray
+    std: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    percentiles: Dict[float, np.ndarray]
+    hist: np.ndarray                  # (F, bins)
+    bin_edges: np.ndarray             # (bins + 1,)
+    seconds: float = 0.0
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for i, name in enumerate(self.names):
+            row = {"name": name, "pixels": int(self.count[i]), "mean": float(self.mean[i]),
+                   "std": float(self.std[i]), "min": float(self.min[i]), "max": float(self.max[i])}
+            row.update({f"p{q:g}": float(v[i]) for q, v in self.percentiles.items()})
+            rows.append(row)
+        return rows
+
+    def summary(self) -> str:
+        ok = self.count > 0
+        return (f"{len(self.names)} field(s), {int(ok.sum())} with data, "
+                f"{int(self.count.sum())} px; mean of means {np.mean(self.mean[ok]) if ok.any() else float('nan'):.3f}; "
+                f"{self.seconds:.2f} s")
+
+
+class ZonalAccumulator:
+    """Накопитель по блокам строк: update(r0, block) в любом порядке, затем result()."""
+
+    def __init__(self, names: List[str], spans: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray], *,
+                 bins: int = 256, value_range: Tuple[float, float] = (-1.0, 1.0),
+                 percentiles: Sequence[float] = (10, 25, 50, 75, 90)):
+        self.names = names
+        self.rows, self.c0, self.c1, self.label = spans
+        self.bins = int(bins)
+        self.lo, self.hi = map(float, value_range)
+        self.q = tuple(float(q) for q in percentiles)
+        f = len(names)
+        self.n = np.zeros(f, dtype=np.int64)
+        self.s = np.zeros(f)
+        self.s2 = np.zeros(f)
+        self.mn = np.full(f, np.inf)
+        self.mx = np.full(f, -np.inf)
+        self.h = np.zeros(f * self.bins, dtype=np.int64)
+
+    def update(self, r0: int, block: np.ndarray) -> None:
+        a, b = np.searchsorted(self.rows, [r0, r0 + block.shape[0]])
+        if a == b:
+            return
+        ln = self.c1[a:b] - self.c0[a:b]
+        total = int(ln.sum())
+        off = np.arange(total) - np.repeat(np.cumsum(ln) - ln, ln)
+        rr = np.repeat(self.rows[a:b] - r0, ln)
+        cc = np.repeat(self.c0[a:b], ln) + off
+        lab = np.repeat(self.label[a:b], ln)
+        v = block[rr, cc].astype(np.float64)
+        ok = np.isfinite(v)
+        if not ok.all():
+            v, lab = v[ok], lab[ok]
+        f = len(self.names)
+        self.n += np.bincount(lab, minlength=f)
+        self.s += np.bincount(lab, weights=v, minlength=f)
+        self.s2 += np.bincount(lab, weights=v * v, minlength=f)
+        np.minimum.at(self.mn, lab, v)
+        np.maximum.at(self.mx, lab, v)
+        bi = np.clip(((v - self.lo) * (self.bins / (self.hi - self.lo))).astype(np.int64), 0, self.bins - 1)
+        self.h += np.bincount(lab * self.bins + bi, minlength=f * self.bins)
+
+    def result(self, seconds: float = 0.0) -> ZonalResult:
+        n = self.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.s / n
+            std = np.sqrt(np.maximum(self.s2 / n - mean * mean, 0.0))
+        hist = self.h.reshape(len(self.names), self.bins)
+        edges = np.linspace(self.lo, self.hi, self.bins + 1)
+        width = (self.hi - self.lo) / self.bins
+        cum = np.cumsum(hist, axis=1)
+        pct: Dict[float, np.ndarray] = {}
+        rows = np.arange(len(self.names))
+        for q in self.q:
+            target = q / 100.0 * n
+            k = np.minimum((cum < target[:, None]).sum(axis=1), self.bins - 1)
+            before = np.where(k > 0, cum[rows, k - 1], 0)
+            inbin = hist[rows, k]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                frac = np.where(inbin > 0, (target - before) / inbin, 0.0)
+            val = np.clip(edges[k] + frac * width, self.mn, self.mx)  # не выходить за точные min/max
+            pct[q] = np.where(n > 0, val, np.nan)
+        empty = n == 0
+        return ZonalResult(
+            names=self.names, count=n, mean=mean, std=std,
+            min=np.where(empty, np.nan, self.mn), max=np.where(empty, np.nan, self.mx),
+            percentiles=pct, hist=hist, bin_edges=edges, seconds=seconds,
+        )
+
+
+def zonal_stats(raster: Union[str, np.ndarray], fields: Union[str, Sequence[Dict[str, Any]]], *,
+                geo: Optional[Geo] = None, epsg: Optional[int] = None, block_rows: int = 512,
+                bins: int = 256, value_range: Tuple[float, float] = (-1.0, 1.0),
+                percentiles: Sequence[float] = (10, 25, 50, 75, 90)) -> ZonalResult:
+    """
+    Статистика растра по полям.
+
+    Args:
+        raster: путь к TIFF (TiffStripWriter / spectral_indices; geo/epsg — из тегов) или массив (H, W)
+        fields: GeoJSON-файл или список фич (lon/lat; при epsg=None — уже в CRS растра)
+        geo: (x0, y0, dx, dy) левого верхнего угла; для массива без geo — пиксельные координаты
+        value_range, bins: диапазон и число бинов гистограммы (для перцентилей)
+    """
+    t0 = time.perf_counter()
+    if isinstance(raster, str):
+        arr, tif_geo, tif_epsg = read_tiff(raster)
+        geo = geo or tif_geo
+        epsg = epsg if epsg is not None else tif_epsg
+    else:
+        arr = raster
+    geo = geo or (0.0, 0.0, 1.0, 1.0)         # пиксели: x = col, y = −row
+    names, polys = load_fields(fields)
+    spans = rasterize_spans(polys, arr.shape, geo, epsg)
+    acc = ZonalAccumulator(names, spans, bins=bins, value_range=value_range, percentiles=percentiles)
+    # только строки, где есть поля
+    if len(spans[0]):
+        first, last = int(spans[0][0]), int(spans[0][-1]) + 1
+        for r0 in range(first, last, block_rows):
+            acc.update(r0, np.asarray(arr[r0:min(last, r0 + block_rows)]))
+    return acc.result(time.perf_counter() - t0)
+
+
+def _bench(size: int = 2000, fields: int = 2500) -> None:
+    side = int(round(fields ** 0.5))
+    step = (size - 40) / side
+    ndvi = np.random.default_rng(0).uniform(0, 1, (size, size)).astype(np.float32)
+    feats = []
+    for k in range(side * side):                       # сетка полей-ромбов, координаты в пикселях
+        cy, cx = 20 + step * (k // side), 20 + step * (k % side)
+        ring = [[cx - 18, -cy], [cx, -(cy - 18)], [cx + 18, -cy], [cx, -(cy + 18)]]
+        feats.append({"properties": {"name": f"f{k}"}, "geometry": {"type": "Polygon", "coordinates": [ring]}})
+    t = time.perf_counter()
+    res = zonal_stats(ndvi, feats)
+    print(f"{len(feats)} fields on {size}x{size}: {(time.perf_counter() - t) * 1e3:.0f} ms; {res.summary()}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+    import sys
+
+    ap = argparse.ArgumentParser(description="Zonal statistics of an index raster per field polygon")
+    ap.add_argument("raster", nargs="?", help="TIFF из hyperspectral_ndvi / spectral_indices")
+    ap.add_argument("fields", nargs="?", help="GeoJSON с полями")
+    ap.add_argument("--bins", type=int, default=256)
+    ap.add_argument("--range", type=float, nargs=2, default=(-1.0, 1.0))
+    ap.add_argument("--bench", action="store_true", help="замер: 2500 полей на растре 2000×2000")
+    a = ap.parse_args()
+    if a.bench:
+        _bench()
+        sys.exit(0)
+    if not (a.raster and a.fields):
+        ap.error("raster and fields are required")
+    res = zonal_stats(a.raster, a.fields, bins=a.bins, value_range=tuple(a.range))
+    rows = res.to_rows()
+    if rows:
+        w = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]))
+        w.writeheader()
+        w.writerows(rows)
+    print(res.summary(), file=sys.stderr)
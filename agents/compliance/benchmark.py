@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк единого движка проверки UAS-зон.
+
+Генерирует синтетический набор зон (по умолчанию 50 000 полигонов над DE/PL/SI
+с разрешающими зонами и высотными ограничениями), сверяет результаты с
+прежней линейной реализацией (shape() + intersects по каждой фиче на каждый
+вызов) и печатает время:
+  • legacy      — прежний линейный скан
+  • index       — ZoneIndex.query (STRtree + prepared)
+  • batch       — check_polygons_against_zones (один запрос на все миссии)
+  • pack        — ZonePack.query (mmap, ленивое декодирование)
+
+Запуск:
+  python -m agents.compliance.benchmark --zones 50000 --missions 200
+Код возврата 1 — если результаты расходятся с эталоном.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from shapely.geometry import Polygon, shape
+
+from agents.compliance.uas_zones_check import (
+    ZoneIndex,
+    _is_permissive,
+    _zone_name,
+    check_polygons_against_zones,
+)
+from agents.compliance.zone_pack import ZonePack, compile_zone_pack
+
+# lon_min, lat_min, lon_max, lat_max — DE + PL + SI
+EXTENT = (5.9, 45.4, 24.1, 55.1)
+
+
+def _legacy_check(mission_poly: Polygon, zones_fc: List[Dict[str, Any]],
+                  flight_alt_m: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Эталон: прежняя линейная проверка из agents/compliance (до ZoneIndex)."""
+    hits: List[Dict[str, Any]] = []
+    for feat in zones_fc:
+        geom = feat.get("geometry")
+        props = feat.get("properties", {}) or {}
+        if not geom:
+            continue
+        try:
+            zone_geom = shape(geom)
+        except Exception:
+            continue
+        if not mission_poly.intersects(zone_geom):
+            continue
+        if _is_permissive(props):
+            continue
+        name = _zone_name(props)
+        reason = str(props.get("restriction") or "restricted zone")
+        z_max = props.get("max_altitude_m")
+        if isinstance(z_max, (int, float)) and flight_alt_m is not None:
+            if float(flight_alt_m) <= float(z_max):
+                continue
+            reason = f"{reason}; max_altitude={z_max}m, flight_alt={flight_alt_m}m"
+        hits.append({"zone": name, "reason": reason, "props": props})
+    return hits
+
+
+def synthetic_zones(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """n зон: случайные выпуклые многоугольники 0.2–5 км, ~10% разрешающих, ~50% с max_altitude_m."""
+    rng = np.random.default_rng(seed)
+    lon0, lat0, lon1, lat1 = EXTENT
+    cx = rng.uniform(lon0, lon1, n)
+    cy = rng.uniform(lat0, lat1, n)
+    r = rng.uniform(0.002, 0.05, n)
+    k = rng.integers(4, 9, n)
+    feats: List[Dict[str, Any]] = []
+    for i in range(n):
+        ang = np.sort(rng.uniform(0, 2 * np.pi, k[i]))
+        ring = np.column_stack([cx[i] + r[i] * np.cos(ang) / np.cos(np.radians(cy[i])),
+                                cy[i] + r[i] * np.sin(ang)]).round(6).tolist()
+        ring.append(ring[0])
+        props: Dict[str, Any] = {"zone": f"SYN-{i:06d}", "restriction": "No Fly Zone"}
+        u = rng.random()
+        if u < 0.1:
+            props["restriction"] = "Training Area"
+        elif u < 0.6:
+            props["max_altitude_m"] = int(rng.choice([0, 50, 100, 120]))
+        feats.append({"type": "Feature", "properties": props,
+                      "geometry": {"type": "Polygon", "coordinates": [ring]}})
+    return feats
+
+
+def synthetic_missions(n: int, seed: int = 1) -> List[Polygon]:
+    """n прямоугольных миссий 1–10 км со случайным поворотом."""
+    rng = np.random.default_rng(seed)
+    lon0, lat0, lon1, lat1 = EXTENT
+    out: List[Polygon] = []
+    for _ in range(n):
+        cx, cy = rng.uniform(lon0, lon1), rng.uniform(lat0, lat1)
+        w, h = rng.uniform(0.01, 0.09, 2)
+        a = rng.uniform(0, np.pi)
+        c, s = np.cos(a), np.sin(a)
+        pts = [(cx + (x * c - y * s) / np.cos(np.radians(cy)), cy + x * s + y * c)
+               for x, y in ((-w, -h), (w, -h), (w, h), (-w, h))]
+        out.append(Polygon(pts))
+    return out
+
+
+def _key(hits: Sequence[Dict[str, Any]]) -> List[tuple]:
+    return [(h["zone"], h["reason"]) for h in hits]
+
+
+def run(n_zones: int = 50000, n_missions: int = 200, n_legacy: int = 5,
+        seed: int = 0) -> bool:
+    """Печатает таблицу времени; возвращает True, если все результаты совпали с эталоном."""
+    zones = synthetic_zones(n_zones, seed)
+    missions = synthetic_missions(n_missions, seed + 1)
+    alts = [None, 40.0, 110.0]
+    ok = True
+
+    t = time.perf_counter()
+    index = ZoneIndex(zones)
+    t_build = time.perf_counter() - t
+
+    # эталон дорогой — сверяем на подмножестве миссий
+    n_legacy = min(n_legacy, n_missions)
+    t = time.perf_counter()
+    legacy = [[_legacy_check(m, zones, a) for a in alts] for m in missions[:n_legacy]]
+    t_legacy = (time.perf_counter() - t) / (n_legacy * len(alts))
+
+    t = time.perf_counter()
+    fast = [[index.query(m, flight_alt_m=a) for a in alts] for m in missions]
+    t_index = (time.perf_counter() - t) / (n_missions * len(alts))
+
+    for i in range(n_legacy):
+        for j in range(len(alts)):
+            if _key(legacy[i][j]) != _key(fast[i][j]):
+                ok = False
+                print(f"[MISMATCH] mission={i} alt={alts[j]}: legacy={_key(legacy[i][j])} "
+                      f"index={_key(fast[i][j])}")
+
+    t = time.perf_counter()
+    batch = [check_polygons_against_zones(missions, index, flight_alt_m=a) for a in alts]
+    t_batch = (time.perf_counter() - t) / (n_missions * len(alts))
+    for j, res in enumerate(batch):
+        for i in range(n_missions):
+            if _key(res.hits_for(i)) != _key(fast[i][j]):
+                ok = False
+                print(f"[MISMATCH] batch mission={i} alt={alts[j]}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "zones.geojson"
+        src.write_text(json.dumps({"type": "FeatureCollection", "features": zones}), encoding="utf-8")
+        pack_path = Path(tmp) / "zones.wkzp"
+        compile_zone_pack([src], pack_path)
+        t = time.perf_counter()
+        pack = ZonePack(pack_path)
+        t_open = time.perf_counter() - t
+        t = time.perf_counter()
+        packed = [[pack.query(m, flight_alt_m=a) for a in alts] for m in missions]
+        t_pack = (time.perf_counter() - t) / (n_missions * len(alts))
+        pack.close()
+    for i in range(n_missions):
+        for j in range(len(alts)):
+            if _key(packed[i][j]) != _key(fast[i][j]):
+                ok = False
+                print(f"[MISMATCH] pack mission={i} alt={alts[j]}")
+
+    n_hits = sum(len(h) for row in fast for h in row)
+    print(f"zones={n_zones} missions={n_missions} hits={n_hits} (parity on {n_legacy} legacy missions)")
+    print(f"{'engine':<8} {'per check':>12} {'speedup':>9}")
+    for name, dt in (("legacy", t_legacy), ("index", t_index), ("batch", t_batch), ("pack", t_pack)):
+        print(f"{name:<8} {dt * 1e3:>10.3f}ms {t_legacy / dt:>8.0f}x")
+    print(f"index build {t_build:.2f}s, pack open {t_open * 1e3:.2f}ms")
+    print("parity: OK" if ok else "parity: FAILED")
+    return ok
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк и сверка движка проверки UAS-зон")
+    parser.add_argument("--zones", type=int, default=50000, help="число синтетических зон")
+    parser.add_argument("--missions", type=int, default=200, help="число миссий")
+    parser.add_argument("--legacy", type=int, default=5, help="миссий для сверки с линейным эталоном")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    return 0 if run(args.zones, args.missions, args.legacy, args.seed) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
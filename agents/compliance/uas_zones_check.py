@@ -1,6 +1,11 @@
 # -*- coding: utf-8 -*-
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import numpy as np
+import shapely
+from shapely import STRtree
 from shapely.geometry import shape, Polygon, mapping
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, Sequence
 
 
 class ZoneHit(Exception):
@@ -30,64 +35,442 @@ def _is_permissive(props: Dict[str, Any]) -> bool:
     return False
 
 
-def check_polygon_against_zones(
-    mission_poly: Polygon,
-    zones_fc: List[Dict[str, Any]],
-    *,
-    flight_alt_m: Optional[float] = None,
-    raise_on_first: bool = False,
-) -> List[Dict[str, Any]]:
+def _num(v: Any) -> Optional[float]:
+    return float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else None
+
+
+def _alt_limits(props: Dict[str, Any]) -> Tuple[Optional[float], Optional[float], Optional[float]]:
     """
-    Возвращает список пересечений с ОГРАНИЧИВАЮЩИМИ зонами.
-    Разрешающие зоны (training/allow_flight) пропускаются.
-    Если указан flight_alt_m, учитывает max_altitude_m зоны.
+    Высотные ограничения зоны:
+      max_altitude_m   — полёт разрешён до этой высоты включительно;
+      lower_altitude_m / upper_altitude_m — запретный высотный слой [lower..upper]
+      (любая граница может отсутствовать = открытый слой).
+    """
+    return (_num(props.get("max_altitude_m")),
+            _num(props.get("lower_altitude_m")),
+            _num(props.get("upper_altitude_m")))
 
-    Args:
-        mission_poly: полигон миссии (в lon/lat, как Shapely Polygon)
-        zones_fc: список GeoJSON-фич (features)
-        flight_alt_m: рабочая высота полёта над уровнем моря (ASL) или AGL — см. вашу модель
-        raise_on_first: при первом нарушении бросить ZoneHit
 
-    Returns:
-        hits: список словарей { "zone": <name>, "reason": <text>, "props": <properties> }
+def _zone_hit(props: Dict[str, Any], flight_alt_m: Optional[float]) -> Optional[Dict[str, Any]]:
     """
-    hits: List[Dict[str, Any]] = []
+    Решение по одной ограничивающей зоне, геометрически пересекающей миссию.
+    Возвращает словарь попадания или None, если по высоте ограничение не нарушено.
+    """
+    # причина и имя
+    name = _zone_name(props)
+    reason = str(props.get("restriction") or "restricted zone")
+
+    # проверка высоты, если указана
+    z_max, z_lo, z_hi = _alt_limits(props)
+    if flight_alt_m is not None and (z_max is not None or z_lo is not None or z_hi is not None):
+        alt = float(flight_alt_m)
+        over_max = z_max is not None and alt > z_max
+        in_band = (z_lo is not None or z_hi is not None) and \
+            (z_lo is None or alt >= z_lo) and (z_hi is None or alt <= z_hi)
+        if not (over_max or in_band):
+            # пересечение есть, но по высоте не нарушаем ограничение — предупреждение не создаём
+            return None
+        if over_max:
+            reason = f"{reason}; max_altitude={props.get('max_altitude_m')}m, flight_alt={flight_alt_m}m"
+        else:
+            reason = f"{reason}; band={z_lo}..{z_hi}m, flight_alt={flight_alt_m}m"
+
+    return {"zone": name, "reason": reason, "props": props}
+
 
+def build_zone_geometries(zones_fc: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """
+    Строит shapely-геометрии из GeoJSON-фич.
+    Фичи без геометрии или с некорректной геометрией пропускаются.
+
+    Returns:
+        (geoms, props): массив геометрий (dtype=object) и список properties той же длины
+    """
+    geoms: List[Any] = []
+    props: List[Dict[str, Any]] = []
     for feat in zones_fc:
         geom = feat.get("geometry")
-        props = feat.get("properties", {}) or {}
         if not geom:
             continue
-
         try:
             zone_geom = shape(geom)
         except Exception:
             continue
+        geoms.append(zone_geom)
+        props.append(feat.get("properties", {}) or {})
+    return np.array(geoms, dtype=object), props
 
-        if not mission_poly.intersects(zone_geom):
-            continue
 
-        # пропускаем разрешающие зоны
-        if _is_permissive(props):
-            continue
+class ZoneIndex:
+    """
+    Пространственный индекс UAS-зон.
+
+    Геометрии строятся из GeoJSON один раз, подготавливаются (prepared geometry)
+    и складываются в STRtree. Запрос отбирает кандидатов по bbox и делает точную
+    проверку пересечения только для них.
+
+    Пример:
+        index = ZoneIndex(load_zones(files))
+        hits = index.query(mission_poly, flight_alt_m=80)
+    """
+
+    def __init__(self, zones_fc: Sequence[Dict[str, Any]]):
+        geoms, props = build_zone_geometries(zones_fc)
+        self._init_parts(geoms, props)
+
+    @classmethod
+    def from_geometries(cls, geoms: Sequence[Any], props: Sequence[Dict[str, Any]]) -> "ZoneIndex":
+        """Собрать индекс из уже построенных геометрий (без повторного shape())."""
+        if len(geoms) != len(props):
+            raise ValueError("geoms and props must have the same length")
+        arr = np.empty(len(geoms), dtype=object)
+        arr[:] = list(geoms)
+        index = cls.__new__(cls)
+        index._init_parts(arr, list(props))
+        return index
+
+    def _init_parts(self, geoms: np.ndarray, props: List[Dict[str, Any]]) -> None:
+        self.geoms = geoms
+        self.props = props
+        shapely.prepare(self.geoms)
+        self.tree = STRtree(self.geoms)
+        self.permissive = np.array([_is_permissive(p) for p in props], dtype=bool)
+        limits = np.array([_alt_limits(p) for p in props], dtype=np.float64).reshape(-1, 3)
+        # NaN = ограничение не задано
+        self.alt_max, self.alt_lower, self.alt_upper = limits.T
+
+    def __len__(self) -> int:
+        return len(self.props)
 
-        # причина и имя
-        name = _zone_name(props)
-        reason = str(props.get("restriction") or "restricted zone")
+    def candidates(self, geom: Any) -> np.ndarray:
+        """
+        Индексы зон (по возрастанию), геометрия которых пересекает geom.
+        bbox-отбор через STRtree, точная проверка — по подготовленным геометриям зон.
+        """
+        idx = self.tree.query(geom)
+        if idx.size == 0:
+            return idx
+        idx.sort()
+        return idx[shapely.intersects(self.geoms[idx], geom)]
 
-        # проверка высоты, если указана
-        z_max = props.get("max_altitude_m")
-        if isinstance(z_max, (int, float)) and flight_alt_m is not None:
-            if float(flight_alt_m) <= float(z_max):
-                # пересечение есть, но по высоте не нарушаем ограничение — предупреждение не создаём
+    def query(
+        self,
+        mission_poly: Polygon,
+        *,
+        flight_alt_m: Optional[float] = None,
+        raise_on_first: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Список пересечений с ОГРАНИЧИВАЮЩИМИ зонами — в том же формате и порядке,
+        что и check_polygon_against_zones().
+        """
+        hits: List[Dict[str, Any]] = []
+        for i in self.candidates(mission_poly):
+            # пропускаем разрешающие зоны
+            if self.permissive[i]:
                 continue
-            else:
-                reason = f"{reason}; max_altitude={z_max}m, flight_alt={flight_alt_m}m"
+            hit = _zone_hit(self.props[i], flight_alt_m)
+            if hit is None:
+                continue
+            hits.append(hit)
+            if raise_on_first:
+                raise ZoneHit(hit["zone"], hit["reason"])
+        return hits
+
+    def query_many(self, geoms: Sequence[Any], flight_alt_m: Any = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Пакетный запрос: пары (индекс миссии, индекс зоны) для всех нарушений.
+        Один запрос к STRtree на весь массив миссий + векторные предикаты shapely.
+
+        Args:
+            geoms: массив/список геометрий миссий
+            flight_alt_m: None, число или массив высот по миссиям
+        """
+        geoms = np.asarray(geoms, dtype=object).ravel()
+        if geoms.size == 0 or len(self) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+        m_idx, z_idx = self.tree.query(geoms)
+        keep = ~self.permissive[z_idx]
+        m_idx, z_idx = m_idx[keep], z_idx[keep]
+        if flight_alt_m is not None:
+            alt = np.broadcast_to(np.asarray(flight_alt_m, dtype=np.float64), geoms.shape)[m_idx]
+            keep = self.altitude_violation(z_idx, alt, alt)
+            m_idx, z_idx = m_idx[keep], z_idx[keep]
+        keep = shapely.intersects(self.geoms[z_idx], geoms[m_idx])
+        m_idx, z_idx = m_idx[keep], z_idx[keep]
+        order = np.lexsort((z_idx, m_idx))
+        return m_idx[order], z_idx[order]
+
+    def altitude_violation(self, zone_idx: np.ndarray, alt_lo: np.ndarray, alt_hi: np.ndarray) -> np.ndarray:
+        """
+        Векторная проверка высотных ограничений для пар (зона, диапазон высот [alt_lo..alt_hi]).
+        Зона без высотных ограничений запрещает любую высоту.
+        """
+        z_max = self.alt_max[zone_idx]
+        z_lo = self.alt_lower[zone_idx]
+        z_hi = self.alt_upper[zone_idx]
+        has_max = ~np.isnan(z_max)
+        has_band = ~np.isnan(z_lo) | ~np.isnan(z_hi)
+        over_max = has_max & (alt_hi > z_max)
+        in_band = has_band & (alt_hi >= np.nan_to_num(z_lo, nan=-np.inf)) & \
+            (alt_lo <= np.nan_to_num(z_hi, nan=np.inf))
+        return ~(has_max | has_band) | over_max | in_band
+
+    def query_trajectory(
+        self,
+        lats: Sequence[float],
+        lons: Sequence[float],
+        alts: Sequence[float],
+        *,
+        raise_on_first: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Проверка траектории (последовательность точек) по сегментам за один пакетный проход.
+
+        Каждый сегмент i = (точка i → точка i+1) проверяется против footprint зоны
+        и её высотных ограничений; высота сегмента — диапазон высот его концов.
+
+        Returns:
+            hits: по одной записи на нарушенную зону (в порядке зон) —
+                  { "zone", "reason", "props", "segment": индекс первого нарушающего сегмента }
+        """
+        lat = np.asarray(lats, dtype=np.float64).ravel()
+        lon = np.asarray(lons, dtype=np.float64).ravel()
+        alt = np.asarray(alts, dtype=np.float64).ravel()
+        if not (lat.size == lon.size == alt.size):
+            raise ValueError("lats, lons and alts must have the same length")
+        if lat.size == 0 or len(self) == 0:
+            return []
+
+        if lat.size == 1:
+            segs = shapely.points(lon, lat)
+            alt_lo = alt_hi = alt
+        else:
+            coords = np.empty((2 * (lat.size - 1), 2))
+            coords[0::2, 0], coords[0::2, 1] = lon[:-1], lat[:-1]
+            coords[1::2, 0], coords[1::2, 1] = lon[1:], lat[1:]
+            segs = shapely.linestrings(coords, indices=np.repeat(np.arange(lat.size - 1), 2))
+            alt_lo = np.minimum(alt[:-1], alt[1:])
+            alt_hi = np.maximum(alt[:-1], alt[1:])
+
+        seg_idx, zone_idx = self.tree.query(segs)
+        keep = ~self.permissive[zone_idx]
+        seg_idx, zone_idx = seg_idx[keep], zone_idx[keep]
+        keep = self.altitude_violation(zone_idx, alt_lo[seg_idx], alt_hi[seg_idx])
+        seg_idx, zone_idx = seg_idx[keep], zone_idx[keep]
+        # точная проверка — по подготовленным геометриям зон
+        keep = shapely.intersects(self.geoms[zone_idx], segs[seg_idx])
+        seg_idx, zone_idx = seg_idx[keep], zone_idx[keep]
+        if zone_idx.size == 0:
+            return []
+
+        order = np.lexsort((seg_idx, zone_idx))
+        zone_idx, seg_idx = zone_idx[order], seg_idx[order]
+        first = np.ones(zone_idx.size, dtype=bool)
+        first[1:] = zone_idx[1:] != zone_idx[:-1]
+
+        hits: List[Dict[str, Any]] = []
+        for z, s in zip(zone_idx[first].tolist(), seg_idx[first].tolist()):
+            props = self.props[z]
+            reason = str(props.get("restriction") or "restricted zone")
+            if not np.isnan(self.alt_max[z]) or not np.isnan(self.alt_lower[z]) or not np.isnan(self.alt_upper[z]):
+                reason = f"{reason}; segment={s}, flight_alt={float(alt_lo[s]):g}..{float(alt_hi[s]):g}m"
+            hit = {"zone": _zone_name(props), "reason": reason, "props": props, "segment": s}
+            hits.append(hit)
+            if raise_on_first:
+                raise ZoneHit(hit["zone"], hit["reason"])
+        return hits
+
+
+class ZoneIndexBuilder:
+    """
+    Накопитель геометрий для ZoneIndex: зоны добавляются чанками
+    (например, из потокового ридера), индекс строится один раз в build().
+    """
+
+    def __init__(self):
+        self._geoms: List[np.ndarray] = []
+        self._props: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._props)
+
+    def add_features(self, zones_fc: Sequence[Dict[str, Any]]) -> int:
+        """Добавить GeoJSON-фичи; возвращает число принятых зон."""
+        geoms, props = build_zone_geometries(zones_fc)
+        self.add(geoms, props)
+        return len(props)
+
+    def add(self, geoms: np.ndarray, props: Sequence[Dict[str, Any]]) -> None:
+        """Добавить уже построенные геометрии и их properties."""
+        if len(geoms) != len(props):
+            raise ValueError("geoms and props must have the same length")
+        self._geoms.append(np.asarray(geoms, dtype=object))
+        self._props.extend(props)
+
+    def build(self) -> ZoneIndex:
+        geoms = np.concatenate(self._geoms) if self._geoms else np.empty(0, dtype=object)
+        return ZoneIndex.from_geometries(geoms, self._props)
+
 
-        hit = {"zone": name, "reason": reason, "props": props}
-        hits.append(hit)
+@dataclass
+class BatchResult:
+    """
+    Результат пакетной проверки N миссий против Z зон (без исключений).
+
+    mission_idx/zone_idx — отсортированные пары нарушений (миссия, зона);
+    matrix — плотная матрица попаданий N×Z (строится по запросу).
+    """
+    n_missions: int
+    mission_idx: np.ndarray
+    zone_idx: np.ndarray
+    zone_props: List[Dict[str, Any]] = field(repr=False)
+    flight_alt_m: Any = None
+
+    @property
+    def matrix(self) -> np.ndarray:
+        m = np.zeros((self.n_missions, len(self.zone_props)), dtype=bool)
+        m[self.mission_idx, self.zone_idx] = True
+        return m
+
+    @property
+    def n_hits(self) -> np.ndarray:
+        """Число нарушенных зон по каждой миссии."""
+        return np.bincount(self.mission_idx, minlength=self.n_missions)
+
+    @property
+    def clean(self) -> np.ndarray:
+        """Маска миссий без нарушений."""
+        return self.n_hits == 0
+
+    def ranking(self) -> np.ndarray:
+        """Индексы миссий по возрастанию числа нарушений (устойчиво к порядку)."""
+        return np.argsort(self.n_hits, kind="stable")
+
+    def hits_for(self, i: int) -> List[Dict[str, Any]]:
+        """Попадания миссии i в формате check_polygon_against_zones()."""
+        a, b = np.searchsorted(self.mission_idx, [i, i + 1])
+        alt = self.flight_alt_m
+        if alt is not None and np.ndim(alt) > 0:
+            alt = float(np.asarray(alt, dtype=np.float64).ravel()[i])
+        # пары уже отфильтрованы по высоте — _zone_hit только формирует запись
+        return [_zone_hit(self.zone_props[z], alt) for z in self.zone_idx[a:b].tolist()]
+
+
+_worker_index: Optional[ZoneIndex] = None
+
+
+def _batch_worker_init(geoms: np.ndarray, props: List[Dict[str, Any]]) -> None:
+    global _worker_index
+    _worker_index = ZoneIndex.from_geometries(geoms, props)
+
+
+def _batch_worker_query(args: Tuple[int, np.ndarray, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    offset, geoms, alt = args
+    m_idx, z_idx = _worker_index.query_many(geoms, alt)
+    return m_idx + offset, z_idx
+
+
+def check_polygons_against_zones(
+    mission_polys: Sequence[Polygon],
+    zones_fc: List[Dict[str, Any]],
+    *,
+    flight_alt_m: Any = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 2000,
+) -> BatchResult:
+    """
+    Пакетная проверка N миссий (например, альтернатив с разным курсом/смещением).
+    Не бросает исключений: возвращает BatchResult для дешёвого ранжирования.
+
+    Args:
+        mission_polys: полигоны миссий (lon/lat)
+        zones_fc: GeoJSON-фичи или готовый ZoneIndex
+        flight_alt_m: None, одна высота или массив высот по миссиям
+        workers: >1 — распараллелить очень большие N по процессам (чанками по chunk_size)
+    """
+    index = zones_fc if isinstance(zones_fc, ZoneIndex) else ZoneIndex(zones_fc)
+    geoms = np.empty(len(mission_polys), dtype=object)
+    geoms[:] = list(mission_polys)
+    n = geoms.size
+    alt = None if flight_alt_m is None else np.broadcast_to(
+        np.asarray(flight_alt_m, dtype=np.float64), (n,))
+
+    if workers and workers > 1 and n > chunk_size:
+        tasks = [(a, geoms[a:a + chunk_size], None if alt is None else alt[a:a + chunk_size])
+                 for a in range(0, n, chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_batch_worker_init,
+                                 initargs=(index.geoms, index.props)) as ex:
+            parts = list(ex.map(_batch_worker_query, tasks))
+        m_idx = np.concatenate([p[0] for p in parts])
+        z_idx = np.concatenate([p[1] for p in parts])
+    else:
+        m_idx, z_idx = index.query_many(geoms, alt)
+
+    return BatchResult(n_missions=n, mission_idx=m_idx, zone_idx=z_idx,
+                       zone_props=index.props, flight_alt_m=flight_alt_m)
+
+
+def check_trajectory_against_zones(
+    lats: Sequence[float],
+    lons: Sequence[float],
+    alts: Sequence[float],
+    zones_fc: List[Dict[str, Any]],
+    *,
+    raise_on_first: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Проверка траектории (массивы lat/lon/alt) по сегментам с учётом высотных слоёв зон.
+    zones_fc — GeoJSON-фичи или готовый ZoneIndex. См. ZoneIndex.query_trajectory().
+    """
+    index = zones_fc if isinstance(zones_fc, ZoneIndex) else ZoneIndex(zones_fc)
+    return index.query_trajectory(lats, lons, alts, raise_on_first=raise_on_first)
+
+
+def check_waypoints_against_zones(
+    waypoints: Sequence[Any],
+    zones_fc: List[Dict[str, Any]],
+    *,
+    alt_offset_m: float = 0.0,
+    raise_on_first: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    То же для точек с атрибутами lat/lon/rel_alt (например, mission_grid.generate_grid()).
+    Колоночный mission_grid.WaypointArray берётся как есть, без обхода по точкам.
+    alt_offset_m добавляется к rel_alt (например, высота дома, если зоны заданы в ASL).
+    """
+    if isinstance(getattr(waypoints, "lat", None), np.ndarray):
+        lats = np.asarray(waypoints.lat, dtype=np.float64)
+        lons = np.asarray(waypoints.lon, dtype=np.float64)
+        alts = np.asarray(waypoints.rel_alt, dtype=np.float64) + float(alt_offset_m)
+        return check_trajectory_against_zones(lats, lons, alts, zones_fc, raise_on_first=raise_on_first)
+    lats = np.fromiter((wp.lat for wp in waypoints), dtype=np.float64)
+    lons = np.fromiter((wp.lon for wp in waypoints), dtype=np.float64)
+    alts = np.fromiter((wp.rel_alt for wp in waypoints), dtype=np.float64) + float(alt_offset_m)
+    return check_trajectory_against_zones(lats, lons, alts, zones_fc, raise_on_first=raise_on_first)
+
+
+def check_polygon_against_zones(
+    mission_poly: Polygon,
+    zones_fc: List[Dict[str, Any]],
+    *,
+    flight_alt_m: Optional[float] = None,
+    raise_on_first: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Возвращает список пересечений с ОГРАНИЧИВАЮЩИМИ зонами.
+    Разрешающие зоны (training/allow_flight) пропускаются.
+    Если указан flight_alt_m, учитывает max_altitude_m зоны.
 
-        if raise_on_first:
-            raise ZoneHit(name, reason)
+    Args:
+        mission_poly: полигон миссии (в lon/lat, как Shapely Polygon)
+        zones_fc: список GeoJSON-фич (features) или готовый ZoneIndex
+        flight_alt_m: рабочая высота полёта над уровнем моря (ASL) или AGL — см. вашу модель
+        raise_on_first: при первом нарушении бросить ZoneHit
 
-    return hits
\ No newline at end of file
+    Returns:
+        hits: список словарей { "zone": <name>, "reason": <text>, "props": <properties> }
+    """
+    index = zones_fc if isinstance(zones_fc, ZoneIndex) else ZoneIndex(zones_fc)
+    return index.query(mission_poly, flight_alt_m=flight_alt_m, raise_on_first=raise_on_first)
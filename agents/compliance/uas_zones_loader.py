@@ -1,74 +1,153 @@
 # -*- coding: utf-8 -*-
+from dataclasses import dataclass, field
 from pathlib import Path
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 
-def load_zones(paths: List[Path]) -> List[Dict[str, Any]]:
+@dataclass
+class IngestStats:
+    """
+    Сводные метрики загрузки зон (вместо построчных print в quiet-режиме).
+    """
+    files: int = 0
+    features: int = 0
+    skipped: int = 0
+    bytes_read: int = 0
+    seconds: float = 0.0
+    missing: List[str] = field(default_factory=list)
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+    def merge(self, other: "IngestStats") -> None:
+        self.files += other.files
+        self.features += other.features
+        self.skipped += other.skipped
+        self.bytes_read += other.bytes_read
+        self.missing.extend(other.missing)
+        self.errors.extend(other.errors)
+
+    def summary(self) -> str:
+        mb = self.bytes_read / (1024 * 1024)
+        s = (f"{self.features} feature(s) from {self.files} file(s), {self.skipped} skipped, "
+             f"{mb:.1f} MB in {self.seconds:.2f}s")
+        if self.missing:
+            s += f", {len(self.missing)} missing"
+        if self.errors:
+            s += f", {len(self.errors)} error(s)"
+        return s
+
+
+def _say(quiet: bool, msg: str) -> None:
+    if not quiet:
+        print(msg)
+
+
+def load_zones(paths: List[Path], *, quiet: bool = False,
+               stats: Optional[IngestStats] = None) -> List[Dict[str, Any]]:
     """
     Загружает UAS геозоны из списка GeoJSON-файлов или директорий.
 
     Args:
         paths: список путей (файлы или каталоги)
+        quiet: не печатать сообщения по каждому файлу
+        stats: необязательный IngestStats, куда складываются метрики загрузки
 
     Returns:
         zones: список GeoJSON features (dict)
     """
     zones: List[Dict[str, Any]] = []
 
+    for fp in expand_zone_paths(paths, quiet=quiet, stats=stats):
+        try:
+            zones.extend(_load_geojson_file(fp, quiet=quiet, stats=stats))
+        except Exception as e:
+            if stats is not None:
+                stats.errors.append((str(fp), str(e)))
+            _say(quiet, f"[ERROR] Failed to load zones from {fp}: {e}")
+
+    _say(quiet, f"[INFO] Loaded {len(zones)} UAS zone features from {len(paths)} source(s)")
+    return zones
+
+
+def expand_zone_paths(paths: List[Path], *, quiet: bool = False,
+                      stats: Optional[IngestStats] = None) -> List[Path]:
+    """
+    Разворачивает список путей в список GeoJSON-файлов (в порядке load_zones).
+    Каталоги обходятся рекурсивно; отсутствующие пути пропускаются с предупреждением.
+    """
+    files: List[Path] = []
     for p in paths:
+        p = Path(p)
         try:
             if not p.exists():
-                print(f"[WARN] File not found: {p}")
+                if stats is not None:
+                    stats.missing.append(str(p))
+                _say(quiet, f"[WARN] File not found: {p}")
                 continue
 
             # если указан каталог — рекурсивно ищем все GeoJSON
             if p.is_dir():
-                files = list(p.rglob("*.geojson")) + list(p.rglob("*.json"))
-                if not files:
-                    print(f"[INFO] No GeoJSON files in directory: {p}")
-                for fp in files:
-                    zones.extend(_load_geojson_file(fp))
+                found = list(p.rglob("*.geojson")) + list(p.rglob("*.json"))
+                if not found:
+                    _say(quiet, f"[INFO] No GeoJSON files in directory: {p}")
+                files.extend(found)
             else:
-                zones.extend(_load_geojson_file(p))
+                files.append(p)
 
         except Exception as e:
-            print(f"[ERROR] Failed to load zones from {p}: {e}")
+            if stats is not None:
+                stats.errors.append((str(p), str(e)))
+            _say(quiet, f"[ERROR] Failed to load zones from {p}: {e}")
+    return files
 
-    print(f"[INFO] Loaded {len(zones)} UAS zone features from {len(paths)} source(s)")
-    return zones
 
+def _valid_features(feats: List[Any]) -> List[Dict[str, Any]]:
+    """Фильтрует только корректные объекты (dict с geometry-объектом)."""
+    valid_feats = []
+    for feat in feats:
+        if not isinstance(feat, dict):
+            continue
+        geom = feat.get("geometry")
+        if not geom or not isinstance(geom, dict):
+            continue
+        valid_feats.append(feat)
+    return valid_feats
 
-def _load_geojson_file(path: Path) -> List[Dict[str, Any]]:
+
+def _load_geojson_file(path: Path, *, quiet: bool = False,
+                       stats: Optional[IngestStats] = None) -> List[Dict[str, Any]]:
     """Загружает и проверяет один GeoJSON файл."""
+    def _fail(msg: str) -> List[Dict[str, Any]]:
+        if stats is not None:
+            stats.errors.append((str(path), msg))
+        _say(quiet, msg)
+        return []
+
     try:
         with path.open("r", encoding="utf-8") as f:
             gj = json.load(f)
     except json.JSONDecodeError as e:
-        print(f"[ERROR] Invalid JSON in {path}: {e}")
-        return []
+        return _fail(f"[ERROR] Invalid JSON in {path}: {e}")
     except Exception as e:
-        print(f"[ERROR] Failed to open {path}: {e}")
-        return []
+        return _fail(f"[ERROR] Failed to open {path}: {e}")
+
+    if stats is not None:
+        stats.files += 1
+        stats.bytes_read += path.stat().st_size
 
     if not isinstance(gj, dict):
-        print(f"[WARN] Unexpected JSON structure in {path}")
+        _say(quiet, f"[WARN] Unexpected JSON structure in {path}")
         return []
 
     feats = gj.get("features")
     if not feats or not isinstance(feats, list):
-        print(f"[WARN] No 'features' in {path}")
+        _say(quiet, f"[WARN] No 'features' in {path}")
         return []
 
-    # фильтруем только корректные объекты
-    valid_feats = []
-    for feat in feats:
-        if not isinstance(feat, dict):
-            continue
-        geom = feat.get("geometry")
-        if not geom or not isinstance(geom, dict):
-            continue
-        valid_feats.append(feat)
+    valid_feats = _valid_features(feats)
+    if stats is not None:
+        stats.features += len(valid_feats)
+        stats.skipped += len(feats) - len(valid_feats)
 
-    print(f"[OK] {path.name}: {len(valid_feats)} feature(s) loaded")
-    return valid_feats
\ No newline at end of file
+    _say(quiet, f"[OK] {path.name}: {len(valid_feats)} feature(s) loaded")
+    return valid_feats
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Единая точка проверки миссии по UAS-зонам.
+
+Все прежние копии ensure_zone_compliance (agents/autopilot_ai/autopilot.py,
+agents/autopilot_ai/compliance/utils.py, engine/agents/autopilot_ai/autopilot.py)
+реэкспортируют эту функцию: индекс зон (STRtree), процессный кэш файлов и
+семантика разрешающих зон/высотных ограничений — одни и те же.
+"""
+from pathlib import Path
+from typing import Optional
+
+from shapely.geometry import Polygon
+
+from agents.compliance.zone_cache import get_zone_store
+from agents.compliance.uas_zones_check import check_polygon_against_zones
+
+
+def ensure_zone_compliance(poly_coords_latlon, zone_files, *, flight_alt_m: Optional[float] = None):
+    """
+    Проверка миссии на пересечение с запретными/ограниченными UAS-зонами.
+
+    Args:
+        poly_coords_latlon: список координат [(lat, lon), ...]
+        zone_files: список путей к GeoJSON-файлам/каталогам с геозонами
+        flight_alt_m: рабочая высота; если задана, учитываются высотные ограничения зон
+
+    Raises:
+        RuntimeError: если маршрут пересекает запретные зоны
+    """
+    mission_poly = Polygon([(lon, lat) for (lat, lon) in poly_coords_latlon])
+    # зоны берутся из процессного кэша: неизменённые файлы повторно не парсятся
+    zones = get_zone_store().index([Path(p) for p in zone_files])
+    hits = check_polygon_against_zones(mission_poly, zones, flight_alt_m=flight_alt_m)
+    if hits:
+        names = ", ".join(h["zone"] for h in hits)
+        raise RuntimeError(
+            f"Маршрут пересекает запретные/ограниченные зоны: {names}. "
+            f"Скорректируйте полигон или получите разрешение."
+        )
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Процессный кэш UAS-зон.
+
+ensure_zone_compliance() вызывается для каждой миссии, а набор файлов зон
+почти всегда один и тот же. ZoneStore хранит разобранные фичи и построенные
+геометрии по каждому файлу (ключ: путь + mtime + размер, опционально хэш
+содержимого) и собранные ZoneIndex по наборам файлов. Неизменённые файлы
+повторно не читаются; при изменении перестраивается только изменившийся файл.
+
+Пример:
+    from agents.compliance.zone_cache import get_zone_store
+    index = get_zone_store().index(["config/uas_zones/de_sample.geojson"])
+    hits = index.query(mission_poly)
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from agents.compliance.uas_zones_loader import _load_geojson_file, expand_zone_paths
+from agents.compliance.uas_zones_check import ZoneIndex, build_zone_geometries
+
+PathLike = Union[str, Path]
+Stamp = Tuple[Any, ...]
+
+
+@dataclass
+class _FileEntry:
+    stamp: Stamp
+    features: List[Dict[str, Any]]
+    geoms: np.ndarray
+    props: List[Dict[str, Any]]
+
+
+class ZoneStore:
+    """
+    LRU-кэш зон: файл → (фичи, геометрии), набор файлов → ZoneIndex.
+
+    Args:
+        max_files: сколько файлов держать в кэше
+        max_indexes: сколько собранных индексов (наборов файлов) держать в кэше
+        use_hash: ключевать по хэшу содержимого вместо mtime/size
+                  (файл читается, но не парсится, если содержимое не изменилось)
+    """
+
+    def __init__(self, max_files: int = 64, max_indexes: int = 8, use_hash: bool = False):
+        self.max_files = int(max_files)
+        self.max_indexes = int(max_indexes)
+        self.use_hash = bool(use_hash)
+        self._files: "OrderedDict[str, _FileEntry]" = OrderedDict()
+        self._indexes: "OrderedDict[Tuple[Tuple[str, Stamp], ...], ZoneIndex]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    # ---- ключи ----
+    def _stamp(self, path: Path) -> Stamp:
+        st = path.stat()
+        if not self.use_hash:
+            return (st.st_mtime_ns, st.st_size)
+        h = hashlib.blake2b(digest_size=16)
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return (st.st_size, h.hexdigest())
+
+    # ---- файлы ----
+    def _entry(self, path: Path) -> Optional[_FileEntry]:
+        key = str(path.resolve())
+        try:
+            stamp = self._stamp(path)
+        except OSError as e:
+            print(f"[WARN] Cannot stat zone file {path}: {e}")
+            return None
+
+        entry = self._files.get(key)
+        if entry is not None and entry.stamp == stamp:
+            self._files.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        features = _load_geojson_file(path)
+        geoms, props = build_zone_geometries(features)
+        entry = _FileEntry(stamp=stamp, features=features, geoms=geoms, props=props)
+        self._files[key] = entry
+        self._files.move_to_end(key)
+        while len(self._files) > self.max_files:
+            self._files.popitem(last=False)
+        return entry
+
+    def _entries(self, paths: Sequence[PathLike]) -> List[Tuple[str, _FileEntry]]:
+        out: List[Tuple[str, _FileEntry]] = []
+        for fp in expand_zone_paths([Path(p) for p in paths]):
+            entry = self._entry(fp)
+            if entry is not None:
+                out.append((str(fp.resolve()), entry))
+        return out
+
+    # ---- публичный API ----
+    def features(self, paths: Sequence[PathLike]) -> List[Dict[str, Any]]:
+        """Аналог load_zones(): список GeoJSON-фич, но без повторного парсинга."""
+        with self._lock:
+            zones: List[Dict[str, Any]] = []
+            for _, entry in self._entries(paths):
+                zones.extend(entry.features)
+            return zones
+
+    def index(self, paths: Sequence[PathLike]) -> ZoneIndex:
+        """ZoneIndex по набору файлов/каталогов; пересобирается только при изменении файлов."""
+        with self._lock:
+            entries = self._entries(paths)
+            key = tuple((k, e.stamp) for k, e in entries)
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+
+            if entries:
+                geoms = np.concatenate([e.geoms for _, e in entries])
+            else:
+                geoms = np.empty(0, dtype=object)
+            props = [p for _, e in entries for p in e.props]
+            index = ZoneIndex.from_geometries(geoms, props)
+
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+            return index
+
+    def invalidate(self, path: Optional[PathLike] = None) -> None:
+        """Сбросить кэш целиком или по одному файлу."""
+        with self._lock:
+            if path is None:
+                self._files.clear()
+                self._indexes.clear()
+                return
+            key = str(Path(path).resolve())
+            self._files.pop(key, None)
+            for k in [k for k in self._indexes if any(name == key for name, _ in k)]:
+                del self._indexes[k]
+
+
+_default_store = ZoneStore()
+
+
+def get_zone_store() -> ZoneStore:
+    """Общий для процесса ZoneStore."""
+    return _default_store
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+Бинарный пакет UAS-зон (*.wkzp) — предкомпилированный набор зон для быстрого
+холодного старта сервиса compliance.
+
+Содержимое пакета:
+  • WKB-геометрии зон (декодируются лениво, при первом попадании)
+  • таблица properties (JSON по каждой зоне, декодируется лениво)
+  • bbox каждой зоны
+  • сериализованный пространственный индекс: упакованное STR-дерево
+    (перестановка зон + bbox узлов по node_size зон)
+
+Загрузка — через mmap: при открытии читается только заголовок, массивы
+bbox/индекса отображаются на файл без копирования.
+
+CLI:
+  python -m agents.compliance.zone_pack build config/uas_zones -o config/uas_zones.wkzp
+  python -m agents.compliance.zone_pack info config/uas_zones.wkzp
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+from agents.compliance.uas_zones_loader import load_zones
+from agents.compliance.uas_zones_check import (
+    ZoneHit,
+    ZoneIndex,
+    _is_permissive,
+    _zone_hit,
+    build_zone_geometries,
+)
+
+MAGIC = b"WKZP"
+VERSION = 1
+FLAG_PERMISSIVE = 0x01
+
+# magic, version, reserved, n_zones, node_size, n_nodes,
+# смещения секций: bbox, perm, node_bbox, flags, wkb_index, wkb_data, props_index, props_data
+_HEADER = struct.Struct("<4sHHQII8Q")
+_ALIGN = 8
+
+
+def _str_order(bboxes: np.ndarray, node_size: int) -> np.ndarray:
+    """Порядок зон по Sort-Tile-Recursive: срезы по X, внутри среза — по Y."""
+    n = len(bboxes)
+    if n == 0:
+        return np.empty(0, dtype=np.uint32)
+    cx = (bboxes[:, 0] + bboxes[:, 2]) * 0.5
+    cy = (bboxes[:, 1] + bboxes[:, 3]) * 0.5
+    n_nodes = -(-n // node_size)
+    n_slices = max(1, int(np.ceil(np.sqrt(n_nodes))))
+    slice_len = node_size * -(-n_nodes // n_slices)
+    rank_x = np.empty(n, dtype=np.int64)
+    rank_x[np.argsort(cx, kind="stable")] = np.arange(n)
+    return np.lexsort((cy, rank_x // slice_len)).astype(np.uint32)
+
+
+def _node_bboxes(leaf_bboxes: np.ndarray, node_size: int) -> np.ndarray:
+    """bbox узлов: объединение bbox каждых node_size зон (в порядке perm)."""
+    n = len(leaf_bboxes)
+    if n == 0:
+        return np.empty((0, 4), dtype=np.float64)
+    starts = np.arange(0, n, node_size)
+    return np.column_stack([
+        np.minimum.reduceat(leaf_bboxes[:, 0], starts),
+        np.minimum.reduceat(leaf_bboxes[:, 1], starts),
+        np.maximum.reduceat(leaf_bboxes[:, 2], starts),
+        np.maximum.reduceat(leaf_bboxes[:, 3], starts),
+    ])
+
+
+def _offsets(chunks: Sequence[bytes]) -> np.ndarray:
+    off = np.zeros(len(chunks) + 1, dtype=np.uint64)
+    np.cumsum([len(c) for c in chunks], out=off[1:])
+    return off
+
+
+def compile_zone_pack(paths: Sequence[Union[str, Path]], out_path: Union[str, Path],
+                      node_size: int = 16) -> int:
+    """
+    Компилирует GeoJSON-файлы/каталоги зон в один бинарный пакет.
+
+    Args:
+        paths: файлы или каталоги (как для load_zones)
+        out_path: путь к создаваемому *.wkzp
+        node_size: число зон в узле индекса
+
+    Returns:
+        число зон в пакете
+    """
+    if node_size < 2:
+        raise ValueError("node_size must be >= 2")
+    features = load_zones([Path(p) for p in paths])
+    geoms, props = build_zone_geometries(features)
+    n = len(props)
+
+    wkbs = list(shapely.to_wkb(geoms)) if n else []
+    props_blobs = [json.dumps(p, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                   for p in props]
+    bboxes = shapely.bounds(geoms).astype(np.float64) if n else np.empty((0, 4))
+    flags = np.array([FLAG_PERMISSIVE if _is_permissive(p) else 0 for p in props], dtype=np.uint8)
+    perm = _str_order(bboxes, node_size)
+    node_bbox = _node_bboxes(bboxes[perm], node_size)
+
+    sections = [
+        np.ascontiguousarray(bboxes, dtype="<f8").tobytes(),
+        perm.astype("<u4").tobytes(),
+        np.ascontiguousarray(node_bbox, dtype="<f8").tobytes(),
+        flags.tobytes(),
+        _offsets(wkbs).astype("<u8").tobytes(),
+        b"".join(wkbs),
+        _offsets(props_blobs).astype("<u8").tobytes(),
+        b"".join(props_blobs),
+    ]
+
+    offsets: List[int] = []
+    pos = _HEADER.size
+    for data in sections:
+        pos += -pos % _ALIGN
+        offsets.append(pos)
+        pos += len(data)
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, n, node_size, len(node_bbox), *offsets))
+        for off, data in zip(offsets, sections):
+            f.write(b"\0" * (off - f.tell()))
+            f.write(data)
+
+    print(f"[OK] {out_path}: {n} zone(s) packed, {len(node_bbox)} index node(s)")
+    return n
+
+
+class ZonePack:
+    """
+    Загрузчик *.wkzp через mmap. Геометрии и properties декодируются лениво
+    и кэшируются; запрос возвращает те же словари попаданий, что ZoneIndex.query().
+
+    Пример:
+        with ZonePack("config/uas_zones.wkzp") as pack:
+            hits = pack.query(mission_poly, flight_alt_m=80)
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = self.path.open("rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # пустой файл
+            self._file.close()
+            raise ValueError(f"Not a zone pack: {self.path}")
+
+        if len(self._mm) < _HEADER.size:
+            self.close()
+            raise ValueError(f"Not a zone pack: {self.path}")
+        (magic, version, _reserved, n, node_size, n_nodes,
+         o_bbox, o_perm, o_node, o_flags, o_wkb_idx, o_wkb, o_props_idx, o_props) = \
+            _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Not a zone pack: {self.path}")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported zone pack version {version} in {self.path}")
+
+        buf = self._mm
+        self.node_size = node_size
+        self.bboxes = np.frombuffer(buf, dtype="<f8", count=4 * n, offset=o_bbox).reshape(n, 4)
+        self.perm = np.frombuffer(buf, dtype="<u4", count=n, offset=o_perm)
+        self.node_bboxes = np.frombuffer(buf, dtype="<f8", count=4 * n_nodes, offset=o_node).reshape(n_nodes, 4)
+        self.permissive = np.frombuffer(buf, dtype=np.uint8, count=n, offset=o_flags) & FLAG_PERMISSIVE != 0
+        self._wkb_index = np.frombuffer(buf, dtype="<u8", count=n + 1, offset=o_wkb_idx)
+        self._props_index = np.frombuffer(buf, dtype="<u8", count=n + 1, offset=o_props_idx)
+        self._wkb_base = o_wkb
+        self._props_base = o_props
+        self._n = n
+
+        self._geoms: Dict[int, Any] = {}
+        self._props: Dict[int, Dict[str, Any]] = {}
+
+    # ---- жизненный цикл ----
+    def close(self) -> None:
+        # numpy-представления держат ссылки на mmap — отпускаем их до закрытия
+        for name in ("bboxes", "perm", "node_bboxes", "_wkb_index", "_props_index"):
+            self.__dict__.pop(name, None)
+        try:
+            self._mm.close()
+        except (AttributeError, BufferError):
+            pass
+        self._file.close()
+
+    def __enter__(self) -> "ZonePack":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._n
+
+    # ---- ленивое декодирование ----
+    def geometry(self, i: int) -> Any:
+        g = self._geoms.get(i)
+        if g is None:
+            a = self._wkb_base + int(self._wkb_index[i])
+            b = self._wkb_base + int(self._wkb_index[i + 1])
+            g = shapely.from_wkb(self._mm[a:b])
+            shapely.prepare(g)
+            self._geoms[i] = g
+        return g
+
+    def properties(self, i: int) -> Dict[str, Any]:
+        p = self._props.get(i)
+        if p is None:
+            a = self._props_base + int(self._props_index[i])
+            b = self._props_base + int(self._props_index[i + 1])
+            p = json.loads(self._mm[a:b].decode("utf-8"))
+            self._props[i] = p
+        return p
+
+    # ---- запросы ----
+    def bbox_candidates(self, bounds: Sequence[float]) -> np.ndarray:
+        """Индексы зон (по возрастанию), чей bbox пересекает bounds=(minx, miny, maxx, maxy)."""
+        minx, miny, maxx, maxy = bounds
+        nb = self.node_bboxes
+        nodes = np.flatnonzero((nb[:, 0] <= maxx) & (nb[:, 2] >= minx) &
+                               (nb[:, 1] <= maxy) & (nb[:, 3] >= miny))
+        if nodes.size == 0:
+            return np.empty(0, dtype=np.int64)
+        ns = self.node_size
+        slots = (nodes[:, None] * ns + np.arange(ns)).ravel()
+        slots = slots[slots < self._n]
+        idx = self.perm[slots].astype(np.int64)
+        bb = self.bboxes[idx]
+        idx = idx[(bb[:, 0] <= maxx) & (bb[:, 2] >= minx) & (bb[:, 1] <= maxy) & (bb[:, 3] >= miny)]
+        idx.sort()
+        return idx
+
+    def candidates(self, geom: Any) -> np.ndarray:
+        """Индексы зон (по возрастанию), геометрия которых пересекает geom."""
+        idx = self.bbox_candidates(shapely.bounds(geom))
+        if idx.size == 0:
+            return idx
+        keep = [shapely.intersects(self.geometry(i), geom) for i in idx.tolist()]
+        return idx[np.asarray(keep, dtype=bool)]
+
+    def query(
+        self,
+        mission_poly: Polygon,
+        *,
+        flight_alt_m: Optional[float] = None,
+        raise_on_first: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """То же, что ZoneIndex.query(), без построения всех геометрий."""
+        hits: List[Dict[str, Any]] = []
+        for i in self.bbox_candidates(shapely.bounds(mission_poly)).tolist():
+            # разрешающие зоны отбрасываем до декодирования геометрии
+            if self.permissive[i]:
+                continue
+            if not shapely.intersects(self.geometry(i), mission_poly):
+                continue
+            hit = _zone_hit(self.properties(i), flight_alt_m)
+            if hit is None:
+                continue
+            hits.append(hit)
+            if raise_on_first:
+                raise ZoneHit(hit["zone"], hit["reason"])
+        return hits
+
+    def to_index(self) -> ZoneIndex:
+        """Полный ZoneIndex (декодирует все геометрии) — для пакетных/траекторных проверок."""
+        geoms = [self.geometry(i) for i in range(self._n)]
+        props = [self.properties(i) for i in range(self._n)]
+        return ZoneIndex.from_geometries(geoms, props)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Компилятор бинарных пакетов UAS-зон (*.wkzp)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_build = sub.add_parser("build", help="GeoJSON-файлы/каталоги → *.wkzp")
+    p_build.add_argument("paths", nargs="+", help="GeoJSON-файлы или каталоги (напр. config/uas_zones)")
+    p_build.add_argument("-o", "--output", required=True, help="путь к пакету *.wkzp")
+    p_build.add_argument("--node-size", type=int, default=16, help="зон в узле индекса (по умолчанию 16)")
+
+    p_info = sub.add_parser("info", help="сводка по пакету")
+    p_info.add_argument("pack", help="путь к *.wkzp")
+
+    args = parser.parse_args(argv)
+    if args.cmd == "build":
+        compile_zone_pack(args.paths, args.output, node_size=args.node_size)
+        return 0
+
+    with ZonePack(args.pack) as pack:
+        n = len(pack)
+        print(f"{pack.path}: {n} zone(s), {len(pack.node_bboxes)} index node(s), "
+              f"{int(pack.permissive.sum())} permissive")
+        if n:
+            b = pack.bboxes
+            print(f"extent: lon {b[:, 0].min():.5f}..{b[:, 2].max():.5f}, "
+                  f"lat {b[:, 1].min():.5f}..{b[:, 3].max():.5f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
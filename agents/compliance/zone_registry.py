@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Реестр UAS-зон для долгоживущих сервисов с горячей перезагрузкой.
+
+Реестр следит за файлами зон (по умолчанию uas_zones.files из
+config/compliance.yaml) и при изменении файла сравнивает фичи по id:
+удалённые/изменённые зоны помечаются «мёртвыми» в базовом индексе,
+новые/изменённые попадают в небольшой дельта-индекс. Полная пересборка
+базового STRtree выполняется только при компактизации, когда дельта
+и «мёртвые» зоны превышают долю compact_ratio от базы.
+
+Читатели получают неизменяемый снимок (copy-on-write): каждая перезагрузка
+публикует новый ZoneSnapshot, а уже идущие проверки дорабатывают на старом
+и никогда не ждут перезагрузку.
+
+Пример:
+    registry = ZoneRegistry.from_config()
+    registry.start()                        # фоновый поллинг файлов
+    hits = registry.snapshot().query(mission_poly, flight_alt_m=80)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import yaml
+
+from agents.compliance.uas_zones_loader import IngestStats, _load_geojson_file, expand_zone_paths
+from agents.compliance.uas_zones_check import (
+    ZoneHit,
+    ZoneIndex,
+    _zone_hit,
+    build_zone_geometries,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]  # WebKurierDrone/
+DEFAULT_CONFIG = PROJECT_ROOT / "config" / "compliance.yaml"
+
+PathLike = Union[str, Path]
+ZoneKey = Tuple[str, str]  # (файл, id фичи)
+
+
+class ZoneSnapshot:
+    """
+    Неизменяемый снимок зон: базовый индекс + маска удалённых + дельта-индекс.
+    query() возвращает тот же набор попаданий, что ZoneIndex.query() по тем же зонам,
+    но порядок свой: сначала попадания базы, затем дельты.
+    """
+
+    def __init__(self, version: int, base: ZoneIndex, dead: np.ndarray, delta: ZoneIndex):
+        self.version = version
+        self.base = base
+        self.dead = dead
+        self.dead.setflags(write=False)
+        self.delta = delta
+
+    def __len__(self) -> int:
+        return len(self.base) - int(self.dead.sum()) + len(self.delta)
+
+    def query(
+        self,
+        mission_poly: Any,
+        *,
+        flight_alt_m: Optional[float] = None,
+        raise_on_first: bool = False,
+    ) -> List[Dict[str, Any]]:
+        hits: List[Dict[str, Any]] = []
+        for index, dead in ((self.base, self.dead), (self.delta, None)):
+            for i in index.candidates(mission_poly):
+                if index.permissive[i] or (dead is not None and dead[i]):
+                    continue
+                hit = _zone_hit(index.props[i], flight_alt_m)
+                if hit is None:
+                    continue
+                hits.append(hit)
+                if raise_on_first:
+                    raise ZoneHit(hit["zone"], hit["reason"])
+        return hits
+
+    def to_index(self) -> ZoneIndex:
+        """Плотный ZoneIndex по живым зонам (для пакетных/траекторных проверок)."""
+        alive = ~self.dead
+        geoms = np.concatenate([self.base.geoms[alive], self.delta.geoms])
+        props = [p for p, a in zip(self.base.props, alive) if a] + list(self.delta.props)
+        return ZoneIndex.from_geometries(geoms, props)
+
+
+def _feature_digest(feat: Dict[str, Any]) -> str:
+    raw = json.dumps(feat, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _feature_ids(features: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """(id, digest) каждой фичи; id — feature.id / properties.id / zone / name, иначе digest."""
+    out: List[Tuple[str, str]] = []
+    seen: Dict[str, int] = {}
+    for feat in features:
+        digest = _feature_digest(feat)
+        props = feat.get("properties") or {}
+        fid = feat.get("id") or props.get("id") or props.get("zone") or props.get("name") or digest
+        fid = str(fid)
+        n = seen.get(fid, 0)
+        seen[fid] = n + 1
+        out.append((fid if n == 0 else f"{fid}#{n}", digest))
+    return out
+
+
+class ZoneRegistry:
+    """
+    Реестр зон с инкрементальной перезагрузкой и снимками copy-on-write.
+
+    Args:
+        files: файлы или каталоги зон
+        poll_interval_s: период опроса mtime/size в фоновом потоке
+        compact_ratio: доля (дельта + удалённые) от базы, после которой база пересобирается
+        quiet: не печатать сообщения загрузчика
+    """
+
+    def __init__(self, files: Sequence[PathLike], *, poll_interval_s: float = 2.0,
+                 compact_ratio: float = 0.25, quiet: bool = True):
+        self.files = [Path(p) for p in files]
+        self.poll_interval_s = float(poll_interval_s)
+        self.compact_ratio = float(compact_ratio)
+        self.quiet = quiet
+
+        self._lock = threading.Lock()          # только для писателей
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._digests: Dict[str, Dict[str, str]] = {}     # файл → {id: digest}
+        self._base_pos: Dict[ZoneKey, int] = {}           # ключ → индекс в базе
+        self._delta: Dict[ZoneKey, Tuple[Any, Dict[str, Any]]] = {}
+        self._version = 0
+
+        with self._lock:
+            self._load_all()
+
+    @classmethod
+    def from_config(cls, config_path: PathLike = DEFAULT_CONFIG, **kwargs) -> "ZoneRegistry":
+        """Создать реестр по uas_zones.files из config/compliance.yaml (пути — от корня проекта)."""
+        config_path = Path(config_path)
+        with config_path.open("r", encoding="utf-8") as f:
+            cfg = yaml.safe_load(f) or {}
+        zones_cfg = cfg.get("uas_zones") or {}
+        if not zones_cfg.get("enabled", True):
+            return cls([], **kwargs)
+        root = config_path.resolve().parent.parent
+        files = [p if Path(p).is_absolute() else root / p for p in zones_cfg.get("files") or []]
+        return cls(files, **kwargs)
+
+    # ---- чтение ----
+    def snapshot(self) -> ZoneSnapshot:
+        """Текущий снимок; не блокируется перезагрузкой."""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def query(self, mission_poly: Any, **kwargs) -> List[Dict[str, Any]]:
+        return self._snapshot.query(mission_poly, **kwargs)
+
+    # ---- загрузка ----
+    def _watched_files(self) -> List[Path]:
+        return expand_zone_paths(self.files, quiet=True)
+
+    def _read(self, fp: Path) -> Optional[Tuple[List[Dict[str, Any]], List[Tuple[str, str]]]]:
+        """
+        Фичи файла и их (id, digest). None — файл не прочитан/не разобран (например, записан
+        наполовину): такой файл пропускается, прежние зоны и отметка (mtime, size) остаются.
+        """
+        stats = IngestStats()
+        features = _load_geojson_file(fp, quiet=self.quiet, stats=stats)
+        if stats.errors:
+            return None
+        return features, _feature_ids(features)
+
+    def _load_all(self) -> None:
+        features: List[Dict[str, Any]] = []
+        keys: List[ZoneKey] = []
+        self._stamps.clear()
+        self._digests.clear()
+        for fp in self._watched_files():
+            name = str(fp.resolve())
+            try:
+                st = fp.stat()
+            except OSError:
+                continue
+            read = self._read(fp)
+            if read is None:
+                continue  # без отметки — повторная попытка при следующем reload()
+            feats, ids = read
+            self._stamps[name] = (st.st_mtime_ns, st.st_size)
+            self._digests[name] = dict(ids)
+            features.extend(feats)
+            keys.extend((name, fid) for fid, _ in ids)
+        self._rebuild_base(features, keys)
+
+    def _rebuild_base(self, features: List[Dict[str, Any]], keys: List[ZoneKey]) -> None:
+        geoms, props, kept = [], [], []
+        for feat, key in zip(features, keys):
+            g, p = build_zone_geometries([feat])
+            if len(p):
+                geoms.append(g[0])
+                props.append(p[0])
+                kept.append(key)
+        base = ZoneIndex.from_geometries(geoms, props)
+        self._base_pos = {k: i for i, k in enumerate(kept)}
+        self._delta = {}
+        self._publish(base, np.zeros(len(base), dtype=bool))
+
+    def _publish(self, base: ZoneIndex, dead: np.ndarray) -> None:
+        delta = ZoneIndex.from_geometries([g for g, _ in self._delta.values()],
+                                          [p for _, p in self._delta.values()])
+        self._version += 1
+        # атомарная замена ссылки — читатели видят либо старый, либо новый снимок целиком
+        self._snapshot = ZoneSnapshot(self._version, base, dead, delta)
+
+    def reload(self) -> bool:
+        """
+        Проверить файлы и применить изменения инкрементально.
+        Возвращает True, если опубликован новый снимок.
+        """
+        with self._lock:
+            current = {str(fp.resolve()): fp for fp in self._watched_files()}
+            changed: List[str] = []
+            for name, fp in current.items():
+                try:
+                    st = fp.stat()
+                except OSError:
+                    continue
+                if self._stamps.get(name) != (st.st_mtime_ns, st.st_size):
+                    changed.append(name)
+            removed_files = [name for name in self._stamps if name not in current]
+            if not changed and not removed_files:
+                return False
+
+            snap = self._snapshot
+            dead = snap.dead.copy()
+            touched = False
+
+            def _drop(key: ZoneKey) -> None:
+                nonlocal touched
+                pos = self._base_pos.pop(key, None)
+                if pos is not None:
+                    dead[pos] = True
+                    touched = True
+                if self._delta.pop(key, None) is not None:
+                    touched = True
+
+            for name in removed_files:
+                for fid in self._digests.pop(name, {}):
+                    _drop((name, fid))
+                self._stamps.pop(name, None)
+
+            for name in changed:
+                fp = current[name]
+                try:
+                    st = fp.stat()
+                except OSError:
+                    continue
+                read = self._read(fp)
+                if read is None:
+                    continue  # ошибка чтения/разбора: оставляем прежние зоны файла
+                feats, ids = read
+                old = self._digests.get(name, {})
+                new = dict(ids)
+                for fid, digest in old.items():
+                    if new.get(fid) != digest:
+                        _drop((name, fid))
+                for feat, (fid, digest) in zip(feats, ids):
+                    if old.get(fid) == digest:
+                        continue
+                    g, p = build_zone_geometries([feat])
+                    if len(p):
+                        self._delta[(name, fid)] = (g[0], p[0])
+                        touched = True
+                self._digests[name] = new
+                self._stamps[name] = (st.st_mtime_ns, st.st_size)
+
+            if not touched:
+                return False  # файлы «тронуты», но содержимое зон не изменилось
+
+            churn = int(dead.sum()) + len(self._delta)
+            if churn and churn > self.compact_ratio * max(1, len(snap.base)):
+                self._compact(snap.base, dead)
+            else:
+                self._publish(snap.base, dead)
+            return True
+
+    def _compact(self, base: ZoneIndex, dead: np.ndarray) -> None:
+        """Полная пересборка базы из живых зон (дельта вливается в базу)."""
+        by_pos = sorted(self._base_pos.items(), key=lambda kv: kv[1])
+        geoms = [base.geoms[i] for _, i in by_pos] + [g for g, _ in self._delta.values()]
+        props = [base.props[i] for _, i in by_pos] + [p for _, p in self._delta.values()]
+        keys = [k for k, _ in by_pos] + list(self._delta.keys())
+        new_base = ZoneIndex.from_geometries(geoms, props)
+        self._base_pos = {k: i for i, k in enumerate(keys)}
+        self._delta = {}
+        self._publish(new_base, np.zeros(len(new_base), dtype=bool))
+
+    # ---- фоновое наблюдение ----
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval_s):
+            try:
+                if self.reload() and not self.quiet:
+                    print(f"[INFO] UAS zones reloaded: v{self.version}, {len(self._snapshot)} zone(s)")
+            except Exception as e:
+                print(f"[ERROR] UAS zone reload failed: {e}")
+
+    def start(self) -> "ZoneRegistry":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="uas-zone-registry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval_s + 1.0)
+            self._thread = None
+
+    def __enter__(self) -> "ZoneRegistry":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
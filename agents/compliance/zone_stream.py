@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Потоковая параллельная загрузка больших национальных наборов UAS-зон.
+
+Официальные выгрузки зон бывают в сотни МБ, поэтому файл не читается целиком:
+массив "features" разбирается инкрементально (json.JSONDecoder.raw_decode по
+скользящему буферу) и отдаётся чанками. Файлы распределяются по пулу процессов;
+воркеры строят геометрии и передают их в WKB через ограниченную очередь,
+а главный процесс сразу складывает их в ZoneIndexBuilder. Память ограничена
+размером чанка × глубиной очереди, а не размером файлов.
+
+Пример:
+    index, stats = ingest_zones([Path("config/uas_zones")], workers=4)
+    print(stats.summary())
+"""
+from __future__ import annotations
+
+import json
+import multiprocessing as mp
+import queue
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import shapely
+
+from agents.compliance.uas_zones_loader import IngestStats, _valid_features, expand_zone_paths
+from agents.compliance.uas_zones_check import ZoneIndex, ZoneIndexBuilder, build_zone_geometries
+
+_WS = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+class _StreamParser:
+    """Минимальный инкрементальный JSON-парсер верхнего уровня поверх текстового потока."""
+
+    def __init__(self, f: TextIO, block_size: int):
+        self.f = f
+        self.block_size = block_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, min_size: int = 0) -> None:
+        data = self.f.read(max(self.block_size, min_size))
+        if not data:
+            self.eof = True
+            return
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+
+    def _skip_ws(self) -> None:
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or self.eof:
+                return
+            self._fill()
+
+    def peek(self) -> str:
+        self._skip_ws()
+        if self.pos >= len(self.buf):
+            raise ValueError("Unexpected end of JSON")
+        return self.buf[self.pos]
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise ValueError(f"Expected '{ch}' at offset {self.pos}, got '{self.buf[self.pos]}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Разобрать одно JSON-значение, догружая буфер, пока значение не станет полным."""
+        self._skip_ws()
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self.buf, self.pos)
+                # число/литерал в самом конце буфера может продолжаться в следующем блоке
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # растём геометрически, чтобы крупные фичи не разбирались квадратично
+            self._fill(min_size=len(self.buf) - self.pos)
+
+
+def iter_geojson_features(path: Path, chunk_size: int = 5000,
+                          block_size: int = 1 << 20) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+    """
+    Потоково читает FeatureCollection и отдаёт чанки фич.
+    Ключи верхнего уровня до/после "features" пропускаются, не выходя за объём одного значения.
+
+    Yields:
+        (valid_features, skipped): корректные фичи чанка и число отброшенных в нём
+    """
+    with Path(path).open("r", encoding="utf-8") as f:
+        p = _StreamParser(f, block_size)
+        p.expect("{")
+        if p.peek() == "}":
+            return
+        while True:
+            key = p.value()
+            p.expect(":")
+            if key != "features":
+                p.value()
+            elif p.peek() != "[":
+                p.value()  # "features" не массив — как в load_zones: пропускаем
+            else:
+                p.expect("[")
+                chunk: List[Any] = []
+                if p.peek() != "]":
+                    while True:
+                        chunk.append(p.value())
+                        if len(chunk) >= chunk_size:
+                            valid = _valid_features(chunk)
+                            yield valid, len(chunk) - len(valid)
+                            chunk = []
+                        sep = p.peek()
+                        p.pos += 1
+                        if sep == "]":
+                            break
+                        if sep != ",":
+                            raise ValueError(f"Expected ',' or ']' in features array, got '{sep}'")
+                else:
+                    p.pos += 1
+                if chunk:
+                    valid = _valid_features(chunk)
+                    yield valid, len(chunk) - len(valid)
+            sep = p.peek()
+            p.pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise ValueError(f"Expected ',' or '}}' in top-level object, got '{sep}'")
+
+
+def _ingest_file(fp: Path, chunk_size: int) -> Iterator[Tuple[str, Any]]:
+    """Общий для in-process и воркеров цикл по одному файлу: ("chunk", (geoms, props)) / ("stats", IngestStats)."""
+    st = IngestStats(files=1, bytes_read=fp.stat().st_size)
+    try:
+        for feats, skipped in iter_geojson_features(fp, chunk_size=chunk_size):
+            geoms, props = build_zone_geometries(feats)
+            st.features += len(props)
+            st.skipped += skipped + len(feats) - len(props)
+            if props:
+                yield "chunk", (geoms, props)
+    except Exception as e:
+        st.errors.append((str(fp), str(e)))
+    yield "stats", st
+
+
+def _ingest_worker(files: List[str], q: "mp.Queue", chunk_size: int) -> None:
+    for name in files:
+        for kind, payload in _ingest_file(Path(name), chunk_size):
+            if kind == "chunk":
+                geoms, props = payload
+                payload = (shapely.to_wkb(geoms), props)
+            q.put((kind, payload))
+    q.put(("done", None))
+
+
+def ingest_zones(
+    paths: Sequence[Path],
+    *,
+    workers: Optional[int] = None,
+    chunk_size: int = 5000,
+    queue_depth: int = 4,
+    quiet: bool = True,
+) -> Tuple[ZoneIndex, IngestStats]:
+    """
+    Потоковая загрузка зон из файлов/каталогов прямо в ZoneIndex.
+
+    Args:
+        paths: файлы или каталоги (как для load_zones)
+        workers: число процессов; None/0/1 — в текущем процессе
+        chunk_size: фич в одном чанке
+        queue_depth: чанков в очереди на воркер (ограничивает память)
+        quiet: не печатать ничего; при quiet=False — только ошибки и итоговая сводка
+
+    При workers > 1 порядок зон в индексе зависит от порядка прихода чанков
+    (набор зон и результаты проверок — те же, что у load_zones).
+
+    Returns:
+        (index, stats)
+    """
+    t0 = time.perf_counter()
+    stats = IngestStats()
+    files = expand_zone_paths([Path(p) for p in paths], quiet=quiet, stats=stats)
+    builder = ZoneIndexBuilder()
+
+    n_workers = min(int(workers or 1), len(files))
+    if n_workers <= 1:
+        for fp in files:
+            for kind, payload in _ingest_file(fp, chunk_size):
+                if kind == "chunk":
+                    builder.add(*payload)
+                else:
+                    stats.merge(payload)
+    else:
+        # крупные файлы — первыми и по разным воркерам
+        files = sorted(files, key=lambda p: p.stat().st_size, reverse=True)
+        shards: List[List[str]] = [[] for _ in range(n_workers)]
+        for i, fp in enumerate(files):
+            shards[i % n_workers].append(str(fp))
+
+        ctx = mp.get_context()
+        q = ctx.Queue(maxsize=max(1, queue_depth * n_workers))
+        procs = [ctx.Process(target=_ingest_worker, args=(shard, q, chunk_size), daemon=True)
+                 for shard in shards]
+        for pr in procs:
+            pr.start()
+        done = 0
+        try:
+            while done < n_workers:
+                try:
+                    kind, payload = q.get(timeout=0.5)
+                except queue.Empty:
+                    if not any(pr.is_alive() for pr in procs):
+                        stats.errors.append(("<worker>", "ingest worker exited unexpectedly"))
+                        break
+                    continue
+                if kind == "chunk":
+                    wkbs, props = payload
+                    builder.add(shapely.from_wkb(wkbs), props)
+                elif kind == "stats":
+                    stats.merge(payload)
+                else:
+                    done += 1
+        finally:
+            for pr in procs:
+                pr.join(timeout=1.0)
+                if pr.is_alive():
+                    pr.terminate()
+
+    index = builder.build()
+    stats.seconds = time.perf_counter() - t0
+    if not quiet:
+        for src, err in stats.errors:
+            print(f"[ERROR] {src}: {err}")
+        print(f"[INFO] UAS zones: {stats.summary()}")
+    return index, stats
@@ -1,14 +1,2 @@
-from pathlib import Path
-import json
-from typing import List, Dict, Any
-
-def load_zones(paths: List[Path]) -> List[Dict[str, Any]]:
-    """Load UAS geo-zones from a list of GeoJSON files."""
-    zones: List[Dict[str, Any]] = []
-    for p in paths:
-        if not p.exists():
-            continue
-        with p.open("r", encoding="utf-8") as f:
-            gj = json.load(f)
-            zones.extend(gj.get("features", []))
-    return zones
\ No newline at end of file
+# Реэкспорт единого загрузчика зон: agents/compliance/uas_zones_loader.py
+from agents.compliance.uas_zones_loader import IngestStats, expand_zone_paths, load_zones  # noqa: F401
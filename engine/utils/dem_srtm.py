@@ -1,13 +1,289 @@
-# Лёгкая обёртка под высоты SRTM (offline-тайлы заранее положить в /data/srtm/)
-# В реальном проекте лучше использовать rasterio/xarray. Здесь простой каркас.
+# Высоты SRTM из offline-тайлов .hgt (заранее положить в data/srtm/)
+# Тайлы 1" (3601×3601) и 3" (1201×1201) — через numpy.memmap, без rasterio/GDAL:
+#   • LRU-кэш открытых тайлов (max_tiles), отсутствующие тайлы тоже кэшируются
+#   • пустоты (-32768) — билинейная интерполяция по оставшимся узлам
+#   • elevation_at(lat, lon) — скалярный путь для тика автопилота (единицы мкс)
+#   • elevation(lats, lons) — векторно, точки группируются по тайлам
+#   • profile(маршрут, spacing_m) — профиль рельефа и мин. запас высоты по плечам
+import math
 import os
-from typing import Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+HGT_VOID = -32768
+HGT_SIZES = {3601 * 3601 * 2: 3601, 1201 * 1201 * 2: 1201}
+
+M_PER_DEG = 111320.0
+
+def hgt_name(lat0: int, lon0: int) -> str:
+    """Имя тайла по юго-западному углу: N52E013.hgt."""
+    return f"{'N' if lat0 >= 0 else 'S'}{abs(lat0):02d}{'E' if lon0 >= 0 else 'W'}{abs(lon0):03d}.hgt"
+
+class TerrainClearanceError(ValueError):
+    """Маршрут проходит ниже допустимого запаса над рельефом."""
+
+@dataclass
+class TerrainProfile:
+    """Профиль рельефа вдоль маршрута: S сэмплов, L плеч."""
+    distance_m: np.ndarray            # (S,) от начала маршрута
+    lat: np.ndarray                   # (S,)
+    lon: np.ndarray                   # (S,)
+    elevation_m: np.ndarray           # (S,) рельеф ASL (NaN — пустота DEM)
+    alt_m: Optional[np.ndarray]       # (S,) высота маршрута ASL (линейно между точками) или None
+    segment: np.ndarray               # (S,) номер плеча (конец маршрута — последнее плечо)
+    clearance_m: np.ndarray           # (L,) мин. запас над рельефом по плечу (NaN — без высот)
+
+    @property
+    def min_clearance_m(self) -> float:
+        return float(np.nanmin(self.clearance_m)) if np.isfinite(self.clearance_m).any() else math.nan
+
+    @property
+    def max_elevation_m(self) -> float:
+        return float(np.nanmax(self.elevation_m)) if np.isfinite(self.elevation_m).any() else math.nan
+
+    @property
+    def worst_segment(self) -> int:
+        return int(np.nanargmin(self.clearance_m)) if np.isfinite(self.clearance_m).any() else -1
+
+    @property
+    def unknown_samples(self) -> int:
+        """Сэмплы, где запас не определён: пустота/нет тайла или неизвестная высота маршрута."""
+        bad = ~np.isfinite(self.elevation_m)
+        if self.alt_m is not None:
+            bad |= ~np.isfinite(self.alt_m)
+        return int(np.count_nonzero(bad))
+
+def sample_route(lats: Any, lons: Any, spacing_m: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Равномерные сэмплы по ломаной (шаг ≤ spacing_m, вершины — всегда в выборке), векторно.
+    Returns: (lat, lon, distance_m, segment, t — доля плеча, starts — индексы вершин в сэмплах).
+    """
+    lat = np.asarray(lats, dtype=float).ravel()
+    lon = np.asarray(lons, dtype=float).ravel()
+    n = len(lat)
+    if n < 2:
+        z = np.zeros(n, dtype=np.int64)
+        return lat.copy(), lon.copy(), np.zeros(n), z, np.zeros(n), z.copy()
+    kx = M_PER_DEG * np.cos(np.radians(0.5 * (lat[1:] + lat[:-1])))
+    leg = np.hypot(np.diff(lat) * M_PER_DEG, np.diff(lon) * kx)
+    counts = np.maximum(1, np.ceil(leg / spacing_m).astype(np.int64))
+    starts = np.concatenate([[0], np.cumsum(counts)])
+    seg = np.repeat(np.arange(n - 1), counts)
+    t = (np.arange(int(starts[-1])) - starts[:-1][seg]) / counts[seg]
+    s_lat = np.append(lat[seg] + t * (lat[seg + 1] - lat[seg]), lat[-1])
+    s_lon = np.append(lon[seg] + t * (lon[seg + 1] - lon[seg]), lon[-1])
+    dist = np.append(np.concatenate([[0.0], np.cumsum(leg)])[seg] + t * leg[seg], leg.sum())
+    return s_lat, s_lon, dist, np.append(seg, n - 2), np.append(t, 1.0), starts
 
 class DEM:
-    def __init__(self, root="data/srtm"):
+    def __init__(self, root="data/srtm", max_tiles: int = 16, missing_elev_m: float = math.nan):
+        """
+        root — каталог с .hgt; max_tiles — сколько тайлов держать открытыми;
+        missing_elev_m — высота там, где тайла нет: по умолчанию NaN («неизвестно», как пустота) —
+        автопилот берёт рельеф из сенсоров, проверка маршрута не проходит; 0.0 — только если
+        отсутствующие тайлы заведомо море (SRTM его не покрывает).
+        """
         self.root = root
+        self.max_tiles = max(1, int(max_tiles))
+        self.missing_elev_m = float(missing_elev_m)
+        self._tiles: "OrderedDict[Tuple[int, int], Optional[np.ndarray]]" = OrderedDict()
+        self._last_key: Optional[Tuple[int, int]] = None
+        self._last: Optional[np.ndarray] = None
+
+    # ---- тайлы ----
+    def _open(self, key: Tuple[int, int]) -> Optional[np.ndarray]:
+        path = os.path.join(self.root, hgt_name(*key))
+        if not os.path.exists(path):
+            return None
+        size = HGT_SIZES.get(os.path.getsize(path))
+        if size is None:
+            raise ValueError(f"{path}: unexpected .hgt size {os.path.getsize(path)} bytes")
+        # ndarray-представление memmap: без накладных расходов подкласса на индексацию
+        return np.memmap(path, dtype=">i2", mode="r", shape=(size, size)).view(np.ndarray)
+
+    def tile(self, lat0: int, lon0: int) -> Optional[np.ndarray]:
+        """Тайл с юго-западным углом (lat0, lon0) или None; LRU по обращениям."""
+        key = (lat0, lon0)
+        if key == self._last_key:
+            return self._last
+        tiles = self._tiles
+        if key in tiles:
+            tiles.move_to_end(key)
+            t = tiles[key]
+        else:
+            t = self._open(key)
+            tiles[key] = t
+            if len(tiles) > self.max_tiles:
+                old, _ = tiles.popitem(last=False)
+                if old == self._last_key:
+                    self._last_key = self._last = None
+        self._last_key, self._last = key, t
+        return t
+
+    def cached_tiles(self) -> int:
+        return len(self._tiles)
+
+    # ---- высоты ----
+    def elevation_at(self, lat: float, lon: float) -> float:
+        """Высота рельефа (м ASL) в точке; билинейно, пустоты — по валидным соседям.
+
+        Нечисловые координаты (нет GPS-фикса: NaN/inf) — NaN, а не исключение.
+        """
+        if not (math.isfinite(lat) and math.isfinite(lon)):
+            return math.nan
+        lat0, lon0 = math.floor(lat), math.floor(lon)
+        t = self.tile(lat0, lon0)
+        if t is None:
+            return self.missing_elev_m
+        n1 = t.shape[0] - 1
+        r = (lat0 + 1 - lat) * n1
+        c = (lon - lon0) * n1
+        r0 = min(int(r), n1 - 1)
+        c0 = min(int(c), n1 - 1)
+        fr, fc = r - r0, c - c0
+        item = t.item
+        z00, z01 = item(r0, c0), item(r0, c0 + 1)
+        z10, z11 = item(r0 + 1, c0), item(r0 + 1, c0 + 1)
+        w00, w01, w10, w11 = (1 - fr) * (1 - fc), (1 - fr) * fc, fr * (1 - fc), fr * fc
+        if HGT_VOID not in (z00, z01, z10, z11):
+            return w00 * z00 + w01 * z01 + w10 * z10 + w11 * z11
+        acc = wsum = 0.0
+        for z, w in ((z00, w00), (z01, w01), (z10, w10), (z11, w11)):
+            if z != HGT_VOID:
+                acc += w * z
+                wsum += w
+        return acc / wsum if wsum > 0 else math.nan
+
+    def elevation(self, lats: Any, lons: Any) -> np.ndarray:
+        """Высоты рельефа (м ASL) для массивов точек — одним вызовом, через границы тайлов."""
+        lats, lons = np.broadcast_arrays(np.asarray(lats, dtype=float), np.asarray(lons, dtype=float))
+        shape = lats.shape
+        lats, lons = lats.ravel(), lons.ravel()
+        out = np.full(lats.shape, self.missing_elev_m)
+        if not lats.size:
+            return out.reshape(shape)
+        ok = np.isfinite(lats) & np.isfinite(lons)
+        if not ok.all():                                  # нет фикса — NaN, как в elevation_at
+            out[~ok] = np.nan
+            out[ok] = self.elevation(lats[ok], lons[ok])
+            return out.reshape(shape)
+        lat0 = np.floor(lats).astype(np.int64)
+        lon0 = np.floor(lons).astype(np.int64)
+        keys, inv = np.unique(lat0 * 1000 + lon0, return_inverse=True)
+        if len(keys) == 1:
+            groups = [np.arange(lats.size)]
+        else:
+            order = np.argsort(inv, kind="stable")
+            groups = np.split(order, np.flatnonzero(np.diff(inv[order])) + 1)
+        for sel in groups:
+            la0, lo0 = int(lat0[sel[0]]), int(lon0[sel[0]])
+            t = self.tile(la0, lo0)
+            if t is not None:
+                out[sel] = self._bilinear(t, (la0 + 1 - lats[sel]), (lons[sel] - lo0))
+        return out.reshape(shape)
+
+    @staticmethod
+    def _bilinear(t: np.ndarray, dr: np.ndarray, dc: np.ndarray) -> np.ndarray:
+        n = t.shape[0]
+        r, c = dr * (n - 1), dc * (n - 1)
+        r0 = np.minimum(r.astype(np.int64), n - 2)
+        c0 = np.minimum(c.astype(np.int64), n - 2)
+        fr, fc = r - r0, c - c0
+        i = r0 * n + c0
+        flat = t.reshape(-1)
+        z = flat[np.stack([i, i + 1, i + n, i + n + 1])].astype(float)
+        void = z == HGT_VOID
+        if not void.any():
+            top = z[0] + fc * (z[1] - z[0])
+            return top + fr * (z[2] + fc * (z[3] - z[2]) - top)
+        w = np.stack([(1 - fr) * (1 - fc), (1 - fr) * fc, fr * (1 - fc), fr * fc])
+        w[void] = 0.0
+        z[void] = 0.0
+        wsum = w.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(wsum > 0, np.einsum("ij,ij->j", w, z) / wsum, np.nan)
+
+    def profile(self, route: Any, lons: Any = None, *, spacing_m: float = 30.0,
+                alts_m: Any = None, home_elev_m: Optional[float] = None) -> TerrainProfile:
+        """
+        Профиль рельефа вдоль маршрута.
+
+        route — WaypointArray (lat/lon/rel_alt; высоты ASL = rel_alt + home_elev_m,
+        по умолчанию дом — рельеф в первой точке) или массив широт вместе с lons
+        (тогда alts_m — высоты вершин ASL, опционально). Запас по плечу — минимум
+        (высота маршрута − рельеф) по его сэмплам, включая концы.
+        """
+        if lons is None:
+            lats, lons = route.lat, route.lon
+            rel = np.asarray(route.rel_alt, dtype=float)
+            home = self.elevation_at(float(lats[0]), float(lons[0])) if home_elev_m is None else home_elev_m
+            alts = rel + home if len(rel) else None
+        else:
+            lats = route
+            alts = None if alts_m is None else np.asarray(alts_m, dtype=float).ravel()
+        s_lat, s_lon, dist, seg, t, starts = sample_route(lats, lons, spacing_m)
+        elev = self.elevation(s_lat, s_lon)
+        n_seg = max(0, len(starts) - 1)
+        if alts is None or n_seg == 0:
+            return TerrainProfile(dist, s_lat, s_lon, elev, None, seg, np.full(n_seg, np.nan))
+        alt = alts[seg] + t * (alts[seg + 1] - alts[seg])
+        clear = alt - elev
+        seg_min = np.fmin(np.fmin.reduceat(clear[:-1], starts[:-1]), clear[starts[1:]])
+        return TerrainProfile(dist, s_lat, s_lon, elev, alt, seg, seg_min)
+
+    def check_clearance(self, route: Any, min_clearance_m: float, *, spacing_m: float = 30.0,
+                        home_elev_m: Optional[float] = None, allow_unknown: bool = False) -> TerrainProfile:
+        """
+        Профиль маршрута (WaypointArray); TerrainClearanceError, если запас < min_clearance_m.
+
+        Рельеф неизвестен (нет тайла, пустота DEM, пустота в точке дома) — тоже
+        TerrainClearanceError: запас не доказан. allow_unknown=True — проверять
+        только известные сэмплы.
+        """
+        prof = self.profile(route, spacing_m=spacing_m, home_elev_m=home_elev_m)
+        unknown = prof.unknown_samples
+        if unknown and not allow_unknown:
+            raise TerrainClearanceError(
+                f"terrain clearance unknown at {unknown} of {len(prof.distance_m)} samples "
+                f"(missing tile, DEM void or unknown home elevation)")
+        worst = prof.min_clearance_m
+        if worst < min_clearance_m:
+            raise TerrainClearanceError(
+                f"terrain clearance {worst:.1f} m < {min_clearance_m:.1f} m on leg {prof.worst_segment}")
+        return prof
 
     def altitude_agl(self, lat: float, lon: float, ref_home_alt_m: float) -> Optional[float]:
-        # TODO: прочитать нужный тайл HGT/GeoTIFF, интерполировать, вернуть alt AGL
-        # Заглушка — возвращаем ту же высоту: полёт на константной высоте
-        return ref_home_alt_m
\ No newline at end of file
+        """Высота над рельефом для высоты ASL ref_home_alt_m; None — рельеф неизвестен (пустота)."""
+        elev = self.elevation_at(lat, lon)
+        return None if math.isnan(elev) else ref_home_alt_m - elev
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    # синтетический тайл 1" для замера (настоящие тайлы — из data/srtm/)
+    with tempfile.TemporaryDirectory() as d:
+        yy, xx = np.mgrid[0:3601, 0:3601]
+        (300 + 100 * np.sin(xx / 400.0) * np.cos(yy / 300.0)).astype(">i2").tofile(os.path.join(d, hgt_name(52, 13)))
+        dem = DEM(d)
+        n = 20000
+        t0 = time.perf_counter()
+        for i in range(n):
+            dem.elevation_at(52.5 + i * 1e-6, 13.5)
+        print(f"elevation_at: {(time.perf_counter() - t0) / n * 1e6:.2f} µs/точка")
+        rng = np.random.default_rng(0)
+        lats, lons = rng.uniform(52, 53, 2_000_000), rng.uniform(13, 14, 2_000_000)
+        t0 = time.perf_counter()
+        dem.elevation(lats, lons)
+        dt = time.perf_counter() - t0
+        print(f"elevation: {lats.size / dt / 1e6:.1f} M точек/с")
+        # коридор ~50 км с шагом 5 м
+        route_lat, route_lon = np.array([52.05, 52.20, 52.18, 52.40]), np.array([13.05, 13.15, 13.35, 13.45])
+        t0 = time.perf_counter()
+        prof = dem.profile(route_lat, route_lon, spacing_m=5.0, alts_m=[700.0, 700.0, 650.0, 700.0])
+        print(f"profile: {prof.distance_m[-1] / 1000:.1f} км, {prof.distance_m.size} сэмплов за "
+              f"{(time.perf_counter() - t0) * 1000:.1f} мс, мин. запас {prof.min_clearance_m:.1f} м")
@@ -117,12 +117,19 @@ class MavlinkRadio:
           {"thrust":0..1, "pitch":-1..1, "roll":-1..1, "yaw":-1..1, "failsafe":bool, ...}
         и мапит в RC_OVERRIDE.
         """
-        thrust = float(cmd.get("thrust", 0.0))
-        pitch = float(cmd.get("pitch", 0.0))
-        roll = float(cmd.get("roll", 0.0))
-        yaw = float(cmd.get("yaw", 0.0))
+        self._apply(float(cmd.get("thrust", 0.0)), float(cmd.get("pitch", 0.0)),
+                    float(cmd.get("roll", 0.0)), float(cmd.get("yaw", 0.0)),
+                    bool(cmd.get("failsafe", False)))
 
-        if cmd.get("failsafe", False):
+    def apply_autopilot_command(self, cmd) -> None:
+        """
+        То же для быстрого тика: объект с атрибутами thrust/pitch/roll/yaw/failsafe
+        (agents.autopilot_ai.frames.AutopilotCommand) — без промежуточного dict.
+        """
+        self._apply(cmd.thrust, cmd.pitch, cmd.roll, cmd.yaw, cmd.failsafe)
+
+    def _apply(self, thrust: float, pitch: float, roll: float, yaw: float, failsafe: bool) -> None:
+        if failsafe:
             thrust = min(thrust, 0.3)
             pitch, roll, yaw = 0.1, 0.0, 0.0
 
@@ -0,0 +1,47 @@
+import random
+
+from agents.autopilot_ai.autopilot import Autopilot
+from agents.autopilot_ai.autopilot_aerobatics import AerobaticsAutopilot
+from agents.autopilot_ai.frames import AutopilotCommand, SensorFrame
+
+
+def _drive(ap_dict, ap_fast, steps=300):
+    r = random.Random(5)
+    cmd = AutopilotCommand()
+    alt = 80.0
+    for t in range(steps):
+        alt += r.gauss(0, 1)
+        sensors = {"baro_alt_m": alt, "airspeed": r.uniform(0, 25), "terrain_elev_m": 40.0,
+                   "lat": 52.0 + r.gauss(0, 0.003), "lon": 13.0, "rtk_fix": True}
+        sys = {"dt": 0.05, "battery_v": 23.0, "link_ok": not 100 < t < 160}
+        out = ap_dict.update(sensors, sys)
+        ap_fast.update_fast(SensorFrame.from_dicts(sensors, sys), cmd)
+        assert cmd.to_dict() == out
+
+
+def test_fast_path_matches_dict_api():
+    pilots = []
+    for cls in (Autopilot, AerobaticsAutopilot):
+        for ap in (cls(), cls()):
+            ap.set_home(52.0, 13.0, 40.0)
+            ap.set_geofence(52.0, 13.0, 600.0)
+            ap.set_mode("CRUISE", target_alt_m=100.0, target_airspeed_ms=18.0)
+            if isinstance(ap, AerobaticsAutopilot):
+                ap.set_profile("figure_eight")
+            pilots.append(ap)
+    _drive(pilots[0], pilots[1])
+    _drive(pilots[2], pilots[3])
+    assert pilots[2].mode == pilots[3].mode
+
+
+def test_command_reused_without_dicts():
+    ap = Autopilot()
+    ap.set_mode("HOLD_ALT", target_alt_m=50.0)
+    frame, cmd = SensorFrame(baro_alt_m=40.0, battery_v=23.0, dt=0.01), AutopilotCommand()
+    assert ap.update_fast(frame, cmd) is cmd
+    assert not hasattr(cmd, "__dict__") and not hasattr(frame, "__dict__")
+    assert 0.0 <= cmd.thrust <= 1.0 and cmd.course_offset_deg is None
+
+    frame.baro_ok = False  # баро пропал → BARO_FAULT
+    ap.update_fast(frame, cmd)
+    assert cmd.failsafe and cmd.failsafe_reason == "BARO_FAULT"
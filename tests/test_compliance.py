@@ -7,4 +7,216 @@ def test_zone_intersection():
     zones = load_zones([Path("config/uas_zones/de_sample.geojson")])
     mission_poly = Polygon([(13.40,52.50),(13.41,52.50),(13.41,52.51),(13.40,52.51)])
     hits = check_polygon_against_zones(mission_poly, zones)
-    assert isinstance(hits, list)
\ No newline at end of file
+    assert isinstance(hits, list)
+
+def test_zone_index_matches_linear_scan():
+    from shapely.geometry import shape
+    from agents.compliance.uas_zones_check import ZoneIndex
+
+    zones = load_zones([Path("config/uas_zones/de_sample.geojson"),
+                        Path("config/uas_zones/de_sample_training.geojson")])
+    index = ZoneIndex(zones)
+    mission_poly = Polygon([(13.39,52.47),(13.56,52.47),(13.56,52.525),(13.39,52.525)])
+
+    expected = [f["properties"]["zone"] for f in zones
+                if mission_poly.intersects(shape(f["geometry"]))
+                and not f["properties"].get("allow_flight")]
+    hits = index.query(mission_poly)
+    assert [h["zone"] for h in hits] == expected
+    assert hits == check_polygon_against_zones(mission_poly, zones)
+
+    # Tempelhof: max_altitude_m=50 → полёт на 40 м не нарушает ограничение
+    names = [h["zone"] for h in index.query(mission_poly, flight_alt_m=40)]
+    assert "ED-R200 Tempelhof" not in names
+    assert "ED-R100 Berlin" in names
+
+
+def test_zone_store_reparses_only_changed_files(tmp_path):
+    import os
+    import shutil
+    from agents.compliance.zone_cache import ZoneStore
+
+    a = tmp_path / "a.geojson"
+    b = tmp_path / "b.geojson"
+    shutil.copy("config/uas_zones/de_sample.geojson", a)
+    shutil.copy("config/uas_zones/pl_sample.geojson", b)
+
+    store = ZoneStore()
+    first = store.index([a, b])
+    assert store.misses == 2
+    assert store.index([a, b]) is first  # ничего не изменилось — тот же индекс
+    assert store.misses == 2
+
+    shutil.copy("config/uas_zones/de_sample_training.geojson", b)
+    os.utime(b, ns=(0, 10**18))  # гарантированно другой mtime
+    second = store.index([a, b])
+    assert store.misses == 3  # перечитан только b
+    assert second is not first
+    assert [p["zone"] for p in second.props][-1] == "DE-TRAINING-AREA-01"
+
+
+def test_zone_pack_matches_index(tmp_path):
+    from shapely.geometry import box
+    from agents.compliance.uas_zones_check import ZoneIndex
+    from agents.compliance.zone_pack import ZonePack, compile_zone_pack
+
+    pack_path = tmp_path / "zones.wkzp"
+    n = compile_zone_pack([Path("config/uas_zones")], pack_path, node_size=2)
+    index = ZoneIndex(load_zones([Path("config/uas_zones")]))
+    assert n == len(index)
+
+    with ZonePack(pack_path) as pack:
+        assert len(pack) == n
+        for x in (13.39, 13.55, 14.50, 20.97):
+            mission = box(x, 46.0, x + 0.02, 52.6)
+            for alt in (None, 40, 200):
+                assert pack.query(mission, flight_alt_m=alt) == index.query(mission, flight_alt_m=alt)
+        assert len(pack.to_index()) == n
+
+
+def test_trajectory_segments_and_altitude_bands():
+    from agents.compliance.uas_zones_check import ZoneIndex
+
+    def feature(name, x0, y0, **props):
+        ring = [[x0, y0], [x0 + 0.01, y0], [x0 + 0.01, y0 + 0.01], [x0, y0 + 0.01], [x0, y0]]
+        return {"type": "Feature", "properties": {"zone": name, **props},
+                "geometry": {"type": "Polygon", "coordinates": [ring]}}
+
+    index = ZoneIndex([
+        feature("CEIL-50", 13.00, 52.00, max_altitude_m=50),
+        feature("BAND-100-200", 13.02, 52.00, lower_altitude_m=100, upper_altitude_m=200),
+        feature("NFZ", 13.04, 52.00),
+    ])
+    # оба конца сегмента 0 вне зон, но сам сегмент пересекает CEIL-50 и BAND-100-200
+    lats = [52.005, 52.005, 52.005, 52.02]
+    lons = [12.99, 13.035, 13.045, 13.045]
+
+    hits = index.query_trajectory(lats, lons, [40, 40, 40, 40])
+    assert [(h["zone"], h["segment"]) for h in hits] == [("NFZ", 1)]
+
+    hits = index.query_trajectory(lats, lons, [60, 150, 150, 150])
+    assert [(h["zone"], h["segment"]) for h in hits] == [("CEIL-50", 0), ("BAND-100-200", 0), ("NFZ", 1)]
+
+    hits = index.query_trajectory(lats, lons, [250, 250, 250, 250])
+    assert [h["zone"] for h in hits] == ["CEIL-50", "NFZ"]
+
+
+def test_batch_matches_single_checks():
+    from shapely.geometry import box
+    from agents.compliance.uas_zones_check import ZoneIndex, check_polygons_against_zones
+
+    index = ZoneIndex(load_zones([Path("config/uas_zones")]))
+    missions = [box(x, 46.0 + 0.5 * k, x + 0.05, 52.6) for k in range(3)
+                for x in (13.37, 13.41, 13.56, 14.49, 20.95, 30.0)]
+    alts = [40.0 + 30 * (i % 4) for i in range(len(missions))]
+
+    res = check_polygons_against_zones(missions, index, flight_alt_m=alts)
+    assert res.matrix.shape == (len(missions), len(index))
+    for i, m in enumerate(missions):
+        assert res.hits_for(i) == index.query(m, flight_alt_m=alts[i])
+    assert res.clean.tolist() == [not index.query(m, flight_alt_m=a) for m, a in zip(missions, alts)]
+
+    pooled = check_polygons_against_zones(missions, index, flight_alt_m=alts, workers=2, chunk_size=5)
+    assert (pooled.matrix == res.matrix).all()
+
+
+def test_streaming_ingest_matches_load_zones(tmp_path):
+    import json
+    from agents.compliance.uas_zones_loader import IngestStats
+    from agents.compliance.zone_stream import ingest_zones, iter_geojson_features
+
+    src = json.loads(Path("config/uas_zones/pl_sample.geojson").read_text(encoding="utf-8"))
+    src["features"].append({"type": "Feature", "properties": {}, "geometry": None})
+    src["crs"] = {"type": "name", "properties": {"name": "EPSG:4326", "note": "\"features\": ["}}
+    big = tmp_path / "big.geojson"
+    big.write_text(json.dumps(src, indent=3), encoding="utf-8")
+
+    chunks = list(iter_geojson_features(big, chunk_size=1, block_size=7))
+    assert [f["properties"]["zone"] for c, _ in chunks for f in c] == \
+        [f["properties"]["zone"] for f in src["features"][:-1]]
+    assert sum(skipped for _, skipped in chunks) == 1
+
+    paths = [Path("config/uas_zones"), big]
+    expected = IngestStats()
+    zones = load_zones(paths, quiet=True, stats=expected)
+    index, stats = ingest_zones(paths)
+    assert [p["zone"] for p in index.props] == [f["properties"]["zone"] for f in zones]
+    assert (stats.files, stats.features, stats.skipped) == (expected.files, expected.features, expected.skipped)
+
+    pooled, pstats = ingest_zones(paths, workers=2, chunk_size=1)
+    assert sorted(p["zone"] for p in pooled.props) == sorted(p["zone"] for p in index.props)
+    assert pstats.features == stats.features and not pstats.errors
+
+
+def test_zone_registry_incremental_reload(tmp_path):
+    import json
+    import os
+    from shapely.geometry import box
+    from agents.compliance.zone_registry import ZoneRegistry
+
+    zf = tmp_path / "zones.geojson"
+    src = json.loads(Path("config/uas_zones/de_sample.geojson").read_text(encoding="utf-8"))
+    zf.write_text(json.dumps(src), encoding="utf-8")
+    berlin = box(13.385, 52.52, 13.39, 52.53)
+    tempelhof = box(13.405, 52.47, 13.41, 52.48)
+
+    reg = ZoneRegistry([zf], compact_ratio=10.0)
+    old = reg.snapshot()
+    assert [h["zone"] for h in old.query(berlin)] == ["ED-R100 Berlin"]
+
+    # Berlin удалён, Tempelhof изменён, добавлена новая зона
+    tempelhof_feat = src["features"][1]
+    tempelhof_feat["properties"]["max_altitude_m"] = 10
+    new_feat = json.loads(json.dumps(tempelhof_feat))
+    new_feat["properties"]["zone"] = "ED-R300 New"
+    zf.write_text(json.dumps({"type": "FeatureCollection", "features": [tempelhof_feat, new_feat]}),
+                  encoding="utf-8")
+    os.utime(zf, ns=(0, 10**18))
+    assert reg.reload()
+
+    snap = reg.snapshot()
+    assert snap.base is old.base  # без полной пересборки базы
+    assert snap.version == old.version + 1 and len(snap) == 2
+    assert snap.query(berlin) == []
+    assert [h["zone"] for h in snap.query(tempelhof, flight_alt_m=30)] == ["ED-R200 Tempelhof", "ED-R300 New"]
+    # старый снимок не изменился (copy-on-write)
+    assert [h["zone"] for h in old.query(berlin)] == ["ED-R100 Berlin"]
+    assert old.query(tempelhof, flight_alt_m=30) == []
+    assert not reg.reload()
+
+
+def test_zone_registry_keeps_zones_on_broken_file(tmp_path):
+    import json
+    import os
+    from shapely.geometry import box
+    from agents.compliance.zone_registry import ZoneRegistry
+
+    zf = tmp_path / "zones.geojson"
+    text = Path("config/uas_zones/de_sample.geojson").read_text(encoding="utf-8")
+    zf.write_text(text, encoding="utf-8")
+    berlin = box(13.385, 52.52, 13.39, 52.53)
+    reg = ZoneRegistry([zf])
+    v0 = reg.version
+
+    # файл записан наполовину — зоны и отметка файла не меняются
+    zf.write_text(text[: len(text) // 2], encoding="utf-8")
+    os.utime(zf, ns=(0, 10**18))
+    assert not reg.reload()
+    assert reg.version == v0 and [h["zone"] for h in reg.query(berlin)] == ["ED-R100 Berlin"]
+    assert not reg.reload()
+
+    # дописан тем же содержимым — перечитывается, зоны прежние
+    zf.write_text(text, encoding="utf-8")
+    os.utime(zf, ns=(0, 2 * 10**18))
+    reg.reload()
+    assert [h["zone"] for h in reg.query(berlin)] == ["ED-R100 Berlin"]
+    assert len(reg.snapshot()) == len(json.loads(text)["features"])
+
+
+def test_unified_engine_parity_small():
+    import engine.agents.compliance.uas_zones_check as engine_check
+    from agents.compliance import benchmark
+    from agents.compliance.uas_zones_check import ZoneIndex
+
+    assert engine_check.ZoneIndex is ZoneIndex
+    assert benchmark.run(n_zones=2000, n_missions=30, n_legacy=10, seed=3)
@@ -0,0 +1,48 @@
+from agents.autopilot_ai.autopilot import Autopilot
+from agents.autopilot_ai.control_loop import ControlLoop, load_tick_rate_hz
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+    def sleep(self, s):
+        self.t += s + 30e-6  # планировщик ОС будит с опозданием
+
+
+def test_tick_rate_from_config():
+    assert load_tick_rate_hz() == 100.0
+
+
+def test_fixed_rate_measured_dt_and_overrun_failsafe():
+    clock = FakeClock()
+    ap = Autopilot()
+    ap.set_home(52.0, 13.0, 40.0)
+    ap.set_mode("CRUISE", target_alt_m=100.0, target_airspeed_ms=18.0)
+    seen = []
+
+    def sensors(frame):
+        frame.baro_alt_m, frame.battery_v = 90.0, 23.0
+        # тики 50..54 «тяжёлые»: работа длиннее периода (15 мс при 10 мс)
+        clock.t += 0.015 if 50 <= len(seen) < 55 else 0.001
+
+    def actuator(cmd):
+        seen.append((cmd.mode, cmd.failsafe_reason, loop.frame.dt))
+
+    loop = ControlLoop(ap, sensors, [actuator], clock=clock, sleep=clock.sleep, spin_s=0.0)
+    stats = loop.run(max_ticks=200)
+
+    assert loop.rate_hz == 100.0 and stats.ticks == 200
+    assert stats.overruns == 5
+    # без overrun тик стартует точно по сетке, dt = период
+    assert abs(seen[10][2] - 0.01) < 1e-9
+    assert abs(seen[52][2] - 0.02) < 1e-9  # пропущенный слот отражён в реальном dt
+    assert 29.0 < stats.p50_us < 31.0 and stats.max_us < 31.0
+    assert stats.hist_counts[0] == 200  # все старты в пределах 50 мкс
+    # 3 overrun подряд → OVERRUN → RTL
+    reasons = [r for _, r, _ in seen]
+    assert "OVERRUN" in reasons and ap.mode == "RTL"
+    assert reasons.index("OVERRUN") == 53
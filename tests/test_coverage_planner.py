@@ -0,0 +1,55 @@
+import numpy as np
+
+from agents.autopilot_ai.coverage_planner import CameraSpec, plan_coverage
+from agents.autopilot_ai.geofence import LocalProjection, PreparedPolygon
+from agents.autopilot_ai.mission_grid import GridParams, generate_grid
+from agents.autopilot_ai.utm import from_utm, to_utm
+
+
+def test_utm_roundtrip_and_reference_point():
+    e, n, zone, north = to_utm(-33.8568, 151.2153)          # Sydney Opera House, 56H
+    assert (zone, north) == (56, False)
+    assert abs(e - 334900.6) < 1.0 and abs(n - 6252288.8) < 1.0
+    lats = np.linspace(40.0, 60.0, 50)
+    lons = np.linspace(9.5, 14.5, 50)
+    e, n, zone, north = to_utm(lats, lons, 33, True)
+    lat2, lon2 = from_utm(e, n, zone, north)
+    assert np.max(np.abs(lat2 - lats)) < 1e-7 and np.max(np.abs(lon2 - lons)) < 1e-7
+
+
+def test_camera_driven_spacing_and_heading_choice():
+    cam = CameraSpec()
+    p = GridParams(gsd_cm=2.0, front_overlap=0.8, side_overlap=0.7, speed_ms=15.0)
+    rect = [(52.0, 13.0), (52.0, 13.1), (52.01, 13.1), (52.01, 13.0)]  # вытянут на восток
+    plan = plan_coverage(rect, params=p, camera=cam, altitude_from_gsd=True)
+    assert abs(plan.gsd_cm - 2.0) < 1e-9
+    across, along = cam.footprint_m(plan.altitude_m)
+    assert abs(plan.line_spacing_m - 0.3 * across) < 1e-9
+    assert abs(plan.trigger_distance_m - 0.2 * along) < 1e-9
+    assert abs(plan.heading_deg - 90.0) <= 1.0 and plan.segments == plan.lines
+    fixed = plan_coverage(rect, params=p, camera=cam, altitude_from_gsd=True, heading_deg=0.0)
+    assert fixed.flight_time_s > plan.flight_time_s
+
+    # generate_grid теперь учитывает heading_deg
+    wps = generate_grid((52.0, 13.0, 52.01, 13.1), GridParams(heading_deg=90.0))
+    assert abs(wps[0].lat - wps[1].lat) < 1e-6 and abs(wps[0].lon - wps[1].lon) > 0.09
+
+
+def test_holes_are_skipped_on_large_field():
+    lat0, lon0 = 52.3, 13.1
+    a = np.linspace(0.0, 2 * np.pi, 1500, endpoint=False)
+    r = 0.018 * (1 + 0.15 * np.sin(5 * a))
+    field = list(zip(lat0 + r * np.sin(a), lon0 + 1.6 * r * np.cos(a)))
+    pond = [(lat0 + 0.004 * np.sin(t), lon0 + 0.0065 * np.cos(t)) for t in np.linspace(0, 2 * np.pi, 60, endpoint=False)]
+
+    plan = plan_coverage(field, holes=[pond])          # замер времени: python -m agents.autopilot_ai.coverage_planner
+    assert plan.area_ha > 1000
+
+    proj = LocalProjection(lat0, lon0)
+    hole = PreparedPolygon([[proj.to_xy(*p) for p in pond]])
+    outer = PreparedPolygon([[proj.to_xy(*p) for p in field]])
+    wps = plan.waypoints
+    for w0, w1 in zip(wps[0::2], wps[1::2]):  # отрезки съёмки: внутри поля, мимо пруда
+        for k in np.linspace(0.02, 0.98, 25):
+            x, y = proj.to_xy(w0.lat + k * (w1.lat - w0.lat), w0.lon + k * (w1.lon - w0.lon))
+            assert outer.contains(x, y) and not hole.contains(x, y)
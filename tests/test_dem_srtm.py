@@ -0,0 +1,196 @@
+import math
+
+import numpy as np
+import pytest
+
+from agents.autopilot_ai import autopilot_basic
+from agents.autopilot_ai.autopilot import Autopilot
+from agents.autopilot_ai.fleet_autopilot import FleetAutopilot
+from agents.autopilot_ai.mission_grid import WaypointArray
+from engine.utils.dem_srtm import DEM, HGT_VOID, TerrainClearanceError, hgt_name
+
+
+def _write_tile(root, lat0, lon0, size, fn):
+    yy, xx = np.mgrid[0:size, 0:size]
+    z = fn(lat0 + 1 - yy / (size - 1), lon0 + xx / (size - 1))   # строка 0 — северный край
+    z.astype(">i2").tofile(str(root / hgt_name(lat0, lon0)))
+
+
+def plane(lat, lon):
+    return np.round(100.0 + 300.0 * (lat - 52.0) + 200.0 * (lon - 13.0))
+
+
+def test_bilinear_across_tiles_voids_and_lru(tmp_path):
+    _write_tile(tmp_path, 52, 13, 1201, plane)       # 3"
+    _write_tile(tmp_path, 52, 14, 3601, plane)       # 1" — соседний тайл другого разрешения
+    dem = DEM(str(tmp_path), max_tiles=2)
+
+    rng = np.random.default_rng(1)
+    lats, lons = rng.uniform(52.0, 53.0, 5000), rng.uniform(13.0, 15.0, 5000)
+    z = dem.elevation(lats, lons)
+    assert np.max(np.abs(z - (100.0 + 300.0 * (lats - 52.0) + 200.0 * (lons - 13.0)))) < 1.0
+    for la, lo, zz in zip(lats[:200], lons[:200], z[:200]):
+        assert abs(dem.elevation_at(la, lo) - zz) < 1e-9
+    assert abs(dem.elevation_at(52.5, 14.0) - 450.0) < 0.5          # ровно на границе тайлов
+
+    # нет тайла — missing_elev_m; LRU не растёт выше max_tiles
+    assert np.isnan(dem.elevation_at(40.5, 13.5))
+    assert dem.cached_tiles() == 2
+
+    # пустоты: узлы -32768 не участвуют, полностью пустая ячейка — NaN
+    t = np.memmap(str(tmp_path / hgt_name(52, 13)), dtype=">i2", mode="r+", shape=(1201, 1201))
+    t[600, 600] = HGT_VOID
+    t[100:102, 100:102] = HGT_VOID
+    t.flush()
+    del t
+    dem = DEM(str(tmp_path))
+    lat, lon = 52.0 + 600.5 / 1200, 13.0 + 600.5 / 1200            # ячейка с одним пустым узлом
+    assert abs(dem.elevation_at(lat, lon) - float(plane(lat, lon))) < 2.0
+    assert math.isnan(dem.elevation_at(53.0 - 100.5 / 1200, 13.0 + 100.5 / 1200))
+    assert dem.altitude_agl(53.0 - 100.5 / 1200, 13.0 + 100.5 / 1200, 500.0) is None
+    assert np.isnan(dem.elevation([53.0 - 100.5 / 1200], [13.0 + 100.5 / 1200])).all()
+
+
+def test_autopilot_and_fleet_follow_dem(tmp_path):
+    _write_tile(tmp_path, 52, 13, 1201, plane)
+    dem = DEM(str(tmp_path))
+    ap = Autopilot()
+    ap.set_dem(dem)
+    ap.set_mode("CRUISE", target_alt_m=0.0, target_airspeed_ms=18.0)
+    ap.update({"baro_alt_m": 200.0, "airspeed": 18.0, "lat": 52.5, "lon": 13.5, "terrain_elev_m": 0.0},
+              {"battery_v": 24.0, "dt": 0.1})
+    assert abs(ap.alt_ctl.target_alt_m - (dem.elevation_at(52.5, 13.5) + ap.terrain.target_agl_m)) < 1e-9
+
+    fleet = FleetAutopilot(3)
+    fleet.dem = dem
+    fleet.set_mode("CRUISE", target_alt_m=0.0, target_airspeed_ms=18.0)
+    lat = np.array([52.2, 52.5, 40.0])                                # последний — вне тайлов
+    res = fleet.step(200.0, 24.0, 0.1, airspeed=18.0, lat=lat, lon=13.5, terrain_elev_m=7.0)
+    assert np.isnan(dem.elevation_at(40.0, 13.5))                     # нет тайла — «неизвестно», не 0 м
+    assert np.allclose(res["target_alt_m"][:2], dem.elevation(lat[:2], 13.5) + 60.0)
+    assert res["target_alt_m"][2] == 7.0 + 60.0                       # рельеф из сенсоров
+
+    # скалярный автопилот: вне тайлов — тоже сенсорный рельеф
+    ap.update({"baro_alt_m": 200.0, "airspeed": 18.0, "lat": 40.0, "lon": 13.5, "terrain_elev_m": 900.0},
+              {"battery_v": 24.0, "dt": 0.1})
+    assert ap.alt_ctl.target_alt_m == 900.0 + ap.terrain.target_agl_m
+    assert DEM(str(tmp_path), missing_elev_m=0.0).elevation_at(40.0, 13.5) == 0.0   # явно «море»
+
+
+def test_no_gps_fix_falls_back_to_sensor_terrain(tmp_path):
+    _write_tile(tmp_path, 52, 13, 1201, plane)
+    dem = DEM(str(tmp_path), missing_elev_m=0.0)
+    assert math.isnan(dem.elevation_at(math.nan, 13.5)) and math.isnan(dem.elevation_at(52.5, math.inf))
+    z = dem.elevation([52.5, math.nan, 52.5], [13.5, 13.5, -math.inf])
+    assert abs(z[0] - dem.elevation_at(52.5, 13.5)) < 1e-9 and np.isnan(z[1:]).all()
+
+    ap = Autopilot()
+    ap.set_dem(dem)
+    ap.set_mode("CRUISE", target_alt_m=0.0, target_airspeed_ms=18.0)
+    ap.update({"baro_alt_m": 200.0, "airspeed": 18.0, "lat": math.nan, "lon": math.nan, "terrain_elev_m": 40.0},
+              {"battery_v": 24.0, "dt": 0.1})
+    assert ap.alt_ctl.target_alt_m == 40.0 + ap.terrain.target_agl_m
+
+    fleet = FleetAutopilot(2)
+    fleet.dem = dem
+    fleet.set_mode("CRUISE", target_alt_m=0.0, target_airspeed_ms=18.0)
+    res = fleet.step(200.0, 24.0, 0.1, airspeed=18.0, lat=np.array([52.5, np.nan]), lon=13.5, terrain_elev_m=40.0)
+    assert res["target_alt_m"][1] == 40.0 + 60.0
+    assert abs(res["target_alt_m"][0] - (dem.elevation_at(52.5, 13.5) + 60.0)) < 1e-9
+
+
+def ridge(lat, lon):
+    return np.round(200.0 + 300.0 * np.exp(-((lon - 13.5) / 0.02) ** 2))
+
+
+def test_route_profile_clearance_gate_and_rtl_floor(tmp_path):
+    _write_tile(tmp_path, 52, 13, 1201, ridge)
+    dem = DEM(str(tmp_path))
+
+    lats, lons = np.array([52.5, 52.5, 52.6]), np.array([13.3, 13.7, 13.7])
+    prof = dem.profile(lats, lons, spacing_m=5.0, alts_m=[450.0, 450.0, 450.0])
+    assert np.all(np.diff(prof.distance_m) <= 5.0 + 1e-9) and prof.distance_m[-1] > 38000
+    assert np.allclose(prof.elevation_m, dem.elevation(prof.lat, prof.lon))
+    assert abs(prof.clearance_m[0] - (450.0 - 500.0)) < 2.0 and abs(prof.clearance_m[1] - 250.0) < 1e-6
+    assert prof.worst_segment == 0
+
+    # WaypointArray: rel_alt относительно дома (рельеф в первой точке — 200 м)
+    wps = WaypointArray.from_columns(lats, lons, 350.0)
+    assert dem.check_clearance(wps, 30.0).min_clearance_m > 30.0
+    with pytest.raises(TerrainClearanceError, match=r"terrain clearance -?\d+\.\d m < 30\.0 m on leg 0"):
+        dem.check_clearance(wps.offset(up_m=-300.0), 30.0)
+
+    # неизвестный рельеф не проходит проверку: маршрут с тайла наружу, пустота на маршруте, пустота дома
+    off_tile = WaypointArray.from_columns([52.5, 51.9], [13.3, 13.3], 350.0)
+    assert dem.profile(off_tile).unknown_samples > 0
+    with pytest.raises(TerrainClearanceError, match="terrain clearance unknown"):
+        dem.check_clearance(off_tile, 30.0)
+    dem.check_clearance(off_tile, 30.0, allow_unknown=True)          # явный флаг — только известные участки
+    with pytest.raises(TerrainClearanceError, match="unknown home elevation"):
+        dem.check_clearance(wps, 30.0, home_elev_m=math.nan)
+    (tmp_path / "void").mkdir()
+    _write_tile(tmp_path / "void", 52, 13, 1201, ridge)
+    t = np.memmap(str(tmp_path / "void" / hgt_name(52, 13)), dtype=">i2", mode="r+", shape=(1201, 1201))
+    t[599:602, 420:960] = HGT_VOID                                    # пустоты на первом плече (дом — вне)
+    t.flush()
+    del t
+    void_dem = DEM(str(tmp_path / "void"))
+    prof = void_dem.profile(wps)
+    assert prof.unknown_samples > 0 and np.isfinite(prof.min_clearance_m)
+    with pytest.raises(TerrainClearanceError, match="terrain clearance unknown"):
+        void_dem.check_clearance(wps, 30.0)
+    assert void_dem.check_clearance(wps, 30.0, allow_unknown=True).min_clearance_m > 30.0
+
+    # RTL через хребет: цель высоты поднимается до рельефа + AGL
+    ap = Autopilot()
+    ap.set_dem(dem)
+    ap.set_home(52.5, 13.3, 200.0)
+    ap.set_mode("RTL", target_alt_m=260.0)
+    ap.update({"baro_alt_m": 260.0, "lat": 52.5, "lon": 13.7}, {"battery_v": 24.0, "dt": 0.1})
+    assert abs(ap.alt_ctl.target_alt_m - (500.0 + ap.terrain.target_agl_m)) < 2.0
+
+
+def plateau(lat, lon):
+    return np.full_like(lat, 1500.0)
+
+
+@pytest.mark.parametrize("cls", [Autopilot, autopilot_basic.Autopilot])
+def test_rtl_floor_recomputed_on_reentry_and_kept_over_unknown_terrain(tmp_path, cls):
+    _write_tile(tmp_path, 52, 13, 1201, ridge)
+    (tmp_path / "high").mkdir()
+    _write_tile(tmp_path / "high", 52, 13, 1201, plateau)
+    dem, high = DEM(str(tmp_path)), DEM(str(tmp_path / "high"))
+    at_ridge = {"baro_alt_m": 260.0, "airspeed": 18.0, "lat": 52.5, "lon": 13.7}
+    sys = {"battery_v": 24.0, "dt": 0.1}
+
+    ap = cls()
+    ap.set_dem(dem)
+    ap.set_home(52.5, 13.3, 200.0)
+    agl = ap.terrain.target_agl_m
+    ap.set_mode("RTL", target_alt_m=260.0)
+    ap.update(at_ridge, sys)
+    assert abs(ap.alt_ctl.target_alt_m - (500.0 + agl)) < 2.0
+
+    # RTL → CRUISE → RTL над поднявшимся рельефом: пол считается заново
+    ap.set_mode("CRUISE", target_alt_m=300.0, target_airspeed_ms=18.0)
+    ap.update(at_ridge, sys)
+    ap.set_dem(high)
+    ap.set_mode("RTL", target_alt_m=100.0)
+    ap.update(at_ridge, sys)
+    assert abs(ap.alt_ctl.target_alt_m - (1500.0 + agl)) < 1e-6
+
+    # выход из RTL и возврат только по failsafe (без set_mode): BARO_FAULT → HOLD_ALT → LINK_LOSS → RTL
+    ap.set_dem(dem)
+    ap.update({k: v for k, v in at_ridge.items() if k != "baro_alt_m"}, sys)
+    assert ap.mode == "HOLD_ALT"
+    ap.update(at_ridge, {"battery_v": 24.0, "dt": 3.0, "link_ok": False})
+    assert ap.mode == "RTL" and abs(ap.alt_ctl.target_alt_m - (500.0 + agl)) < 2.0
+
+    # рельеф до дома неизвестен (дом вне тайлов, нет GPS-фикса) — не ниже цели + запаса
+    ap.set_home(51.9, 13.3, 0.0)
+    ap.set_mode("RTL", target_alt_m=900.0)
+    ap.update(at_ridge, sys)
+    assert ap.alt_ctl.target_alt_m == 900.0 + ap.rtl_unknown_margin_m
+    ap.set_mode("RTL", target_alt_m=300.0)
+    ap.update({**at_ridge, "lat": math.nan, "lon": math.nan}, sys)
+    assert ap.alt_ctl.target_alt_m == 300.0 + ap.rtl_unknown_margin_m
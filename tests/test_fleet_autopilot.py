@@ -0,0 +1,134 @@
+import numpy as np
+
+from agents.autopilot_ai.autopilot import Autopilot
+from agents.autopilot_ai.fleet_autopilot import FleetAutopilot, MODE_NAMES
+from agents.autopilot_ai.geofence import PolygonGeofence
+from engine.utils.dem_srtm import DEM, hgt_name
+
+
+def test_fleet_matches_scalar_autopilot():
+    n, steps, dt = 24, 300, 0.05
+    rng = np.random.default_rng(7)
+    fleet = FleetAutopilot(n)
+    pilots = [Autopilot() for _ in range(n)]
+
+    nfz = PolygonGeofence.from_zones(keep_out=[[[(52.001, 12.999), (52.001, 13.004), (52.003, 13.004),
+                                                (52.003, 12.999)]]])
+    modes = [MODE_NAMES[i % len(MODE_NAMES)] for i in range(n)]
+    for i, (ap, mode) in enumerate(zip(pilots, modes)):
+        alt, spd = 50.0 + i, 15.0 + i % 5
+        ap.use_terrain = fleet.use_terrain[i] = i % 3 != 0
+        ap.require_rtk = fleet.require_rtk[i] = i % 4 == 0
+        if i % 2:
+            ap.set_home(52.0, 13.0, 40.0)
+            fleet.set_home(52.0, 13.0, 40.0, idx=i)
+        if i % 5 == 0:
+            ap.set_geofence(52.0, 13.0, 500.0)
+            fleet.set_geofence(52.0, 13.0, 500.0, idx=i)
+        if i % 4 == 1:
+            ap.set_polygon_fence(nfz, margin_m=100.0)
+            fleet.set_polygon_fence(nfz, margin_m=100.0, idx=i)
+        ap.set_mode(mode, target_alt_m=alt, target_airspeed_ms=spd)
+        fleet.set_mode(mode, target_alt_m=alt, target_airspeed_ms=spd, idx=i)
+
+    fence_rtl = 0
+    baro = rng.uniform(0.0, 120.0, n)
+    for t in range(steps):
+        baro = baro + rng.normal(0.0, 1.0, n)
+        baro_in = np.where(rng.random(n) < 0.02, np.nan, baro)
+        batt = np.where(rng.random(n) < 0.01, 18.0, 23.0)
+        link = rng.random(n) > 0.3
+        if 100 <= t < 160:  # длительная потеря связи → LINK_LOSS
+            link[1::3] = False
+        rtk = rng.random(n) > 0.1
+        airspeed = rng.uniform(0.0, 25.0, n)
+        terrain = rng.uniform(0.0, 80.0, n)
+        lat = 52.0 + rng.normal(0.0, 0.004, n)
+        lon = 13.0 + rng.normal(0.0, 0.004, n)
+        manual = {"thrust": 0.3, "pitch": 0.1}
+        fence_rtl += sum(nfz.margin_m(lat[i], lon[i]) < 100.0 for i in range(1, n, 4))
+
+        fleet.step(baro_in, batt, dt, airspeed=airspeed, link_ok=link, rtk_fix=rtk,
+                   terrain_elev_m=terrain, lat=lat, lon=lon, manual_cmd=manual)
+        for i, ap in enumerate(pilots):
+            sensors = {"airspeed": airspeed[i], "terrain_elev_m": terrain[i],
+                       "lat": lat[i], "lon": lon[i], "rtk_fix": bool(rtk[i])}
+            if not np.isnan(baro_in[i]):
+                sensors["baro_alt_m"] = float(baro_in[i])
+            sys = {"dt": dt, "battery_v": float(batt[i]), "link_ok": bool(link[i])}
+            assert fleet.vehicle_output(i) == ap.update(sensors, sys, manual)
+            assert MODE_NAMES[fleet.mode[i]] == ap.mode
+    assert {"LAND", "RTL", "HOLD_ALT"} <= set(fleet.mode_names())
+    assert fence_rtl > 0  # запас до полигона меньше margin_m — RTL заранее тоже сверен
+
+
+def test_manual_vehicle_with_zero_dt_does_not_stop_fleet():
+    fleet = FleetAutopilot(3)
+    pilots = [Autopilot() for _ in range(3)]
+    for i, mode in enumerate(["MANUAL", "HOLD_ALT", "CRUISE"]):
+        fleet.set_mode(mode, target_alt_m=60.0, target_airspeed_ms=15.0, idx=i)
+        pilots[i].set_mode(mode, target_alt_m=60.0, target_airspeed_ms=15.0)
+    dt = np.array([0.0, 0.1, 0.1])
+    manual = {"thrust": 0.4}
+    for _ in range(3):
+        fleet.step(50.0, 23.0, dt, airspeed=12.0, manual_cmd=manual)
+        for i, ap in enumerate(pilots):
+            out = ap.update({"baro_alt_m": 50.0, "airspeed": 12.0}, {"dt": float(dt[i]), "battery_v": 23.0},
+                            manual)
+            assert fleet.vehicle_output(i) == out
+
+
+def _outputs(out):
+    return [out["thrust"], out["pitch"], out["targets"]["alt_m"], out["targets"]["airspeed_ms"]]
+
+
+def test_fleet_rtl_terrain_floor_matches_scalar(tmp_path):
+    size = 1201
+    lon_grid = 13.0 + np.mgrid[0:size, 0:size][1] / (size - 1)
+    ridge = np.round(200.0 + 300.0 * np.exp(-((lon_grid - 13.5) / 0.02) ** 2))   # хребет по 13.5°
+    ridge.astype(">i2").tofile(str(tmp_path / hgt_name(52, 13)))
+    dem = DEM(str(tmp_path))
+
+    n, dt = 8, 0.2
+    fleet = FleetAutopilot(n)
+    fleet.dem = dem
+    pilots = [Autopilot() for _ in range(n)]
+    homes = [(52.5, 13.3)] * 6 + [(51.9, 13.3), None]   # 6 — дом вне тайлов, 7 — без дома
+    for i, (ap, home) in enumerate(zip(pilots, homes)):
+        ap.set_dem(dem)
+        if home:
+            ap.set_home(*home, 200.0)
+            fleet.set_home(*home, 200.0, idx=i)
+        ap.set_mode("CRUISE", target_alt_m=260.0, target_airspeed_ms=18.0)
+    fleet.set_mode("CRUISE", target_alt_m=260.0, target_airspeed_ms=18.0)
+
+    for t in range(80):
+        lat = np.full(n, 52.5)
+        lon = 13.40 + 0.02 * np.arange(n) + 0.001 * t
+        if 15 <= t < 30:
+            lat[5] = np.nan                                 # нет GPS-фикса на входе в RTL
+        link = not 8 <= t < 30                              # LINK_LOSS → RTL
+        if t == 50:
+            fleet.set_mode("CRUISE", idx=slice(0, 4))
+            for ap in pilots[:4]:
+                ap.set_mode("CRUISE")
+        if t == 60:                                         # повторный вход: пол считается заново
+            fleet.set_mode("RTL", target_alt_m=100.0, idx=slice(0, 4))
+            for ap in pilots[:4]:
+                ap.set_mode("RTL", target_alt_m=100.0)
+
+        fleet.step(300.0, 23.0, dt, airspeed=18.0, link_ok=link, terrain_elev_m=150.0, lat=lat, lon=lon)
+        for i, ap in enumerate(pilots):
+            out = ap.update({"baro_alt_m": 300.0, "airspeed": 18.0, "terrain_elev_m": 150.0,
+                             "lat": lat[i], "lon": lon[i]},
+                            {"dt": dt, "battery_v": 23.0, "link_ok": link})
+            f = fleet.vehicle_output(i)
+            assert (f["mode"], f["failsafe_reason"]) == (out["mode"], out["failsafe_reason"])
+            np.testing.assert_allclose(_outputs(f), _outputs(out), rtol=0.0, atol=1e-6)
+        if t == 40:
+            assert fleet.mode_names() == ["RTL"] * 7 + ["HOLD_ALT"]
+            assert np.isfinite(fleet.rtl_floor_m[:7]).all()
+            assert fleet.target_alt_m[5] == 150.0 + 60.0 + 100.0        # без фикса: сенсорная цель + запас
+            assert fleet.target_alt_m[6] > 550.0                        # хребет на известном участке пути
+    assert (fleet.target_alt_m[:4] > 260.0).all() and (fleet.target_alt_m[2:4] > 550.0).all()
+    assert np.isnan(fleet.rtl_floor_m[7])
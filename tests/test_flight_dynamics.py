@@ -0,0 +1,77 @@
+import numpy as np
+
+from agents.autopilot_ai.flight_dynamics import AirframeParams, FlightDynamics, simulate_mission
+
+
+def test_params_from_spec():
+    p = AirframeParams.from_spec()
+    assert p.model == "FIXAR 007 NG" and p.mass_kg == 7.0
+    assert p.battery_wh == 25.0 * 27.0 and p.endurance_min == 60.0
+    assert p.cda_m2 > 0.0
+
+
+def test_hover_and_top_speed():
+    for method in ("rk4", "semi-implicit"):
+        dyn = FlightDynamics(3, method=method)
+        dyn.y[2] = 100.0
+        for _ in range(300):
+            dyn.step(dyn.p.hover_thrust, 0.0, dt=0.1)
+        np.testing.assert_allclose(dyn.altitude, 100.0, atol=1e-6)
+
+        dyn = FlightDynamics(2, AirframeParams.from_spec(wing_lift_frac=0.0), method=method)
+        dyn.y[2] = 100.0
+        for _ in range(3000):  # без крыла, pitch=1 → установившаяся скорость max_ms
+            dyn.step(dyn.p.hover_thrust, 1.0, dt=0.1)
+        np.testing.assert_allclose(dyn.groundspeed, dyn.p.max_ms, rtol=1e-3)
+        assert (dyn.soc < 1.0).all()
+
+
+def test_autopilot_mission_holds_cruise():
+    res = simulate_mission(8, duration_s=120.0, target_alt_m=100.0)
+    assert (res["mode"] == "CRUISE").all()
+    np.testing.assert_allclose(res["altitude"], 100.0, atol=5.0)
+    assert (res["airspeed"] > 12.0).all() and (res["soc"] > 0.9).all()
+
+
+def test_low_battery_leaves_reserve_to_land():
+    p = AirframeParams.from_spec()
+    assert abs(p.open_circuit_v(p.reserve_soc) - p.r_internal_ohm * p.cruise_power_w
+               / p.open_circuit_v(p.reserve_soc) - p.min_batt_v) < 1e-9
+    res = simulate_mission(1, duration_s=p.endurance_min * 60.0 * 1.2, params=p)
+    assert res["mode"].tolist() == ["LAND"]
+    t_land = res["t_land"][0]
+    assert 0.75 * p.endurance_min * 60.0 < t_land < p.endurance_min * 60.0   # крейсер ~до endurance_min
+    # LOW_BATTERY → LAND с резервом: через 2 мин аппарат на земле, заряд ≈ reserve_soc
+    landed = simulate_mission(1, duration_s=t_land + 120.0, params=p)
+    assert landed["altitude"][0] < 0.5 and landed["soc"][0] > 0.75 * p.reserve_soc
+
+
+def test_single_vehicle_scalar_path_matches_vector():
+    from agents.autopilot_ai.frames import SensorFrame
+
+    rng = np.random.default_rng(3)
+    one = FlightDynamics(1, wind_mean=(2.0, -1.0, 0.5))
+    two = FlightDynamics(2, wind_mean=(2.0, -1.0, 0.5))
+    for dyn in (one, two):
+        dyn.y[2] = 20.0
+        dyn.y[9] = 0.004                                                     # разрядится по ходу теста
+    frame = SensorFrame()
+    dead = grounded = 0
+    for k in range(800):
+        cmd = rng.uniform([0.0, -1.0, -0.5, -0.5], [0.8, 1.0, 0.5, 0.5])
+        if k % 100 < 30:
+            cmd[0] = 0.1                                                      # снижение до земли
+        ground = 3.0 if k > 400 else 0.0
+        one.fill_frame(frame, cmd[0])
+        s = two.sensors(cmd[0])
+        np.testing.assert_allclose([frame.baro_alt_m, frame.airspeed, frame.battery_v, frame.lat, frame.lon],
+                                   [s[k][0] for k in ("baro_alt_m", "airspeed", "battery_v", "lat", "lon")],
+                                   rtol=1e-12)
+        one.step_one(*cmd, dt=0.25, ground=ground)
+        two.step(*cmd, dt=0.25, ground_m=ground)
+        # все компоненты состояния: позиция, скорость, углы, SOC
+        np.testing.assert_allclose(one.y[:, 0], two.y[:, 0], rtol=1e-9, atol=1e-9)
+        dead += two.soc[0] == 0.0
+        grounded += two.altitude[0] == ground
+    assert dead > 100 and grounded > 10                                       # ветки «разряжен» и «на земле»
+    assert (two.y[:, 0] == two.y[:, 1]).all() and one.t == two.t
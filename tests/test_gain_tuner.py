@@ -0,0 +1,40 @@
+import numpy as np
+
+from agents.autopilot_ai.gain_tuner import (
+    GainTuner,
+    TuningConfig,
+    default_gains,
+    load_gains,
+    make_controllers,
+    save_gains,
+)
+
+
+def test_batched_evaluation_matches_single_candidate():
+    cfg = TuningConfig(duration_s=15.0, scenarios=3)
+    tuner = GainTuner(cfg=cfg, chunk=2)
+    base = default_gains()
+    cand = np.vstack([base, base * 0.5, base])
+    m = tuner.evaluate(cand)
+    assert m["cost"][0] == m["cost"][2]  # одни и те же сценарии для всех пачек
+    single = tuner.evaluate(base * 0.5)
+    np.testing.assert_allclose(single["cost"], m["cost"][1:2])
+
+
+def test_cmaes_improves_and_roundtrips_config(tmp_path):
+    cfg = TuningConfig(duration_s=20.0, scenarios=4)
+    with GainTuner(cfg=cfg, seed=1) as tuner:
+        res = tuner.cmaes(generations=4, popsize=6)
+    assert res.cost <= res.baseline_cost
+    assert len(res.history) == 5 and res.history == sorted(res.history, reverse=True)
+
+    path = tmp_path / "pid_gains.yaml"
+    save_gains(res, path)
+    other = res.__class__(**{**res.__dict__, "airframe": "FIXAR 025"})
+    save_gains(other, path)
+    assert set(load_gains(None, path)) == {"FIXAR 007 NG", "FIXAR 025"}
+
+    alt, spd = make_controllers("FIXAR 007 NG", path)
+    assert abs(alt.kp - res.gains["alt_kp"]) < 1e-4 and abs(spd.ki - res.gains["spd_ki"]) < 1e-4
+    alt, spd = make_controllers("unknown", path)
+    assert (alt.kp, spd.kp) == (0.9, 0.4)
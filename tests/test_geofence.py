@@ -0,0 +1,95 @@
+import math
+import random
+
+from agents.autopilot_ai.autopilot import Autopilot, Geofence
+from agents.autopilot_ai.geofence import LocalProjection, PolygonGeofence, PreparedPolygon
+
+
+def _ray_cast(rings, x, y):
+    inside = False
+    for ring in rings:
+        for i in range(len(ring)):
+            (x1, y1), (x2, y2) = ring[i - 1], ring[i]
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+    return inside
+
+
+def _brute_dist(rings, x, y):
+    best = math.inf
+    for ring in rings:
+        for i in range(len(ring)):
+            (x1, y1), (x2, y2) = ring[i - 1], ring[i]
+            dx, dy = x2 - x1, y2 - y1
+            t = max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / (dx * dx + dy * dy)))
+            best = min(best, math.hypot(x - x1 - t * dx, y - y1 - t * dy))
+    return best
+
+
+def test_prepared_polygon_matches_brute_force():
+    rnd = random.Random(7)
+    outer, r = [], 800.0
+    for i in range(400):  # рваный контур
+        a = 2 * math.pi * i / 400
+        r = min(1200.0, max(500.0, r + rnd.gauss(0.0, 40.0)))
+        outer.append((r * math.cos(a), r * math.sin(a)))
+    hole = [(150 * math.cos(2 * math.pi * k / 7), 150 * math.sin(2 * math.pi * k / 7)) for k in range(7)]
+    rings = [outer, hole]
+    poly = PreparedPolygon(rings)
+    for _ in range(3000):
+        x, y = rnd.uniform(-1400, 1400), rnd.uniform(-1400, 1400)
+        assert poly.contains(x, y) == _ray_cast(rings, x, y)
+        assert abs(poly.distance(x, y) - _brute_dist(rings, x, y)) < 1e-6
+        d = poly.distance(x, y, horizon=100.0)
+        assert d == _brute_dist(rings, x, y) or 100.0 <= d <= _brute_dist(rings, x, y) + 1e-9
+
+
+def test_fence_margin_and_navigator_config(tmp_path):
+    cfg = tmp_path / "navigator.yaml"
+    cfg.write_text(
+        "navigator:\n  geofence:\n    enabled: true\n    zones:\n"
+        "      - {name: field, type: polygon, kind: keep_in,\n"
+        "         coordinates: [[60.00, 10.00], [60.00, 10.04], [60.02, 10.04], [60.02, 10.00]]}\n"
+        "      - {name: NFZ, type: circle, center: [60.01, 10.02], radius_m: 200}\n",
+        encoding="utf-8")
+    fence = PolygonGeofence.from_navigator_config(cfg)
+    assert [z.name for z in fence.zones()] == ["field", "NFZ"]
+
+    margin, zone = fence.check(60.01, 10.02)          # центр NFZ
+    assert zone == "NFZ" and -200.5 < margin < -199.0
+    margin, zone = fence.check(60.0001, 10.03)        # ~11 м от южной границы поля
+    assert zone == "field" and 10.0 < margin < 12.0
+    assert not fence.inside(59.999, 10.03)
+
+    # на 60° долгота «короче» вдвое: 0.01° ≈ 556 м, а не 668 м, как с фактором 0.6
+    proj = LocalProjection(60.0, 10.0)
+    assert abs(proj.to_xy(60.0, 10.01)[0] - 556.6) < 1.0
+    assert Geofence(60.0, 10.0, 600.0).inside(60.0, 10.01)
+
+
+def test_autopilot_rtl_before_polygon_breach():
+    fence = PolygonGeofence.from_zones(keep_in=[[[(52.0, 13.0), (52.0, 13.1), (52.1, 13.1), (52.1, 13.0)]]])
+    ap = Autopilot()
+    ap.set_home(52.05, 13.05, 40.0)
+    ap.set_polygon_fence(fence, margin_m=100.0)
+    ap.set_mode("CRUISE", target_alt_m=120.0, target_airspeed_ms=18.0)
+    sensors = {"baro_alt_m": 120.0, "airspeed": 18.0, "lat": 52.05, "lon": 13.05}
+    sys_ = {"battery_v": 24.0, "dt": 0.1}
+    assert ap.update(sensors, sys_)["mode"] == "CRUISE"
+    sensors["lat"] = 52.1 - 50.0 / 111320.0           # ещё внутри, но ближе 100 м к границе
+    ap.update(sensors, sys_)
+    assert ap.mode == "RTL"
+
+
+def test_margin_beyond_horizon_does_not_trigger_early_rtl():
+    fence = PolygonGeofence(LocalProjection(52.0, 13.0))            # horizon_m = 200
+    fence.add_circle("field", 52.0, 13.0, 3000.0, keep_in=True, segments=720)
+    lat, lon = 51.99994, 12.99992                                    # ~2990 м до границы
+    assert fence.margin_m(lat, lon) < 2000.0                        # за горизонтом — лишь оценка снизу
+    ap = Autopilot()
+    ap.set_polygon_fence(fence, margin_m=2000.0)
+    assert fence.horizon_m >= 2000.0
+    assert fence.margin_m(lat, lon) >= 2000.0
+    ap.set_mode("CRUISE", target_alt_m=120.0, target_airspeed_ms=18.0)
+    ap.update({"baro_alt_m": 120.0, "airspeed": 18.0, "lat": lat, "lon": lon}, {"battery_v": 24.0, "dt": 0.1})
+    assert ap.mode == "CRUISE"
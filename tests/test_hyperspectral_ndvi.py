@@ -0,0 +1,74 @@
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from agents.autopilot_ai.envi_io import EnviImage
+from agents.autopilot_ai.hyperspectral_ndvi import compute_index_tiled, compute_ndvi, ndvi_kernel
+
+WL = [450.0, 550.0, 650.0, 720.0, 800.0]
+
+
+def _scene(tmp_path, interleave, lines=203, samples=97):
+    rng = np.random.default_rng(3)
+    cube = rng.integers(0, 4000, size=(len(WL), lines, samples)).astype(">u2")   # (bands, lines, samples)
+    cube[:, 0, 0] = 0                                                              # NIR+RED = 0
+    layout = {"bsq": (0, 1, 2), "bil": (1, 0, 2), "bip": (1, 2, 0)}[interleave]
+    np.ascontiguousarray(cube.transpose(layout)).tofile(str(tmp_path / f"s_{interleave}.img"))
+    hdr = tmp_path / f"s_{interleave}.hdr"
+    hdr.write_text(
+        "ENVI\ndescription = {synthetic}\n"
+        f"samples = {samples}\nlines = {lines}\nbands = {len(WL)}\nheader offset = 0\n"
+        f"data type = 12\ninterleave = {interleave}\nbyte order = 1\n"
+        "map info = {UTM, 1.000, 1.000, 390000.0, 5820000.0, 0.5, 0.5, 33, North, WGS-84, units=Meters}\n"
+        "wavelength units = Micrometers\n"
+        "wavelength = {" + ", ".join(f"{w / 1000:.3f}" for w in WL) + "}\n", encoding="utf-8")
+    red, nir = cube[2].astype(np.float32), cube[4].astype(np.float32)
+    return str(hdr), (nir - red) / (nir + red + 1e-6)
+
+
+def _read_png_gray(path):
+    raw = open(path, "rb").read()
+    pos, idat, (w, h) = 8, b"", (0, 0)
+    while pos < len(raw):
+        n = struct.unpack(">I", raw[pos:pos + 4])[0]
+        kind, data = raw[pos + 4:pos + 8], raw[pos + 8:pos + 8 + n]
+        if kind == b"IHDR":
+            w, h = struct.unpack(">II", data[:8])
+        elif kind == b"IDAT":
+            idat += data
+        pos += 12 + n
+    rows = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(h, w + 1)
+    assert not rows[:, 0].any()
+    return rows[:, 1:]
+
+
+@pytest.mark.parametrize("interleave", ["bsq", "bil", "bip"])
+def test_tiled_ndvi_matches_full_scene(tmp_path, interleave):
+    hdr, expected = _scene(tmp_path, interleave)
+    img = EnviImage.open(hdr)
+    assert (img.nearest_band(650), img.nearest_band(800)) == (2, 4) and img.epsg() == 32633
+
+    tif, png = str(tmp_path / "ndvi.tif"), str(tmp_path / "ndvi.png")
+    st = compute_index_tiled(img, [2, 4], ndvi_kernel, save_tif=tif, save_png=png, block_rows=16, workers=3)
+    assert st.blocks == 13 and st.valid == expected.size
+    assert abs(st.mean - float(expected.mean(dtype=np.float64))) < 1e-5
+    # пик памяти — буферы блоков, а не сцена
+    assert st.buffer_bytes < 6 * 3 * 16 * 97 * 4 + 16 * 97 + 1
+
+    # полосы TIFF лежат подряд сразу за заголовком
+    got = np.fromfile(tif, dtype="<f4", count=expected.size, offset=8).reshape(expected.shape)
+    assert np.allclose(got, expected, atol=1e-6)
+    raw = open(tif, "rb").read()
+    ifd = struct.unpack("<I", raw[4:8])[0]
+    tags = {struct.unpack("<H", raw[ifd + 2 + 12 * k:ifd + 4 + 12 * k])[0]
+            for k in range(struct.unpack("<H", raw[ifd:ifd + 2])[0])}
+    assert {256, 257, 273, 279, 33550, 33922, 34735} <= tags
+
+    u8 = _read_png_gray(png)
+    assert np.abs(u8.astype(int) - ((expected + 1.0) * 127.5).clip(0, 255).astype(np.uint8)).max() <= 1
+
+    # прежний API
+    assert compute_ndvi(hdr, save_png=str(tmp_path / "legacy.png"), workers=1) == str(tmp_path / "legacy.png")
+    assert np.array_equal(_read_png_gray(str(tmp_path / "legacy.png")), u8)
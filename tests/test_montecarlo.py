@@ -0,0 +1,17 @@
+import numpy as np
+
+from agents.autopilot_ai.montecarlo import ScenarioConfig, run_montecarlo
+
+
+def test_montecarlo_failsafe_and_determinism():
+    cfg = ScenarioConfig(duration_s=40.0, p_link_drop=0.6, p_baro_fault=0.3, battery_v0=(19.0, 24.0))
+    rep = run_montecarlo(96, batch_size=32, cfg=cfg, seed=3)
+    assert rep.failsafe_accuracy == 1.0
+    stats = rep.stats()
+    assert stats["failsafe_low_battery"] > 0 and stats["failsafe_link_loss"] > 0
+    assert stats["failsafe_baro_fault"] > 0
+    assert rep.converge_rate > 0.3  # аварии часто раньше выхода на высоту
+
+    par = run_montecarlo(96, batch_size=32, cfg=cfg, seed=3, workers=2)
+    for key, arr in rep.metrics.items():
+        np.testing.assert_array_equal(arr, par.metrics[key])
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from utils.pid import PID, PIDBank
+
+
+def test_pid_bank_matches_scalar_pid():
+    m = 18  # например, все вертикальные группы моторов
+    rng = np.random.default_rng(3)
+    kp, ki, kd = rng.uniform(0.1, 2.0, (3, m))
+    sp = rng.uniform(-5.0, 5.0, m)
+    pids = [PID(kp[i], ki[i], kd[i], sp[i], output_limits=(-1.0, 1.0),
+                integral_limits=(None if i % 2 else -0.3, 0.3)) for i in range(m)]
+    bank = PIDBank(m, kp, ki, kd, sp, output_limits=(-1.0, 1.0),
+                   integral_limits=(np.where(np.arange(m) % 2, -np.inf, -0.3), 0.3))
+
+    meas = np.zeros(m)
+    for step in range(200):
+        meas = meas + rng.normal(0.0, 0.5, m)
+        mask = rng.random(m) > 0.2
+        if step == 100:
+            bank.reset(mask)
+            for i in np.flatnonzero(mask):
+                pids[i].reset()
+        out = bank.update(meas, 0.02, mask=mask)
+        for i in np.flatnonzero(mask):
+            assert out[i] == pids[i].update(meas[i], 0.02)
+
+
+def test_pid_bank_rejects_bad_dt():
+    with pytest.raises(ValueError):
+        PIDBank(3, 1.0, 0.0, 0.0).update(np.zeros(3), 0.0)
+    bank = PIDBank(3, 1.0, 0.0, 1.0)
+    mask = np.array([True, False, True])
+    out = bank.update(np.ones(3), np.array([0.1, 0.0, 0.1]), mask=mask)   # dt неактивного контура не важен
+    assert out[0] == out[2] == PID(1.0, 0.0, 1.0).update(1.0, 0.1)
+    bank.update(np.ones(3), 0.0, mask=np.zeros(3, dtype=bool))
+    with pytest.raises(ValueError):
+        bank.update(np.ones(3), np.array([0.1, 0.1, 0.0]), mask=mask)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from agents.autopilot_ai.envi_io import EnviImage
+from agents.autopilot_ai.spectral_indices import SpectralIndexEngine, expr_bands
+
+WL = [475.0, 560.0, 668.0, 717.0, 842.0, 900.0]
+
+
+def _scene(tmp_path, lines=150, samples=64):
+    rng = np.random.default_rng(5)
+    cube = rng.integers(1, 10000, size=(lines, samples, len(WL))).astype("<u2")     # BIP
+    cube[0, :3, :] = 0
+    cube.tofile(str(tmp_path / "ms.dat"))
+    hdr = tmp_path / "ms.hdr"
+    hdr.write_text(f"ENVI\nsamples = {samples}\nlines = {lines}\nbands = {len(WL)}\ndata type = 12\n"
+                   "interleave = bip\nbyte order = 0\nwavelength units = Nanometers\n"
+                   "wavelength = {" + ", ".join(map(str, WL)) + "}\n", encoding="utf-8")
+    return str(hdr), {n: cube[:, :, i].astype(np.float64) * 1e-4
+                      for i, n in enumerate(["blue", "green", "red", "rededge", "nir"])}
+
+
+def test_five_indices_one_pass_each_band_read_once(tmp_path):
+    hdr, b = _scene(tmp_path)
+    img = EnviImage.open(hdr)
+    reads = []
+    orig = img.band_rows
+    img.band_rows = lambda band, r0, r1, out: reads.append((band, r0)) or orig(band, r0, r1, out)
+
+    eng = SpectralIndexEngine(img, ["ndvi", "ndre", "gndvi", "savi", "evi"], reflectance_scale=1e-4,
+                              use_numexpr=False)
+    assert eng.bands == {"nir": 4, "red": 2, "rededge": 3, "green": 1, "blue": 0}
+    stats = eng.run(str(tmp_path / "out"), png=True, block_rows=32, workers=2)
+    assert len(reads) == len(set(reads)) == 5 * 5                  # 5 каналов × 5 блоков, без повторов
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ref = {
+            "ndvi": (b["nir"] - b["red"]) / (b["nir"] + b["red"]),
+            "ndre": (b["nir"] - b["rededge"]) / (b["nir"] + b["rededge"]),
+            "gndvi": (b["nir"] - b["green"]) / (b["nir"] + b["green"]),
+            "savi": 1.5 * (b["nir"] - b["red"]) / (b["nir"] + b["red"] + 0.5),
+            "evi": 2.5 * (b["nir"] - b["red"]) / (b["nir"] + 6 * b["red"] - 7.5 * b["blue"] + 1.0),
+        }
+    for name, r in ref.items():
+        got = np.fromfile(str(tmp_path / "out" / f"{name}.tif"), dtype="<f4", count=r.size, offset=8).reshape(r.shape)
+        fin = np.isfinite(r)
+        assert np.array_equal(np.isfinite(got), fin), name
+        assert np.allclose(got[fin], r[fin], rtol=1e-3, atol=1e-5), name
+        assert stats[name].valid == int(fin.sum()) and abs(stats[name].mean - r[fin].mean()) < 1e-4
+        assert (tmp_path / "out" / f"{name}.png").stat().st_size > 0
+    assert stats["ndvi"].valid == stats["ndvi"].lines * stats["ndvi"].samples - 3   # 0/0 -> NaN
+
+
+def test_custom_expressions_and_validation(tmp_path):
+    hdr, b = _scene(tmp_path)
+    eng = SpectralIndexEngine(hdr, {"sr": "nir / red", "nir_sqrt": "sqrt(nir)"}, band_nm={"nir": 900.0})
+    assert eng.bands == {"nir": 5, "red": 2}
+    st = eng.run(None, block_rows=50, workers=1)
+    assert st["sr"].blocks == 3 and st["nir_sqrt"].max < 100.0
+
+    assert expr_bands("2.5 * (nir - red) / (nir + blue)") == ["nir", "red", "blue"]
+    with pytest.raises(ValueError):
+        expr_bands("__import__('os').system('x')")
+    with pytest.raises(ValueError):
+        SpectralIndexEngine(hdr, {"x": "swir / red"})
@@ -0,0 +1,138 @@
+import time
+
+import numpy as np
+
+from utils.telemetry_codec import (FRAME_SIZE, TELEMETRY_DTYPE, TelemetryDecoder, _fill_regex, encode, encode_frames,
+                                   parse_text_batch, to_dict)
+from utils.telemetry_parser import parse
+
+
+def _records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    rec = np.zeros(n, dtype=TELEMETRY_DTYPE)
+    rec["seq"] = np.arange(n)
+    rec["t_ms"] = np.arange(n) * 100
+    rec["lat"] = 52.1 + rng.normal(0, 1e-3, n)
+    rec["lon"] = 13.4 + rng.normal(0, 1e-3, n)
+    rec["alt_m"] = rng.uniform(50, 150, n)
+    rec["bat_pct"] = rng.uniform(10, 100, n)
+    rec["mode"] = rng.integers(0, 5, n)
+    return rec
+
+
+def test_roundtrip_and_single_frame():
+    rec = _records(100)
+    stream = encode_frames(rec)
+    assert len(stream) == 100 * FRAME_SIZE == 100 * 46
+    got = TelemetryDecoder().feed(stream)
+    rec["version"] = 1
+    assert got.dtype == TELEMETRY_DTYPE and np.array_equal(got, rec)
+
+    one = TelemetryDecoder().feed(encode(seq=7, lat=52.5, lon=13.3, alt_m=120, bat_pct=87))
+    d = to_dict(one[0])
+    assert d["seq"] == 7 and d["lat"] == 52.5 and d["bat_pct"] == 87.0 and "heading_deg" not in d
+
+
+def test_chunked_stream_with_garbage_and_bad_crc():
+    rng = np.random.default_rng(1)
+    rec = _records(300, seed=1)
+    frames = bytearray(encode_frames(rec))
+    bad = 123
+    frames[bad * FRAME_SIZE + 20] ^= 0xFF                            # порча внутри кадра 123
+    # мусор (с ложными magic) между кадрами
+    parts, expect = [], []
+    for i in range(300):
+        if i % 37 == 0:
+            parts.append(b"\xa5\x5a\x01" + bytes(rng.integers(0, 256, 17, dtype=np.uint8)))
+        parts.append(bytes(frames[i * FRAME_SIZE:(i + 1) * FRAME_SIZE]))
+        if i != bad:
+            expect.append(i)
+    stream = b"".join(parts)
+
+    for trial in range(5):
+        cuts = np.sort(rng.integers(0, len(stream), 40 if trial else 0))
+        cuts = [0, *cuts.tolist(), len(stream)]
+        dec = TelemetryDecoder()
+        out = [dec.feed(memoryview(stream)[a:b]) for a, b in zip(cuts[:-1], cuts[1:])]
+        got = np.concatenate(out)
+        assert got["seq"].tolist() == expect
+        assert dec.frames == 299 and dec.crc_errors >= 1
+        assert dec.skipped_bytes == len(stream) - 299 * FRAME_SIZE
+
+    # побайтовая подача тоже собирает кадры через хвост
+    dec = TelemetryDecoder()
+    chunk = encode_frames(rec[:3])
+    got = [r for i in range(len(chunk)) for r in dec.feed(chunk[i:i + 1])]
+    assert [int(r["seq"]) for r in got] == [0, 1, 2]
+
+
+def test_text_batch_matches_legacy_parser():
+    lines = [
+        "GPS:52.1,13.4;ALT:120;BAT:87%",
+        "ALT:95.5;GPS:52.2,13.5",
+        "GPS:oops;ALT:80;BAT:50",
+        "",
+        "SPD:12.5;HDG:270;BAT:bad%",
+    ]
+    out = parse_text_batch(lines)
+    assert out.shape == (5,) and out["seq"].tolist() == [0, 1, 2, 3, 4]
+    assert out["lat"][0] == 52.1 and out["lon"][0] == 13.4 and out["alt_m"][0] == 120 and out["bat_pct"][0] == 87
+    legacy = parse(lines[0])
+    assert float(legacy["alt"]) == out["alt_m"][0]
+    assert out["alt_m"][1] == np.float32(95.5) and out["lat"][1] == 52.2 and np.isnan(out["bat_pct"][1])
+    assert np.isnan(out["lat"][2]) and out["alt_m"][2] == 80 and out["bat_pct"][2] == 50
+    assert np.isnan(out["alt_m"][3])
+    assert out["airspeed_ms"][4] == 12.5 and out["heading_deg"][4] == 270 and np.isnan(out["bat_pct"][4])
+    assert parse_text_batch([]).size == 0
+
+
+def test_text_batch_layout_groups_match_regex_path():
+    # смесь раскладок, пробелов, чужих ключей и битых значений: быстрый путь == регулярки
+    rng = np.random.default_rng(3)
+    pool = ["GPS:52.{0},13.{1}", "ALT:{2}.5", "BAT:{3}%", "BAT:{3}", "SPD:{4}", "HDG:-{4}e1", " ALT : {2} ",
+            "GPS:oops", "ALT:", "ALT:1..2", "MODE:3", "BAT:bad%", "", "GPS:{0}", "HDG:.{1}"]
+    lines = []
+    for i in range(5000):
+        toks = [pool[j] for j in rng.choice(len(pool) if i % 4 == 0 else 6, rng.integers(1, 5))]
+        lines.append(";".join(toks).format(*rng.integers(0, 999, 5)))
+    lines += ["ALT:", ";ALT:;;"]
+    got = parse_text_batch(lines)
+    ref = parse_text_batch([""] * len(lines))
+    _fill_regex(ref, lines, np.arange(len(lines)))
+    for f in ("lat", "lon", "alt_m", "bat_pct", "airspeed_ms", "heading_deg"):
+        assert np.array_equal(got[f], ref[f], equal_nan=True), f
+    assert np.isnan(got["alt_m"][-1]) and np.isnan(got["alt_m"][-2])
+
+    nl = parse_text_batch(["ALT:7\nBAT:5", "ALT:8"])                      # перевод строки внутри строки
+    assert nl["alt_m"].tolist() == [7.0, 8.0] and nl["bat_pct"][0] == 5
+
+
+def test_text_batch_faster_than_legacy_parser():
+    rng = np.random.default_rng(0)
+    n = 20_000
+    lines = [f"GPS:{a:.6f},{b:.6f};ALT:{c:.1f};BAT:{d:.0f}%" for a, b, c, d in
+             zip(52.1 + rng.normal(0, 1e-3, n), 13.4 + rng.normal(0, 1e-3, n),
+                 rng.uniform(80, 120, n), rng.uniform(20, 100, n))]
+
+    def legacy():
+        rows = []
+        for line in lines:
+            d = parse(line)
+            lat, lon = d["gps"].split(",")
+            rows.append((float(lat), float(lon), float(d["alt"]), float(d["bat"].rstrip("%"))))
+        return rows
+
+    def best(fn):
+        out, dt = None, np.inf
+        for _ in range(3):
+            t = time.perf_counter()
+            out = fn()
+            dt = min(dt, time.perf_counter() - t)
+        return out, dt
+
+    ref, t_legacy = best(legacy)
+    got, t_batch = best(lambda: parse_text_batch(lines))
+    ref = np.array(ref)
+    assert np.array_equal(got["lat"], ref[:, 0]) and np.array_equal(got["lon"], ref[:, 1])
+    assert np.array_equal(got["alt_m"], ref[:, 2].astype(np.float32))
+    assert t_batch < t_legacy
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from agents.autopilot_ai.coverage_planner import plan_coverage
+from agents.autopilot_ai.mission_grid import GridParams, WaypointArray, terrain_follow
+from engine.utils.dem_srtm import DEM
+
+
+class RidgeDEM:
+    """Склон на восток + хребет поперёк линий; считает вызовы (выборка должна быть пакетной)."""
+    calls = 0
+
+    def elevation(self, lats, lons):
+        RidgeDEM.calls += 1
+        x = (np.asarray(lons) - 13.0) * 68000.0
+        return 200.0 + 0.02 * x + 60.0 * np.exp(-((x - 600.0) / 150.0) ** 2)
+
+
+def test_terrain_follow_holds_agl_within_tolerance():
+    dem = RidgeDEM()
+    wps = WaypointArray.from_columns([52.0, 52.0, 52.001, 52.001], [13.0, 13.02, 13.02, 13.0], 100.0)
+    RidgeDEM.calls = 0
+    out = terrain_follow(wps, dem, agl_m=100.0, tolerance_m=1.0, sample_m=5.0)
+    assert RidgeDEM.calls == 1
+    assert 4 < len(out) < 60                              # вставки только у хребта
+    for col in ("lat", "lon"):                            # исходные точки сохранены по порядку
+        assert np.isin(wps.data[col], out.data[col]).all()
+
+    # плотный профиль: линейная интерполяция высот миссии ≈ рельеф + AGL
+    home = float(dem.elevation(52.0, 13.0))
+    for i in range(len(out) - 1):
+        k = np.linspace(0.0, 1.0, 50)
+        lat = out.lat[i] + k * (out.lat[i + 1] - out.lat[i])
+        lon = out.lon[i] + k * (out.lon[i + 1] - out.lon[i])
+        alt = out.rel_alt[i] + k * (out.rel_alt[i + 1] - out.rel_alt[i])
+        assert np.max(np.abs(alt - (dem.elevation(lat, lon) - home + 100.0))) < 1.5
+
+
+def test_plan_coverage_with_dem():
+    rect = [(52.0, 13.0), (52.0, 13.02), (52.004, 13.02), (52.004, 13.0)]
+    p = GridParams(heading_deg=90.0, altitude_m=80.0)
+    flat = plan_coverage(rect, params=p, heading_deg=90.0)
+    follow = plan_coverage(rect, params=p, heading_deg=90.0, dem=RidgeDEM(), home_elev_m=150.0)
+    assert len(follow.waypoints) > len(flat.waypoints)
+    assert follow.waypoints.rel_alt.min() > 80.0 + 50.0 - 1.0    # рельеф ≥ 200 м, дом на 150 м
+
+    # DEM без тайлов: рельеф неизвестен — план не строится; явное «море» (0 м) — высоты не меняются
+    with pytest.raises(ValueError, match="no DEM elevation"):
+        plan_coverage(rect, params=p, heading_deg=90.0, dem=DEM())
+    sea = plan_coverage(rect, params=p, heading_deg=90.0, dem=DEM(missing_elev_m=0.0))
+    assert np.array_equal(sea.waypoints.data, flat.waypoints.data)
@@ -0,0 +1,66 @@
+import numpy as np
+
+from agents.autopilot_ai.coverage_planner import plan_coverage
+from agents.autopilot_ai.mission_grid import (
+    GridParams, Waypoint, WaypointArray, as_waypoint_array, camera_actions, generate_grid, generate_grid_array,
+)
+
+
+def test_roundtrip_views_and_legacy_api():
+    wps = [Waypoint(52.0 + i * 1e-4, 13.0, 100.0 + i, take_photo=i % 2 == 0, photo_distance_m=5.0 * i)
+           for i in range(6)]
+    arr = WaypointArray.from_waypoints(wps)
+    assert len(arr) == 6 and arr.to_waypoints() == wps and list(arr) == wps
+    assert arr[2] == wps[2] and as_waypoint_array(arr) is arr
+
+    head = arr[1:4]                      # срез — представление, без копии
+    assert isinstance(head, WaypointArray) and np.shares_memory(head.data, arr.data)
+    head.rel_alt[:] = 50.0
+    assert arr.rel_alt[1:4].tolist() == [50.0] * 3
+    assert arr[arr.take_photo].to_waypoints() == [w for w in arr if w.take_photo]
+
+    grid = generate_grid_array((52.0, 13.0, 52.01, 13.02), GridParams())
+    assert generate_grid((52.0, 13.0, 52.01, 13.02), GridParams()) == grid.to_waypoints()
+    plan = plan_coverage([(52.0, 13.0), (52.0, 13.02), (52.01, 13.02), (52.01, 13.0)])
+    assert isinstance(plan.waypoints, WaypointArray)
+    assert np.all(plan.waypoints.photo_distance_m[0::2] > 0) and np.all(plan.waypoints.photo_distance_m[1::2] == 0)
+
+
+def test_vectorized_transforms():
+    arr = WaypointArray.from_columns([60.0, 60.0, 60.01], [10.0, 10.02, 10.02], 120.0)
+
+    moved = arr.offset(north_m=111.32, east_m=55.66, up_m=10.0)     # на 60° 1e-3° долготы ≈ 55.7 м
+    assert np.allclose(moved.lat - arr.lat, 1e-3) and np.allclose(moved.lon - arr.lon, 1e-3, atol=1e-6)
+    assert np.all(moved.rel_alt == 130.0) and np.all(arr.rel_alt == 120.0)
+
+    origin = (60.0, 10.0)
+    r90 = arr.rotate(90.0, origin)                                   # восток -> юг
+    assert abs(r90.lon[1] - 10.0) < 1e-9 and r90.lat[1] < 60.0
+    back = r90.rotate(-90.0, origin)
+    assert np.allclose(back.lat, arr.lat, atol=1e-12) and np.allclose(back.lon, arr.lon, atol=1e-12)
+
+    def terrain(lats, lons):                                         # склон на север, 10 м на 0.01°
+        return 30.0 + 1000.0 * (lats - 60.0)
+
+    agl = arr.agl_adjust(terrain, agl_m=100.0, home_elev_m=30.0)
+    assert np.allclose(agl.rel_alt, [100.0, 100.0, 110.0])
+    assert np.allclose(arr.agl_adjust(np.array([40.0, 40.0, 40.0]), home_elev_m=30.0).rel_alt, 130.0)
+
+
+def test_camera_actions_distance_trigger():
+    poly = [(52.0, 13.0), (52.0, 13.02), (52.01, 13.02), (52.01, 13.0)]
+    plan = plan_coverage(poly)
+    acts = camera_actions(plan.waypoints)
+    assert set(acts[0::2]) == {"START_PHOTO_DISTANCE"} and set(acts[1::2]) == {"STOP_PHOTO_DISTANCE"}
+
+    class Hills:
+        def elevation(self, lats, lons):
+            return 50.0 * np.sin(np.asarray(lons) * 3000.0)
+
+    wps = plan_coverage(poly, dem=Hills()).waypoints
+    acts = camera_actions(wps)
+    assert len(wps) > len(plan.waypoints) and acts.count("NONE") == len(wps) - len(plan.waypoints)
+    assert acts.count("START_PHOTO_DISTANCE") == acts.count("STOP_PHOTO_DISTANCE") == len(plan.waypoints) // 2
+
+    legacy = WaypointArray.from_columns([52.0, 52.001], [13.0, 13.0], 100.0, take_photo=[True, False])
+    assert camera_actions(legacy) == ["TAKE_PHOTO", "NONE"]
@@ -0,0 +1,71 @@
+import json
+
+import numpy as np
+from shapely.geometry import Point, Polygon
+
+from agents.autopilot_ai.envi_io import TiffStripWriter, read_tiff
+from agents.autopilot_ai.utm import from_utm
+from agents.autopilot_ai.zonal_stats import zonal_stats
+
+X0, Y0, PX = 390000.0, 5820000.0, 2.0          # UTM 33N, пиксель 2 м
+
+
+def _lonlat(pts_xy):
+    lat, lon = from_utm(np.array([p[0] for p in pts_xy]), np.array([p[1] for p in pts_xy]), 33, True)
+    return [[float(a), float(b)] for a, b in zip(lon, lat)]
+
+
+def test_zonal_stats_match_brute_force(tmp_path):
+    h, w = 120, 150
+    rng = np.random.default_rng(2)
+    ndvi = rng.uniform(-0.2, 0.9, (h, w)).astype(np.float32)
+    ndvi[5, 5] = np.nan
+    tif = str(tmp_path / "ndvi.tif")
+    with TiffStripWriter(tif, w, h, geo=(X0, Y0, PX, PX), epsg=32633) as wr:
+        for r0 in range(0, h, 32):
+            wr.write(ndvi[r0:r0 + 32])
+    arr, geo, epsg = read_tiff(tif)
+    assert geo == (X0, Y0, PX, PX) and epsg == 32633 and np.array_equal(arr, ndvi, equal_nan=True)
+
+    outer = [(X0 + 10, Y0 - 10), (X0 + 150, Y0 - 20), (X0 + 120, Y0 - 200), (X0 + 15, Y0 - 180)]
+    hole = [(X0 + 50, Y0 - 60), (X0 + 90, Y0 - 60), (X0 + 90, Y0 - 100), (X0 + 50, Y0 - 100)]
+    tri = [(X0 + 160, Y0 - 30), (X0 + 290, Y0 - 120), (X0 + 170, Y0 - 230)]
+    feats = [
+        {"type": "Feature", "properties": {"name": "A"},
+         "geometry": {"type": "Polygon", "coordinates": [_lonlat(outer), _lonlat(hole)]}},
+        {"type": "Feature", "properties": {"id": 7},
+         "geometry": {"type": "MultiPolygon", "coordinates": [[_lonlat(tri)]]}},
+        {"type": "Feature", "properties": {"name": "off-scene"},
+         "geometry": {"type": "Polygon", "coordinates": [_lonlat([(0, 0), (10, 0), (10, 10)])]}},
+    ]
+    path = tmp_path / "fields.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": feats}), encoding="utf-8")
+
+    res = zonal_stats(tif, str(path), block_rows=16, bins=512)
+    assert res.names == ["A", "7", "off-scene"] and res.count[2] == 0 and np.isnan(res.mean[2])
+
+    rows, cols = np.mgrid[0:h, 0:w]
+    cx, cy = X0 + (cols + 0.5) * PX, Y0 - (rows + 0.5) * PX
+    for i, g in enumerate([Polygon(outer, [hole]), Polygon(tri)]):
+        inside = np.array([g.contains(Point(x, y)) for x, y in zip(cx.ravel(), cy.ravel())]).reshape(h, w)
+        v = ndvi[inside]
+        v = v[np.isfinite(v)]
+        assert res.count[i] == v.size
+        assert abs(res.mean[i] - v.mean()) < 1e-6 and abs(res.std[i] - v.std()) < 1e-6
+        assert res.min[i] == v.min() and res.max[i] == v.max()
+        assert abs(res.percentiles[50.0][i] - np.median(v)) < 2 * 2.0 / 512
+        assert abs(res.percentiles[90.0][i] - np.percentile(v, 90)) < 2 * 2.0 / 512
+        assert res.hist[i].sum() == v.size
+    assert res.to_rows()[0]["p50"] == res.percentiles[50.0][0]
+
+
+def test_thousands_of_fields():
+    h = w = 2000
+    ndvi = np.random.default_rng(0).uniform(0, 1, (h, w)).astype(np.float32)
+    feats = []
+    for k in range(2500):                              # сетка 50×50 полей-ромбов по ~36 px в пикселях
+        cy, cx = 20 + 39.5 * (k // 50), 20 + 39.5 * (k % 50)
+        ring = [[cx - 18, -cy], [cx, -(cy - 18)], [cx + 18, -cy], [cx, -(cy + 18)]]
+        feats.append({"properties": {"name": f"f{k}"}, "geometry": {"type": "Polygon", "coordinates": [ring]}})
+    res = zonal_stats(ndvi, feats)                     # без geo: x = col, y = −row (замер: zonal_stats --bench)
+    assert (res.count > 600).all() and np.allclose(res.mean, 0.5, atol=0.05)
@@ -4,9 +4,12 @@
 - Анти-накопление интегральной ошибки (anti-windup)
 - Ограничение выходного сигнала
 - Плавная производная по измерению (без "кика" по setpoint)
+- PIDBank: M независимых контуров в массивах NumPy (рой, группы моторов)
 """
 
-from typing import Optional, Tuple
+from typing import Any, Optional, Tuple
+
+import numpy as np
 
 
 class PID:
@@ -73,4 +76,121 @@ class PID:
         self.setpoint = float(sp)
 
     def tune(self, kp: float, ki: float, kd: float) -> None:
-        self.kp, self.ki, self.kd = float(kp), float(ki), float(kd)
\ No newline at end of file
+        self.kp, self.ki, self.kd = float(kp), float(ki), float(kd)
+
+
+class PIDBank:
+    """
+    Банк из M независимых PID-контуров с той же семантикой, что у PID
+    (anti-windup, производная по измерению), но одним вызовом на все контуры.
+
+    Усиления, setpoint и лимиты — массивы (M,), их можно менять на месте
+    (bank.kp[i] = ...). Лимит None → без ограничения. update() не выделяет
+    память: результат пишется во внутренний буфер bank.out.
+    Результаты поэлементно совпадают с PID.update бит-в-бит.
+    """
+
+    def __init__(
+        self,
+        m: int,
+        kp: Any,
+        ki: Any,
+        kd: Any,
+        setpoint: Any = 0.0,
+        output_limits: Tuple[Any, Any] = (None, None),
+        integral_limits: Tuple[Any, Any] = (None, None),
+    ) -> None:
+        if m <= 0:
+            raise ValueError("m must be > 0")
+        self.m = int(m)
+
+        def _arr(v: Any, default: float) -> np.ndarray:
+            return np.array(np.broadcast_to(default if v is None else np.asarray(v, dtype=float), (m,)),
+                            dtype=float)
+
+        self.kp, self.ki, self.kd = _arr(kp, 0.0), _arr(ki, 0.0), _arr(kd, 0.0)
+        self.setpoint = _arr(setpoint, 0.0)
+        self.min_out, self.max_out = _arr(output_limits[0], -np.inf), _arr(output_limits[1], np.inf)
+        self.min_int, self.max_int = _arr(integral_limits[0], -np.inf), _arr(integral_limits[1], np.inf)
+
+        self.integral = np.zeros(m)
+        self.prev_meas = np.zeros(m)
+        self.has_prev = np.zeros(m, dtype=bool)
+
+        # рабочие буферы
+        self.out = np.zeros(m)
+        self._err = np.zeros(m)
+        self._tmp = np.zeros(m)
+        self._int = np.zeros(m)
+        self._no_prev = np.zeros(m, dtype=bool)
+
+    def __len__(self) -> int:
+        return self.m
+
+    def reset(self, mask: Any = None) -> None:
+        """Сбросить интеграл и историю измерений (mask/индексы/срез; None — все контуры)."""
+        idx = slice(None) if mask is None else mask
+        self.integral[idx] = 0.0
+        self.prev_meas[idx] = 0.0
+        self.has_prev[idx] = False
+
+    def update(self, measurement: Any, dt: Any, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Обновить контуры и вернуть bank.out (M,).
+        mask (bool, M) — какие контуры продвигают состояние; для остальных
+        интеграл/история не меняются, а значения out не определены.
+        dt проверяется (> 0) только у контуров из mask — как у скалярного PID, который не вызывается.
+        """
+        if mask is None:
+            if np.min(dt) <= 0:
+                raise ValueError("dt must be > 0")
+        else:
+            dt_all = np.broadcast_to(np.asarray(dt, dtype=float), (self.m,))
+            run = dt_all[mask]
+            if not run.size:
+                return self.out
+            if run.min() <= 0:
+                raise ValueError("dt must be > 0")
+            if dt_all.min() <= 0:
+                dt = np.where(dt_all > 0, dt_all, 1.0)  # неактивные контуры: без деления на 0
+        err, tmp, integ, u = self._err, self._tmp, self._int, self.out
+
+        np.subtract(self.setpoint, measurement, out=err)
+
+        # Интегральная составляющая с ограничением (anti-windup)
+        np.multiply(err, dt, out=tmp)
+        np.add(self.integral, tmp, out=integ)
+        np.clip(integ, self.min_int, self.max_int, out=integ)
+
+        # Производная по измерению: -(meas - prev) / dt, 0 на первом шаге
+        np.subtract(measurement, self.prev_meas, out=tmp)
+        np.divide(tmp, dt, out=tmp)
+        np.negative(tmp, out=tmp)
+        np.logical_not(self.has_prev, out=self._no_prev)
+        np.copyto(tmp, 0.0, where=self._no_prev)
+
+        # Сумма (порядок сложения как в PID.update)
+        np.multiply(self.kp, err, out=u)
+        np.multiply(self.ki, integ, out=err)
+        np.add(u, err, out=u)
+        np.multiply(self.kd, tmp, out=tmp)
+        np.add(u, tmp, out=u)
+        np.clip(u, self.min_out, self.max_out, out=u)
+
+        if mask is None:
+            self.integral[:] = integ
+            np.copyto(self.prev_meas, measurement)
+            self.has_prev.fill(True)
+        else:
+            np.copyto(self.integral, integ, where=mask)
+            np.copyto(self.prev_meas, measurement, where=mask)
+            np.logical_or(self.has_prev, mask, out=self.has_prev)
+        return u
+
+    # Вспомогательные методы
+    def set_setpoint(self, sp: Any, idx: Any = None) -> None:
+        self.setpoint[slice(None) if idx is None else idx] = sp
+
+    def tune(self, kp: Any, ki: Any, kd: Any, idx: Any = None) -> None:
+        i = slice(None) if idx is None else idx
+        self.kp[i], self.ki[i], self.kd[i] = kp, ki, kd
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Бинарная телеметрия WebKurierDrone: кадр фиксированной длины + потоковый декодер.
+
+Кадр v1 (little-endian, 46 байт):
+    magic A5 5A | version u1 | flags u1 | seq u2 | t_ms u4 |
+    lat f8 | lon f8 | alt_m f4 | bat_pct f4 | airspeed_ms f4 | heading_deg f4 |
+    mode u1 | status u1 | crc u2 (CRC-16/CCITT-FALSE от version до status)
+Отсутствующие значения — NaN.
+
+- TelemetryDecoder.feed(bytes/bytearray/memoryview) -> структурированный массив TELEMETRY_DTYPE:
+  буфер смотрится через np.frombuffer (без копий), кандидаты кадров — по magic векторно,
+  CRC — таблично сразу для всех кандидатов; мусор/битые кадры пропускаются (ресинхронизация),
+  хвост неполного кадра переносится в следующий feed()
+- encode_frames(records) — массив записей -> байты (CRC векторно)
+- parse_text_batch(lines) — прежний текст "GPS:52.1,13.4;ALT:120;BAT:87%" в тот же dtype:
+  строки одной раскладки — одним np.fromstring на группу, прочие — регулярками;
+  битая часть строки даёт NaN только в своём поле
+"""
+
+import re
+from itertools import repeat
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+MAGIC = b"\xa5\x5a"
+VERSION = 1
+
+WIRE_DTYPE = np.dtype([
+    ("magic", "<u2"), ("version", "u1"), ("flags", "u1"), ("seq", "<u2"), ("t_ms", "<u4"),
+    ("lat", "<f8"), ("lon", "<f8"), ("alt_m", "<f4"), ("bat_pct", "<f4"),
+    ("airspeed_ms", "<f4"), ("heading_deg", "<f4"), ("mode", "u1"), ("status", "u1"), ("crc", "<u2"),
+])
+FRAME_SIZE = WIRE_DTYPE.itemsize
+_MAGIC_U16 = int.from_bytes(MAGIC, "little")
+
+# Декодированная запись (без служебных magic/crc)
+TELEMETRY_DTYPE = np.dtype([
+    ("version", "u1"), ("flags", "u1"), ("seq", "u2"), ("t_ms", "u4"),
+    ("lat", "f8"), ("lon", "f8"), ("alt_m", "f4"), ("bat_pct", "f4"),
+    ("airspeed_ms", "f4"), ("heading_deg", "f4"), ("mode", "u1"), ("status", "u1"),
+])
+
+
+def _crc16_table() -> np.ndarray:
+    table = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        c = i << 8
+        for _ in range(8):
+            c = ((c << 1) ^ 0x1021) if c & 0x8000 else (c << 1)
+        table[i] = c & 0xFFFF
+    return table
+
+
+_CRC_TABLE = _crc16_table()
+
+
+def crc16(frames: np.ndarray) -> np.ndarray:
+    """CRC-16/CCITT-FALSE по строкам (N, L) uint8 — цикл по L байтам, вектор по N кадрам."""
+    crc = np.full(frames.shape[0], 0xFFFF, dtype=np.uint16)
+    idx = np.empty_like(crc)
+    for col in np.ascontiguousarray(frames.T):                         # столбцы подряд в памяти
+        np.right_shift(crc, 8, out=idx)
+        idx ^= col
+        np.left_shift(crc, 8, out=crc)
+        crc ^= _CRC_TABLE[idx]
+    return crc
+
+
+def encode_frames(records: Union[np.ndarray, Sequence[Dict[str, Any]]]) -> bytes:
+    """Записи (TELEMETRY_DTYPE или список dict) -> байты подряд идущих кадров v1."""
+    if not isinstance(records, np.ndarray):
+        rec = np.zeros(len(records), dtype=TELEMETRY_DTYPE)
+        for f in ("lat", "lon", "alt_m", "bat_pct", "airspeed_ms", "heading_deg"):
+            rec[f] = np.nan
+        for i, r in enumerate(records):
+            for k, v in r.items():
+                rec[k][i] = v
+        records = rec
+    wire = np.zeros(len(records), dtype=WIRE_DTYPE)
+    for f in TELEMETRY_DTYPE.names:
+        wire[f] = records[f]
+    wire["magic"] = _MAGIC_U16
+    wire["version"] = VERSION
+    raw = wire.view(np.uint8).reshape(len(wire), FRAME_SIZE)
+    wire["crc"] = crc16(raw[:, 2:-2])
+    return wire.tobytes()
+
+
+def encode(**fields: Any) -> bytes:
+    """Один кадр: encode(seq=1, lat=52.1, lon=13.4, alt_m=120, bat_pct=87)."""
+    return encode_frames([fields])
+
+
+class TelemetryDecoder:
+    """
+    Потоковый декодер одного канала (линка). feed() возвращает пачку кадров по порядку;
+    счётчики: frames, crc_errors (magic+версия верны, CRC нет), skipped_bytes (мусор между кадрами).
+    """
+
+    def __init__(self) -> None:
+        self._carry = b""
+        self.frames = 0
+        self.crc_errors = 0
+        self._bytes_in = 0
+
+    def _scan(self, buf: np.ndarray, limit: Optional[int] = None) -> "tuple[np.ndarray, int]":
+        """
+        Кадры в buf (uint8, вид на исходные байты); limit — только кадры, начинающиеся до limit.
+        Returns: (записи, конец последнего принятого кадра или 0).
+        """
+        n = buf.shape[0]
+        if n < FRAME_SIZE:
+            return np.empty(0, dtype=TELEMETRY_DTYPE), 0
+        last = n - FRAME_SIZE + 1 if limit is None else min(limit, n - FRAME_SIZE + 1)
+        pos = np.flatnonzero((buf[:last] == MAGIC[0]) & (buf[1:last + 1] == MAGIC[1]))
+        if pos.size:
+            pos = pos[buf[pos + 2] == VERSION]
+        if not pos.size:
+            return np.empty(0, dtype=TELEMETRY_DTYPE), 0
+        win = np.lib.stride_tricks.sliding_window_view(buf, FRAME_SIZE)
+        raw = win[pos]                                                       # (K, FRAME_SIZE) — кандидаты
+        crc = raw[:, -2].astype(np.uint16) | (raw[:, -1].astype(np.uint16) << np.uint16(8))
+        good = crc16(raw[:, 2:-2]) == crc
+        self.crc_errors += int((~good).sum())
+        pos, raw = pos[good], raw[good]
+        if pos.size > 1 and (np.diff(pos) < FRAME_SIZE).any():
+            # редкий случай: ложный magic внутри принятого кадра с совпавшим CRC — жадно, без перекрытий
+            keep, end = [], -1
+            for i, p in enumerate(pos.tolist()):
+                if p >= end:
+                    keep.append(i)
+                    end = p + FRAME_SIZE
+            pos, raw = pos[keep], raw[keep]
+        if not pos.size:
+            return np.empty(0, dtype=TELEMETRY_DTYPE), 0
+        wire = np.ascontiguousarray(raw).view(WIRE_DTYPE).reshape(-1)
+        out = np.empty(len(wire), dtype=TELEMETRY_DTYPE)
+        for f in TELEMETRY_DTYPE.names:
+            out[f] = wire[f]
+        return out, int(pos[-1]) + FRAME_SIZE
+
+    def feed(self, data: Union[bytes, bytearray, memoryview]) -> np.ndarray:
+        """Очередной кусок потока -> кадры (TELEMETRY_DTYPE), возможно пустой массив."""
+        mv = memoryview(data).cast("B")
+        carry = self._carry
+        nc, total = len(carry), len(carry) + mv.nbytes
+        batches: List[np.ndarray] = []
+        start = 0                       # откуда сканировать mv
+        consumed = 0                    # конец последнего кадра в координатах carry + data
+        if carry:
+            # стык: хвост прошлого куска + начало нового (< 2·FRAME_SIZE байт — единственная копия)
+            joint = carry + bytes(mv[:FRAME_SIZE - 1])
+            rec, end = self._scan(np.frombuffer(joint, dtype=np.uint8), limit=nc)
+            if rec.size:
+                batches.append(rec)
+                start, consumed = end - nc, end
+        buf = np.frombuffer(mv, dtype=np.uint8)[start:]                      # вид, без копии
+        rec, end = self._scan(buf)
+        if rec.size:
+            batches.append(rec)
+            consumed = nc + start + end
+        # в хвост — всё после последнего кадра, но не больше FRAME_SIZE − 1 байт
+        # (всё, что раньше, уже проверено как начало полного кадра)
+        tail = max(consumed, total - (FRAME_SIZE - 1))
+        self._carry = carry[tail:] + bytes(mv) if tail < nc else bytes(mv[tail - nc:])
+        self._bytes_in += mv.nbytes
+        self.frames += sum(b.size for b in batches)
+        if not batches:
+            return np.empty(0, dtype=TELEMETRY_DTYPE)
+        return batches[0] if len(batches) == 1 else np.concatenate(batches)
+
+    @property
+    def skipped_bytes(self) -> int:
+        """Байты, не вошедшие ни в один принятый кадр (мусор, битые кадры), без текущего хвоста."""
+        return self._bytes_in - self.frames * FRAME_SIZE - len(self._carry)
+
+    def decode_stream(self, chunks: Iterable[Union[bytes, bytearray, memoryview]]) -> Iterator[np.ndarray]:
+        """Генератор пачек по кускам потока (пустые пачки пропускаются)."""
+        for chunk in chunks:
+            rec = self.feed(chunk)
+            if rec.size:
+                yield rec
+
+
+# ───────────────────────── Текстовый формат (совместимость) ─────────────────────────
+_NUM = r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)"
+_TEXT_FIELDS = {                       # ключ -> (поля, регулярка значения)
+    "GPS": (("lat", "lon"), _NUM + r"[ \t]*,[ \t]*" + _NUM),
+    "ALT": (("alt_m",), _NUM),
+    "BAT": (("bat_pct",), _NUM + r"[ \t]*%?"),
+    "SPD": (("airspeed_ms",), _NUM),
+    "HDG": (("heading_deg",), _NUM),
+}
+# ключ — литералом в начале шаблона (быстрый поиск префикса в re), граница поля — lookbehind после него
+_TEXT_RE = {k: re.compile(r"(?m)" + k + r"(?<![^;\n \t]" + k + r")[ \t]*:[ \t]*" + v + r"[ \t]*(?=;|$)")
+            for k, (_, v) in _TEXT_FIELDS.items()}
+# Раскладка строки — текст без символов чисел: "GPS:52.1,13.4;ALT:120;BAT:87%" -> "GPS:,;ALT:;BAT:%".
+# Допустимые хвосты ключа в раскладке; буквы ключей не должны пересекаться с символами чисел.
+_TEXT_TAILS = {"GPS": (",",), "BAT": ("", "%")}
+_NUM_CHARS = "0123456789.+-eE"
+_SKELETON = str.maketrans("", "", _NUM_CHARS)
+_TO_NUMBERS = str.maketrans({**dict.fromkeys(";:,%\n", " "), **dict.fromkeys("".join(_TEXT_FIELDS), None)})
+
+
+def _layout_fields(skeleton: str) -> Optional[List[str]]:
+    """Раскладка -> поля в порядке чисел строки; None — строку разбирает регулярка."""
+    fields: List[str] = []
+    for tok in skeleton.split(";"):
+        if not tok:
+            continue
+        key, sep, tail = tok.partition(":")
+        if not sep or key not in _TEXT_FIELDS or tail not in _TEXT_TAILS.get(key, ("",)):
+            return None
+        fields.extend(_TEXT_FIELDS[key][0])
+    return fields
+
+
+def _fill_layout(out: np.ndarray, text: str, rows: np.ndarray, fields: List[str]) -> bool:
+    """Строки одной раскладки: все числа — один np.fromstring, колонки — reshape. False — есть битые."""
+    if not fields:
+        return True
+    nums = text.translate(_TO_NUMBERS)
+    if not nums or nums.isspace():                                          # fromstring("  ") -> [-1.]
+        return False
+    try:
+        vals = np.fromstring(nums, sep=" ")
+    except ValueError:                                                      # "1..2", "1e", "--1"
+        return False
+    if vals.size != len(rows) * len(fields):                                # пустое значение "ALT:"
+        return False
+    vals = vals.reshape(len(rows), len(fields))
+    for j, f in enumerate(fields):
+        out[f][rows] = vals[:, j]                                           # при повторе ключа — последний
+    return True
+
+
+def _fill_regex(out: np.ndarray, lines: Sequence[str], rows: np.ndarray) -> None:
+    """Общий путь: регулярка на ключ по всем строкам, номер строки по позиции — np.searchsorted."""
+    text = "\n".join(lines)
+    starts = np.zeros(len(lines), dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, lines[:-1]), np.int64, len(lines) - 1) + 1, out=starts[1:])
+    for key, (fields, _) in _TEXT_FIELDS.items():
+        ms = list(_TEXT_RE[key].finditer(text))
+        if not ms:
+            continue
+        row = rows[np.searchsorted(starts, list(map(re.Match.start, ms)), side="right") - 1]
+        for j, f in enumerate(fields):
+            vals = list(map(re.Match.group, ms, repeat(j + 1)))
+            out[f][row] = np.array(vals, dtype=float)                          # при повторе ключа — последний
+
+
+def parse_text_batch(lines: Sequence[str]) -> np.ndarray:
+    """
+    Пачка строк "GPS:52.1,13.4;ALT:120;BAT:87%" -> TELEMETRY_DTYPE (seq — номер строки).
+    Строки группируются по раскладке (текст без чисел); для известной раскладки числа группы
+    разбираются одним np.fromstring и раскладываются по колонкам. Остальное (пробелы, чужие
+    ключи, битые значения) — регулярками. Неразобранные/битые поля — NaN, остальные поля строки сохраняются.
+    """
+    out = np.zeros(len(lines), dtype=TELEMETRY_DTYPE)
+    out["seq"] = np.arange(len(lines))
+    for fields, _ in _TEXT_FIELDS.values():
+        for f in fields:
+            out[f] = np.nan
+    if not lines:
+        return out
+    rows = np.arange(len(lines))
+    text = "\n".join(lines)
+    skeletons = text.translate(_SKELETON).split("\n")
+    if len(skeletons) != len(lines):                                        # "\n" внутри строк
+        _fill_regex(out, lines, rows)
+        return out
+    layouts = {sk: _layout_fields(sk) for sk in set(skeletons)}
+    slow = []
+    if len(layouts) == 1:
+        fields = next(iter(layouts.values()))
+        if fields is None or not _fill_layout(out, text, rows, fields):
+            slow.append(rows)
+    else:
+        ids = {sk: i for i, sk in enumerate(layouts)}
+        code = np.fromiter(map(ids.__getitem__, skeletons), np.int64, len(lines))
+        order = np.argsort(code, kind="stable")
+        bounds = np.flatnonzero(np.diff(code[order])) + 1
+        for grp in np.split(order, bounds):
+            fields = layouts[skeletons[grp[0]]]
+            sub = "\n".join(map(lines.__getitem__, grp.tolist()))
+            if fields is None or not _fill_layout(out, sub, grp, fields):
+                slow.append(grp)
+    if slow:
+        grp = np.sort(np.concatenate(slow))
+        _fill_regex(out, list(map(lines.__getitem__, grp.tolist())), grp)
+    return out
+
+
+def to_dict(rec: np.void) -> Dict[str, Any]:
+    """Одна запись -> dict чисел (NaN-поля опускаются)."""
+    d = {}
+    for f in TELEMETRY_DTYPE.names:
+        v = rec[f].item()
+        if not (isinstance(v, float) and v != v):
+            d[f] = v
+    return d
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    n = 200_000
+    rec = np.zeros(n, dtype=TELEMETRY_DTYPE)
+    rec["seq"] = np.arange(n)
+    rec["lat"], rec["lon"] = 52.1 + rng.normal(0, 1e-3, n), 13.4 + rng.normal(0, 1e-3, n)
+    rec["alt_m"], rec["bat_pct"] = rng.uniform(80, 120, n), rng.uniform(20, 100, n)
+    stream = encode_frames(rec)
+    dec = TelemetryDecoder()
+    t = time.perf_counter()
+    got = sum(dec.feed(memoryview(stream)[i:i + 65536]).size for i in range(0, len(stream), 65536))
+    dt = time.perf_counter() - t
+    print(f"binary: {got} frames, {got / dt / 1e6:.2f} M frames/s ({len(stream) / dt / 2**20:.0f} MiB/s)")
+
+    lines = [f"GPS:{a:.6f},{b:.6f};ALT:{c:.1f};BAT:{d:.0f}%" for a, b, c, d in
+             zip(rec["lat"][:50_000], rec["lon"][:50_000], rec["alt_m"][:50_000], rec["bat_pct"][:50_000])]
+    t = time.perf_counter()
+    parse_text_batch(lines)
+    print(f"text batch: {len(lines) / (time.perf_counter() - t) / 1e6:.2f} M lines/s")
+    from utils.telemetry_parser import parse
+    t = time.perf_counter()
+    for line in lines:
+        d = parse(line)
+        lat, lon = map(float, d["gps"].split(","))
+        alt, bat = float(d["alt"]), float(d["bat"].rstrip("%"))
+    print(f"legacy parse + float: {len(lines) / (time.perf_counter() - t) / 1e6:.2f} M lines/s")
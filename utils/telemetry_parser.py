@@ -1,5 +1,6 @@
 """
 Парсер телеметрии дронов. Преобразует входные RAW-данные в структурированный формат.
+Для потоков и пачек — utils.telemetry_codec (бинарные кадры с CRC, parse_text_batch для этого текста).
 """
 
 def parse(raw_data):